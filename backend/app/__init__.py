@@ -28,8 +28,12 @@ def create_app(config_name='development'):
     app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     app.register_blueprint(adaptation_bp, url_prefix='/api/adaptation')
     
-    # Create database tables
+    # Create database tables and pre-encode question payloads
     with app.app_context():
         db.create_all()
+        
+        from app.cbt.question_cache import question_payload_cache
+        question_payload_cache.clear()
+        question_payload_cache.warm()
     
     return app
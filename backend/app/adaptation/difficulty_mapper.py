@@ -1,6 +1,11 @@
 # Question Difficulty Mapper
 # Maps system difficulty (0.0-1.0) to question difficulty pools (low/medium/high)
 
+from bisect import bisect_right
+
+import numpy as np
+
+
 class DifficultyMapper:
     """
     Maps system difficulty level to question difficulty labels and pools.
@@ -20,6 +25,10 @@ class DifficultyMapper:
     THRESHOLD_LOW_TO_MEDIUM = 0.35
     THRESHOLD_MEDIUM_TO_HARD = 0.65
     
+    # Sorted breakpoints and the label of each band between them
+    THRESHOLDS = (THRESHOLD_LOW_TO_MEDIUM, THRESHOLD_MEDIUM_TO_HARD)
+    LABELS = (QUESTION_EASY, QUESTION_MEDIUM, QUESTION_HARD)
+    
     @staticmethod
     def get_difficulty_label(system_difficulty):
         """
@@ -31,12 +40,13 @@ class DifficultyMapper:
         Returns:
             Difficulty label: "easy", "medium", or "hard"
         """
-        if system_difficulty < DifficultyMapper.THRESHOLD_LOW_TO_MEDIUM:
-            return DifficultyMapper.QUESTION_EASY
-        elif system_difficulty < DifficultyMapper.THRESHOLD_MEDIUM_TO_HARD:
-            return DifficultyMapper.QUESTION_MEDIUM
-        else:
-            return DifficultyMapper.QUESTION_HARD
+        return DifficultyMapper.LABELS[bisect_right(DifficultyMapper.THRESHOLDS, system_difficulty)]
+    
+    @staticmethod
+    def get_difficulty_labels(system_difficulties):
+        """Vectorized get_difficulty_label for an array of system difficulties."""
+        codes = np.searchsorted(DifficultyMapper.THRESHOLDS, system_difficulties, side='right')
+        return np.array(DifficultyMapper.LABELS, dtype=object)[codes]
     
     @staticmethod
     def get_difficulty_range(system_difficulty):
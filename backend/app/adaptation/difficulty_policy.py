@@ -0,0 +1,151 @@
+"""
+Difficulty Policy
+
+The accuracy-band difficulty policy of AdaptiveEngine.adapt_difficulty as a
+declarative table, compiled once into sorted breakpoint arrays and shared by
+the live engine, offline replay (replay.py) and simulations (which drive the
+live engine through HeadlessEngine).
+
+- Bands are checked highest bound first, so the matching band is the number
+  of inclusive breakpoints <= accuracy: bisect_right for one decision,
+  np.searchsorted(side='right') for whole columns
+- Exclusive bounds (accuracy > b) become the inclusive breakpoint
+  nextafter(b, +inf), which is exact for floats
+- Accuracy below every band (or NaN) takes the below-bands step; a no-change
+  decision with engagement under the threshold steps down instead
+"""
+
+from bisect import bisect_right
+
+import numpy as np
+
+from config import Config
+
+
+# (lower accuracy bound, bound inclusive, difficulty step, trigger metric, reason)
+DIFFICULTY_BANDS = (
+    (0.99, True, 0.10, 'perfect_accuracy', "Perfect accuracy ({accuracy:.0%}), +0.10 step"),
+    (0.8, True, 0.10, 'high_accuracy', "High accuracy ({accuracy:.0%}), +0.10 step"),
+    (0.67, True, 0.01, 'mixed_good_accuracy', "Mixed results ({accuracy:.0%}), +0.01 stability step"),
+    (0.33, False, 0.0, 'marginal_accuracy', "Marginal accuracy ({accuracy:.0%}), no change"),
+    (0.01, False, -0.10, 'low_accuracy', "Low accuracy ({accuracy:.0%}), -0.10 step"),
+)
+BELOW_BANDS = (-0.10, 'zero_accuracy', "No correct answers ({accuracy:.0%}), -0.10 step")
+LOW_ENGAGEMENT = (
+    'marginal_accuracy_low_engagement',
+    "Marginal accuracy ({accuracy:.0%}) + low engagement ({engagement:.0%}), -0.05 step"
+)
+
+
+def default_policy():
+    """Difficulty policy parameters matching AdaptiveEngine.adapt_difficulty"""
+    return {
+        'min_difficulty': Config.ADAPTATION_CONFIG['min_difficulty'],
+        'max_difficulty': Config.ADAPTATION_CONFIG['max_difficulty'],
+        'adapt_every_n_answers': Config.ADAPTATION_CONFIG.get('adapt_every_n_answers', 3),
+        # (lower accuracy bound, bound inclusive, difficulty step), highest bound first
+        'accuracy_bands': [band[:3] for band in DIFFICULTY_BANDS],
+        'below_bands_step': BELOW_BANDS[0],
+        # No-change decisions with engagement below the threshold step down instead
+        'low_engagement_threshold': 0.3,
+        'low_engagement_step': 0.05
+    }
+
+
+class CompiledDifficultyPolicy:
+    """A difficulty policy compiled into breakpoint and step arrays"""
+
+    def __init__(self, policy=None):
+        policy = policy or default_policy()
+        self.min_difficulty = float(policy['min_difficulty'])
+        self.max_difficulty = float(policy['max_difficulty'])
+        self.low_engagement_threshold = float(policy['low_engagement_threshold'])
+        self.low_engagement_step = float(policy['low_engagement_step'])
+
+        # Trigger names and reasons for bands declared in DIFFICULTY_BANDS
+        labels = {band[:3]: band[3:] for band in DIFFICULTY_BANDS}
+        bands = sorted(
+            (tuple(band[:3]) for band in policy['accuracy_bands']),
+            key=lambda band: band[0]
+        )
+        # Index 0 is "below every band"; index i + 1 is the i-th band in ascending order
+        self.breakpoints = np.array([
+            bound if inclusive else np.nextafter(bound, np.inf)
+            for bound, inclusive, _ in bands
+        ], dtype=float)
+        self.steps = np.array([policy['below_bands_step']] + [step for _, _, step in bands], dtype=float)
+        self.triggers = [BELOW_BANDS[1]] + [
+            labels.get(band, (f'accuracy_band_{i + 1}',))[0] for i, band in enumerate(bands)
+        ]
+        self.reasons = [BELOW_BANDS[2]] + [
+            labels.get(band, (None, "Accuracy {accuracy:.0%}, {step:+.2f} step"))[1] for band in bands
+        ]
+        self.low_engagement_code = len(self.steps)
+
+        # Plain-float copies for the scalar path
+        self._breakpoints = self.breakpoints.tolist()
+        self._steps = self.steps.tolist()
+
+    # ------------------------------------------------------------ scalar path
+
+    def band(self, accuracy):
+        """Band index for one accuracy (0 = below every band)"""
+        if accuracy != accuracy:  # NaN
+            return 0
+        return bisect_right(self._breakpoints, accuracy)
+
+    def decide(self, current, accuracy, engagement):
+        """(new difficulty, trigger metric, reason) for one decision"""
+        code = self.band(accuracy)
+        step = self._steps[code]
+        if step > 0:
+            new = min(self.max_difficulty, current + step)
+        elif step < 0:
+            new = max(self.min_difficulty, current - -step)
+        else:
+            new = current
+        trigger, reason = self.triggers[code], self.reasons[code]
+
+        if engagement < self.low_engagement_threshold and new == current:
+            new = max(self.min_difficulty, current - self.low_engagement_step)
+            trigger, reason = LOW_ENGAGEMENT
+
+        return new, trigger, reason.format(accuracy=accuracy, engagement=engagement, step=step)
+
+    # ------------------------------------------------------------- batch path
+
+    def decide_many(self, current, accuracy, engagement):
+        """
+        Vectorized decide over columns of (current, accuracy, engagement).
+        Returns (new difficulty array, decision codes) where codes index
+        self.triggers, or equal low_engagement_code for the engagement rule.
+        """
+        current = np.asarray(current, dtype=float)
+        accuracy = np.asarray(accuracy, dtype=float)
+        engagement = np.asarray(engagement, dtype=float)
+
+        codes = np.searchsorted(self.breakpoints, accuracy, side='right')
+        codes[np.isnan(accuracy)] = 0
+        step = self.steps[codes]
+        new = np.where(step > 0, np.minimum(self.max_difficulty, current + step),
+                       np.where(step < 0, np.maximum(self.min_difficulty, current - -step), current))
+
+        disengaged = (engagement < self.low_engagement_threshold) & (new == current)
+        new = np.where(disengaged, np.maximum(self.min_difficulty, current - self.low_engagement_step), new)
+        return new, np.where(disengaged, self.low_engagement_code, codes)
+
+    def trigger_names(self, codes):
+        """Trigger metric names for decision codes from decide_many"""
+        names = np.array(self.triggers + [LOW_ENGAGEMENT[0]], dtype=object)
+        return names[np.asarray(codes)]
+
+
+_default_policy = None
+
+
+def get_difficulty_policy(refresh=False):
+    """Shared compiled default policy; refresh=True recompiles after changing Config"""
+    global _default_policy
+    if _default_policy is None or refresh:
+        _default_policy = CompiledDifficultyPolicy(default_policy())
+    return _default_policy
@@ -0,0 +1,271 @@
+"""
+Adaptation Effectiveness Labeler
+
+Incremental background job that fills AdaptationLog.was_effective and
+effectiveness_notes, so effectiveness reports become plain counts.
+
+- Logs are processed in (timestamp, id) order past a stored watermark
+  (JobWatermark); logs younger than settle_seconds are left for the next run
+  so their "after" window can fill
+- A label is final once its after window holds window_responses answers, its
+  session has ended, or the log is older than final_after_seconds. The
+  watermark only advances past final labels: from the first provisional one
+  on, logs are labeled but re-queued, and relabeled on the next run
+- Per batch, responses and engagement metrics of the batch's sessions are
+  loaded with two ordered scans and joined to each log as-of its timestamp:
+  the window_responses answers at or before the log vs the ones after it,
+  and the latest engagement metric at the log vs at the end of the window
+- An adaptation is effective when accuracy change + engagement change
+  exceeds min_improvement; logs without responses on both sides stay
+  unknown (None) with a note
+- Labels are written with one bulk UPDATE per batch and the watermark
+  advanced in the same commit; the watermark's updated_at changes with every
+  batch, so it also marks relabeled provisional rows
+
+Run from backend directory: python scripts/label_adaptation_effectiveness.py
+"""
+
+import logging
+from datetime import datetime, timedelta
+from itertools import groupby
+
+import numpy as np
+from sqlalchemy import and_, or_, func
+
+from app import db
+from app.models.adaptation import AdaptationLog, JobWatermark
+from app.models.engagement import EngagementMetric
+from app.models.session import Session, StudentResponse
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = 'adaptation_effectiveness'
+
+
+class EffectivenessLabeler:
+    """Label adaptation logs as effective/ineffective from before/after windows"""
+
+    def __init__(self, window_responses=None, settle_seconds=None, min_improvement=None, batch_size=None,
+                 final_after_seconds=None):
+        settings = Config.EFFECTIVENESS_LABELING
+        self.window_responses = window_responses or settings['window_responses']
+        self.settle_seconds = settings['settle_seconds'] if settle_seconds is None else settle_seconds
+        self.final_after_seconds = (settings['final_after_seconds'] if final_after_seconds is None
+                                    else final_after_seconds)
+        self.min_improvement = settings['min_improvement'] if min_improvement is None else min_improvement
+        self.batch_size = batch_size or settings['batch_size']
+
+    # ----------------------------------------------------------- watermark
+
+    def get_watermark(self):
+        """Stored watermark row, created on first use"""
+        watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+        if watermark is None:
+            watermark = JobWatermark(name=WATERMARK_NAME, processed_count=0)
+            db.session.add(watermark)
+            db.session.flush()
+        return watermark
+
+    def _pending_query(self, position, now):
+        """Settled logs after a (timestamp, id) position ((None, None) = from the start)"""
+        last_timestamp, last_id = position
+        query = db.session.query(
+            AdaptationLog.id, AdaptationLog.session_id, AdaptationLog.timestamp
+        ).filter(
+            AdaptationLog.timestamp <= now - timedelta(seconds=self.settle_seconds)
+        )
+        if last_timestamp is not None:
+            query = query.filter(or_(
+                AdaptationLog.timestamp > last_timestamp,
+                and_(AdaptationLog.timestamp == last_timestamp,
+                     AdaptationLog.id > last_id)
+            ))
+        return query
+
+    @staticmethod
+    def _position(watermark):
+        return watermark.last_timestamp, watermark.last_id
+
+    def pending(self, now=None):
+        """Number of settled logs without a final label"""
+        return self._pending_query(self._position(self.get_watermark()), now or datetime.utcnow()).count()
+
+    # ------------------------------------------------------------- running
+
+    def run(self, now=None, max_batches=None):
+        """Label settled logs past the watermark, batch by batch"""
+        now = now or datetime.utcnow()
+        summary = {'batches': 0, 'labeled': 0, 'effective': 0, 'ineffective': 0, 'unknown': 0,
+                   'requeued': 0}
+
+        # The run walks every pending log; the watermark stops at the first provisional label
+        position = self._position(self.get_watermark())
+        advance = True
+        while max_batches is None or summary['batches'] < max_batches:
+            counts = self.label_batch(now, position, advance)
+            if counts['labeled'] == 0:
+                break
+            position = counts['position']
+            advance = advance and counts['requeued'] == 0
+            summary['batches'] += 1
+            for key in ('labeled', 'effective', 'ineffective', 'unknown', 'requeued'):
+                summary[key] += counts[key]
+
+        summary['watermark'] = self.get_watermark().to_dict()
+        return summary
+
+    def label_batch(self, now=None, position=None, advance=True):
+        """
+        Label the next batch of logs after position (default: the watermark)
+        and, when advance is set, move the watermark past its leading final
+        labels, in one commit. Returns counts plus the batch's end position.
+        """
+        now = now or datetime.utcnow()
+        watermark = self.get_watermark()
+        position = position or self._position(watermark)
+        logs = self._pending_query(position, now).order_by(
+            AdaptationLog.timestamp, AdaptationLog.id
+        ).limit(self.batch_size).all()
+
+        counts = {'labeled': len(logs), 'effective': 0, 'ineffective': 0, 'unknown': 0,
+                  'requeued': 0, 'position': position}
+        if not logs:
+            return counts
+
+        session_ids = sorted({log.session_id for log in logs})
+        responses = self._load_responses(session_ids)
+        metrics = self._load_metrics(session_ids)
+        ended = {
+            session_id for session_id, session_end in db.session.query(Session.id, Session.session_end)
+            .filter(Session.id.in_(session_ids)) if session_end is not None
+        }
+        final_before = now - timedelta(seconds=self.final_after_seconds)
+
+        updates = []
+        finalized = 0  # Leading final labels the watermark moves past
+        for log in logs:
+            was_effective, notes, complete = self.evaluate(
+                responses.get(log.session_id), metrics.get(log.session_id), log.timestamp
+            )
+            updates.append({'id': log.id, 'was_effective': was_effective, 'effectiveness_notes': notes})
+            counts['unknown' if was_effective is None else 'effective' if was_effective else 'ineffective'] += 1
+
+            final = complete or log.session_id in ended or log.timestamp <= final_before
+            if advance and final and counts['requeued'] == 0:
+                finalized += 1
+            else:
+                counts['requeued'] += 1
+
+        db.session.execute(db.update(AdaptationLog), updates)
+
+        if finalized:
+            watermark.last_timestamp = logs[finalized - 1].timestamp
+            watermark.last_id = logs[finalized - 1].id
+            watermark.processed_count = (watermark.processed_count or 0) + finalized
+        # Touched by every batch, relabels included: caches of labels key on it
+        watermark.updated_at = datetime.utcnow()
+        db.session.commit()
+        counts['position'] = (logs[-1].timestamp, logs[-1].id)
+
+        logger.info(f"[EFFECTIVENESS] Labeled {len(logs)} logs "
+                    f"({counts['effective']} effective, {counts['ineffective']} ineffective, "
+                    f"{counts['unknown']} unknown; {counts['requeued']} provisional, re-queued)")
+        return counts
+
+    # -------------------------------------------------------------- as-of
+
+    def _load_responses(self, session_ids):
+        rows = db.session.query(
+            StudentResponse.session_id, StudentResponse.timestamp, StudentResponse.is_correct
+        ).filter(
+            StudentResponse.session_id.in_(session_ids)
+        ).order_by(StudentResponse.session_id, StudentResponse.timestamp).all()
+        return self._by_session(rows)
+
+    def _load_metrics(self, session_ids):
+        rows = db.session.query(
+            EngagementMetric.session_id, EngagementMetric.timestamp, EngagementMetric.engagement_score
+        ).filter(
+            EngagementMetric.session_id.in_(session_ids)
+        ).order_by(EngagementMetric.session_id, EngagementMetric.timestamp).all()
+        return self._by_session(rows)
+
+    @staticmethod
+    def _by_session(rows):
+        """{session_id: (datetime64 timestamps, float values)} from rows ordered by session"""
+        series = {}
+        for session_id, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            series[session_id] = (
+                np.array([row[1] for row in group], dtype='datetime64[us]'),
+                np.array([float(row[2] if row[2] is not None else 0.0) for row in group])
+            )
+        return series
+
+    def evaluate(self, responses, metrics, timestamp):
+        """
+        (was_effective, notes, complete) for an adaptation at timestamp, given
+        the session's (timestamps, is_correct) responses and (timestamps, score)
+        engagement metrics; complete is set once the after window holds
+        window_responses answers.
+        """
+        if responses is None:
+            return None, 'Insufficient data: no responses in session', False
+
+        at = np.datetime64(timestamp, 'us')
+        times, correct = responses
+        split = int(np.searchsorted(times, at, side='right'))
+        before = correct[max(0, split - self.window_responses):split]
+        after = correct[split:split + self.window_responses]
+        complete = after.size == self.window_responses
+        if before.size == 0 or after.size == 0:
+            return None, (f'Insufficient data: {before.size} responses before, '
+                          f'{after.size} after adaptation'), complete
+
+        accuracy_before, accuracy_after = before.mean(), after.mean()
+        improvement = accuracy_after - accuracy_before
+        notes = (f'Accuracy {accuracy_before:.2f} -> {accuracy_after:.2f} ({improvement:+.2f}) '
+                 f'over {before.size}/{after.size} responses')
+
+        window_end = times[split + after.size - 1]
+        engagement_before = self._as_of(metrics, at)
+        engagement_after = self._as_of(metrics, window_end)
+        if engagement_before is not None and engagement_after is not None:
+            engagement_change = engagement_after - engagement_before
+            improvement += engagement_change
+            notes += (f'; engagement {engagement_before:.2f} -> {engagement_after:.2f} '
+                      f'({engagement_change:+.2f})')
+        else:
+            notes += '; no engagement metric'
+
+        return bool(improvement > self.min_improvement), notes, complete
+
+    @staticmethod
+    def _as_of(metrics, at):
+        """Latest metric value recorded at or before at, or None"""
+        if metrics is None:
+            return None
+        times, scores = metrics
+        index = int(np.searchsorted(times, at, side='right')) - 1
+        return float(scores[index]) if index >= 0 else None
+
+
+def effectiveness_counts(session_id):
+    """Counts of effective/ineffective/unknown adaptations for a session (one grouped query)"""
+    rows = db.session.query(
+        AdaptationLog.was_effective, func.count(AdaptationLog.id)
+    ).filter(
+        AdaptationLog.session_id == session_id
+    ).group_by(AdaptationLog.was_effective).all()
+
+    counts = {True: 0, False: 0, None: 0}
+    for was_effective, count in rows:
+        counts[None if was_effective is None else bool(was_effective)] += count
+    total = sum(counts.values())
+    return {
+        'total_adaptations': total,
+        'effective': counts[True],
+        'ineffective': counts[False],
+        'unknown': counts[None]
+    }
@@ -3,6 +3,7 @@ from app.models.session import Session
 from app.models.adaptation import AdaptationLog
 from app import db
 from config import Config
+from app.adaptation.difficulty_policy import get_difficulty_policy
 from app.adaptation.facial_signal_integration import get_facial_modifier
 import logging
 
@@ -17,6 +18,7 @@ class AdaptiveEngine:
     def __init__(self):
         self.config = Config.ADAPTATION_CONFIG
         self.engagement_config = Config.ENGAGEMENT_THRESHOLDS
+        self.difficulty_policy = get_difficulty_policy()
         self.facial_modifier = get_facial_modifier()  # Optional facial signal integration
     
     def adapt_difficulty(self, student_id, session_id, engagement_metric):
@@ -36,101 +38,48 @@ class AdaptiveEngine:
         - Low accuracy (0.01-0.32): Decrease by 0.10 (consistent decrease)
         """
         session = Session.query.get(session_id)
-        current_difficulty = session.current_difficulty
+        result, log = self._decide_difficulty(
+            student_id, session_id, session.current_difficulty, engagement_metric
+        )
         
+        # Apply the adaptation
+        if log is not None:
+            session.current_difficulty = result['new_difficulty']
+            db.session.add(log)
+            db.session.commit()
+        
+        return result
+    
+    def _decide_difficulty(self, student_id, session_id, current_difficulty, engagement_metric):
+        """Difficulty decision without side effects: (result, AdaptationLog or None)"""
         accuracy = engagement_metric.accuracy
         engagement_score = engagement_metric.engagement_score
         
-        # Determine new difficulty based on accuracy-driven stepping
-        new_difficulty = current_difficulty
-        trigger_metric = None
+        # Accuracy bands + low-engagement rule (compiled table, see difficulty_policy.py)
+        new_difficulty, trigger_metric, reason = self.difficulty_policy.decide(
+            current_difficulty, accuracy, engagement_score
+        )
         trigger_value = accuracy
-        reason = None
-        
-        # Precise stepping based on accuracy ranges
-        if accuracy >= 0.99:  # Perfect or near-perfect (all correct)
-            # Large increase: 0.50 → 0.60 → 0.70 → 0.80
-            step = 0.10
-            new_difficulty = min(
-                self.config['max_difficulty'],
-                current_difficulty + step
-            )
-            trigger_metric = 'perfect_accuracy'
-            reason = f"Perfect accuracy ({accuracy:.0%}), +0.10 step"
-        
-        elif accuracy >= 0.8:  # High accuracy but not perfect
-            # Same step size for consistency: +0.10
-            step = 0.10
-            new_difficulty = min(
-                self.config['max_difficulty'],
-                current_difficulty + step
-            )
-            trigger_metric = 'high_accuracy'
-            reason = f"High accuracy ({accuracy:.0%}), +0.10 step"
-        
-        elif accuracy >= 0.67:  # Mixed but good (2/3 correct = 0.667)
-            # Tiny increase for stability: 0.50 → 0.51 pattern (exactly +0.01)
-            step = 0.01
-            new_difficulty = min(
-                self.config['max_difficulty'],
-                current_difficulty + step
-            )
-            trigger_metric = 'mixed_good_accuracy'
-            reason = f"Mixed results ({accuracy:.0%}), +0.01 stability step"
-        
-        elif accuracy > 0.33:  # Mixed but below 2/3
-            # Maintain current difficulty (no change)
-            trigger_metric = 'marginal_accuracy'
-            reason = f"Marginal accuracy ({accuracy:.0%}), no change"
-        
-        elif accuracy > 0.01:  # Low accuracy
-            # Decrease by 0.10 for consistency
-            step = 0.10
-            new_difficulty = max(
-                self.config['min_difficulty'],
-                current_difficulty - step
-            )
-            trigger_metric = 'low_accuracy'
-            reason = f"Low accuracy ({accuracy:.0%}), -0.10 step"
-        
-        else:  # Complete failure
-            # Large decrease: 0.50 → 0.40 → 0.30 → 0.20
-            step = 0.10
-            new_difficulty = max(
-                self.config['min_difficulty'],
-                current_difficulty - step
-            )
-            trigger_metric = 'zero_accuracy'
-            reason = f"No correct answers ({accuracy:.0%}), -0.10 step"
-        
-        # Consider engagement for additional modulation (but don't override accuracy-based decision)
-        if engagement_score < 0.3 and new_difficulty == current_difficulty:
-            # Very low engagement with marginal accuracy - still decrease slightly
-            step = 0.05
-            new_difficulty = max(
-                self.config['min_difficulty'],
-                current_difficulty - step
-            )
-            trigger_metric = 'marginal_accuracy_low_engagement'
-            reason = f"Marginal accuracy ({accuracy:.0%}) + low engagement ({engagement_score:.0%}), -0.05 step"
         
         # OPTIONAL: Apply facial signal as soft modifier (if available and enabled)
         facial_metadata = None
         facial_reason = None
         difficulty_delta = new_difficulty - current_difficulty
         
-        # Try to get facial data from the response (if available)
-        try:
-            facial_data = getattr(engagement_metric, 'facial_data', None) or {}
-            if facial_data:
-                facial_delta, facial_reason = self.facial_modifier.modify_difficulty_adjustment(
-                    difficulty_delta,
-                    # Get facial engagement signal if available
-                    facial_data.get('engagement_signal'),  
-                    engagement_score
-                )
-                # Apply facial modification only if it's available and enabled
-                if self.facial_modifier.is_enabled():
+        if not self.facial_modifier.is_enabled():
+            # Compiled no-op: sessions without facial integration skip validation entirely
+            facial_metadata = self.facial_modifier.compiled.disabled_metadata()
+        else:
+            # Try to get facial data from the response (if available)
+            try:
+                facial_data = getattr(engagement_metric, 'facial_data', None) or {}
+                if facial_data:
+                    facial_delta, facial_reason = self.facial_modifier.modify_difficulty_adjustment(
+                        difficulty_delta,
+                        # Get facial engagement signal if available
+                        facial_data.get('engagement_signal'),  
+                        engagement_score
+                    )
                     new_difficulty = current_difficulty + facial_delta
                     new_difficulty = max(
                         self.config['min_difficulty'],
@@ -138,18 +87,13 @@ class AdaptiveEngine:
                     )
                     reason += f" [Facial adjustment: {facial_reason}]"
                     logger.info(f"[FACIAL] Difficulty modified: {facial_reason}")
-            
-            facial_metadata = self.facial_modifier.get_integration_metadata(facial_data)
-        except Exception as e:
-            logger.warning(f"[FACIAL] Failed to apply facial signal: {e}")
-            facial_metadata = {'facial_integration_error': str(e)}
+                
+                facial_metadata = self.facial_modifier.get_integration_metadata(facial_data)
+            except Exception as e:
+                logger.warning(f"[FACIAL] Failed to apply facial signal: {e}")
+                facial_metadata = {'facial_integration_error': str(e)}
         
-        # Apply the adaptation
         if new_difficulty != current_difficulty:
-            session.current_difficulty = new_difficulty
-            db.session.commit()
-            
-            # Log the adaptation
             log = AdaptationLog(
                 student_id=student_id,
                 session_id=session_id,
@@ -160,8 +104,6 @@ class AdaptiveEngine:
                 new_value=new_difficulty,
                 reason=reason
             )
-            db.session.add(log)
-            db.session.commit()
             
             return {
                 'adapted': True,
@@ -170,14 +112,14 @@ class AdaptiveEngine:
                 'reason': reason,
                 'step_size': new_difficulty - current_difficulty,
                 'facial_integration': facial_metadata
-            }
+            }, log
         
         return {
             'adapted': False,
             'current_difficulty': current_difficulty,
             'reason': reason or 'No adaptation needed',
             'facial_integration': facial_metadata
-        }
+        }, None
     
     def adapt_pacing(self, student_id, session_id, engagement_metric):
         """
@@ -190,7 +132,21 @@ class AdaptiveEngine:
         - Use completion_rate and navigation_frequency for additional signals
         """
         session = Session.query.get(session_id)
-        pacing = session.student.preferred_pacing or 'medium'
+        result, log = self._decide_pacing(
+            student_id, session_id, session.student.preferred_pacing, engagement_metric
+        )
+        
+        # Apply the adaptation
+        if log is not None:
+            session.student.preferred_pacing = result['new_pacing']
+            db.session.add(log)
+            db.session.commit()
+        
+        return result
+    
+    def _decide_pacing(self, student_id, session_id, preferred_pacing, engagement_metric):
+        """Pacing decision without side effects: (result, AdaptationLog or None)"""
+        pacing = preferred_pacing or 'medium'
         
         # Use explicit None checks for engagement metrics
         response_time = engagement_metric.response_time_seconds if engagement_metric.response_time_seconds is not None else 0
@@ -245,12 +201,7 @@ class AdaptiveEngine:
             reason = f"High rapid clicking ({navigation_frequency} clicks) + low engagement ({engagement_score:.0%}), increasing pace to capture focus"
             indicators_used = ['navigation_frequency', 'engagement_score']
         
-        # Apply the adaptation
         if new_pacing != pacing:
-            session.student.preferred_pacing = new_pacing
-            db.session.commit()
-            
-            # Log the adaptation
             log = AdaptationLog(
                 student_id=student_id,
                 session_id=session_id,
@@ -261,8 +212,6 @@ class AdaptiveEngine:
                 new_value=self._pacing_to_float(new_pacing),
                 reason=reason
             )
-            db.session.add(log)
-            db.session.commit()
             
             return {
                 'adapted': True,
@@ -270,13 +219,13 @@ class AdaptiveEngine:
                 'new_pacing': new_pacing,
                 'reason': reason,
                 'indicators_used': indicators_used
-            }
+            }, log
         
         return {
             'adapted': False,
             'current_pacing': pacing,
             'reason': 'No adaptation needed'
-        }
+        }, None
     
     def adapt_hint_frequency(self, student_id, session_id, engagement_metric):
         """
@@ -289,11 +238,22 @@ class AdaptiveEngine:
         - Use inactivity to detect cognitive overload
         - Use interest_level to provide motivational hints
         """
+        result, log = self._decide_hints(student_id, session_id, engagement_metric)
+        
+        if log is not None:
+            db.session.add(log)
+            db.session.commit()
+        
+        return result
+    
+    def _decide_hints(self, student_id, session_id, engagement_metric):
+        """Hint decision without side effects: (result, AdaptationLog or None)"""
         # Use explicit None checks for all engagement indicators
         confidence = engagement_metric.confidence_level if engagement_metric.confidence_level is not None else 0.5
         frustration = engagement_metric.frustration_level if engagement_metric.frustration_level is not None else 0.5
         accuracy = engagement_metric.accuracy
-        attempts_count = engagement_metric.attempts_count if engagement_metric.attempts_count is not None else 0
+        # attempts_count is not an EngagementMetric column; only ad-hoc metrics carry it
+        attempts_count = getattr(engagement_metric, 'attempts_count', None) or 0
         inactivity_duration = engagement_metric.inactivity_duration if engagement_metric.inactivity_duration is not None else 0.0
         interest_level = engagement_metric.interest_level if engagement_metric.interest_level is not None else 0.5
         
@@ -342,8 +302,8 @@ class AdaptiveEngine:
             'indicators_used': indicators_used
         }
         
+        log = None
         if provide_proactive_hints or reduce_hint_threshold or increase_hint_frequency:
-            # Log the adaptation
             log = AdaptationLog(
                 student_id=student_id,
                 session_id=session_id,
@@ -354,10 +314,8 @@ class AdaptiveEngine:
                 new_value=1.0 if provide_proactive_hints else (0.0 if reduce_hint_threshold else 0.7),
                 reason=adaptation_result['reason']
             )
-            db.session.add(log)
-            db.session.commit()
         
-        return adaptation_result
+        return adaptation_result, log
     
     def adapt_content_selection(self, student_id, session_id, engagement_metric):
         """
@@ -446,9 +404,10 @@ class AdaptiveEngine:
             'indicator_sources': list(set([s.get('indicator_source') for s in strategies if 'indicator_source' in s]))
         }
     
-    def get_adaptation_recommendations(self, student_id, session_id):
+    def get_adaptation_recommendations(self, student_id, session_id, dry_run=False):
         """
         Get all adaptation recommendations for a student's current session
+        (one combined decision, see decide)
         """
         session = Session.query.get(session_id)
         if not session:
@@ -462,14 +421,43 @@ class AdaptiveEngine:
         if not metric:
             return {'error': 'No engagement metrics found'}, 404
         
-        recommendations = {
-            'difficulty': self.adapt_difficulty(student_id, session_id, metric),
-            'pacing': self.adapt_pacing(student_id, session_id, metric),
-            'hints': self.adapt_hint_frequency(student_id, session_id, metric),
-            'content': self.adapt_content_selection(student_id, session_id, metric)
-        }
+        return self.decide(student_id, session, metric, dry_run=dry_run)
+    
+    def decide(self, student_id, session, engagement_metric, dry_run=False):
+        """
+        Evaluate the difficulty, pacing, hint and content policies against one
+        loaded session and metric, and persist every resulting change and
+        AdaptationLog in a single commit. With dry_run=True nothing is written.
+        
+        The policies are independent (none reads another's output), so the
+        combined decision equals calling the four adapt_* methods in turn.
+        """
+        difficulty, difficulty_log = self._decide_difficulty(
+            student_id, session.id, session.current_difficulty, engagement_metric
+        )
+        pacing, pacing_log = self._decide_pacing(
+            student_id, session.id, session.student.preferred_pacing, engagement_metric
+        )
+        hints, hint_log = self._decide_hints(student_id, session.id, engagement_metric)
+        content = self.adapt_content_selection(student_id, session.id, engagement_metric)
+        
+        logs = [log for log in (difficulty_log, pacing_log, hint_log) if log is not None]
+        if logs and not dry_run:
+            if difficulty_log is not None:
+                session.current_difficulty = difficulty['new_difficulty']
+            if pacing_log is not None:
+                session.student.preferred_pacing = pacing['new_pacing']
+            db.session.add_all(logs)
+            db.session.commit()
         
-        return recommendations
+        return {
+            'difficulty': difficulty,
+            'pacing': pacing,
+            'hints': hints,
+            'content': content,
+            'dry_run': dry_run,
+            'adaptation_logs': len(logs)
+        }
     
     def _pacing_to_float(self, pacing):
         """Convert pacing string to float value"""
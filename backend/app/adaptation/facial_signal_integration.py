@@ -17,6 +17,8 @@ Architecture:
 - FacialSignalProcessor: Extracts engagement signals from facial emotion data
 - FacialDataValidator: Ensures data quality and handles missing/invalid data
 - AdaptationModifier: Applies facial signals as adjustments (never overrides)
+- CompiledFacialConfig: Configuration frozen into code-indexed lookup tables
+  (scalar fast path, constant no-op when disabled, batch scoring of many frames)
 - Configuration: Enable/disable at system level with fallback mode
 
 Integration Points:
@@ -27,6 +29,7 @@ Integration Points:
 
 from typing import Dict, Optional, Tuple
 from datetime import datetime
+import numpy as np
 from app.models.engagement import EngagementMetric
 from app.models.session import Session, StudentResponse
 from app import db
@@ -84,6 +87,175 @@ class FacialSignalConfig:
         'sad': {'confidence': 0.1, 'frustration': 0.8, 'interest': 0.2},
         'angry': {'confidence': 0.1, 'frustration': 1.0, 'interest': 0.1}
     }
+    
+    # Engagement signal adjustments (scaled by 0.1) per gaze pattern / posture
+    GAZE_PATTERN_ADJUSTMENTS = {
+        'focused': 0.2,      # Increase signal (very focused)
+        'reading': 0.1,      # Slight increase (reading content)
+        'scattered': -0.3,   # Decrease signal (distracted)
+        'downward': -0.5,    # Significant decrease (looking away/down)
+        'away': -0.7,        # Strong decrease (completely away)
+    }
+    POSTURE_ADJUSTMENTS = {
+        'upright_engaged': 0.15,    # Increase signal
+        'leaning_forward': 0.25,    # Strong increase (very engaged)
+        'relaxed': 0.0,             # No change
+        'slumped': -0.25,           # Decrease signal (disengaged)
+        'tense': -0.2,              # Decrease signal (stressed)
+    }
+
+
+class CompiledFacialConfig:
+    """
+    FacialSignalConfig frozen into lookup tables at startup.
+    
+    Emotions, gaze patterns and postures are mapped to integer codes; code 0
+    is "unknown" (invalid emotion / no adjustment). Signals follow
+    FacialSignalProcessor.extract_engagement_signal exactly:
+        signal = clip(clip(emotion + 0.1 * gaze) + 0.1 * posture)
+    
+    - encode()/signal(): scalar path with tuple lookups, no validation strings
+    - score()/score_frames(): numpy batch path for many frames (NaN = invalid)
+    - disabled_metadata(): constant result used when integration is off
+    
+    Changing FacialSignalConfig at runtime requires recompiling
+    (get_facial_modifier(refresh=True)).
+    """
+    
+    AFFECTIVE_FIELDS = ('confidence_level', 'frustration_level', 'interest_level')
+    
+    def __init__(self, config=None):
+        config = config or FacialSignalConfig
+        self.enabled = bool(config.ENABLED)
+        self.fallback_mode = bool(config.FALLBACK_MODE)
+        self.min_confidence = float(config.MIN_EMOTION_CONFIDENCE)
+        self.engagement_weight = float(config.ENGAGEMENT_SIGNAL_WEIGHT)
+        self.difficulty_weight = float(config.DIFFICULTY_ADJUSTMENT_WEIGHT)
+        
+        self.emotions = ('',) + tuple(config.EMOTION_ENGAGEMENT_MAP)
+        self.emotion_codes = {emotion: code for code, emotion in enumerate(self.emotions) if code}
+        self._emotion_engagement = (0.5,) + tuple(float(v) for v in config.EMOTION_ENGAGEMENT_MAP.values())
+        
+        nan = (float('nan'),) * 3
+        self._emotion_affective = (nan,) + tuple(
+            tuple(float(config.EMOTION_AFFECTIVE_MAP[emotion][key])
+                  for key in ('confidence', 'frustration', 'interest'))
+            if emotion in config.EMOTION_AFFECTIVE_MAP else nan
+            for emotion in self.emotions[1:]
+        )
+        
+        self.gaze_patterns = ('',) + tuple(config.GAZE_PATTERN_ADJUSTMENTS)
+        self.gaze_codes = {gaze: code for code, gaze in enumerate(self.gaze_patterns) if code}
+        self._gaze_adjustment = (0.0,) + tuple(float(v) for v in config.GAZE_PATTERN_ADJUSTMENTS.values())
+        
+        self.postures = ('',) + tuple(config.POSTURE_ADJUSTMENTS)
+        self.posture_codes = {posture: code for code, posture in enumerate(self.postures) if code}
+        self._posture_adjustment = (0.0,) + tuple(float(v) for v in config.POSTURE_ADJUSTMENTS.values())
+        
+        # Array views of the same tables for batch scoring
+        self.emotion_engagement = np.array(self._emotion_engagement)
+        self.emotion_affective = np.array(self._emotion_affective)
+        self.gaze_adjustment = np.array(self._gaze_adjustment)
+        self.posture_adjustment = np.array(self._posture_adjustment)
+    
+    def disabled_metadata(self) -> Dict:
+        """Integration metadata when facial integration is off"""
+        return {
+            'facial_integration_enabled': False,
+            'facial_signal_used': False,
+            'fallback_mode_active': self.fallback_mode,
+            'reason': 'Facial integration not enabled'
+        }
+    
+    # ------------------------------------------------------------ scalar path
+    
+    def encode(self, facial_data) -> Optional[Tuple[int, float, int, int]]:
+        """
+        (emotion_code, confidence, gaze_code, posture_code) for data that
+        FacialDataValidator.validate accepts, else None
+        """
+        if not facial_data or not isinstance(facial_data, dict):
+            return None
+        emotion_code = self.emotion_codes.get(str(facial_data.get('emotion_detected') or '').lower(), 0)
+        confidence = facial_data.get('emotion_confidence', 0.0)
+        if not emotion_code or not isinstance(confidence, (int, float)) or confidence < self.min_confidence:
+            return None
+        return (
+            emotion_code,
+            float(confidence),
+            self.gaze_codes.get(str(facial_data.get('gaze_pattern') or '').lower(), 0),
+            self.posture_codes.get(str(facial_data.get('posture_type') or '').lower(), 0)
+        )
+    
+    def signal_from_codes(self, emotion_code, gaze_code=0, posture_code=0) -> float:
+        """Engagement signal (0-1) for encoded data"""
+        signal = self._emotion_engagement[emotion_code]
+        if gaze_code:
+            signal = max(0.0, min(1.0, signal + self._gaze_adjustment[gaze_code] * 0.1))
+        if posture_code:
+            signal = max(0.0, min(1.0, signal + self._posture_adjustment[posture_code] * 0.1))
+        return max(0.0, min(1.0, signal))
+    
+    def signal(self, facial_data) -> Optional[float]:
+        """Engagement signal for raw facial data, or None if invalid"""
+        codes = self.encode(facial_data)
+        if codes is None:
+            return None
+        return self.signal_from_codes(codes[0], codes[2], codes[3])
+    
+    def affective_values(self, emotion_code) -> Optional[Dict[str, float]]:
+        """confidence/frustration/interest levels for an emotion code"""
+        values = self._emotion_affective[emotion_code]
+        if values[0] != values[0]:  # NaN: no affective mapping
+            return None
+        return dict(zip(self.AFFECTIVE_FIELDS, values), source='facial_emotion_recognition')
+    
+    # ------------------------------------------------------------- batch path
+    
+    def encode_frames(self, frames):
+        """Code arrays (emotion i2, confidence f8, gaze i2, posture i2) for many frames"""
+        count = len(frames)
+        emotions = np.zeros(count, dtype=np.int16)
+        confidences = np.zeros(count)
+        gazes = np.zeros(count, dtype=np.int16)
+        postures = np.zeros(count, dtype=np.int16)
+        for i, frame in enumerate(frames):
+            codes = self.encode(frame)
+            if codes is not None:
+                emotions[i], confidences[i], gazes[i], postures[i] = codes
+        return emotions, confidences, gazes, postures
+    
+    def score(self, emotion_codes, confidences=None, gaze_codes=None, posture_codes=None):
+        """
+        Engagement signals for code arrays; NaN where the emotion is unknown
+        or (when confidences are given) below MIN_EMOTION_CONFIDENCE
+        """
+        emotion_codes = np.asarray(emotion_codes)
+        signals = self.emotion_engagement[emotion_codes]
+        if gaze_codes is not None:
+            signals = np.clip(signals + self.gaze_adjustment[np.asarray(gaze_codes)] * 0.1, 0.0, 1.0)
+        if posture_codes is not None:
+            signals = np.clip(signals + self.posture_adjustment[np.asarray(posture_codes)] * 0.1, 0.0, 1.0)
+        signals = np.clip(signals, 0.0, 1.0)
+        
+        invalid = emotion_codes == 0
+        if confidences is not None:
+            invalid |= np.asarray(confidences) < self.min_confidence
+        signals[invalid] = np.nan
+        return signals
+    
+    def score_frames(self, frames):
+        """Engagement signal per facial data dict (NaN where invalid)"""
+        return self.score(*self.encode_frames(frames))
+    
+    def blend_engagement(self, base_scores, signals):
+        """Batch modify_engagement_score: blend valid signals into base scores"""
+        base_scores = np.array(base_scores, dtype=float)
+        if not self.enabled:
+            return base_scores
+        signals = np.asarray(signals, dtype=float)
+        weight = self.engagement_weight
+        return np.where(np.isnan(signals), base_scores, base_scores * (1 - weight) + signals * weight)
 
 
 class FacialDataValidator:
@@ -118,8 +290,8 @@ class FacialDataValidator:
         cleaned_data = {
             'emotion_detected': emotion,
             'emotion_confidence': float(confidence),
-            'gaze_pattern': facial_data.get('gaze_pattern', '').lower() or None,
-            'posture_type': facial_data.get('posture_type', '').lower() or None,
+            'gaze_pattern': (facial_data.get('gaze_pattern') or '').lower() or None,
+            'posture_type': (facial_data.get('posture_type') or '').lower() or None,
             'timestamp': facial_data.get('timestamp')
         }
         
@@ -161,8 +333,9 @@ class FacialSignalProcessor:
     whether to use facial data or fall back to behavioral inference
     """
     
-    def __init__(self, config: FacialSignalConfig = None):
+    def __init__(self, config: FacialSignalConfig = None, compiled: CompiledFacialConfig = None):
         self.config = config or FacialSignalConfig()
+        self.compiled = compiled or CompiledFacialConfig(self.config)
         self.validator = FacialDataValidator()
         self.logger = logger
     
@@ -198,8 +371,7 @@ class FacialSignalProcessor:
         emotion = facial_data['emotion_detected']
         emotion_confidence = facial_data['emotion_confidence']
         
-        emotion_signal = self.config.EMOTION_ENGAGEMENT_MAP.get(emotion, 0.5)
-        signal = emotion_signal
+        signal = self.compiled._emotion_engagement[self.compiled.emotion_codes.get(emotion, 0)]
         reasons.append(
             f"Emotion: {emotion} (confidence: {emotion_confidence:.0%})"
         )
@@ -235,25 +407,11 @@ class FacialSignalProcessor:
     
     def _gaze_pattern_adjustment(self, gaze_pattern: str) -> float:
         """Adjustment to engagement signal based on gaze pattern"""
-        adjustments = {
-            'focused': 0.2,      # Increase signal (very focused)
-            'reading': 0.1,      # Slight increase (reading content)
-            'scattered': -0.3,   # Decrease signal (distracted)
-            'downward': -0.5,    # Significant decrease (looking away/down)
-            'away': -0.7,        # Strong decrease (completely away)
-        }
-        return adjustments.get(gaze_pattern, 0.0)
+        return self.compiled._gaze_adjustment[self.compiled.gaze_codes.get(gaze_pattern, 0)]
     
     def _posture_adjustment(self, posture_type: str) -> float:
         """Adjustment to engagement signal based on posture"""
-        adjustments = {
-            'upright_engaged': 0.15,    # Increase signal
-            'leaning_forward': 0.25,    # Strong increase (very engaged)
-            'relaxed': 0.0,             # No change
-            'slumped': -0.25,           # Decrease signal (disengaged)
-            'tense': -0.2,              # Decrease signal (stressed)
-        }
-        return adjustments.get(posture_type, 0.0)
+        return self.compiled._posture_adjustment[self.compiled.posture_codes.get(posture_type, 0)]
 
 
 class AdaptationModifier:
@@ -269,17 +427,18 @@ class AdaptationModifier:
     
     def __init__(self, config: FacialSignalConfig = None):
         self.config = config or FacialSignalConfig()
-        self.processor = FacialSignalProcessor(config)
+        self.compiled = CompiledFacialConfig(self.config)
+        self.processor = FacialSignalProcessor(self.config, self.compiled)
         self.validator = FacialDataValidator()
         self.logger = logger
     
     def is_enabled(self) -> bool:
-        """Check if facial signal integration is enabled"""
-        return self.config.ENABLED
+        """Check if facial signal integration is enabled (as compiled)"""
+        return self.compiled.enabled
     
     def supports_fallback(self) -> bool:
         """Check if system should gracefully fall back when facial data unavailable"""
-        return self.config.FALLBACK_MODE
+        return self.compiled.fallback_mode
     
     def modify_difficulty_adjustment(
         self,
@@ -337,7 +496,6 @@ class AdaptationModifier:
         self.logger.info(f"[FACIAL] Difficulty adjustment: {explanation}")
         
         return modified_delta, explanation
-        return modified_delta, explanation
     
     def modify_engagement_score(
         self,
@@ -467,12 +625,7 @@ class AdaptationModifier:
         """
         
         if not self.is_enabled():
-            return {
-                'facial_integration_enabled': False,
-                'facial_signal_used': False,
-                'fallback_mode_active': self.supports_fallback(),
-                'reason': 'Facial integration not enabled'
-            }
+            return self.compiled.disabled_metadata()
         
         # Validate facial data
         is_valid, cleaned_data, validation_reason = self.validator.validate(facial_data)
@@ -504,7 +657,16 @@ class AdaptationModifier:
         }
 
 
+_shared_modifier = None
+
+
 # Convenience function for use in adaptation engine
-def get_facial_modifier() -> AdaptationModifier:
-    """Factory function to get configured facial modifier instance"""
-    return AdaptationModifier()
+def get_facial_modifier(refresh: bool = False) -> AdaptationModifier:
+    """
+    Shared facial modifier; the configuration is compiled on first use.
+    Pass refresh=True to recompile after changing FacialSignalConfig.
+    """
+    global _shared_modifier
+    if _shared_modifier is None or refresh:
+        _shared_modifier = AdaptationModifier()
+    return _shared_modifier
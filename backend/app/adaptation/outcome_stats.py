@@ -0,0 +1,144 @@
+"""
+Adaptation Outcome Statistics
+
+Set-based aggregation of adaptation outcomes for RL policy validation: one
+join of adaptation_logs with sessions and a GROUP BY adaptation_type,
+instead of a query per session or per log.
+
+Results are returned as NumPy arrays (one entry per adaptation type) and are
+optionally cached. The cache key includes the most recent adaptation log and
+the updated_at of the effectiveness labeler's watermark, which every labeling
+batch touches (relabels of provisional rows included), so any new log or
+label invalidates it; session scores updated without either are picked up on
+the next one.
+
+An adaptation counts as a success when EffectivenessLabeler marked it
+effective; unlabeled logs fall back to the session score proxy.
+"""
+
+import numpy as np
+from sqlalchemy import func, case
+
+from app import db
+from app.models.adaptation import AdaptationLog, JobWatermark
+from app.adaptation.effectiveness import WATERMARK_NAME
+from app.models.session import Session
+
+
+# Unlabeled adaptations count as a success when their session scores above this
+SUCCESS_SCORE = 50
+
+
+class AdaptationOutcomeStats:
+    """Grouped adaptation outcome aggregates with a latest-log cache"""
+
+    def __init__(self, use_cache=True):
+        self.use_cache = use_cache
+        self._cache = {}
+        self._cache_version = None
+
+    # --------------------------------------------------------------- cache
+
+    def cache_version(self):
+        """
+        (latest log timestamp, latest log id, labeler watermark updated_at),
+        read with a single statement
+        """
+        latest = db.session.query(AdaptationLog.timestamp, AdaptationLog.id).order_by(
+            AdaptationLog.timestamp.desc(), AdaptationLog.id.desc()
+        ).limit(1).subquery()
+        labeled_at = db.session.query(JobWatermark.updated_at).filter(
+            JobWatermark.name == WATERMARK_NAME
+        ).scalar_subquery()
+        row = db.session.query(
+            db.session.query(latest.c.timestamp).scalar_subquery(),
+            db.session.query(latest.c.id).scalar_subquery(),
+            labeled_at
+        ).one()
+        return tuple(row)
+
+    def _cached(self, key, compute):
+        if not self.use_cache:
+            return compute()
+
+        version = self.cache_version()
+        if version != self._cache_version:
+            self._cache = {}
+            self._cache_version = version
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def clear(self):
+        self._cache = {}
+        self._cache_version = None
+
+    # --------------------------------------------------------- aggregation
+
+    def by_action_type(self, recent_sessions=None):
+        """
+        Outcome aggregates per adaptation type, as parallel arrays:
+            adaptation_type, total, successes, impact_sum, impact_sq_sum
+        impact_* cover successful uses only (session score / 100).
+
+        recent_sessions: restrict to logs of the N most recently ended sessions
+        """
+        return self._cached(('by_action_type', recent_sessions),
+                            lambda: self._by_action_type(recent_sessions))
+
+    def session_scores(self, recent_sessions):
+        """(session count, summed score_percentage) over the N most recently ended sessions"""
+        return self._cached(('session_scores', recent_sessions),
+                            lambda: self._session_scores(recent_sessions))
+
+    def _recent_sessions(self, limit):
+        return db.session.query(
+            Session.id.label('id'),
+            Session.score_percentage.label('score_percentage')
+        ).order_by(Session.session_end.desc()).limit(limit).subquery()
+
+    def _by_action_type(self, recent_sessions):
+        if recent_sessions is None:
+            sessions = Session.__table__
+        else:
+            sessions = self._recent_sessions(recent_sessions)
+
+        score = sessions.c.score_percentage
+        succeeded = func.coalesce(AdaptationLog.was_effective, func.coalesce(score, 0) > SUCCESS_SCORE)
+        impact = score / 100.0
+
+        rows = db.session.query(
+            AdaptationLog.adaptation_type,
+            func.count(AdaptationLog.id),
+            func.sum(case((succeeded, 1), else_=0)),
+            func.sum(case((succeeded, impact), else_=0.0)),
+            func.sum(case((succeeded, impact * impact), else_=0.0))
+        ).join(
+            sessions, AdaptationLog.session_id == sessions.c.id
+        ).group_by(AdaptationLog.adaptation_type).order_by(AdaptationLog.adaptation_type).all()
+
+        columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+        return {
+            'adaptation_type': np.array(columns[0], dtype=object),
+            'total': np.array(columns[1], dtype=np.int64),
+            'successes': np.array([v or 0 for v in columns[2]], dtype=np.int64),
+            'impact_sum': np.array([v or 0.0 for v in columns[3]], dtype=float),
+            'impact_sq_sum': np.array([v or 0.0 for v in columns[4]], dtype=float)
+        }
+
+    def _session_scores(self, recent_sessions):
+        sessions = self._recent_sessions(recent_sessions)
+        count, total = db.session.query(
+            func.count(sessions.c.id),
+            func.sum(func.coalesce(sessions.c.score_percentage, 0))
+        ).one()
+        return int(count or 0), float(total or 0.0)
+
+    def action_type_row(self, action_type):
+        """Aggregates for one adaptation type across all sessions, or None"""
+        stats = self.by_action_type()
+        matches = np.flatnonzero(stats['adaptation_type'] == action_type)
+        if matches.size == 0:
+            return None
+        i = matches[0]
+        return {key: values[i] for key, values in stats.items()}
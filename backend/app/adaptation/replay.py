@@ -0,0 +1,345 @@
+"""
+Offline Difficulty Policy Replay
+
+Re-executes the difficulty policy (AdaptiveEngine.adapt_difficulty, as driven
+by CBTSystem.submit_response every N answers) over logged sessions with
+alternative parameters, entirely in memory, and reports how the decisions
+and difficulty trajectories diverge.
+
+- Historical student_responses are streamed once in (session, timestamp)
+  order into flat NumPy arrays (CSR layout: one offset per session)
+- Each response is paired with the engagement metric recorded right after it
+  (the metric the live engine saw), defaulting to 0.5
+- Decisions are computed for all sessions at once: one vectorized step per
+  decision index, so cost grows with the longest session, not with the
+  number of sessions; each step is CompiledDifficultyPolicy.decide_many,
+  the same band table the live engine uses (difficulty_policy.py)
+- Parameter grids fan out over a process pool; the dataset is sent to each
+  worker once
+
+The replay is open-loop: learners' logged answers are reused as-is, so
+projected outcomes under a different policy are estimates (see
+_project_accuracy). Facial signal modulation is not replayed.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app import db
+from app.models.session import Session, StudentResponse
+from app.models.question import Question
+from app.models.engagement import EngagementMetric
+from app.models.adaptation import AdaptationLog
+from app.adaptation.difficulty_policy import CompiledDifficultyPolicy, default_policy
+
+
+DEFAULT_ENGAGEMENT = 0.5
+
+
+class ReplayDataset:
+    """Logged sessions flattened into arrays for replay"""
+
+    def __init__(self, session_ids, offsets, correct, engagement, question_difficulty,
+                 initial_difficulty, logged_final_difficulty=None):
+        self.session_ids = list(session_ids)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.correct = np.asarray(correct, dtype=np.int8)
+        self.engagement = np.asarray(engagement, dtype=float)
+        self.question_difficulty = np.asarray(question_difficulty, dtype=float)
+        self.initial_difficulty = np.asarray(initial_difficulty, dtype=float)
+        self.logged_final_difficulty = (
+            None if logged_final_difficulty is None else np.asarray(logged_final_difficulty, dtype=float)
+        )
+
+    @property
+    def num_sessions(self):
+        return len(self.session_ids)
+
+    @property
+    def num_events(self):
+        return len(self.correct)
+
+    @classmethod
+    def from_database(cls, session_ids=None, stream_batch_size=10000):
+        """Load responses, engagement and starting difficulty with three ordered scans"""
+        response_query = db.session.query(
+            StudentResponse.session_id,
+            StudentResponse.timestamp,
+            StudentResponse.is_correct,
+            Question.difficulty
+        ).join(Question, StudentResponse.question_id == Question.id)
+        metric_query = db.session.query(
+            EngagementMetric.session_id,
+            EngagementMetric.timestamp,
+            EngagementMetric.engagement_score
+        )
+        log_query = db.session.query(
+            AdaptationLog.session_id,
+            AdaptationLog.old_value
+        ).filter(AdaptationLog.adaptation_type == 'difficulty')
+        if session_ids is not None:
+            session_ids = list(session_ids)
+            response_query = response_query.filter(StudentResponse.session_id.in_(session_ids))
+            metric_query = metric_query.filter(EngagementMetric.session_id.in_(session_ids))
+            log_query = log_query.filter(AdaptationLog.session_id.in_(session_ids))
+
+        # Responses -> CSR arrays
+        sessions, offsets, times, correct, difficulty = [], [], [], [], []
+        index = {}
+        for session_id, timestamp, is_correct, question_difficulty in response_query.order_by(
+            StudentResponse.session_id, StudentResponse.timestamp
+        ).yield_per(stream_batch_size):
+            if session_id not in index:
+                index[session_id] = len(sessions)
+                sessions.append(session_id)
+                offsets.append(len(correct))
+            times.append(timestamp)
+            correct.append(1 if is_correct else 0)
+            difficulty.append(question_difficulty)
+        offsets.append(len(correct))
+
+        response_session = np.repeat(np.arange(len(sessions)), np.diff(offsets))
+
+        # Engagement: first metric at or after each response (same session)
+        metric_session, metric_times, metric_scores = [], [], []
+        for session_id, timestamp, score in metric_query.order_by(
+            EngagementMetric.session_id, EngagementMetric.timestamp
+        ).yield_per(stream_batch_size):
+            if session_id in index:
+                metric_session.append(index[session_id])
+                metric_times.append(timestamp)
+                metric_scores.append(DEFAULT_ENGAGEMENT if score is None else score)
+        engagement = _forward_as_of(
+            response_session, np.array(times, dtype='datetime64[us]'),
+            np.array(metric_session, dtype=np.int64), np.array(metric_times, dtype='datetime64[us]'),
+            np.array(metric_scores, dtype=float)
+        )
+
+        # Starting difficulty: before the first difficulty change, else unchanged final value
+        session_query = db.session.query(Session.id, Session.current_difficulty)
+        if session_ids is not None:
+            session_query = session_query.filter(Session.id.in_(session_ids))
+        final = {
+            session_id: difficulty
+            for session_id, difficulty in session_query.yield_per(stream_batch_size)
+            if session_id in index
+        }
+        initial = {}
+        for session_id, old_value in log_query.order_by(
+            AdaptationLog.session_id, AdaptationLog.timestamp
+        ).yield_per(stream_batch_size):
+            if session_id not in initial and old_value is not None:
+                initial[session_id] = old_value
+
+        logged_final = [final.get(s, 0.5) for s in sessions]
+        return cls(
+            sessions, offsets, correct, engagement, difficulty,
+            [initial.get(s, f) for s, f in zip(sessions, logged_final)],
+            logged_final
+        )
+
+
+def _forward_as_of(left_group, left_time, right_group, right_time, right_value):
+    """For each left row, the first right value in the same group with time >= left time"""
+    result = np.full(len(left_group), DEFAULT_ENGAGEMENT)
+    if len(left_group) == 0 or len(right_group) == 0:
+        return result
+
+    # Dense time ranks make (group, time) a single sortable int64 key
+    ranks = np.unique(np.concatenate([left_time, right_time]))
+    width = len(ranks) + 1
+    left_key = left_group * width + np.searchsorted(ranks, left_time)
+    right_key = right_group * width + np.searchsorted(ranks, right_time)
+
+    position = np.searchsorted(right_key, left_key, side='left')
+    found = position < len(right_key)
+    same_group = np.zeros_like(found)
+    same_group[found] = right_group[position[found]] == left_group[found]
+    result[same_group] = right_value[position[same_group]]
+    return result
+
+
+def replay_difficulty(dataset, policy):
+    """
+    Re-run the difficulty policy over every session.
+
+    Returns a dict with:
+        decision_counts (S,)   decisions per session
+        accuracy (S, D)        window accuracy at each decision (NaN past the end)
+        before / after (S, D)  difficulty before and after each decision
+        final_difficulty (S,)
+        response_difficulty (E,) session difficulty in effect when each response was given
+    """
+    window = int(policy['adapt_every_n_answers'])
+    lengths = np.diff(dataset.offsets)
+    decisions = lengths // window
+    num_sessions = dataset.num_sessions
+    max_decisions = int(decisions.max()) if num_sessions else 0
+
+    # Window accuracy and the engagement the engine saw at each decision point
+    accuracy = np.full((num_sessions, max_decisions), np.nan)
+    engagement = np.full((num_sessions, max_decisions), DEFAULT_ENGAGEMENT)
+    session_of = np.repeat(np.arange(num_sessions), lengths)
+    position = np.arange(dataset.num_events) - np.repeat(dataset.offsets[:-1], lengths)
+    decision_of = position // window
+    in_window = decision_of < decisions[session_of]
+    if in_window.any():
+        flat = session_of[in_window] * max_decisions + decision_of[in_window]
+        sums = np.bincount(flat, weights=dataset.correct[in_window], minlength=num_sessions * max_decisions)
+        valid = np.arange(max_decisions)[None, :] < decisions[:, None]
+        accuracy[valid] = (sums.reshape(num_sessions, max_decisions) / float(window))[valid]
+        last = (position % window == window - 1) & in_window
+        engagement[session_of[last], decision_of[last]] = dataset.engagement[last]
+
+    before = np.full((num_sessions, max_decisions), np.nan)
+    after = np.full((num_sessions, max_decisions), np.nan)
+    current = dataset.initial_difficulty.copy()
+    compiled = CompiledDifficultyPolicy(policy)
+    for j in range(max_decisions):
+        active = decisions > j
+        new, _ = compiled.decide_many(current, accuracy[:, j], engagement[:, j])
+        before[:, j] = np.where(active, current, np.nan)
+        after[:, j] = np.where(active, new, np.nan)
+        current = np.where(active, new, current)
+
+    # Difficulty in effect per response: initial until the first decision, then after[j-1]
+    step_index = decision_of - 1  # decision made after the previous full window
+    response_difficulty = dataset.initial_difficulty[session_of].copy()
+    changed = step_index >= 0
+    response_difficulty[changed] = after[session_of[changed], step_index[changed]]
+
+    return {
+        'decision_counts': decisions,
+        'accuracy': accuracy,
+        'before': before,
+        'after': after,
+        'final_difficulty': current,
+        'response_difficulty': response_difficulty
+    }
+
+
+class PolicyReplayEngine:
+    """Compare alternative difficulty policies over one logged dataset"""
+
+    def __init__(self, dataset, baseline=None):
+        self.dataset = dataset
+        self.baseline_policy = baseline or default_policy()
+        self._baseline = None
+        self._slope = None
+
+    @classmethod
+    def from_database(cls, session_ids=None):
+        return cls(ReplayDataset.from_database(session_ids))
+
+    def policy(self, overrides=None):
+        policy = dict(self.baseline_policy)
+        policy.update(overrides or {})
+        return policy
+
+    @property
+    def baseline(self):
+        if self._baseline is None:
+            self._baseline = replay_difficulty(self.dataset, self.baseline_policy)
+        return self._baseline
+
+    def replay(self, overrides=None):
+        return replay_difficulty(self.dataset, self.policy(overrides))
+
+    def compare(self, overrides=None):
+        """
+        Replay with overrides and report divergence from the baseline policy
+        and projected outcomes.
+        """
+        policy = self.policy(overrides)
+        baseline = self.baseline
+        candidate = replay_difficulty(self.dataset, policy)
+        dataset = self.dataset
+
+        # Per-response difficulty divergence (comparable regardless of window size)
+        gap = candidate['response_difficulty'] - baseline['response_difficulty']
+        differs = ~np.isclose(gap, 0.0)
+        lengths = np.diff(dataset.offsets)
+        session_of = np.repeat(np.arange(dataset.num_sessions), lengths)
+        sessions_diverged = np.bincount(session_of[differs], minlength=dataset.num_sessions) > 0
+
+        report = {
+            'overrides': overrides or {},
+            'sessions': dataset.num_sessions,
+            'events': dataset.num_events,
+            'decisions': int(candidate['decision_counts'].sum()),
+            'divergence': {
+                'responses_at_different_difficulty': round(float(differs.mean()), 4) if differs.size else 0.0,
+                'sessions_diverged': round(float(sessions_diverged.mean()), 4) if sessions_diverged.size else 0.0,
+                'mean_abs_difficulty_gap': round(float(np.abs(gap).mean()), 4) if gap.size else 0.0,
+                'mean_final_difficulty_shift': round(float(
+                    (candidate['final_difficulty'] - baseline['final_difficulty']).mean()
+                ), 4) if dataset.num_sessions else 0.0
+            },
+            'projected': {
+                'mean_difficulty': _mean(candidate['response_difficulty']),
+                'baseline_mean_difficulty': _mean(baseline['response_difficulty']),
+                'time_at_bounds': _mean(
+                    np.isclose(candidate['response_difficulty'], policy['min_difficulty']) |
+                    np.isclose(candidate['response_difficulty'], policy['max_difficulty'])
+                ),
+                'accuracy': self._project_accuracy(gap),
+                'observed_accuracy': _mean(dataset.correct)
+            }
+        }
+        if dataset.logged_final_difficulty is not None and dataset.num_sessions:
+            report['baseline_fidelity'] = round(float(np.isclose(
+                baseline['final_difficulty'], dataset.logged_final_difficulty
+            ).mean()), 4)
+        return report
+
+    def _project_accuracy(self, gap):
+        """
+        Observed accuracy shifted by the mean difficulty gap, using the
+        logged accuracy-vs-question-difficulty slope (linear probability).
+        """
+        if self._slope is None:
+            difficulty = self.dataset.question_difficulty
+            if difficulty.size > 1 and difficulty.var() > 0:
+                self._slope = float(np.cov(difficulty, self.dataset.correct, bias=True)[0, 1] / difficulty.var())
+            else:
+                self._slope = 0.0
+        if not gap.size:
+            return 0.0
+        projected = self.dataset.correct.mean() + self._slope * gap.mean()
+        return round(float(min(1.0, max(0.0, projected))), 4)
+
+    def grid(self, param_grid, max_workers=None):
+        """
+        Evaluate every combination of param_grid ({name: [values]}) and return
+        the compare() reports, in grid order. Runs in a process pool when
+        max_workers > 1.
+        """
+        names = list(param_grid)
+        combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+        max_workers = max_workers or os.cpu_count() or 1
+
+        if max_workers <= 1 or len(combinations) <= 1:
+            return [self.compare(overrides) for overrides in combinations]
+
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(self.dataset, self.baseline_policy)) as executor:
+            return list(executor.map(_compare_in_worker, combinations))
+
+
+def _mean(values):
+    return round(float(np.mean(values)), 4) if np.size(values) else 0.0
+
+
+_worker_engine = None
+
+
+def _init_worker(dataset, baseline_policy):
+    global _worker_engine
+    _worker_engine = PolicyReplayEngine(dataset, baseline_policy)
+
+
+def _compare_in_worker(overrides):
+    return _worker_engine.compare(overrides)
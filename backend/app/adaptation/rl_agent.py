@@ -11,19 +11,74 @@ Learns optimal policies for:
 - Pacing modification
 - Hint provision
 - Content selection
+
+The Q-table is a dense NumPy array (27 discretized states x 135 factored
+actions) trained with vectorized batch updates and experience replay, and
+persisted as .npz.
 """
 
+import os
 import numpy as np
-from collections import defaultdict
+import ast
 from datetime import datetime, timedelta
 from app.models.adaptation import AdaptationLog
 from app.models.session import Session, StudentResponse
+from app.adaptation.transitions import TransitionExtractor
 from app import db
 import json
 
+
+class ExperienceReplayBuffer:
+    """Fixed-capacity ring buffer of (state_id, action_id, reward, next_state_id) transitions"""
+    
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self._next = 0
+        self._size = 0
+    
+    def __len__(self):
+        return self._size
+    
+    def add_batch(self, states, actions, rewards, next_states):
+        """Append transitions, overwriting the oldest once full"""
+        states = np.asarray(states, dtype=np.int64)[-self.capacity:]
+        count = len(states)
+        if count == 0:
+            return
+        slots = (self._next + np.arange(count)) % self.capacity
+        self.states[slots] = states
+        self.actions[slots] = np.asarray(actions, dtype=np.int64)[-count:]
+        self.rewards[slots] = np.asarray(rewards, dtype=np.float64)[-count:]
+        self.next_states[slots] = np.asarray(next_states, dtype=np.int64)[-count:]
+        self._next = int((slots[-1] + 1) % self.capacity)
+        self._size = min(self.capacity, self._size + count)
+    
+    def sample(self, batch_size, rng=None):
+        """Uniform sample (with replacement) of up to batch_size transitions"""
+        rng = rng or np.random.default_rng()
+        idx = rng.integers(0, self._size, size=batch_size)
+        return self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx]
+    
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+
 class RLAdaptiveAgent:
     """Reinforcement Learning Agent for tutorial adaptation"""
     
+    # Bucket names per state dimension, in index order
+    STATE_LEVELS = {
+        'engagement': ('low', 'medium', 'high'),
+        'accuracy': ('poor', 'fair', 'good'),
+        'difficulty': ('easy', 'medium', 'hard')
+    }
+    NEUTRAL_ACTION = (0, 'medium', 'normal', 'maintain')
+    
     def __init__(self, learning_rate=0.1, discount_factor=0.95, epsilon=0.1):
         """
         Initialize RL Agent
@@ -37,20 +92,29 @@ class RLAdaptiveAgent:
         self.gamma = discount_factor
         self.epsilon = epsilon
         
-        # Q-table: state -> action -> Q-value
-        # State: (engagement_level, accuracy_range, question_difficulty)
-        # Action: (difficulty_change, pacing, hint_strategy, content_focus)
-        self.q_table = defaultdict(lambda: defaultdict(float))
-        
-        # Experience buffer for training
-        self.experience_buffer = []
-        self.max_buffer_size = 10000
-        
         # Action space
         self.difficulty_actions = [-0.2, -0.1, 0, 0.1, 0.2]  # Change in difficulty
         self.pacing_actions = ['slow', 'medium', 'fast']
         self.hint_actions = ['minimal', 'normal', 'generous']
         self.content_actions = ['reinforce_gaps', 'maintain', 'advance']
+        self._action_dims = (
+            len(self.difficulty_actions), len(self.pacing_actions),
+            len(self.hint_actions), len(self.content_actions)
+        )
+        self._state_dims = tuple(len(levels) for levels in self.STATE_LEVELS.values())
+        
+        # Dense Q-array: state_id x action_id
+        # State: (engagement_level, accuracy_range, question_difficulty) -> factored id
+        # Action: (difficulty_change, pacing, hint_strategy, content_focus) -> factored id
+        self.num_states = int(np.prod(self._state_dims))
+        self.num_actions = int(np.prod(self._action_dims))
+        self.q_values = np.zeros((self.num_states, self.num_actions))
+        self.visit_counts = np.zeros((self.num_states, self.num_actions), dtype=np.int64)
+        
+        # Experience buffer for training
+        self.max_buffer_size = 10000
+        self.experience_buffer = ExperienceReplayBuffer(self.max_buffer_size)
+        self.transition_extractor = TransitionExtractor()
     
     def discretize_state(self, engagement_score, accuracy, question_difficulty):
         """
@@ -70,6 +134,30 @@ class RLAdaptiveAgent:
         state = (engagement_level, accuracy_level, difficulty_level)
         return state
     
+    def state_index(self, state):
+        """Dense factored id for a discretized state tuple (levels in STATE_LEVELS order)"""
+        return int(np.ravel_multi_index(
+            tuple(levels.index(level) for levels, level in zip(self.STATE_LEVELS.values(), state)),
+            self._state_dims
+        ))
+    
+    def action_index(self, action):
+        """Dense factored id for an action tuple (difficulty change snaps to the nearest step)"""
+        difficulty_change, pacing, hints, content = action
+        d = int(np.argmin(np.abs(np.array(self.difficulty_actions) - float(difficulty_change))))
+        return int(np.ravel_multi_index((
+            d,
+            self.pacing_actions.index(pacing),
+            self.hint_actions.index(hints),
+            self.content_actions.index(content)
+        ), self._action_dims))
+    
+    def index_to_action(self, action_id):
+        """Action tuple for a factored action id"""
+        d, p, h, c = np.unravel_index(int(action_id), self._action_dims)
+        return (self.difficulty_actions[d], self.pacing_actions[p],
+                self.hint_actions[h], self.content_actions[c])
+    
     def select_action(self, state, use_exploration=True):
         """
         Select action using epsilon-greedy strategy
@@ -92,12 +180,7 @@ class RLAdaptiveAgent:
             )
         else:
             # Exploit: best known action
-            difficulty_action = self._select_best_action(state, 'difficulty')
-            pacing_action = self._select_best_action(state, 'pacing')
-            hint_action = self._select_best_action(state, 'hints')
-            content_action = self._select_best_action(state, 'content')
-            
-            return (difficulty_action, pacing_action, hint_action, content_action)
+            return self.best_action(state)
     
     def update_q_value(self, state, action, reward, next_state):
         """
@@ -110,21 +193,66 @@ class RLAdaptiveAgent:
             reward: Reward received
             next_state: Resulting state
         """
-        action_str = str(action)
+        state_ids = np.array([self.state_index(state)])
+        action_ids = np.array([self.action_index(action)])
+        next_state_ids = np.array([self.state_index(next_state)])
+        rewards = np.array([reward], dtype=float)
         
-        # Current Q-value
-        current_q = self.q_table[state][action_str]
+        self.experience_buffer.add_batch(state_ids, action_ids, rewards, next_state_ids)
+        self.train_batch(state_ids, action_ids, rewards, next_state_ids)
+    
+    def train_batch(self, state_ids, action_ids, rewards, next_state_ids):
+        """
+        One vectorized Q-learning step over a batch of transitions.
         
-        # Maximum Q-value for next state
-        max_next_q = max(
-            (self.q_table[next_state].values()) 
-            if self.q_table[next_state] else [0]
-        )
+        Targets use the Q-array as it was before the step; repeated
+        (state, action) pairs in a batch apply their mean TD error once.
         
-        # Q-learning update
-        new_q = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
+        Returns:
+            Mean absolute TD error of the batch
+        """
+        state_ids = np.asarray(state_ids, dtype=np.int64)
+        action_ids = np.asarray(action_ids, dtype=np.int64)
+        rewards = np.asarray(rewards, dtype=float)
+        next_state_ids = np.asarray(next_state_ids, dtype=np.int64)
+        if len(state_ids) == 0:
+            return 0.0
+        
+        # max over actions already tried in the next state (0 if none)
+        tried = self.visit_counts[next_state_ids] > 0
+        max_next_q = np.where(tried, self.q_values[next_state_ids], -np.inf).max(axis=1)
+        max_next_q[~tried.any(axis=1)] = 0.0
+        
+        td_error = rewards + self.gamma * max_next_q - self.q_values[state_ids, action_ids]
+        
+        flat = state_ids * self.num_actions + action_ids
+        td_sum = np.bincount(flat, weights=td_error, minlength=self.q_values.size)
+        td_count = np.bincount(flat, minlength=self.q_values.size)
+        touched = td_count > 0
+        
+        q_flat = self.q_values.reshape(-1)
+        q_flat[touched] += self.alpha * td_sum[touched] / td_count[touched]
+        self.visit_counts.reshape(-1)[touched] += td_count[touched]
+        
+        return float(np.abs(td_error).mean())
+    
+    def replay(self, batch_size=1024, steps=1, rng=None):
+        """
+        Experience replay: sample batches from the buffer and apply
+        vectorized Q-learning steps.
         
-        self.q_table[state][action_str] = new_q
+        Returns:
+            {'steps': int, 'mean_td_error': float}
+        """
+        if len(self.experience_buffer) == 0:
+            return {'steps': 0, 'mean_td_error': 0.0}
+        
+        rng = rng or np.random.default_rng()
+        errors = [
+            self.train_batch(*self.experience_buffer.sample(batch_size, rng))
+            for _ in range(steps)
+        ]
+        return {'steps': steps, 'mean_td_error': float(np.mean(errors))}
     
     def calculate_reward(self, engagement_before, engagement_after, 
                         accuracy_before, accuracy_after, adaptation_type):
@@ -171,68 +299,42 @@ class RLAdaptiveAgent:
         
         Analyzes adaptation logs and engagement metrics to improve policy
         """
-        # Get adaptation logs for this session
-        logs = AdaptationLog.query.filter_by(
-            session_id=session_id
-        ).order_by(AdaptationLog.timestamp).all()
-        
-        if len(logs) < 2:
+        result = self.learn_from_cohort(session_ids=[session_id])
+        if result['updates'] == 0:
             return {'status': 'insufficient_data', 'updates': 0}
-        
+        return result
+    
+    def learn_from_cohort(self, session_ids=None, student_ids=None, batch_size=4096):
+        """
+        Learn from many sessions at once (every session when no filter is given).
+        Transitions come from one ordered as-of merge of logs and metrics and are
+        applied in vectorized batches.
+        """
         updates = 0
-        
-        # Process each adaptation event
-        for i, log in enumerate(logs[:-1]):
-            # Get engagement metric before and after
-            metric_before = self._get_engagement_at_time(session_id, log.timestamp)
-            metric_after = self._get_engagement_at_time(session_id, logs[i+1].timestamp)
-            
-            if not (metric_before and metric_after):
-                continue
-            
-            # Discretize states - use explicit None checks for confidence_level
-            confidence_before = metric_before.confidence_level if metric_before.confidence_level is not None else 0.5
-            confidence_after = metric_after.confidence_level if metric_after.confidence_level is not None else 0.5
-            
-            state = self.discretize_state(
-                metric_before.engagement_score,
-                metric_before.accuracy,
-                confidence_before
-            )
-            
-            next_state = self.discretize_state(
-                metric_after.engagement_score,
-                metric_after.accuracy,
-                confidence_after
+        for batch in self.transition_extractor.iter_batches(
+            self, session_ids=session_ids, student_ids=student_ids, batch_size=batch_size
+        ):
+            self.experience_buffer.add_batch(
+                batch['states'], batch['actions'], batch['rewards'], batch['next_states']
             )
-            
-            # Convert log to action tuple
-            action = self._log_to_action(log)
-            
-            # Calculate reward
-            reward = self.calculate_reward(
-                metric_before.engagement_score,
-                metric_after.engagement_score,
-                metric_before.accuracy,
-                metric_after.accuracy,
-                log.adaptation_type
-            )
-            
-            # Update Q-value
-            self.update_q_value(state, action, reward, next_state)
-            updates += 1
+            self.train_batch(batch['states'], batch['actions'], batch['rewards'], batch['next_states'])
+            updates += len(batch['states'])
         
         return {
             'status': 'success',
             'updates': updates,
-            'total_states_learned': len(self.q_table)
+            'total_states_learned': self.states_visited()
         }
     
+    def states_visited(self):
+        """Number of states with at least one learned action"""
+        return int((self.visit_counts.sum(axis=1) > 0).sum())
+    
     def get_policy_summary(self):
         """Get summary of learned policy"""
         return {
-            'total_states': len(self.q_table),
-            'q_table_size': sum(len(actions) for actions in self.q_table.values()),
+            'total_states': self.states_visited(),
+            'q_table_size': int((self.visit_counts > 0).sum()),
             'learning_rate': self.alpha,
             'discount_factor': self.gamma,
             'exploration_rate': self.epsilon
@@ -246,11 +348,7 @@ class RLAdaptiveAgent:
             Recommended actions for difficulty, pacing, hints, and content
         """
         state = self.discretize_state(engagement_score, accuracy, current_difficulty)
-        
-        difficulty_action = self._select_best_action(state, 'difficulty')
-        pacing_action = self._select_best_action(state, 'pacing')
-        hint_action = self._select_best_action(state, 'hints')
-        content_action = self._select_best_action(state, 'content')
+        difficulty_action, pacing_action, hint_action, content_action = self.best_action(state)
         
         return {
             'difficulty_change': difficulty_action,
@@ -260,27 +358,26 @@ class RLAdaptiveAgent:
             'confidence': self._estimate_confidence(state)
         }
     
+    def best_action(self, state):
+        """Greedy action among those tried in this state (neutral if none)"""
+        state_id = self.state_index(state)
+        tried = self.visit_counts[state_id] > 0
+        if not tried.any():
+            return self.NEUTRAL_ACTION
+        action_id = int(np.argmax(np.where(tried, self.q_values[state_id], -np.inf)))
+        return self.index_to_action(action_id)
+    
     # Helper methods
     def _select_best_action(self, state, action_type):
         """Select best action for given state and action type"""
-        # Stub: would evaluate all possible actions
-        # For now, return neutral action
-        if action_type == 'difficulty':
-            return 0  # No change
-        elif action_type == 'pacing':
-            return 'medium'
-        elif action_type == 'hints':
-            return 'normal'
-        else:  # content
-            return 'maintain'
+        component = ('difficulty', 'pacing', 'hints', 'content').index(action_type)
+        return self.best_action(state)[component]
     
     def _estimate_confidence(self, state):
         """Estimate confidence in policy recommendation"""
-        if state in self.q_table:
-            actions = self.q_table[state]
-            if actions:
-                values = list(actions.values())
-                return min(1.0, len(values) / 10)  # More data = more confidence
+        actions_tried = int(np.count_nonzero(self.visit_counts[self.state_index(state)]))
+        if actions_tried:
+            return min(1.0, actions_tried / 10)  # More data = more confidence
         return 0.1  # Low confidence for unexplored states
     
     def _log_to_action(self, log):
@@ -299,51 +396,55 @@ class RLAdaptiveAgent:
         # This is a simplified mapping; could be more sophisticated
         return (new_value - old_value, 'medium', 'normal', 'maintain')
     
-    def _get_engagement_at_time(self, session_id, timestamp):
-        """Get engagement metric closest to given timestamp"""
-        from app.models.engagement import EngagementMetric
-        
-        metric = EngagementMetric.query.filter_by(
-            session_id=session_id
-        ).filter(
-            EngagementMetric.timestamp <= timestamp
-        ).order_by(EngagementMetric.timestamp.desc()).first()
-        
-        return metric
+    @staticmethod
+    def _npz_path(filepath):
+        """filepath with the .npz suffix np.savez_compressed would append"""
+        filepath = os.fspath(filepath)
+        return filepath if filepath.endswith('.npz') else filepath + '.npz'
     
     def save_model(self, filepath):
-        """Save trained model to file"""
-        # Convert defaultdict to regular dict for serialization
-        q_table_dict = {str(k): {str(a): v for a, v in actions.items()} 
-                       for k, actions in self.q_table.items()}
-        
-        model_data = {
-            'q_table': q_table_dict,
-            'alpha': self.alpha,
-            'gamma': self.gamma,
-            'epsilon': self.epsilon,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        
-        # Save to JSON
-        import json
-        with open(filepath, 'w') as f:
-            json.dump(model_data, f, indent=2)
+        """Save trained model to a .npz file (suffix added if missing); returns the path written"""
+        filepath = self._npz_path(filepath)
+        np.savez_compressed(
+            filepath,
+            q_values=self.q_values,
+            visit_counts=self.visit_counts,
+            hyperparameters=np.array([self.alpha, self.gamma, self.epsilon]),
+            action_space=np.array(json.dumps({
+                'difficulty': self.difficulty_actions,
+                'pacing': self.pacing_actions,
+                'hints': self.hint_actions,
+                'content': self.content_actions
+            })),
+            timestamp=np.array(datetime.utcnow().isoformat())
+        )
+        return filepath
     
     def load_model(self, filepath):
-        """Load trained model from file"""
-        import json
-        
+        """Load trained model from a .npz file (suffix optional, as in save_model) or a legacy JSON Q-table"""
+        if str(filepath).endswith('.json'):
+            return self._load_legacy_json(filepath)
+        
+        with np.load(self._npz_path(filepath)) as model_data:
+            q_values = model_data['q_values']
+            if q_values.shape != self.q_values.shape:
+                raise ValueError(f'Q-array shape {q_values.shape} does not match agent {self.q_values.shape}')
+            self.q_values = q_values.astype(float)
+            self.visit_counts = model_data['visit_counts'].astype(np.int64)
+            self.alpha, self.gamma, self.epsilon = (float(v) for v in model_data['hyperparameters'])
+    
+    def _load_legacy_json(self, filepath):
+        """Import a Q-table saved by the previous dict-based agent"""
         with open(filepath, 'r') as f:
             model_data = json.load(f)
         
-        # Restore Q-table
         for state_str, actions in model_data['q_table'].items():
-            state = eval(state_str)  # Convert string back to tuple
+            state_id = self.state_index(ast.literal_eval(state_str))
             for action_str, q_value in actions.items():
-                self.q_table[state][action_str] = q_value
+                action_id = self.action_index(ast.literal_eval(action_str))
+                self.q_values[state_id, action_id] = q_value
+                self.visit_counts[state_id, action_id] = max(1, self.visit_counts[state_id, action_id])
         
         self.alpha = model_data['alpha']
         self.gamma = model_data['gamma']
         self.epsilon = model_data['epsilon']
-
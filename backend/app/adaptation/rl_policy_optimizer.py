@@ -14,6 +14,8 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from app.models.adaptation import AdaptationLog
 from app.models.session import Session, StudentResponse
+from app.adaptation.transitions import TransitionExtractor
+from app.adaptation.outcome_stats import AdaptationOutcomeStats
 from app import db
 import json
 
@@ -32,6 +34,8 @@ class RLPolicyOptimizer:
         self.policy_history = []  # Track policy changes over time
         self.reward_signals = defaultdict(list)  # Track rewards per action
         self.action_effectiveness = defaultdict(float)  # Action -> avg effectiveness
+        self.transition_extractor = TransitionExtractor()
+        self.outcome_stats = AdaptationOutcomeStats()
     
     def validate_policy(self, test_sessions_count=50):
         """
@@ -48,37 +52,16 @@ class RLPolicyOptimizer:
                 'recommendations': []
             }
         """
-        # Get recent sessions
-        recent_sessions = Session.query.order_by(
-            Session.session_end.desc()
-        ).limit(test_sessions_count).all()
+        # Recent sessions and their adaptation outcomes, aggregated in SQL
+        sessions_analyzed, total_effectiveness = self.outcome_stats.session_scores(test_sessions_count)
         
-        if not recent_sessions:
+        if not sessions_analyzed:
             return {'policy_score': 0, 'convergence': False, 'recommendations': ['No session data']}
         
-        # Analyze policy effectiveness on these sessions
-        total_effectiveness = 0
-        action_successes = defaultdict(lambda: {'success': 0, 'total': 0})
-        
-        for session in recent_sessions:
-            adaptation_logs = AdaptationLog.query.filter_by(session_id=session.id).all()
-            
-            # Calculate session effectiveness
-            session_gain = session.score_percentage if session.score_percentage else 0
-            
-            for log in adaptation_logs:
-                action_type = log.adaptation_type  # 'difficulty', 'pacing', 'hints', 'content'
-                
-                # Check if engagement improved after this action
-                if session_gain > 50:  # Arbitrary threshold
-                    action_successes[action_type]['success'] += 1
-                
-                action_successes[action_type]['total'] += 1
-            
-            total_effectiveness += session_gain
+        outcomes = self.outcome_stats.by_action_type(recent_sessions=test_sessions_count)
         
         # Calculate metrics
-        avg_effectiveness = total_effectiveness / len(recent_sessions) if recent_sessions else 0
+        avg_effectiveness = total_effectiveness / sessions_analyzed
         policy_score = min(100, avg_effectiveness)
         
         # Determine convergence (small variance in recent rewards)
@@ -86,11 +69,12 @@ class RLPolicyOptimizer:
         convergence = (len(recent_rewards) > 10 and 
                       np.std(recent_rewards[-10:]) < 0.1) if recent_rewards else False
         
-        # Calculate action effectiveness
-        action_effectiveness = {}
-        for action, results in action_successes.items():
-            if results['total'] > 0:
-                action_effectiveness[action] = results['success'] / results['total']
+        # Calculate action effectiveness (success share per adaptation type)
+        used = outcomes['total'] > 0
+        action_effectiveness = dict(zip(
+            outcomes['adaptation_type'][used],
+            (outcomes['successes'][used] / outcomes['total'][used]).tolist()
+        ))
         
         # Generate recommendations
         recommendations = self._generate_recommendations(
@@ -102,7 +86,7 @@ class RLPolicyOptimizer:
             'convergence': convergence,
             'action_effectiveness': action_effectiveness,
             'avg_session_performance': round(avg_effectiveness, 1),
-            'sessions_analyzed': len(recent_sessions),
+            'sessions_analyzed': sessions_analyzed,
             'recommendations': recommendations
         }
     
@@ -138,9 +122,17 @@ class RLPolicyOptimizer:
         if not session:
             return None
         
-        # Calculate reward components
-        engagement_change = self._estimate_engagement_change(session_id)
-        accuracy_change = self._estimate_accuracy_change(session_id)
+        # Calculate reward components: mean per-adaptation change from the
+        # as-of aligned engagement metrics, falling back to response proxies
+        transitions = list(self.transition_extractor.iter_transitions(session_ids=[session_id]))
+        if transitions:
+            engagement_change = float(np.mean([
+                t.after.engagement_score - t.before.engagement_score for t in transitions
+            ]))
+            accuracy_change = float(np.mean([t.after.accuracy - t.before.accuracy for t in transitions]))
+        else:
+            engagement_change = self._estimate_engagement_change(session_id)
+            accuracy_change = self._estimate_accuracy_change(session_id)
         student_satisfaction = self._estimate_satisfaction(session_id)
         
         # Weighted reward signal (can be tuned)
@@ -161,6 +153,7 @@ class RLPolicyOptimizer:
             'accuracy_change': accuracy_change,
             'satisfaction_estimate': student_satisfaction,
             'overall_reward': optimized_reward,
+            'transitions_used': len(transitions),
             'weights': weights
         }
     
@@ -226,16 +219,13 @@ class RLPolicyOptimizer:
         if not self.rl_agent.experience_buffer:
             return {'converged': False, 'q_table_size': 0}
         
-        # Get Q-value statistics
-        all_q_values = []
-        for state_actions in self.rl_agent.q_table.values():
-            all_q_values.extend(state_actions.values())
+        # Get Q-value statistics over learned (state, action) entries
+        q_values = self.rl_agent.q_values[self.rl_agent.visit_counts > 0]
         
-        if not all_q_values:
+        if q_values.size == 0:
             return {'converged': False, 'q_table_size': 0}
         
         # Calculate metrics
-        q_values = np.array(all_q_values)
         q_std = np.std(q_values)
         q_mean = np.mean(q_values)
         
@@ -243,12 +233,12 @@ class RLPolicyOptimizer:
         max_q_variance = q_std / (abs(q_mean) + 0.1) if q_mean != 0 else q_std
         
         return {
-            'q_table_size': len(self.rl_agent.q_table),
-            'states_visited': len(self.rl_agent.q_table),
+            'q_table_size': int(q_values.size),
+            'states_visited': self.rl_agent.states_visited(),
             'avg_q_value': float(q_mean),
             'q_value_std': float(q_std),
             'convergence_metric': 1.0 - min(1.0, max_q_variance),
-            'converged': max_q_variance < 0.3,  # Converged if low variance
+            'converged': bool(max_q_variance < 0.3),  # Converged if low variance
             'training_progress': min(1.0, len(self.rl_agent.experience_buffer) / 1000.0)
         }
     
@@ -262,35 +252,25 @@ class RLPolicyOptimizer:
         Returns:
             Impact analysis
         """
-        logs = AdaptationLog.query.filter_by(adaptation_type=action_type).all()
+        row = self.outcome_stats.action_type_row(action_type)
         
-        if not logs:
+        if row is None or row['total'] == 0:
             return {'action': action_type, 'impact': 'insufficient_data'}
         
-        # Collect outcomes
-        improvements = 0
-        total = 0
-        impact_scores = []
-        
-        for log in logs:
-            session = Session.query.get(log.session_id)
-            if session:
-                total += 1
-                
-                # Check if performance improved after action
-                if session.score_percentage and session.score_percentage > 50:
-                    improvements += 1
-                    impact_scores.append(session.score_percentage / 100.0)
-        
-        if total == 0:
-            return {'action': action_type, 'impact': 'insufficient_data'}
+        total = int(row['total'])
+        improvements = int(row['successes'])
+        if improvements:
+            avg_impact = row['impact_sum'] / improvements
+            impact_std = np.sqrt(max(0.0, row['impact_sq_sum'] / improvements - avg_impact ** 2))
+        else:
+            avg_impact = impact_std = 0.0
         
         return {
             'action': action_type,
             'total_times_used': total,
             'success_rate': improvements / total,
-            'avg_impact_score': np.mean(impact_scores) if impact_scores else 0.0,
-            'impact_std': np.std(impact_scores) if impact_scores else 0.0,
+            'avg_impact_score': float(avg_impact),
+            'impact_std': float(impact_std),
             'recommendation': self._action_recommendation(improvements / total)
         }
     
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.adaptation.engine import AdaptiveEngine
+from app.adaptation.effectiveness import EffectivenessLabeler, effectiveness_counts
 from app.models.adaptation import AdaptationLog
 
 adaptation_bp = Blueprint('adaptation', __name__)
@@ -7,9 +8,13 @@ engine = AdaptiveEngine()
 
 @adaptation_bp.route('/recommend/<student_id>/<session_id>', methods=['GET'])
 def get_recommendations(student_id, session_id):
-    """Get adaptation recommendations for a student"""
+    """Get adaptation recommendations for a student (?dry_run=true: no changes are saved)"""
     try:
-        recommendations = engine.get_adaptation_recommendations(student_id, session_id)
+        dry_run = request.args.get('dry_run', 'false').lower() in ('1', 'true', 'yes')
+        recommendations = engine.get_adaptation_recommendations(student_id, session_id, dry_run=dry_run)
+        if isinstance(recommendations, tuple):
+            error, status = recommendations
+            return jsonify(error), status
         
         return jsonify({
             'success': True,
@@ -41,16 +46,16 @@ def get_adaptation_logs(session_id):
 def get_adaptation_effectiveness(session_id):
     """Analyze effectiveness of adaptations in a session"""
     try:
-        logs = AdaptationLog.query.filter_by(session_id=session_id).all()
+        counts = effectiveness_counts(session_id)
         
-        if not logs:
+        if counts['total_adaptations'] == 0:
             return jsonify({'error': 'No adaptation logs found'}), 404
         
-        # Calculate effectiveness metrics
-        total_adaptations = len(logs)
-        effective_adaptations = sum(1 for log in logs if log.was_effective)
-        ineffective_adaptations = sum(1 for log in logs if log.was_effective == False)
-        unknown_effectiveness = total_adaptations - effective_adaptations - ineffective_adaptations
+        # Calculate effectiveness metrics (labels written by EffectivenessLabeler)
+        total_adaptations = counts['total_adaptations']
+        effective_adaptations = counts['effective']
+        ineffective_adaptations = counts['ineffective']
+        unknown_effectiveness = counts['unknown']
         
         effectiveness_rate = effective_adaptations / total_adaptations if total_adaptations > 0 else 0
         
@@ -68,3 +73,34 @@ def get_adaptation_effectiveness(session_id):
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@adaptation_bp.route('/effectiveness/label', methods=['POST'])
+def label_adaptation_effectiveness():
+    """Label settled adaptation logs past the labeler watermark"""
+    try:
+        data = request.get_json(silent=True) or {}
+        labeler = EffectivenessLabeler(batch_size=data.get('batch_size'))
+        summary = labeler.run(max_batches=data.get('max_batches'))
+        
+        return jsonify({
+            'success': True,
+            'labeling': summary
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@adaptation_bp.route('/effectiveness/labeler', methods=['GET'])
+def get_labeler_status():
+    """Labeler watermark and number of settled logs still to label"""
+    try:
+        labeler = EffectivenessLabeler()
+        
+        return jsonify({
+            'success': True,
+            'watermark': labeler.get_watermark().to_dict(),
+            'pending': labeler.pending()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
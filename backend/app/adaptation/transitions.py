@@ -0,0 +1,149 @@
+"""
+RL Transition Extraction
+
+Builds (state, action, reward, next_state) transitions from AdaptationLog and
+EngagementMetric history for one session or a whole cohort without per-log
+queries.
+
+- Two ordered scans: adaptation logs and engagement metrics, both sorted by
+  (session_id, timestamp) and streamed with yield_per
+- A streaming as-of merge pairs each log with the latest metric recorded at
+  or before it (the same alignment as a `timestamp <=` point lookup)
+- Consecutive logs in a session form a transition: metric as-of log i is the
+  "before" observation, metric as-of log i+1 the "after" observation
+- Raw transitions can be mapped to dense RLAdaptiveAgent ids in NumPy batches
+"""
+
+from collections import namedtuple
+from itertools import groupby
+
+import numpy as np
+
+from app import db
+from app.models.adaptation import AdaptationLog
+from app.models.engagement import EngagementMetric
+from app.models.session import Session
+
+
+# log: AdaptationLog row (id, session_id, timestamp, adaptation_type, old_value, new_value)
+# before/after: EngagementMetric rows (session_id, timestamp, engagement_score, accuracy, confidence_level)
+Transition = namedtuple('Transition', ['session_id', 'log', 'before', 'after'])
+
+
+class TransitionExtractor:
+    """Stream RL transitions with an ordered as-of merge of logs and metrics"""
+
+    def __init__(self, stream_batch_size=1000):
+        self.stream_batch_size = stream_batch_size
+
+    # --------------------------------------------------------------- scans
+
+    def _scope(self, query, session_column, session_ids, student_ids):
+        if session_ids is not None:
+            query = query.filter(session_column.in_(list(session_ids)))
+        if student_ids is not None:
+            cohort = db.session.query(Session.id).filter(Session.student_id.in_(list(student_ids)))
+            query = query.filter(session_column.in_(cohort))
+        return query
+
+    def _log_scan(self, session_ids=None, student_ids=None):
+        query = db.session.query(
+            AdaptationLog.id,
+            AdaptationLog.session_id,
+            AdaptationLog.timestamp,
+            AdaptationLog.adaptation_type,
+            AdaptationLog.old_value,
+            AdaptationLog.new_value
+        )
+        query = self._scope(query, AdaptationLog.session_id, session_ids, student_ids)
+        return query.order_by(
+            AdaptationLog.session_id, AdaptationLog.timestamp
+        ).yield_per(self.stream_batch_size)
+
+    def _metric_scan(self, session_ids=None, student_ids=None):
+        query = db.session.query(
+            EngagementMetric.session_id,
+            EngagementMetric.timestamp,
+            EngagementMetric.engagement_score,
+            EngagementMetric.accuracy,
+            EngagementMetric.confidence_level
+        )
+        query = self._scope(query, EngagementMetric.session_id, session_ids, student_ids)
+        return query.order_by(
+            EngagementMetric.session_id, EngagementMetric.timestamp
+        ).yield_per(self.stream_batch_size)
+
+    # --------------------------------------------------------------- merge
+
+    def iter_transitions(self, session_ids=None, student_ids=None):
+        """
+        Yield Transition tuples for the given sessions and/or students
+        (every session when both are None), in (session_id, timestamp) order.
+        """
+        metrics = iter(self._metric_scan(session_ids, student_ids))
+        pending = next(metrics, None)
+
+        for session_id, session_logs in groupby(self._log_scan(session_ids, student_ids),
+                                                key=lambda row: row.session_id):
+            # Skip metrics of sessions that have no adaptation logs
+            while pending is not None and pending.session_id < session_id:
+                pending = next(metrics, None)
+
+            latest = None  # as-of metric for the current log
+            previous = None  # (log, as-of metric) of the previous log
+            for log in session_logs:
+                while (pending is not None and pending.session_id == session_id
+                       and pending.timestamp <= log.timestamp):
+                    latest = pending
+                    pending = next(metrics, None)
+
+                if previous is not None and previous[1] is not None and latest is not None:
+                    yield Transition(session_id, previous[0], previous[1], latest)
+                previous = (log, latest)
+
+    def iter_batches(self, agent, session_ids=None, student_ids=None, batch_size=4096):
+        """
+        Yield dicts of NumPy arrays (states, actions, rewards, next_states) in
+        the agent's dense id space, at most batch_size transitions each.
+        """
+        buffer = []
+        for transition in self.iter_transitions(session_ids, student_ids):
+            buffer.append(self.encode(agent, transition))
+            if len(buffer) >= batch_size:
+                yield self._to_arrays(buffer)
+                buffer = []
+        if buffer:
+            yield self._to_arrays(buffer)
+
+    @staticmethod
+    def encode(agent, transition):
+        """Map one transition to (state_id, action_id, reward, next_state_id) for an agent"""
+        before, after = transition.before, transition.after
+        confidence_before = before.confidence_level if before.confidence_level is not None else 0.5
+        confidence_after = after.confidence_level if after.confidence_level is not None else 0.5
+
+        state = agent.discretize_state(before.engagement_score, before.accuracy, confidence_before)
+        next_state = agent.discretize_state(after.engagement_score, after.accuracy, confidence_after)
+        reward = agent.calculate_reward(
+            before.engagement_score,
+            after.engagement_score,
+            before.accuracy,
+            after.accuracy,
+            transition.log.adaptation_type
+        )
+        return (
+            agent.state_index(state),
+            agent.action_index(agent._log_to_action(transition.log)),
+            reward,
+            agent.state_index(next_state)
+        )
+
+    @staticmethod
+    def _to_arrays(rows):
+        states, actions, rewards, next_states = zip(*rows)
+        return {
+            'states': np.array(states, dtype=np.int64),
+            'actions': np.array(actions, dtype=np.int64),
+            'rewards': np.array(rewards, dtype=float),
+            'next_states': np.array(next_states, dtype=np.int64)
+        }
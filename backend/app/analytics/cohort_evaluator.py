@@ -0,0 +1,140 @@
+"""
+Cohort Evaluator
+
+Set-based counterpart of ResearchEvaluator's per-student evaluations for the
+aggregate system-impact report. Computes, for every student, the same three
+headline values the per-student evaluators produce:
+
+- engagement: mean of per-session average engagement over the window
+  (evaluate_sustained_engagement -> engagement.average_score)
+- improvement_percent: last-quartile minus first-quartile accuracy x 100
+  (evaluate_performance_improvement -> learning_gain_percent), NaN below
+  5 responses
+- adaptation_effectiveness: share of adaptations marked effective
+  (evaluate_adaptation_effectiveness -> overall_effectiveness_rate), NaN
+  without adaptations
+
+Students are processed in contiguous student_id ranges; each chunk costs
+three grouped queries whose rows are reduced with pandas, so memory is
+bounded by the chunk rather than the cohort.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, case
+
+from app import db
+from app.models.session import Session, StudentResponse
+from app.models.engagement import EngagementMetric
+from app.models.adaptation import AdaptationLog
+from app.models.student import Student
+
+
+MIN_RESPONSES = 5  # Same threshold as evaluate_performance_improvement
+
+
+class CohortEvaluator:
+    """Grouped, chunked per-student evaluation for a whole cohort"""
+
+    def __init__(self, chunk_size=5000, time_window_days=30):
+        self.chunk_size = chunk_size
+        self.time_window_days = time_window_days
+
+    def iter_student_ranges(self):
+        """Yield (first_id, last_id, student_ids) for chunks of students in id order"""
+        ids = [row[0] for row in db.session.query(Student.id).order_by(Student.id).all()]
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            yield chunk[0], chunk[-1], chunk
+
+    def iter_student_metrics(self, now=None):
+        """Yield one DataFrame (indexed by student_id) per chunk of students"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.time_window_days)
+        for low, high, student_ids in self.iter_student_ranges():
+            frame = pd.DataFrame(index=pd.Index(student_ids, name='student_id'))
+            frame['engagement'] = self._engagement(low, high, cutoff).reindex(frame.index).fillna(0.0)
+            frame['improvement_percent'] = self._improvement(low, high).reindex(frame.index)
+            frame['adaptation_effectiveness'] = self._adaptation(low, high).reindex(frame.index)
+            yield frame
+
+    def student_metrics(self, now=None):
+        """Per-student metrics for the whole cohort"""
+        frames = list(self.iter_student_metrics(now))
+        if not frames:
+            return pd.DataFrame(columns=['engagement', 'improvement_percent', 'adaptation_effectiveness'])
+        return pd.concat(frames)
+
+    # ------------------------------------------------------------- queries
+
+    def _engagement(self, low, high, cutoff):
+        rows = db.session.query(
+            Session.student_id,
+            func.avg(EngagementMetric.engagement_score)
+        ).join(
+            EngagementMetric, EngagementMetric.session_id == Session.id
+        ).filter(
+            Session.student_id >= low,
+            Session.student_id <= high,
+            Session.session_start >= cutoff
+        ).group_by(Session.id, Session.student_id).all()
+
+        per_session = pd.DataFrame(rows, columns=['student_id', 'score'], dtype=object)
+        per_session['score'] = per_session['score'].astype(float)
+        means = per_session.groupby('student_id')['score'].mean()
+        return means.map(lambda value: round(value, 3))
+
+    def _improvement(self, low, high):
+        rows = db.session.query(
+            Session.student_id,
+            StudentResponse.timestamp,
+            StudentResponse.is_correct
+        ).join(
+            Session, StudentResponse.session_id == Session.id
+        ).filter(
+            Session.student_id >= low,
+            Session.student_id <= high
+        ).all()
+        if not rows:
+            return pd.Series(dtype=float)
+
+        responses = pd.DataFrame(rows, columns=['student_id', 'timestamp', 'is_correct'])
+        responses = responses.sort_values(['student_id', 'timestamp'], kind='stable')
+        correct = responses['is_correct'].astype(float).to_numpy()
+
+        grouped = responses.groupby('student_id', sort=False)
+        rank = grouped.cumcount().to_numpy()
+        size = grouped['is_correct'].transform('size').to_numpy()
+        window = np.maximum(1, size // 4)  # Baseline/current quartile size
+
+        per_student = pd.DataFrame({
+            'student_id': responses['student_id'].to_numpy(),
+            'size': size,
+            'window': window,
+            'baseline': np.where(rank < window, correct, 0.0),
+            'current': np.where(rank >= size - window, correct, 0.0)
+        }).groupby('student_id', sort=False).agg(
+            size=('size', 'first'), window=('window', 'first'),
+            baseline=('baseline', 'sum'), current=('current', 'sum')
+        )
+        per_student = per_student[per_student['size'] >= MIN_RESPONSES]
+
+        gain = (per_student['current'] - per_student['baseline']) / per_student['window'] * 100
+        return gain.map(lambda value: round(value, 1))
+
+    def _adaptation(self, low, high):
+        rows = db.session.query(
+            AdaptationLog.student_id,
+            func.count(AdaptationLog.id),
+            func.sum(case((AdaptationLog.was_effective.is_(True), 1), else_=0))
+        ).filter(
+            AdaptationLog.student_id >= low,
+            AdaptationLog.student_id <= high
+        ).group_by(AdaptationLog.student_id).all()
+        if not rows:
+            return pd.Series(dtype=float)
+
+        counts = pd.DataFrame(rows, columns=['student_id', 'total', 'effective']).set_index('student_id')
+        rate = counts['effective'].astype(float) / counts['total']
+        return rate.map(lambda value: round(value, 3))
@@ -15,6 +15,7 @@ from app.models.session import Session, StudentResponse
 from app.models.engagement import EngagementMetric
 from app.models.adaptation import AdaptationLog
 from app.models.student import Student
+from app.analytics.cohort_evaluator import CohortEvaluator
 from app import db
 import statistics
 import json
@@ -24,6 +25,7 @@ class ResearchEvaluator:
     
     def __init__(self):
         self.metrics = {}
+        self.cohort_evaluator = CohortEvaluator()
     
     # OBJECTIVE IV: Evaluation Framework
     
@@ -330,41 +332,21 @@ class ResearchEvaluator:
                 }
             }
         else:
-            # Aggregate impact
-            students = Student.query.all()
+            # Aggregate impact: grouped queries per chunk of students
+            total_students = Student.query.count()
             
-            if not students:
+            if not total_students:
                 return {'status': 'no_students'}
             
+            cohort = self.cohort_evaluator.student_metrics()
             metrics = {
-                'avg_engagement': [],
-                'avg_improvement': [],
-                'avg_adaptation_effectiveness': []
+                'avg_engagement': cohort['engagement'].tolist(),
+                'avg_improvement': cohort['improvement_percent'].dropna().tolist(),
+                'avg_adaptation_effectiveness': cohort['adaptation_effectiveness'].dropna().tolist()
             }
             
-            for student in students:
-                try:
-                    engagement = self.evaluate_sustained_engagement(student.id)
-                    metrics['avg_engagement'].append(
-                        engagement.get('engagement', {}).get('average_score', 0)
-                    )
-                    
-                    performance = self.evaluate_performance_improvement(student.id)
-                    if 'performance_analysis' in performance:
-                        metrics['avg_improvement'].append(
-                            performance['performance_analysis'].get('learning_gain_percent', 0)
-                        )
-                    
-                    adaptation = self.evaluate_adaptation_effectiveness(student.id)
-                    if 'effectiveness' in adaptation:
-                        metrics['avg_adaptation_effectiveness'].append(
-                            adaptation['effectiveness'].get('overall_effectiveness_rate', 0)
-                        )
-                except:
-                    pass
-            
             return {
-                'total_students': len(students),
+                'total_students': total_students,
                 'students_with_data': len(metrics['avg_engagement']),
                 
                 'system_impact': {
@@ -10,19 +10,25 @@ import statistics
 
 # Import new modules
 from app.engagement.mastery import MasteryTracker
+from app.engagement.knowledge_tracing import BayesianKnowledgeTracer
 from app.engagement.affective import AffectiveIndicatorAnalyzer
 from app.engagement.spaced_repetition import SpacedRepetitionScheduler, LearningCurveAnalyzer
+from app.engagement.review_queue import ReviewQueueBuilder
 from app.adaptation.rl_agent import RLAdaptiveAgent
 from app.adaptation.rl_policy_optimizer import RLPolicyOptimizer, ExplorationStrategy
 from app.adaptation.irt import IRTModel, CATAlgorithm
+from app.adaptation.replay import PolicyReplayEngine
+from app.adaptation.effectiveness import effectiveness_counts
 from app.analytics.evaluator import ResearchEvaluator
 
 analytics_bp = Blueprint('analytics', __name__)
 
 # Initialize modules (singletons)
 mastery_tracker = MasteryTracker()
+knowledge_tracer = BayesianKnowledgeTracer()
 affective_analyzer = AffectiveIndicatorAnalyzer()
 spaced_rep_scheduler = SpacedRepetitionScheduler()
+review_queue_builder = ReviewQueueBuilder()
 learning_curve_analyzer = LearningCurveAnalyzer()
 rl_agent = RLAdaptiveAgent()
 policy_optimizer = RLPolicyOptimizer(rl_agent)
@@ -215,10 +221,11 @@ def get_adaptation_impact(session_id):
         adaptations_by_type[adaptation_type].append(log.to_dict())
     
     # Calculate effectiveness
-    total_logged = len(logs)
-    effective = sum(1 for log in logs if log.was_effective == True)
-    ineffective = sum(1 for log in logs if log.was_effective == False)
-    unknown = total_logged - effective - ineffective
+    counts = effectiveness_counts(session_id)
+    total_logged = counts['total_adaptations']
+    effective = counts['effective']
+    ineffective = counts['ineffective']
+    unknown = counts['unknown']
     
     return jsonify({
         'success': True,
@@ -358,6 +365,37 @@ def get_knowledge_profile(student_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@analytics_bp.route('/mastery/bkt/<student_id>', methods=['GET'])
+def get_bkt_mastery(student_id):
+    """Get persisted BKT knowledge state (all topics, or ?topic=<name>)"""
+    try:
+        topic = request.args.get('topic')
+        return jsonify({
+            'success': True,
+            'data': knowledge_tracer.get_mastery(student_id, topic)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/mastery/bkt/fit', methods=['POST'])
+def fit_bkt_parameters():
+    """Re-estimate per-topic BKT parameters from response history (batch EM)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        results = knowledge_tracer.fit(
+            topics=data.get('topics'),
+            min_observations=data.get('min_observations', 10),
+            max_iterations=data.get('max_iterations', 50),
+            rebuild_states=data.get('rebuild_states', True)
+        )
+        return jsonify({
+            'success': True,
+            'topics': results
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # ============ AFFECTIVE ROUTES ============
 
 @analytics_bp.route('/affective/record-facial', methods=['POST'])
@@ -426,6 +464,23 @@ def detect_frustration():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@analytics_bp.route('/affective/summary/<session_id>', methods=['GET'])
+def get_affective_summary(session_id):
+    """Get windowed affective summary for a session (?minutes=30)"""
+    try:
+        minutes = request.args.get('minutes', 30, type=int)
+        summary = affective_analyzer.get_affective_summary(
+            request.args.get('student_id'), session_id, minutes=minutes
+        )
+
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'summary': summary
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============ RL AGENT ROUTES ============
 
 @analytics_bp.route('/rl/recommend/<student_id>/<session_id>', methods=['GET'])
@@ -466,6 +521,23 @@ def learn_from_session(student_id, session_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@analytics_bp.route('/rl/learn/cohort', methods=['POST'])
+def learn_from_cohort():
+    """Learn from many sessions at once (all sessions if none are given)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = rl_agent.learn_from_cohort(
+            session_ids=data.get('session_ids'),
+            student_ids=data.get('student_ids')
+        )
+        
+        return jsonify({
+            'success': True,
+            'learning_result': result
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============ EVALUATION ROUTES ============
 
 @analytics_bp.route('/evaluate/engagement/<student_id>', methods=['GET'])
@@ -704,26 +776,52 @@ def schedule_review(student_id, question_id):
 
 @analytics_bp.route('/sr/due-for-review/<student_id>', methods=['GET'])
 def get_due_reviews(student_id):
-    """Get questions due for review"""
+    """Get questions due for review (precomputed nightly queue, live fallback)"""
+    limit = request.args.get('limit', type=int) if 'limit' in request.args else 20
+    if limit is None or limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    # Precomputed queues hold at most per_student_limit questions
+    limit = min(limit, review_queue_builder.per_student_limit)
+    
     try:
-        due_questions = spaced_rep_scheduler.get_due_for_review(student_id)
+        due_questions = review_queue_builder.get_queue(student_id, limit=limit)
+        source = 'precomputed'
+        if due_questions is None:
+            due_questions = spaced_rep_scheduler.get_due_for_review(student_id, limit=limit)
+            source = 'live'
         
         return jsonify({
             'success': True,
             'student_id': student_id,
-            'due_count': len(due_questions),
+            'source': source,
+            'built_at': due_questions[0]['built_at'].isoformat() if source == 'precomputed' else None,
+            'due_count': spaced_rep_scheduler.count_due(student_id),
             'questions': [
                 {
                     'question_id': q['question_id'],
                     'days_overdue': q['days_overdue'],
                     'question_text': q['question'].question_text[:100] if q['question'] else 'N/A'
                 }
-                for q in due_questions[:20]  # Limit to 20
+                for q in due_questions
             ]
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@analytics_bp.route('/sr/review-queue/build', methods=['POST'])
+def build_review_queues():
+    """Rebuild all precomputed review queues in-process (normally run nightly)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        summary = review_queue_builder.build(num_partitions=int(data.get('partitions', 1)))
+        
+        return jsonify({
+            'success': True,
+            'build': summary
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @analytics_bp.route('/sr/statistics/<student_id>', methods=['GET'])
 def get_sr_statistics(student_id):
     """Get spaced repetition statistics"""
@@ -768,6 +866,29 @@ def get_topic_schedule(student_id, topic):
         return jsonify({'error': str(e)}), 500
 
 
+# ============ Policy Replay Endpoints ============
+
+@analytics_bp.route('/replay/difficulty-policy', methods=['POST'])
+def replay_difficulty_policy():
+    """Replay logged sessions with alternative difficulty policy parameters"""
+    try:
+        data = request.get_json(silent=True) or {}
+        engine = PolicyReplayEngine.from_database(session_ids=data.get('session_ids'))
+        
+        if data.get('grid'):
+            reports = engine.grid(data['grid'], max_workers=data.get('workers', 1))
+        else:
+            reports = [engine.compare(data.get('overrides'))]
+        
+        return jsonify({
+            'success': True,
+            'baseline_policy': engine.baseline_policy,
+            'reports': reports
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ============ RL Policy Optimizer Endpoints ============
 
 @analytics_bp.route('/rl/policy-validation', methods=['GET'])
@@ -870,7 +991,9 @@ def decay_eps():
 # FACIAL EXPRESSION API ENDPOINTS
 # ============================================================================
 
-from app.engagement.facial_expression_api import FacialExpressionIntegrator
+from app.engagement.facial_expression_api import (
+    FacialExpressionIntegrator, MAX_FRAME_PAYLOAD_BYTES, decode_frames
+)
 
 # Initialize facial expression integrator
 facial_integrator = FacialExpressionIntegrator(provider='face.js')
@@ -900,6 +1023,49 @@ def get_facial_summary(session_id):
         return jsonify({'error': str(e)}), 500
 
 
+@analytics_bp.route('/affective/facial-frames/<session_id>', methods=['POST'])
+def ingest_facial_frames(session_id):
+    """
+    Ingest a batch of packed facial frames (application/octet-stream body of
+    29-byte little-endian records, see FRAME_DTYPE in facial_expression_api)
+    of at most MAX_FRAME_PAYLOAD_BYTES
+    """
+    too_large = {'error': f'Frame payload exceeds {MAX_FRAME_PAYLOAD_BYTES} bytes'}
+    if (request.content_length or 0) > MAX_FRAME_PAYLOAD_BYTES:
+        return jsonify(too_large), 413
+    # Bounded read, also for bodies sent without a Content-Length
+    payload = request.stream.read(MAX_FRAME_PAYLOAD_BYTES + 1)
+    if len(payload) > MAX_FRAME_PAYLOAD_BYTES:
+        return jsonify(too_large), 413
+    
+    try:
+        frames = decode_frames(payload)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        result = facial_integrator.add_frames(session_id, frames)
+        if result is None:
+            session = db.session.get(Session, session_id)
+            if not session:
+                return jsonify({'error': 'Session not found'}), 404
+            # Keeps a recording another request started meanwhile
+            facial_integrator.record_session_start(session_id, session.student_id, restart=False)
+            result = facial_integrator.add_frames(session_id, frames)
+        detected, missing, frames_recorded = result
+        
+        return jsonify({
+            'success': True,
+            'session_id': session_id,
+            'frames_received': int(frames.size),
+            'faces_detected': int(detected),
+            'faces_missing': missing,
+            'frames_recorded': frames_recorded
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @analytics_bp.route('/affective/facial-capabilities', methods=['GET'])
 def get_facial_capabilities():
     """Get available facial detection capabilities"""
@@ -0,0 +1,166 @@
+"""
+Question Payload Cache
+Pre-encoded JSON payloads for questions, keyed by question id.
+
+Question content is effectively immutable after seeding, so the client payload
+is built and encoded once and served as bytes. Entries are populated at app startup and filled lazily on
+a miss.
+
+The cache is per process. ORM edits and deletes in this process invalidate the
+entry immediately. Every other change becomes visible once the entry's TTL
+(Config.QUESTION_CACHE_TTL_SECONDS) runs out: edits from other workers or
+scripts, reseeding, and bulk `Question.query.update()/delete()` statements.
+"""
+
+import json
+import threading
+import time
+from sqlalchemy import event, inspect as sa_inspect
+
+from app.models.question import Question
+from config import Config
+
+
+# Columns that appear in the cached payload or hints; edits to other columns
+# (e.g. times_presented, average_correct_rate) do not invalidate the entry.
+PAYLOAD_COLUMNS = (
+    'difficulty', 'question_text',
+    'option_a', 'option_b', 'option_c', 'option_d', 'hints'
+)
+
+
+def _encode(data):
+    """Compact JSON encoding"""
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def build_client_payload(question):
+    """Payload sent to the student when a question is delivered (no answer)"""
+    return {
+        'question_id': question.id,
+        'question_text': question.question_text,
+        'options': {
+            'A': question.option_a,
+            'B': question.option_b,
+            'C': question.option_c,
+            'D': question.option_d
+        },
+        'difficulty': question.difficulty,
+        'hints_available': len(question.hints or [])
+    }
+
+
+class _CachedQuestion:
+    """Encoded payloads for a single question"""
+
+    def __init__(self, question, expires):
+        self.expires = expires  # time.monotonic() after which the row is re-read
+        self.client = build_client_payload(question)
+        self.client_bytes = _encode(self.client)
+        self.hints = tuple(question.hints or [])
+
+
+class QuestionPayloadCache:
+    """
+    Process-local cache of pre-encoded question payloads; entries are re-read
+    from the database after ttl_seconds.
+    """
+
+    def __init__(self, ttl_seconds=None):
+        self.ttl_seconds = Config.QUESTION_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, question):
+        """Encode and store the payloads for a Question row"""
+        entry = _CachedQuestion(question, time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            self._entries[question.id] = entry
+        return entry
+
+    def warm(self, questions=None):
+        """
+        Populate the cache from the given questions (default: all questions).
+        Returns the number of cached entries.
+        """
+        if questions is None:
+            questions = Question.query.all()
+        for question in questions:
+            self.put(question)
+        return len(self._entries)
+
+    def _get_entry(self, question_id):
+        entry = self._entries.get(question_id)
+        if entry is not None and entry.expires > time.monotonic():
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        question = Question.query.get(question_id)
+        if not question:
+            self.invalidate(question_id)
+            return None
+        return self.put(question)
+
+    def get_client_payload(self, question_id):
+        """Client payload dict (a copy, safe to extend), or None if not found"""
+        entry = self._get_entry(question_id)
+        if entry is None:
+            return None
+        return dict(entry.client)
+
+    def get_client_bytes(self, question_id):
+        """Pre-encoded client payload, or None if not found"""
+        entry = self._get_entry(question_id)
+        return entry.client_bytes if entry is not None else None
+
+    def get_hints(self, question_id):
+        """Tuple of hint strings, or None if the question does not exist"""
+        entry = self._get_entry(question_id)
+        return entry.hints if entry is not None else None
+
+    def invalidate(self, question_id):
+        """Drop a single entry"""
+        with self._lock:
+            self._entries.pop(question_id, None)
+
+    def clear(self):
+        """Drop all entries (use after bulk edits)"""
+        with self._lock:
+            self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def encoded_envelope(key, payload_bytes):
+    """
+    Wrap pre-encoded payload bytes as {"success": true, "<key>": <payload>}
+    without decoding and re-encoding the payload.
+    """
+    return b'{"success":true,"' + key.encode('utf-8') + b'":' + payload_bytes + b'}'
+
+
+question_payload_cache = QuestionPayloadCache()
+
+
+def _invalidate_on_update(mapper, connection, target):
+    state = sa_inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in PAYLOAD_COLUMNS):
+        question_payload_cache.invalidate(target.id)
+
+
+def _invalidate_on_delete(mapper, connection, target):
+    question_payload_cache.invalidate(target.id)
+
+
+event.listen(Question, 'after_update', _invalidate_on_update)
+event.listen(Question, 'after_delete', _invalidate_on_delete)
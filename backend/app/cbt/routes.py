@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from app.cbt.system import CBTSystem
+from app.cbt.question_cache import question_payload_cache, encoded_envelope
 from app.models.student import Student
 from app.models.session import Session
 
@@ -96,11 +97,35 @@ def get_next_question(session_id):
     if isinstance(result, tuple):
         return jsonify(result[0]), result[1]
     
+    if 'question_id' in result:
+        # Serve the pre-encoded payload instead of re-serializing the question
+        payload = question_payload_cache.get_client_bytes(result['question_id'])
+        if payload is not None:
+            return Response(encoded_envelope('question', payload), status=200, mimetype='application/json')
+    
     return jsonify({
         'success': True,
         'question': result
     }), 200
 
+@cbt_bp.route('/question/prefetch/<session_id>', methods=['GET'])
+def prefetch_questions(session_id):
+    """Get up to k candidate questions at the session's current difficulty"""
+    k = request.args.get('k', 3, type=int)
+    
+    if k < 1 or k > 10:
+        return jsonify({'error': 'k must be between 1 and 10'}), 400
+    
+    result = cbt_system.prefetch_questions(session_id, k)
+    
+    if isinstance(result, tuple):
+        return jsonify(result[0]), result[1]
+    
+    return jsonify({
+        'success': True,
+        'prefetch': result
+    }), 200
+
 @cbt_bp.route('/response/submit', methods=['POST'])
 def submit_response():
     """Submit a response to a question"""
@@ -132,6 +157,9 @@ def submit_response():
     facial_metrics = data.get('facial_metrics', {})
     hints_used_array = data.get('hints_used', [])  # hints_used is the array from frontend
     
+    # Optionally return the next question inline to save a round-trip
+    include_next_question = bool(data.get('include_next_question', False))
+    
     # DEBUG: Log all tracking data received
     print(f"[TRACKING DATA RECEIVED] initial={initial_option}, final={final_option}, changes={option_change_count}, nav_freq={navigation_frequency}, ts={submission_iso_timestamp}, time_spent={time_spent_per_question}s, inactivity={inactivity_duration_ms}ms", flush=True)
     print(f"[COGNITIVE DATA] hesitation_flags={hesitation_flags}, navigation_pattern={navigation_pattern}, question_index={question_index}", flush=True)
@@ -159,7 +187,8 @@ def submit_response():
         navigation_pattern=navigation_pattern,
         # Facial & Hint data
         facial_metrics=facial_metrics,
-        hints_used_array=hints_used_array
+        hints_used_array=hints_used_array,
+        include_next_question=include_next_question
     )
     
     if isinstance(result, tuple):
@@ -176,6 +205,9 @@ def submit_response():
         'current_difficulty': result.get('current_difficulty', 0.5)
     }
     
+    if include_next_question:
+        response_data['next_question'] = result.get('next_question')
+    
     print(f"[RESPONSE] Sending difficulty: {response_data['current_difficulty']}, is_correct: {response_data['is_correct']}", flush=True)
     
     return jsonify(response_data), 201
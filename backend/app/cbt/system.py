@@ -3,8 +3,11 @@ from app.models.question import Question
 from app.models.student import Student
 from app.models.engagement import EngagementMetric
 from app.engagement.tracker import EngagementIndicatorTracker
+from app.engagement.knowledge_tracing import BayesianKnowledgeTracer
 from app.adaptation.engine import AdaptiveEngine
+from app.cbt.question_cache import question_payload_cache
 from app import db
+from config import Config
 from datetime import datetime
 import random
 
@@ -16,6 +19,7 @@ class CBTSystem:
     
     def __init__(self):
         self.adaptive_engine = AdaptiveEngine()
+        self.knowledge_tracer = BayesianKnowledgeTracer()
     
     def start_session(self, student_id, subject, num_questions=10):
         """
@@ -54,14 +58,95 @@ class CBTSystem:
         Get the next question for the student.
         Uses difficulty mapping to select from appropriate question pool.
         """
-        from app.adaptation.difficulty_mapper import DifficultyMapper
+        session = Session.query.get(session_id)
+        if not session:
+            return {'error': 'Session not found'}, 404
         
+        answered_ids = self._get_answered_question_ids(session_id)
+        return self._select_next_question(session, answered_ids, current_difficulty)
+    
+    def prefetch_questions(self, session_id, k=3):
+        """
+        Get up to k candidate questions for the session's current difficulty.
+        The client can serve these while the next submit round-trip is in flight;
+        candidates are re-validated server-side on submit like any other question.
+        """
         session = Session.query.get(session_id)
         if not session:
             return {'error': 'Session not found'}, 404
         
+        if session.status not in ['active', 'paused']:
+            return {'error': f'Session is not active (status: {session.status})'}, 400
+        
+        answered_ids = self._get_answered_question_ids(session_id)
+        remaining = max(session.total_questions - len(answered_ids), 0)
+        question_ids = self._get_candidate_question_ids(session, session.current_difficulty, answered_ids)
+        selected = random.sample(question_ids, min(k, remaining, len(question_ids)))
+        
+        return {
+            'session_id': session_id,
+            'current_difficulty': session.current_difficulty,
+            'remaining_questions': remaining,
+            'questions': [question_payload_cache.get_client_payload(qid) for qid in selected]
+        }
+    
+    def _get_answered_question_ids(self, session_id):
+        """Question ids already answered in this session (single column query)"""
+        answered_questions = StudentResponse.query.filter_by(
+            session_id=session_id
+        ).with_entities(StudentResponse.question_id).all()
+        return [q[0] for q in answered_questions]
+    
+    def _get_candidate_question_ids(self, session, difficulty, answered_ids):
+        """
+        Ids of unanswered questions for the session's subject around the given difficulty,
+        falling back to a tighter band and then to any unanswered question.
+        Only the id column is loaded; payloads come from the question payload cache.
+        """
+        from app.adaptation.difficulty_mapper import DifficultyMapper
+        
+        # Use difficulty mapper to determine question pool
+        min_difficulty, max_difficulty, difficulty_label = DifficultyMapper.get_difficulty_range(difficulty)
+        
+        print(f'[DEBUG] get_next_question: session_difficulty={difficulty}, label={difficulty_label}, range=[{min_difficulty}, {max_difficulty}]')
+        
+        def unanswered_ids(*criteria):
+            rows = Question.query.with_entities(Question.id).filter(
+                Question.subject == session.subject,
+                *criteria,
+                ~Question.id.in_(answered_ids) if answered_ids else True
+            ).all()
+            return [row[0] for row in rows]
+        
+        # Get unanswered questions from the appropriate difficulty range
+        question_ids = unanswered_ids(
+            Question.difficulty >= min_difficulty,
+            Question.difficulty <= max_difficulty
+        )
+        
+        if not question_ids:
+            # Fallback: use tighter band around current difficulty
+            min_band, max_band, _ = DifficultyMapper.get_difficulty_band(difficulty)
+            question_ids = unanswered_ids(
+                Question.difficulty >= min_band,
+                Question.difficulty <= max_band
+            )
+        
+        if not question_ids:
+            # Final fallback: get any unanswered question
+            question_ids = unanswered_ids()
+        
+        print(f'[DEBUG] Found {len(question_ids)} questions for difficulty {difficulty_label}')
+        
+        return question_ids
+    
+    def _select_next_question(self, session, answered_ids, current_difficulty=None):
+        """
+        Pick the next question for an already-loaded session.
+        Shared by get_next_question and the inline next question on submit.
+        """
         # Check if we've reached the target number of questions
-        answered_count = len(StudentResponse.query.filter_by(session_id=session_id).all())
+        answered_count = len(answered_ids)
         if answered_count >= session.total_questions:
             # Test is complete - auto-end the session
             if session.status != 'completed':
@@ -89,48 +174,9 @@ class CBTSystem:
         # Use provided difficulty or session's current difficulty
         difficulty = current_difficulty or session.current_difficulty
         
-        # Get questions already answered in this session
-        answered_questions = StudentResponse.query.filter_by(
-            session_id=session_id
-        ).with_entities(StudentResponse.question_id).all()
-        answered_ids = [q[0] for q in answered_questions]
-        
-        # Use difficulty mapper to determine question pool
-        min_difficulty, max_difficulty, difficulty_label = DifficultyMapper.get_difficulty_range(difficulty)
-        
-        print(f'[DEBUG] get_next_question: session_difficulty={difficulty}, label={difficulty_label}, range=[{min_difficulty}, {max_difficulty}]')
-        
-        # Get unanswered questions from the appropriate difficulty range
-        questions = Question.query.filter(
-            Question.subject == session.subject,
-            Question.difficulty >= min_difficulty,
-            Question.difficulty <= max_difficulty,
-            ~Question.id.in_(answered_ids) if answered_ids else True
-        ).all()
-        
-        if not questions:
-            # Fallback: use tighter band around current difficulty
-            min_band, max_band, _ = DifficultyMapper.get_difficulty_band(difficulty)
-            questions = Question.query.filter(
-                Question.subject == session.subject,
-                Question.difficulty >= min_band,
-                Question.difficulty <= max_band,
-                ~Question.id.in_(answered_ids) if answered_ids else True
-            ).all()
-        
-        if not questions:
-            # Final fallback: get any unanswered question
-            questions = Question.query.filter(
-                Question.subject == session.subject,
-                ~Question.id.in_(answered_ids) if answered_ids else True
-            ).all()
-        
-        print(f'[DEBUG] Found {len(questions)} questions for difficulty {difficulty_label}')
-        if questions:
-            q = questions[0]
-            print(f'[DEBUG] Sample question: id={q.id}, difficulty={q.difficulty}, text={q.question_text[:50]}...')
+        question_ids = self._get_candidate_question_ids(session, difficulty, answered_ids)
         
-        if not questions:
+        if not question_ids:
             # No more questions available - end session
             session.status = 'completed'
             session.session_end = datetime.utcnow()
@@ -146,20 +192,18 @@ class CBTSystem:
         
         # Return a random question from the available pool
         # This ensures different questions are selected even with same difficulty
-        question = random.choice(questions)
+        question_id = random.choice(question_ids)
+        payload = question_payload_cache.get_client_payload(question_id)
+        if payload is None:
+            # Row deleted since the candidates were selected; try the others
+            for question_id in question_ids:
+                payload = question_payload_cache.get_client_payload(question_id)
+                if payload is not None:
+                    break
+            else:
+                return {'error': 'Selected questions are no longer available, please retry'}, 404
         
-        return {
-            'question_id': question.id,
-            'question_text': question.question_text,
-            'options': {
-                'A': question.option_a,
-                'B': question.option_b,
-                'C': question.option_c,
-                'D': question.option_d
-            },
-            'difficulty': question.difficulty,
-            'hints_available': len(question.hints)
-        }
+        return payload
     
     def submit_response(self, session_id, question_id, student_answer, response_time_seconds,
                        initial_option=None, final_option=None, option_change_count=0, 
@@ -168,9 +212,14 @@ class CBTSystem:
                        submission_iso_timestamp=None,
                        time_spent_per_question=0, inactivity_duration_ms=0,
                        question_index=0, hesitation_flags=None, navigation_pattern='sequential',
-                       facial_metrics=None, hints_used_array=None):
+                       facial_metrics=None, hints_used_array=None,
+                       include_next_question=False):
         """
-        Record a student's response to a question with comprehensive cognitive and affective tracking
+        Record a student's response to a question with comprehensive cognitive and affective tracking.
+        
+        If include_next_question is set, the next question (selected at the freshly
+        adapted difficulty) is returned inline as 'next_question', saving the client
+        a separate GET /question/next round-trip.
         """
         session = Session.query.get(session_id)
         if not session:
@@ -279,6 +328,9 @@ class CBTSystem:
             # Update session stats (only for new responses)
             if is_correct:
                 session.correct_answers += 1
+            
+            # Update the student's BKT state for this topic (first attempts only)
+            self.knowledge_tracer.update(session.student_id, question.topic, is_correct)
         
         # Calculate current score
         if session.total_questions > 0:
@@ -341,7 +393,7 @@ class CBTSystem:
             traceback.print_exc()
         
         # === ADAPTIVE ENGINE - HANDLE DIFFICULTY ADAPTATION ===
-        # IMPORTANT: Only adapt every 3 answers, looking at last 3 performance
+        # IMPORTANT: Only adapt every N (default 3) answers, looking at last N performance
         # This matches the original behavior which worked well
         try:
             all_responses = StudentResponse.query.filter_by(session_id=session_id).order_by(
@@ -350,15 +402,16 @@ class CBTSystem:
             
             total_answered = len(all_responses)
             current_difficulty = session.current_difficulty
+            window = Config.ADAPTATION_CONFIG.get('adapt_every_n_answers', 3)
             
-            # Only adapt when we have at least 3 answers AND on multiples of 3
-            if total_answered >= 3 and total_answered % 3 == 0:
-                # Get the last 3 responses
-                last_3 = all_responses[-3:]
+            # Only adapt when we have at least N answers AND on multiples of N
+            if total_answered >= window and total_answered % window == 0:
+                # Get the last N responses
+                last_3 = all_responses[-window:]
                 correct_in_last_3 = sum(1 for r in last_3 if r.is_correct)
                 
                 # Use the engine ONLY for this decision, with recent accuracy
-                recent_accuracy = correct_in_last_3 / 3.0
+                recent_accuracy = correct_in_last_3 / float(window)
                 
                 # Create a temporary metric with recent accuracy for the engine
                 temp_metric = type('TempMetric', (), {
@@ -374,9 +427,9 @@ class CBTSystem:
                 
                 if result['adapted']:
                     session = Session.query.get(session_id)  # Re-fetch to get updated value
-                    print(f"\n[ADAPT Q{total_answered}] Last 3: {correct_in_last_3}/3 ({recent_accuracy:.0%}) | {result['reason']} | {result['old_difficulty']:.2f} → {result['new_difficulty']:.2f}\n", flush=True)
+                    print(f"\n[ADAPT Q{total_answered}] Last {window}: {correct_in_last_3}/{window} ({recent_accuracy:.0%}) | {result['reason']} | {result['old_difficulty']:.2f} → {result['new_difficulty']:.2f}\n", flush=True)
                 else:
-                    print(f"\n[ADAPT Q{total_answered}] Last 3: {correct_in_last_3}/3 ({recent_accuracy:.0%}) | {result['reason']}\n", flush=True)
+                    print(f"\n[ADAPT Q{total_answered}] Last {window}: {correct_in_last_3}/{window} ({recent_accuracy:.0%}) | {result['reason']}\n", flush=True)
                 
         except Exception as e:
             import traceback
@@ -384,11 +437,10 @@ class CBTSystem:
             traceback.print_exc()
 
         # Calculate unique answered questions (for progress)
-        unique_answered = len(StudentResponse.query.filter_by(session_id=session_id).distinct(
-            StudentResponse.question_id
-        ).all())
+        answered_ids = self._get_answered_question_ids(session_id)
+        unique_answered = len(set(answered_ids))
 
-        return {
+        result = {
             'response_id': existing_response.id,
             'is_correct': is_correct,
             'correct_answer': question.correct_option,
@@ -401,17 +453,27 @@ class CBTSystem:
             'engagement_score': engagement_score if 'engagement_score' in locals() else 0.5,
             'engagement_level': engagement_level if 'engagement_level' in locals() else 'medium'
         }
+        
+        if include_next_question:
+            next_question = self._select_next_question(session, answered_ids)
+            if isinstance(next_question, tuple):
+                # Keep the HTTP status the standalone endpoint would have returned
+                error, status = next_question
+                next_question = dict(error, status=status)
+            result['next_question'] = next_question
+        
+        return result
 
     
     def get_hint(self, session_id, question_id, hint_index=0):
         """
         Get a hint for a question
         """
-        question = Question.query.get(question_id)
-        if not question:
+        hints = question_payload_cache.get_hints(question_id)
+        if hints is None:
             return {'error': 'Question not found'}, 404
         
-        if not question.hints or hint_index >= len(question.hints):
+        if not hints or hint_index >= len(hints):
             return {'error': 'No more hints available'}, 400
         
         # Update response to record hint usage
@@ -425,9 +487,9 @@ class CBTSystem:
             db.session.commit()
         
         return {
-            'hint': question.hints[hint_index],
+            'hint': hints[hint_index],
             'hint_number': hint_index + 1,
-            'total_hints': len(question.hints)
+            'total_hints': len(hints)
         }
     
     def end_session(self, session_id):
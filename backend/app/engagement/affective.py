@@ -7,8 +7,12 @@ Captures and analyzes student emotional and affective states through:
 3. Posture Analysis (engagement indicators)
 4. Emotional State Classification
 5. Confusion and Frustration Detection
+
+Observations are kept in the time-bucketed affective store (see
+affective_store.py); summaries and detection read windows of buckets.
 """
 
+from app.engagement.affective_store import affective_store
 from app.models.engagement import EngagementMetric
 from app.models.session import Session, StudentResponse
 from datetime import datetime, timedelta
@@ -58,8 +62,12 @@ class AffectiveIndicatorAnalyzer:
         'tense': {'engagement': 0.4, 'confidence': 0.2}
     }
     
-    def __init__(self):
-        pass
+    # Emotions whose share of recent frames counts as a facial signal
+    CONFUSION_EMOTIONS = ('confused', 'frustrated', 'anxious')
+    FRUSTRATION_EMOTIONS = ('frustrated', 'angry', 'anxious')
+    
+    def __init__(self, store=None):
+        self.store = store or affective_store
     
     def record_facial_expression(self, student_id, session_id, emotion_label, 
                                 confidence_score, frame_data=None):
@@ -95,6 +103,7 @@ class AffectiveIndicatorAnalyzer:
             'inferred_interest_level': engagement_values['interest'],
             'frame_metadata': frame_data or {}
         }
+        self.store.add(metric_data)
         
         return metric_data
     
@@ -126,6 +135,7 @@ class AffectiveIndicatorAnalyzer:
             'engagement_level': pattern_values['engagement'],
             'gaze_metadata': gaze_metadata or {}
         }
+        self.store.add(metric_data)
         
         return metric_data
     
@@ -154,11 +164,12 @@ class AffectiveIndicatorAnalyzer:
             'confidence_indicator': posture_values['confidence'],
             'posture_metadata': posture_metadata or {}
         }
+        self.store.add(metric_data)
         
         return metric_data
     
     def detect_confusion(self, student_id, session_id, facial_data=None, 
-                        behavioral_data=None):
+                        behavioral_data=None, window_minutes=2):
         """
         Detect confusion state using multimodal signals
         
@@ -168,6 +179,9 @@ class AffectiveIndicatorAnalyzer:
         - Multiple retries (behavioral)
         - Frequent hint requests (behavioral)
         - Scattered gaze (eye tracking)
+        
+        Without facial_data, the facial signal comes from the stored frames
+        of the last window_minutes.
         """
         confusion_score = 0.0
         signals = []
@@ -175,9 +189,16 @@ class AffectiveIndicatorAnalyzer:
         # Facial signals
         if facial_data:
             emotion = facial_data.get('emotion', '').lower()
-            if emotion in ['confused', 'frustrated', 'anxious']:
+            if emotion in self.CONFUSION_EMOTIONS:
                 confusion_score += 0.4
                 signals.append(f"Facial expression: {emotion}")
+        else:
+            signal = self._windowed_emotion_signal(
+                student_id, session_id, self.CONFUSION_EMOTIONS, window_minutes
+            )
+            if signal:
+                confusion_score += 0.4
+                signals.append(signal)
         
         # Behavioral signals
         if behavioral_data:
@@ -210,7 +231,7 @@ class AffectiveIndicatorAnalyzer:
         }
     
     def detect_frustration(self, student_id, session_id, facial_data=None,
-                          behavioral_data=None):
+                          behavioral_data=None, window_minutes=2):
         """
         Detect frustration state
         
@@ -220,6 +241,9 @@ class AffectiveIndicatorAnalyzer:
         - Frequent hint requests
         - Multiple wrong attempts
         - Jaw tension
+        
+        Without facial_data, the facial signal comes from the stored frames
+        of the last window_minutes.
         """
         frustration_score = 0.0
         signals = []
@@ -227,7 +251,7 @@ class AffectiveIndicatorAnalyzer:
         # Facial signals
         if facial_data:
             emotion = facial_data.get('emotion', '').lower()
-            if emotion in ['frustrated', 'angry', 'anxious']:
+            if emotion in self.FRUSTRATION_EMOTIONS:
                 frustration_score += 0.35
                 signals.append(f"Facial expression: {emotion}")
             
@@ -235,6 +259,13 @@ class AffectiveIndicatorAnalyzer:
             if jaw_tension > 0.6:
                 frustration_score += 0.2
                 signals.append("Jaw tension detected")
+        else:
+            signal = self._windowed_emotion_signal(
+                student_id, session_id, self.FRUSTRATION_EMOTIONS, window_minutes
+            )
+            if signal:
+                frustration_score += 0.35
+                signals.append(signal)
         
         # Behavioral signals
         if behavioral_data:
@@ -293,6 +324,18 @@ class AffectiveIndicatorAnalyzer:
         return min(1.0, max(0.0, affective_score))
     
     # Helper methods
+    def _windowed_emotion_signal(self, student_id, session_id, emotions, window_minutes):
+        """Signal text when most stored frames of the window show one of emotions"""
+        if not session_id and not student_id:
+            return None
+        share, frames = self.store.emotion_share(
+            emotions, session_id=session_id or None, student_id=student_id,
+            since=datetime.utcnow() - timedelta(minutes=window_minutes)
+        )
+        if frames and share >= 0.5:
+            return f"Facial expression: {share:.0%} of {frames} frames in last {window_minutes} min"
+        return None
+    
     def _emotion_to_engagement(self, emotion):
         """Convert emotion to engagement score"""
         emotion_lower = emotion.lower()
@@ -359,19 +402,74 @@ class AffectiveIndicatorAnalyzer:
     def get_affective_summary(self, student_id, session_id, minutes=30):
         """
         Get summary of affective indicators over recent period
+        (aggregated from the stored buckets of the window)
         """
         cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
+        scope = {'session_id': session_id or None, 'student_id': student_id, 'since': cutoff_time}
+        totals = self.store.totals(**scope)
+        
+        facial = {label: cell for (kind, label), cell in totals.items() if kind == 'facial_expression'}
+        gaze = [cell for (kind, _), cell in totals.items() if kind == 'gaze_tracking']
+        posture = [cell for (kind, _), cell in totals.items() if kind == 'posture_analysis']
+        
+        frames = sum(cell['count'] for cell in facial.values())
+        if frames:
+            average_confidence = sum(cell['confidence'] for cell in facial.values()) / frames
+            average_frustration = sum(cell['frustration'] for cell in facial.values()) / frames
+            average_interest = sum(cell['interest'] for cell in facial.values()) / frames
+            dominant_emotion = max(facial, key=lambda label: facial[label]['count'])
+            emotional_trend = self._emotional_trend(self.store.timeline(**scope))
+        else:
+            average_confidence, average_frustration, average_interest = 0.5, 0.3, 0.6
+            dominant_emotion, emotional_trend = 'neutral', 'stable'
+        
+        gaze_data = self._mean_cell(gaze, 'attention', 'attention_level')
+        posture_data = self._mean_cell(posture, 'engagement', 'engagement_indicator')
+        if frames or gaze_data or posture_data:
+            affective_engagement = self.calculate_affective_engagement_score(
+                {'emotion': dominant_emotion} if frames else None, gaze_data, posture_data
+            )
+        else:
+            affective_engagement = 0.55
+        
+        recommendations = []
+        if average_frustration > 0.6:
+            recommendations.append(self._recommend_frustration_response(average_frustration))
+        if facial.get('confused', {}).get('count', 0) * 2 >= frames > 0:
+            recommendations.append(self._recommend_confusion_response(0.6))
         
-        # This would query affective data from database
-        # For now, return structure
         return {
             'period_minutes': minutes,
-            'average_confidence': 0.5,  # Would be calculated from data
-            'average_frustration': 0.3,
-            'average_interest': 0.6,
-            'dominant_emotion': 'neutral',
-            'emotional_trend': 'stable',
-            'affective_engagement': 0.55,
-            'recommendations': []
+            'average_confidence': round(average_confidence, 3),
+            'average_frustration': round(average_frustration, 3),
+            'average_interest': round(average_interest, 3),
+            'dominant_emotion': dominant_emotion,
+            'emotional_trend': emotional_trend,
+            'affective_engagement': round(affective_engagement, 3),
+            'recommendations': recommendations,
+            'observations': frames + sum(cell['count'] for cell in gaze + posture)
         }
-
+    
+    @staticmethod
+    def _mean_cell(cells, field, key):
+        """{key: mean of field} over bucket cells, or None without observations"""
+        count = sum(cell['count'] for cell in cells)
+        return {key: sum(cell[field] for cell in cells) / count} if count else None
+    
+    @staticmethod
+    def _emotional_trend(timeline):
+        """Compare mean valence (confidence - frustration) of later vs earlier facial buckets"""
+        if len(timeline) < 2:
+            return 'stable'
+        half = len(timeline) // 2
+        
+        def valence(cells):
+            count = sum(cell['count'] for _, cell in cells)
+            return sum(cell['confidence'] - cell['frustration'] for _, cell in cells) / count
+        
+        change = valence(timeline[half:]) - valence(timeline[:half])
+        if change > 0.1:
+            return 'improving'
+        if change < -0.1:
+            return 'declining'
+        return 'stable'
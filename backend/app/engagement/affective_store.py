@@ -0,0 +1,305 @@
+"""
+Affective Store
+
+Compact, per-session time-bucketed storage for affective observations
+(facial expression, gaze, posture), the highest-volume signal we collect.
+
+- Observations are aggregated in memory into (session, bucket, kind, label)
+  cells holding a count and sums of the inferred values
+- Pending cells are written in batches (every flush_threshold observations
+  or flush_interval_seconds, and at interpreter exit) with one dialect
+  upsert that adds to count and the sums, on a connection of its own so the
+  caller's session is never committed; concurrent flushes from threads or
+  workers merge instead of colliding on uq_affective_bucket. Dialects
+  without an upsert fall back to UPDATE-then-INSERT per cell
+- A failed flush is rolled back and its cells merged back into the pending
+  batch for the next attempt; at most max_pending_cells cells are held, so
+  observations for new cells are dropped (and counted) while the database
+  is unavailable
+- Windowed summaries are GROUP BY queries over the buckets of the window
+  plus the still-pending cells, so they cost O(buckets) rather than
+  O(observations) and never write
+"""
+
+import atexit
+import logging
+import threading
+import time
+import weakref
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app import db
+from app.models.engagement import AffectiveBucket
+
+logger = logging.getLogger(__name__)
+
+# Dialects with an INSERT ... ON CONFLICT upsert
+UPSERT_DIALECTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+# Live stores, flushed at interpreter exit
+_stores = weakref.WeakSet()
+
+# Summed fields; each is stored in the AffectiveBucket column '<name>_sum'
+SUM_FIELDS = ('detection_confidence', 'confidence', 'frustration', 'interest',
+              'attention', 'engagement', 'duration')
+
+# Observation keys (as produced by AffectiveIndicatorAnalyzer.record_*) per kind:
+# (label key, {summed field: observation key})
+OBSERVATION_FIELDS = {
+    'facial_expression': ('emotion_label', {
+        'detection_confidence': 'emotion_confidence',
+        'confidence': 'inferred_confidence_level',
+        'frustration': 'inferred_frustration_level',
+        'interest': 'inferred_interest_level'
+    }),
+    'gaze_tracking': ('gaze_pattern', {
+        'attention': 'attention_level',
+        'engagement': 'engagement_level',
+        'duration': 'gaze_duration'
+    }),
+    'posture_analysis': ('posture_type', {
+        'engagement': 'engagement_indicator',
+        'confidence': 'confidence_indicator'
+    })
+}
+
+
+class AffectiveStore:
+    """Batched writer and windowed reader for affective_buckets"""
+
+    def __init__(self, bucket_seconds=10, flush_threshold=500, flush_interval_seconds=5.0,
+                 max_pending_cells=100000):
+        self.bucket_seconds = bucket_seconds
+        self.flush_threshold = flush_threshold
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending_cells = max_pending_cells
+        self.dropped_observations = 0
+
+        self._lock = threading.Lock()
+        self._pending = {}  # (session_id, bucket_start, kind, label) -> [student_id, count, sums...]
+        self._pending_observations = 0
+        self._last_flush = time.monotonic()
+        self._app = None  # application whose database receives the buckets (for the exit flush)
+        _stores.add(self)
+
+    def bucket_start(self, timestamp):
+        """Start of the bucket containing timestamp"""
+        seconds = timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
+        midnight = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        return midnight + timedelta(seconds=seconds - seconds % self.bucket_seconds)
+
+    # ------------------------------------------------------------- writing
+
+    def add(self, observation):
+        """Aggregate one observation (a record_* dict); flushes when a batch is due"""
+        kind = observation.get('detection_type')
+        if kind not in OBSERVATION_FIELDS or not observation.get('session_id'):
+            return False
+
+        label_key, fields = OBSERVATION_FIELDS[kind]
+        key = (
+            observation['session_id'],
+            self.bucket_start(observation.get('timestamp') or datetime.utcnow()),
+            kind,
+            str(observation.get(label_key) or 'unknown').lower()[:30]
+        )
+
+        with self._lock:
+            if self._app is None and has_app_context():
+                self._app = current_app._get_current_object()
+            cell = self._pending.get(key)
+            if cell is None:
+                if len(self._pending) >= self.max_pending_cells:
+                    self.dropped_observations += 1
+                    return False
+                cell = self._pending[key] = [observation.get('student_id'), 0] + [0.0] * len(SUM_FIELDS)
+            cell[1] += 1
+            for i, name in enumerate(SUM_FIELDS):
+                if name in fields:
+                    cell[2 + i] += float(observation.get(fields[name]) or 0.0)
+            self._pending_observations += 1
+            due = (self._pending_observations >= self.flush_threshold or
+                   time.monotonic() - self._last_flush >= self.flush_interval_seconds)
+
+        if due:
+            try:
+                self.flush()
+            except Exception as e:
+                # Batch is kept for the next flush; recording must not fail
+                logger.warning(f"[AFFECTIVE] Flush failed, keeping batch pending: {e}")
+        return True
+
+    def flush(self):
+        """Upsert pending cells into affective_buckets; returns the number of cells written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            observations, self._pending_observations = self._pending_observations, 0
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        rows = []
+        for (session_id, bucket_start, kind, label), cell in pending.items():
+            row = {
+                'session_id': session_id, 'bucket_start': bucket_start, 'kind': kind, 'label': label,
+                'student_id': cell[0], 'count': cell[1]
+            }
+            row.update({f'{name}_sum': cell[2 + i] for i, name in enumerate(SUM_FIELDS)})
+            rows.append(row)
+
+        try:
+            # Own connection and transaction: the caller's session is left untouched
+            with db.engine.begin() as connection:
+                statement = self._upsert_statement(connection.dialect.name)
+                if statement is not None:
+                    connection.execute(statement, rows)
+                else:
+                    self._update_then_insert(connection, rows)
+        except Exception:
+            self._restore(pending, observations)
+            raise
+        return len(pending)
+
+    def _upsert_statement(self, dialect):
+        """
+        INSERT that adds count and sums to an existing (session, bucket, kind,
+        label) row, or None when the dialect has no upsert
+        """
+        table = AffectiveBucket.__table__
+        additive = ['count'] + [f'{name}_sum' for name in SUM_FIELDS]
+        if dialect in UPSERT_DIALECTS:
+            statement = UPSERT_DIALECTS[dialect](table)
+            return statement.on_conflict_do_update(
+                index_elements=['session_id', 'bucket_start', 'kind', 'label'],
+                set_={column: table.c[column] + statement.excluded[column] for column in additive}
+            )
+        if dialect in ('mysql', 'mariadb'):
+            statement = mysql.insert(table)
+            return statement.on_duplicate_key_update(
+                {column: table.c[column] + statement.inserted[column] for column in additive}
+            )
+        return None
+
+    def _update_then_insert(self, connection, rows):
+        """Generic fallback: add each cell to its row, inserting rows that do not exist yet"""
+        table = AffectiveBucket.__table__
+        additive = ['count'] + [f'{name}_sum' for name in SUM_FIELDS]
+        keys = ('session_id', 'bucket_start', 'kind', 'label')
+        for row in rows:
+            result = connection.execute(
+                table.update()
+                .where(*(table.c[key] == row[key] for key in keys))
+                .values({column: table.c[column] + row[column] for column in additive})
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert(), row)
+
+    def _restore(self, pending, observations):
+        """Merge a failed batch back into the pending cells (up to max_pending_cells)"""
+        dropped = 0
+        with self._lock:
+            for key, cell in pending.items():
+                current = self._pending.get(key)
+                if current is not None:
+                    for i in range(1, len(cell)):
+                        current[i] += cell[i]
+                elif len(self._pending) < self.max_pending_cells:
+                    self._pending[key] = cell
+                else:
+                    dropped += cell[1]
+            self._pending_observations += observations - dropped
+            self.dropped_observations += dropped
+        if dropped:
+            logger.warning(f"[AFFECTIVE] Pending cells at max_pending_cells, dropped {dropped} observations")
+
+    def _flush_at_exit(self):
+        if not self._pending or self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as e:
+            logger.warning(f"[AFFECTIVE] Exit flush failed, {len(self._pending)} cells lost: {e}")
+
+    # ------------------------------------------------------------- reading
+
+    def _scope(self, query, session_id, student_id, since, kind):
+        if session_id is not None:
+            query = query.filter(AffectiveBucket.session_id == session_id)
+        elif student_id is not None:
+            query = query.filter(AffectiveBucket.student_id == student_id)
+        if since is not None:
+            query = query.filter(AffectiveBucket.bucket_start >= self.bucket_start(since))
+        if kind is not None:
+            query = query.filter(AffectiveBucket.kind == kind)
+        return query
+
+    def _pending_in_scope(self, session_id, student_id, since, kind):
+        """Snapshot of not-yet-flushed cells matching a query scope"""
+        start = self.bucket_start(since) if since is not None else None
+        with self._lock:
+            return [
+                (key, list(cell)) for key, cell in self._pending.items()
+                if (session_id is None or key[0] == session_id)
+                and (session_id is not None or student_id is None or cell[0] == student_id)
+                and (start is None or key[1] >= start)
+                and (kind is None or key[2] == kind)
+            ]
+
+    def _sum_columns(self):
+        return [func.sum(AffectiveBucket.count)] + [
+            func.sum(getattr(AffectiveBucket, f'{name}_sum')) for name in SUM_FIELDS
+        ]
+
+    @staticmethod
+    def _cell(row):
+        return {'count': int(row[0] or 0), **{name: float(value or 0.0) for name, value in zip(SUM_FIELDS, row[1:])}}
+
+    @staticmethod
+    def _merge(cells, key, values):
+        """Add a pending [count, sums...] list into cells[key]"""
+        cell = cells.setdefault(key, {'count': 0, **{name: 0.0 for name in SUM_FIELDS}})
+        cell['count'] += values[0]
+        for name, value in zip(SUM_FIELDS, values[1:]):
+            cell[name] += value
+
+    def totals(self, session_id=None, student_id=None, since=None, kind=None):
+        """{(kind, label): {'count', <field sums>}} over the window (stored + pending)"""
+        query = db.session.query(AffectiveBucket.kind, AffectiveBucket.label, *self._sum_columns())
+        query = self._scope(query, session_id, student_id, since, kind)
+        rows = query.group_by(AffectiveBucket.kind, AffectiveBucket.label).all()
+        totals = {(row[0], row[1]): self._cell(row[2:]) for row in rows}
+        for key, cell in self._pending_in_scope(session_id, student_id, since, kind):
+            self._merge(totals, (key[2], key[3]), cell[1:])
+        return totals
+
+    def timeline(self, session_id=None, student_id=None, since=None, kind='facial_expression'):
+        """[(bucket_start, {'count', <field sums>})] in time order for one kind (stored + pending)"""
+        query = db.session.query(AffectiveBucket.bucket_start, *self._sum_columns())
+        query = self._scope(query, session_id, student_id, since, kind)
+        rows = query.group_by(AffectiveBucket.bucket_start).all()
+        buckets = {row[0]: self._cell(row[1:]) for row in rows}
+        for key, cell in self._pending_in_scope(session_id, student_id, since, kind):
+            self._merge(buckets, key[1], cell[1:])
+        return sorted(buckets.items())
+
+    def emotion_share(self, emotions, session_id=None, student_id=None, since=None):
+        """(share of facial observations with one of emotions, observation count) in the window"""
+        totals = self.totals(session_id, student_id, since, kind='facial_expression')
+        count = sum(cell['count'] for cell in totals.values())
+        matching = sum(cell['count'] for (_, label), cell in totals.items() if label in emotions)
+        return (matching / count if count else 0.0), count
+
+
+@atexit.register
+def _flush_stores_at_exit():
+    for store in list(_stores):
+        store._flush_at_exit()
+
+
+# Shared by every AffectiveIndicatorAnalyzer so pending batches are not split
+affective_store = AffectiveStore()
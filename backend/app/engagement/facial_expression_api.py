@@ -14,12 +14,209 @@ This module handles:
 """
 
 from datetime import datetime
+import threading
+import time
+import numpy as np
 from app.models.engagement import EngagementMetric
 from app.models.session import Session, StudentResponse
 from app import db
 import json
 
 
+# Emotion mappings to engagement values (row order defines the emotion codes)
+EMOTION_ENGAGEMENT_MAP = {
+    'happy': {'engagement': 0.95, 'confidence': 0.9, 'frustration': 0.0},
+    'excited': {'engagement': 0.95, 'confidence': 0.9, 'frustration': 0.0},
+    'neutral': {'engagement': 0.6, 'confidence': 0.6, 'frustration': 0.2},
+    'confused': {'engagement': 0.4, 'confidence': 0.2, 'frustration': 0.4},
+    'frustrated': {'engagement': 0.2, 'confidence': 0.1, 'frustration': 0.9},
+    'angry': {'engagement': 0.1, 'confidence': 0.05, 'frustration': 1.0},
+    'sad': {'engagement': 0.3, 'confidence': 0.2, 'frustration': 0.6},
+    'fearful': {'engagement': 0.2, 'confidence': 0.1, 'frustration': 0.7},
+    'disgusted': {'engagement': 0.1, 'confidence': 0.1, 'frustration': 0.8},
+}
+EMOTIONS = tuple(EMOTION_ENGAGEMENT_MAP)
+EMOTION_CODES = {emotion: code for code, emotion in enumerate(EMOTIONS)}
+NEUTRAL_CODE = EMOTION_CODES['neutral']
+
+# Per-code lookup tables for batched scoring
+EMOTION_ENGAGEMENT = np.array([EMOTION_ENGAGEMENT_MAP[e]['engagement'] for e in EMOTIONS])
+EMOTION_FRUSTRATION = np.array([EMOTION_ENGAGEMENT_MAP[e]['frustration'] for e in EMOTIONS])
+EMOTION_CONFIDENCE = np.array([EMOTION_ENGAGEMENT_MAP[e]['confidence'] for e in EMOTIONS])
+
+# Packed binary frame layout for batched ingestion: little-endian, no padding,
+# 29 bytes per frame (struct format '<dBfffff')
+#   timestamp   float64  epoch seconds
+#   emotion     uint8    index into EMOTIONS; NO_FACE_CODE = no face detected,
+#                        any other unknown code is treated as neutral
+#   confidence  float32
+#   x, y, width, height  float32 face box
+FRAME_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('emotion', 'u1'),
+    ('confidence', '<f4'),
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('width', '<f4'),
+    ('height', '<f4')
+])
+NO_FACE_CODE = 255
+MAX_FRAMES_PER_BATCH = 10000
+MAX_FRAME_PAYLOAD_BYTES = MAX_FRAMES_PER_BATCH * FRAME_DTYPE.itemsize
+
+
+def invalid_frames(frames):
+    """
+    Mask of frames that would corrupt the aggregates: a non-finite timestamp,
+    or a detected face whose confidence is non-finite or outside [0, 1]
+    """
+    confidence = frames['confidence']
+    bad_confidence = ~np.isfinite(confidence) | (confidence < 0) | (confidence > 1)
+    return ~np.isfinite(frames['timestamp']) | ((frames['emotion'] != NO_FACE_CODE) & bad_confidence)
+
+
+def decode_frames(payload):
+    """Zero-copy view of a packed frame payload as a validated FRAME_DTYPE array"""
+    if len(payload) % FRAME_DTYPE.itemsize:
+        raise ValueError(
+            f'Frame payload length {len(payload)} is not a multiple of {FRAME_DTYPE.itemsize} bytes'
+        )
+    frames = np.frombuffer(payload, dtype=FRAME_DTYPE)
+    invalid = invalid_frames(frames)
+    if invalid.any():
+        raise ValueError(
+            f'{int(np.count_nonzero(invalid))} frame(s) have a non-finite timestamp or a confidence '
+            f'outside [0, 1] (first at index {int(np.argmax(invalid))})'
+        )
+    return frames
+
+
+class FacialRecording:
+    """
+    Streaming aggregates for one session's facial frames.
+    
+    Each frame updates emotion counters, Welford mean/variance of engagement
+    and frustration and the face-detected counts in O(1); only the last
+    ring_size frames are kept, as NumPy arrays (timestamps are epoch seconds).
+    """
+    
+    __slots__ = (
+        'session_id', 'student_id', 'start_time', 'last_seen',
+        'face_detected_count', 'face_not_detected_count', 'emotion_counts',
+        'engagement_stats', 'frustration_stats',
+        'timestamps', 'emotions', 'emotion_confidence', 'engagement', 'frustration',
+        'confidence_level', 'bbox', 'ring_size', 'head', 'size'
+    )
+    
+    def __init__(self, session_id, student_id, ring_size=300):
+        self.session_id = session_id
+        self.student_id = student_id
+        self.start_time = datetime.utcnow()
+        self.last_seen = time.monotonic()
+        self.face_detected_count = 0
+        self.face_not_detected_count = 0
+        self.emotion_counts = np.zeros(len(EMOTIONS), dtype=np.int64)
+        self.engagement_stats = [0, 0.0, 0.0]  # Welford count, mean, M2
+        self.frustration_stats = [0, 0.0, 0.0]
+        
+        self.ring_size = ring_size
+        self.head = 0  # Next write position
+        self.size = 0
+        self.timestamps = np.zeros(ring_size, dtype=np.float64)
+        self.emotions = np.zeros(ring_size, dtype=np.int8)
+        self.emotion_confidence = np.zeros(ring_size, dtype=np.float32)
+        self.engagement = np.zeros(ring_size, dtype=np.float32)
+        self.frustration = np.zeros(ring_size, dtype=np.float32)
+        self.confidence_level = np.zeros(ring_size, dtype=np.float32)
+        self.bbox = np.zeros((ring_size, 4), dtype=np.float32)
+    
+    @staticmethod
+    def _welford(stats, value):
+        stats[0] += 1
+        delta = value - stats[1]
+        stats[1] += delta / stats[0]
+        stats[2] += delta * (value - stats[1])
+    
+    def add(self, timestamp, emotion_code, emotion_confidence, engagement, frustration,
+            confidence_level, bbox=(0.0, 0.0, 0.0, 0.0)):
+        """Add one processed frame"""
+        self.last_seen = time.monotonic()
+        self.face_detected_count += 1
+        self.emotion_counts[emotion_code] += 1
+        self._welford(self.engagement_stats, engagement)
+        self._welford(self.frustration_stats, frustration)
+        
+        i = self.head
+        self.timestamps[i] = timestamp
+        self.emotions[i] = emotion_code
+        self.emotion_confidence[i] = emotion_confidence
+        self.engagement[i] = engagement
+        self.frustration[i] = frustration
+        self.confidence_level[i] = confidence_level
+        self.bbox[i] = bbox
+        self.head = (i + 1) % self.ring_size
+        self.size = min(self.size + 1, self.ring_size)
+    
+    def add_missing(self, count=1):
+        """Count frames without a detected face"""
+        self.last_seen = time.monotonic()
+        self.face_not_detected_count += count
+    
+    @staticmethod
+    def _merge(stats, values):
+        """Merge a batch into Welford (count, mean, M2) with Chan's parallel update"""
+        count = values.size
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = stats[0] + count
+        delta = batch_mean - stats[1]
+        stats[2] += batch_m2 + delta * delta * stats[0] * count / total
+        stats[1] += delta * count / total
+        stats[0] = total
+    
+    def add_batch(self, timestamps, emotion_codes, emotion_confidence, engagement, frustration,
+                  confidence_level, bbox):
+        """Add many processed frames (equal-length arrays, bbox shaped (n, 4))"""
+        count = len(timestamps)
+        if count == 0:
+            return
+        self.last_seen = time.monotonic()
+        self.face_detected_count += count
+        self.emotion_counts += np.bincount(emotion_codes, minlength=len(EMOTIONS))
+        self._merge(self.engagement_stats, np.asarray(engagement, dtype=float))
+        self._merge(self.frustration_stats, np.asarray(frustration, dtype=float))
+        
+        # Only the last ring_size frames of the batch land in the ring
+        kept = slice(max(0, count - self.ring_size), count)
+        positions = (self.head + np.arange(count)[kept]) % self.ring_size
+        self.timestamps[positions] = timestamps[kept]
+        self.emotions[positions] = emotion_codes[kept]
+        self.emotion_confidence[positions] = emotion_confidence[kept]
+        self.engagement[positions] = engagement[kept]
+        self.frustration[positions] = frustration[kept]
+        self.confidence_level[positions] = confidence_level[kept]
+        self.bbox[positions] = bbox[kept]
+        self.head = (self.head + count) % self.ring_size
+        self.size = min(self.size + count, self.ring_size)
+    
+    def recent_frames(self):
+        """Retained frames in chronological order, as arrays"""
+        order = (np.arange(self.size) + self.head - self.size) % self.ring_size
+        return {
+            'timestamp': self.timestamps[order],
+            'emotion': self.emotions[order],
+            'emotion_confidence': self.emotion_confidence[order],
+            'engagement_score': self.engagement[order],
+            'frustration_level': self.frustration[order],
+            'confidence_level': self.confidence_level[order],
+            'bbox': self.bbox[order]
+        }
+    
+    @property
+    def frames_recorded(self):
+        return self.face_detected_count
+
+
 class FacialExpressionIntegrator:
     """
     Integrates facial expression recognition with tutoring system
@@ -29,33 +226,52 @@ class FacialExpressionIntegrator:
     2. AWS Rekognition (good accuracy)
     3. Face.js (local, privacy-first)
     4. MediaPipe (free, open-source)
+    
+    Recordings keep streaming aggregates plus a bounded ring of recent frames
+    (FacialRecording) and expire after session_ttl_seconds without frames.
+    recording_sessions and the recordings in it are guarded by one lock, so
+    request threads can start, feed, end and expire recordings concurrently.
     """
     
-    def __init__(self, provider='face.js', api_key=None):
+    def __init__(self, provider='face.js', api_key=None, ring_size=300, session_ttl_seconds=2 * 3600):
         """
         Initialize facial expression integrator
         
         Args:
             provider: 'face.js', 'azure', 'aws', or 'mediapipe'
             api_key: API key for cloud providers (if applicable)
+            ring_size: recent frames retained per session
+            session_ttl_seconds: idle time after which a recording is dropped
         """
         self.provider = provider
         self.api_key = api_key
+        self.ring_size = ring_size
+        self.session_ttl_seconds = session_ttl_seconds
         
         # Emotion mappings to engagement values
-        self.emotion_engagement_map = {
-            'happy': {'engagement': 0.95, 'confidence': 0.9, 'frustration': 0.0},
-            'excited': {'engagement': 0.95, 'confidence': 0.9, 'frustration': 0.0},
-            'neutral': {'engagement': 0.6, 'confidence': 0.6, 'frustration': 0.2},
-            'confused': {'engagement': 0.4, 'confidence': 0.2, 'frustration': 0.4},
-            'frustrated': {'engagement': 0.2, 'confidence': 0.1, 'frustration': 0.9},
-            'angry': {'engagement': 0.1, 'confidence': 0.05, 'frustration': 1.0},
-            'sad': {'engagement': 0.3, 'confidence': 0.2, 'frustration': 0.6},
-            'fearful': {'engagement': 0.2, 'confidence': 0.1, 'frustration': 0.7},
-            'disgusted': {'engagement': 0.1, 'confidence': 0.1, 'frustration': 0.8},
-        }
+        self.emotion_engagement_map = EMOTION_ENGAGEMENT_MAP
+        
+        self.recording_sessions = {}  # session_id -> FacialRecording
+        self._lock = threading.Lock()
+    
+    def _score_frame(self, frame_data):
+        """(emotion, confidence, engagement, frustration, confidence level) for a frame"""
+        emotion = frame_data.get('emotion', 'neutral').lower()
+        confidence = frame_data.get('confidence', 0.5)
+        
+        # Validate emotion
+        if emotion not in self.emotion_engagement_map:
+            emotion = 'neutral'
         
-        self.recording_sessions = {}  # session_id -> recording data
+        # Get engagement mapping and apply confidence weighting
+        engagement_data = self.emotion_engagement_map[emotion]
+        return (
+            emotion,
+            confidence,
+            engagement_data['engagement'] * confidence,
+            engagement_data['frustration'] * confidence,
+            engagement_data['confidence'] * confidence
+        )
     
     def process_facial_frame(self, session_id, frame_data):
         """
@@ -79,20 +295,8 @@ class FacialExpressionIntegrator:
         if not frame_data:
             return None
         
-        emotion = frame_data.get('emotion', 'neutral').lower()
-        confidence = frame_data.get('confidence', 0.5)
-        
-        # Validate emotion
-        if emotion not in self.emotion_engagement_map:
-            emotion = 'neutral'
-        
-        # Get engagement mapping
-        engagement_data = self.emotion_engagement_map[emotion]
-        
-        # Apply confidence weighting
-        weighted_engagement = engagement_data['engagement'] * confidence
-        weighted_frustration = engagement_data['frustration'] * confidence
-        weighted_confidence = engagement_data['confidence'] * confidence
+        emotion, confidence, weighted_engagement, weighted_frustration, weighted_confidence = \
+            self._score_frame(frame_data)
         
         return {
             'emotion': emotion,
@@ -103,88 +307,134 @@ class FacialExpressionIntegrator:
             'timestamp': datetime.utcnow().isoformat()
         }
     
-    def record_session_start(self, session_id, student_id):
-        """Start recording facial expressions for a session"""
-        self.recording_sessions[session_id] = {
-            'student_id': student_id,
-            'session_id': session_id,
-            'frames': [],
-            'start_time': datetime.utcnow(),
-            'face_detected_count': 0,
-            'face_not_detected_count': 0
-        }
+    def record_session_start(self, session_id, student_id, restart=True):
+        """
+        Start recording facial expressions for a session; with restart=False
+        an existing recording is kept. Returns the session's recording.
+        """
+        with self._lock:
+            self._expire_sessions()
+            recording = self.recording_sessions.get(session_id)
+            if recording is None or restart:
+                recording = self.recording_sessions[session_id] = FacialRecording(
+                    session_id, student_id, self.ring_size
+                )
+            return recording
+    
+    def expire_sessions(self):
+        """Drop recordings idle for longer than the TTL; returns the number dropped"""
+        with self._lock:
+            return self._expire_sessions()
+    
+    def _expire_sessions(self):
+        cutoff = time.monotonic() - self.session_ttl_seconds
+        expired = [sid for sid, recording in self.recording_sessions.items() if recording.last_seen < cutoff]
+        for session_id in expired:
+            del self.recording_sessions[session_id]
+        return len(expired)
     
     def add_frame(self, session_id, frame_data):
         """Add a facial frame to session recording"""
-        if session_id not in self.recording_sessions:
-            return False
+        if frame_data:
+            emotion, confidence, engagement, frustration, confidence_level = self._score_frame(frame_data)
         
-        if not frame_data:
-            self.recording_sessions[session_id]['face_not_detected_count'] += 1
-            return False
+        with self._lock:
+            recording = self.recording_sessions.get(session_id)
+            if recording is None:
+                return False
+            
+            if not frame_data:
+                recording.add_missing()
+                return False
+            
+            recording.add(
+                time.time(), EMOTION_CODES[emotion], confidence, engagement, frustration, confidence_level,
+                (frame_data.get('x', 0.0), frame_data.get('y', 0.0),
+                 frame_data.get('width', 0.0), frame_data.get('height', 0.0))
+            )
+            return True
+    
+    def add_frames(self, session_id, frames):
+        """
+        Add a batch of packed frames (FRAME_DTYPE array, e.g. from decode_frames)
+        to a session recording in one call.
         
-        processed = self.process_facial_frame(session_id, frame_data)
-        self.recording_sessions[session_id]['frames'].append(processed)
-        self.recording_sessions[session_id]['face_detected_count'] += 1
+        Frames failing invalid_frames are dropped.
         
-        return True
+        Returns:
+            (frames with a face, frames without a face, frames recorded in the session),
+            or None if the session is not recording
+        """
+        frames = frames[~invalid_frames(frames)]
+        detected = frames['emotion'] != NO_FACE_CODE
+        missing = int(frames.size - np.count_nonzero(detected))
+        
+        frames = frames[detected]
+        codes = frames['emotion'].astype(np.intp)
+        codes[codes >= len(EMOTIONS)] = NEUTRAL_CODE
+        confidence = frames['confidence'].astype(float)
+        
+        with self._lock:
+            recording = self.recording_sessions.get(session_id)
+            if recording is None:
+                return None
+            
+            if missing:
+                recording.add_missing(missing)
+            recording.add_batch(
+                frames['timestamp'],
+                codes,
+                confidence,
+                EMOTION_ENGAGEMENT[codes] * confidence,
+                EMOTION_FRUSTRATION[codes] * confidence,
+                EMOTION_CONFIDENCE[codes] * confidence,
+                np.stack([frames['x'], frames['y'], frames['width'], frames['height']], axis=1)
+            )
+            return frames.size, missing, recording.frames_recorded
     
     def record_session_end(self, session_id):
         """End facial recording and get summary"""
-        if session_id not in self.recording_sessions:
-            return None
-        
-        recording = self.recording_sessions[session_id]
-        frames = recording['frames']
-        
-        if not frames:
-            del self.recording_sessions[session_id]
+        with self._lock:
+            recording = self.recording_sessions.pop(session_id, None)
+        if recording is None or recording.frames_recorded == 0:
             return None
         
-        # Calculate statistics
-        emotions = [f['emotion'] for f in frames]
-        engagement_scores = [f['engagement_score'] for f in frames]
-        frustration_levels = [f['frustration_level'] for f in frames]
-        
-        from statistics import mean, stdev
-        
-        avg_engagement = mean(engagement_scores) if engagement_scores else 0.5
-        avg_frustration = mean(frustration_levels) if frustration_levels else 0.0
-        engagement_stability = stdev(engagement_scores) if len(engagement_scores) > 1 else 0.0
+        # Statistics from the streaming aggregates
+        frames = recording.frames_recorded
+        avg_engagement = recording.engagement_stats[1]
+        avg_frustration = recording.frustration_stats[1]
+        engagement_stability = (
+            (recording.engagement_stats[2] / (frames - 1)) ** 0.5 if frames > 1 else 0.0
+        )
         
         # Most common emotion
-        dominant_emotion = max(set(emotions), key=emotions.count) if emotions else 'neutral'
+        dominant_emotion = EMOTIONS[int(np.argmax(recording.emotion_counts))]
         
-        summary = {
+        return {
             'session_id': session_id,
-            'student_id': recording['student_id'],
-            'duration_seconds': (datetime.utcnow() - recording['start_time']).total_seconds(),
-            'frames_recorded': len(frames),
-            'face_detection_rate': (recording['face_detected_count'] / 
-                                   (recording['face_detected_count'] + recording['face_not_detected_count'])),
+            'student_id': recording.student_id,
+            'duration_seconds': (datetime.utcnow() - recording.start_time).total_seconds(),
+            'frames_recorded': frames,
+            'face_detection_rate': (recording.face_detected_count / 
+                                   (recording.face_detected_count + recording.face_not_detected_count)),
             'avg_engagement': avg_engagement,
             'avg_frustration': avg_frustration,
             'engagement_stability': engagement_stability,
             'dominant_emotion': dominant_emotion,
-            'emotion_breakdown': self._emotion_breakdown(emotions),
+            'emotion_breakdown': self._emotion_breakdown(recording.emotion_counts),
             'recommendations': self._generate_recommendations(avg_engagement, avg_frustration)
         }
-        
-        del self.recording_sessions[session_id]
-        return summary
     
-    def _emotion_breakdown(self, emotions):
-        """Get breakdown of emotions in session"""
-        if not emotions:
+    def _emotion_breakdown(self, emotion_counts):
+        """Get breakdown of emotions in session from per-emotion counts"""
+        total = int(emotion_counts.sum())
+        if not total:
             return {}
         
-        breakdown = {}
-        total = len(emotions)
-        for emotion in set(emotions):
-            count = emotions.count(emotion)
-            breakdown[emotion] = round(count / total, 2)
-        
-        return breakdown
+        return {
+            EMOTIONS[code]: round(int(count) / total, 2)
+            for code, count in enumerate(emotion_counts) if count
+        }
     
     def _generate_recommendations(self, avg_engagement, avg_frustration):
         """Generate pedagogical recommendations based on facial analysis"""
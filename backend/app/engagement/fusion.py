@@ -2,12 +2,18 @@
 # Combines behavioral, cognitive, and affective indicators into unified engagement state
 
 from enum import Enum
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime
+import numpy as np
 from app.engagement.indicators import EngagementIndicators
 
 
+# Indicator columns consumed by EngagementFusionEngine.fuse_many: every
+# EngagementIndicators field except the timestamp
+INDICATOR_COLUMNS = tuple(name for name in EngagementIndicators.__slots__ if name != 'timestamp')
+
+
 class EngagementState(Enum):
     """Categorical engagement state."""
     HIGHLY_ENGAGED = "highly_engaged"
@@ -21,7 +27,13 @@ class EngagementState(Enum):
 class FusedEngagementState:
     """
     Unified engagement representation combining all modalities.
+    Slotted (fields have no defaults, so __slots__ works with @dataclass).
     """
+    __slots__ = (
+        'engagement_score', 'categorical_state', 'behavioral_score', 'cognitive_score',
+        'affective_score', 'confidence', 'primary_driver', 'secondary_driver', 'timestamp'
+    )
+    
     # Numeric score: 0.0 = completely disengaged, 1.0 = highly engaged
     engagement_score: float
     
@@ -308,6 +320,178 @@ class EngagementFusionEngine:
             return 1.0
     
     
+    # ------------------------------------------------------------ columnar
+    
+    # Categorical state codes returned by fuse_many (index into this tuple)
+    CATEGORIES = (
+        EngagementState.HIGHLY_ENGAGED,
+        EngagementState.ENGAGED,
+        EngagementState.NEUTRAL,
+        EngagementState.STRUGGLING,
+        EngagementState.DISENGAGED
+    )
+    
+    # Driver codes returned by fuse_many (index into this tuple, -1 = None)
+    DRIVERS = (
+        "Struggling (many hints)", "Variable response times",
+        "Rapid guessing detected", "Long inactivity periods",
+        "Declining accuracy", "High cognitive load", "Inconsistent performance",
+        "Frustration detected", "Confusion detected", "Boredom detected",
+        "Steady behavioral engagement", "Strong cognitive performance", "Positive affective state",
+        "No clear driver", "Insufficient data"
+    )
+    
+    @staticmethod
+    def to_columns(indicators_list: List[EngagementIndicators]) -> Dict[str, np.ndarray]:
+        """Struct-of-arrays view of a list of EngagementIndicators for fuse_many."""
+        return {
+            name: np.array([getattr(indicators, name) for indicators in indicators_list],
+                           dtype=bool if name == 'is_valid' else float)
+            for name in INDICATOR_COLUMNS
+        }
+    
+    def fuse_many(self, columns) -> Dict[str, np.ndarray]:
+        """
+        Fuse many indicator snapshots at once.
+        
+        Args:
+            columns: mapping (dict or DataFrame) of INDICATOR_COLUMNS to equal-length
+                     arrays; is_valid defaults to all True
+        
+        Returns:
+            Dict of arrays, elementwise identical to fuse():
+            engagement_score, behavioral_score, cognitive_score, affective_score,
+            confidence (float), categorical_state (codes into CATEGORIES),
+            primary_driver / secondary_driver (codes into DRIVERS, -1 = None)
+            and one batch timestamp.
+        """
+        col = {name: np.asarray(columns[name], dtype=float)
+               for name in INDICATOR_COLUMNS if name != 'is_valid'}
+        size = col['window_size'].shape[0]
+        valid = (np.asarray(columns['is_valid'], dtype=bool) if 'is_valid' in columns
+                 else np.ones(size, dtype=bool))
+        
+        clamp = lambda values: np.maximum(0.0, np.minimum(1.0, values))
+        
+        # Behavioral (same operation order as _normalize_behavioral)
+        hints = col['hint_usage_count']
+        hints_component = np.select(
+            [hints == 0, hints == 1, hints == 2],
+            [1.0, 0.8, 0.6],
+            np.maximum(0.2, 1.0 - (hints * 0.2))
+        )
+        behavioral = clamp((
+            (1.0 - col['response_time_deviation']) +
+            np.maximum(0.0, 1.0 - (col['inactivity_duration'] / 60.0)) +
+            hints_component +
+            (1.0 - col['rapid_guessing_probability'])
+        ) / 4)
+        
+        # Cognitive (same operation order as _normalize_cognitive)
+        load = col['inferred_cognitive_load']
+        load_component = np.where(
+            load < 0.5,
+            0.3 + (load * 1.4),
+            1.0 - ((load - 0.5) * 1.6)
+        )
+        load_component = np.maximum(0.2, np.minimum(1.0, load_component))
+        cognitive = clamp((
+            ((col['accuracy_trend'] + 1.0) / 2.0 * 0.7 + 0.2) +
+            col['consistency_score'] +
+            load_component
+        ) / 3)
+        
+        # Affective (same operation order as _normalize_affective)
+        affective = clamp((
+            (1.0 - col['frustration_probability']) +
+            (1.0 - col['confusion_probability']) +
+            (1.0 - col['boredom_probability'])
+        ) / 3)
+        
+        engagement = clamp(
+            behavioral * self.BEHAVIORAL_WEIGHT +
+            cognitive * self.COGNITIVE_WEIGHT +
+            affective * self.AFFECTIVE_WEIGHT
+        )
+        
+        categorical = np.select(
+            [engagement >= self.HIGHLY_ENGAGED_THRESHOLD,
+             engagement >= self.ENGAGED_THRESHOLD,
+             engagement >= self.NEUTRAL_THRESHOLD,
+             engagement >= self.STRUGGLING_THRESHOLD],
+            [0, 1, 2, 3], 4
+        ).astype(np.int8)
+        
+        window = col['window_size']
+        confidence = np.select([window < 3, window < 5, window < 10], [0.3, 0.6, 0.85], 1.0)
+        
+        primary, secondary = self._drivers_many(col, behavioral, cognitive, affective)
+        
+        # Invalid snapshots get the neutral state
+        neutral = ~valid
+        return {
+            'engagement_score': np.where(neutral, 0.5, engagement),
+            'categorical_state': np.where(neutral, 2, categorical).astype(np.int8),
+            'behavioral_score': np.where(neutral, 0.5, behavioral),
+            'cognitive_score': np.where(neutral, 0.5, cognitive),
+            'affective_score': np.where(neutral, 0.5, affective),
+            'confidence': np.where(neutral, 0.0, confidence),
+            'primary_driver': np.where(neutral, self.DRIVERS.index("Insufficient data"), primary).astype(np.int16),
+            'secondary_driver': np.where(neutral, -1, secondary).astype(np.int16),
+            'timestamp': datetime.utcnow()
+        }
+    
+    def _drivers_many(self, col, behavioral, cognitive, affective):
+        """Columnar _identify_drivers: driver codes per snapshot (-1 = None)."""
+        # First matching condition per modality, in _identify_drivers order
+        negative = np.stack([
+            np.select([col['hint_usage_count'] > 2,
+                       col['response_time_deviation'] > 0.8,
+                       col['rapid_guessing_probability'] > 0.5,
+                       col['inactivity_duration'] > 30], [0, 1, 2, 3], -1),
+            np.select([col['accuracy_trend'] < -0.3,
+                       col['inferred_cognitive_load'] > 0.8,
+                       col['consistency_score'] < 0.3], [4, 5, 6], -1),
+            np.select([col['frustration_probability'] > 0.7,
+                       col['confusion_probability'] > 0.7,
+                       col['boredom_probability'] > 0.7], [7, 8, 9], -1)
+        ], axis=1)
+        positive = np.stack([
+            np.where(behavioral > 0.8, 10, -1),
+            np.where(cognitive > 0.8, 11, -1),
+            np.where(affective > 0.8, 12, -1)
+        ], axis=1)
+        
+        has_negative = (negative >= 0).any(axis=1)
+        drivers = np.where(has_negative[:, None], negative, positive)
+        
+        # Compact each row so found drivers come first, preserving modality order
+        present = drivers >= 0
+        order = np.argsort(~present, axis=1, kind='stable')
+        drivers = np.take_along_axis(drivers, order, axis=1)
+        
+        primary = np.where(drivers[:, 0] >= 0, drivers[:, 0], self.DRIVERS.index("No clear driver"))
+        return primary, drivers[:, 1]
+    
+    def states_from_columns(self, fused: Dict[str, np.ndarray]) -> List[FusedEngagementState]:
+        """Materialize fuse_many output as FusedEngagementState objects."""
+        return [
+            FusedEngagementState(
+                engagement_score=float(fused['engagement_score'][i]),
+                categorical_state=self.CATEGORIES[fused['categorical_state'][i]],
+                behavioral_score=float(fused['behavioral_score'][i]),
+                cognitive_score=float(fused['cognitive_score'][i]),
+                affective_score=float(fused['affective_score'][i]),
+                confidence=float(fused['confidence'][i]),
+                primary_driver=self.DRIVERS[fused['primary_driver'][i]],
+                secondary_driver=(self.DRIVERS[fused['secondary_driver'][i]]
+                                  if fused['secondary_driver'][i] >= 0 else None),
+                timestamp=fused['timestamp']
+            )
+            for i in range(len(fused['engagement_score']))
+        ]
+    
+    
     def _neutral_state(self) -> FusedEngagementState:
         """Return neutral engagement state when data is insufficient."""
         return FusedEngagementState(
@@ -1,7 +1,9 @@
 # Engagement Indicators Extractor
 # Computes behavioral, cognitive, and affective indicators from CBT interaction data
 
+from collections import deque
 from datetime import datetime, timedelta
+import math
 from statistics import mean, stdev
 from typing import Dict, List, Tuple, Optional
 from app.models.session import StudentResponse
@@ -12,8 +14,16 @@ class EngagementIndicators:
     """
     Structured data container for engagement indicators.
     All indicators normalized to 0.0-1.0 unless otherwise specified.
+    Slotted: simulations and loggers hold one per question.
     """
     
+    __slots__ = (
+        'response_time_deviation', 'inactivity_duration', 'hint_usage_count', 'rapid_guessing_probability',
+        'accuracy_trend', 'consistency_score', 'inferred_cognitive_load',
+        'frustration_probability', 'confusion_probability', 'boredom_probability',
+        'timestamp', 'window_size', 'is_valid'
+    )
+    
     def __init__(self):
         # Behavioral indicators
         self.response_time_deviation = 0.0  # How much response time varies (0=consistent, 1=highly variable)
@@ -178,55 +188,70 @@ class EngagementIndicatorExtractor:
         # How consistent is performance? All correct/all wrong = 1.0, random = 0.0
         if len(responses) >= 3:
             accuracy = sum(correct_answers) / len(responses)
-            # Entropy-based: consistent performance = high entropy separation
-            # If accuracy close to 0 or 1, more consistent
-            consistency = 1.0 - abs(accuracy - 0.5) * 2  # Maps to [0, 1]
-            
-            # But also check for run patterns (consecutive correct/wrong)
             runs = self._count_runs(correct_answers)
-            max_runs = len(responses) // 2 + 1  # Max possible alternations
-            run_ratio = runs / max_runs if max_runs > 0 else 0
-            
-            # Average consistency from accuracy pattern and run pattern
-            indicators.consistency_score = (consistency + (1 - run_ratio)) / 2
+            indicators.consistency_score = self._consistency_score(accuracy, runs, len(responses))
         
         # 3. Inferred Cognitive Load
-        # Based on: accuracy, response time, hints needed
-        cognitive_load = 0.0
-        
-        # Low accuracy = high load
         accuracy = sum(correct_answers) / len(responses) if responses else 0
+        response_times = [r.response_time_seconds for r in responses 
+                         if r.response_time_seconds and r.response_time_seconds > 0]
+        avg_time = mean(response_times) if response_times else None
+        indicators.inferred_cognitive_load = self._cognitive_load(
+            accuracy, avg_time, indicators.hint_usage_count
+        )
+    
+    def _consistency_score(self, accuracy: float, runs: int, count: int) -> float:
+        """Consistency from the accuracy pattern and the run pattern."""
+        # Entropy-based: consistent performance = high entropy separation
+        # If accuracy close to 0 or 1, more consistent
+        consistency = 1.0 - abs(accuracy - 0.5) * 2  # Maps to [0, 1]
+        
+        # But also check for run patterns (consecutive correct/wrong)
+        max_runs = count // 2 + 1  # Max possible alternations
+        run_ratio = runs / max_runs if max_runs > 0 else 0
+        
+        # Average consistency from accuracy pattern and run pattern
+        return (consistency + (1 - run_ratio)) / 2
+    
+    def _cognitive_load(self, accuracy: float, avg_time: Optional[float], hint_count: int) -> float:
+        """Inferred cognitive load from accuracy, response time and hints needed."""
+        # Low accuracy = high load
         load_from_accuracy = 1.0 - accuracy
         
         # Slow/variable responses = high load
-        response_times = [r.response_time_seconds for r in responses 
-                         if r.response_time_seconds and r.response_time_seconds > 0]
-        if response_times:
-            avg_time = mean(response_times)
+        if avg_time is not None:
             # Normalize: 5s = 0 load, >30s = 1.0 load
             load_from_time = max(0.0, min(1.0, (avg_time - self.RESPONSE_TIME_IDEAL) / 25.0))
         else:
             load_from_time = 0.0
         
         # Many hints = high load
-        load_from_hints = min(1.0, indicators.hint_usage_count / self.HINT_OVERUSE_THRESHOLD)
+        load_from_hints = min(1.0, hint_count / self.HINT_OVERUSE_THRESHOLD)
         
         # Combine (equally weighted)
-        cognitive_load = (load_from_accuracy + load_from_time + load_from_hints) / 3
-        indicators.inferred_cognitive_load = cognitive_load
+        return (load_from_accuracy + load_from_time + load_from_hints) / 3
     
     
     def _compute_affective_indicators(self, responses: List[StudentResponse], 
                                      indicators: EngagementIndicators):
         """Compute affective indicators (simulated/probabilistic)."""
         
+        accuracy = sum(1 for r in responses if r.is_correct) / len(responses)
+        response_times = [r.response_time_seconds for r in responses 
+                         if r.response_time_seconds and r.response_time_seconds > 0]
+        avg_time = mean(response_times) if response_times else None
+        self._affective_from_stats(indicators, accuracy, avg_time)
+    
+    def _affective_from_stats(self, indicators: EngagementIndicators, accuracy: float,
+                              avg_time: Optional[float]):
+        """Infer affective indicators from accuracy, mean response time and the other indicators."""
+        
         # Use behavioral and cognitive indicators to infer affective state
         
         # 1. Frustration Probability
         # Frustration: wrong answers, slow responses, many hints, declining accuracy
         frustration_signals = []
         
-        accuracy = sum(1 for r in responses if r.is_correct) / len(responses)
         frustration_signals.append(1.0 - accuracy)  # Low accuracy = frustrated
         
         if indicators.inactivity_duration > self.INACTIVITY_THRESHOLD:
@@ -260,10 +285,7 @@ class EngagementIndicatorExtractor:
         # Boredom: very fast responses, perfect accuracy, no hints needed, no inactivity
         boredom_signals = []
         
-        response_times = [r.response_time_seconds for r in responses 
-                         if r.response_time_seconds and r.response_time_seconds > 0]
-        if response_times:
-            avg_time = mean(response_times)
+        if avg_time is not None:
             if avg_time < self.RESPONSE_TIME_MIN:
                 boredom_signals.append(0.9)  # Very fast = bored/not engaged
         
@@ -293,6 +315,173 @@ class EngagementIndicatorExtractor:
         return runs
 
 
+class StreamingIndicatorExtractor(EngagementIndicatorExtractor):
+    """
+    Incremental variant of extract_from_responses for live sessions.
+    
+    push(response) updates running accumulators in O(1) and snapshot()
+    returns the same EngagementIndicators that extract_from_responses would
+    for the responses currently in the window (every response pushed so far,
+    or the last window_size when a window size is given):
+    - Welford mean/variance of response times (with removal on eviction,
+      refreshed from the window once per window_size evictions)
+    - run, inactivity-gap, hint, rapid-guess and correct counters
+    - the window split into first-half/second-half deques for the trend
+    """
+    
+    def __init__(self, window_size: Optional[int] = None):
+        if window_size is not None and window_size < 1:
+            raise ValueError(f'window_size must be None or at least 1, got {window_size}')
+        self.window_size = window_size
+        self.reset()
+    
+    def reset(self):
+        """Forget every pushed response."""
+        # Window entries (timestamp, response_time, is_correct, used_hints)
+        self._first_half = deque()
+        self._second_half = deque()
+        self._first_correct = 0
+        self._second_correct = 0
+        
+        # Welford accumulators over positive response times
+        self._time_count = 0
+        self._time_mean = 0.0
+        self._time_m2 = 0.0
+        
+        self._evictions = 0
+        self._runs = 0
+        self._gap_seconds = 0.0
+        self._hint_count = 0
+        self._rapid_count = 0
+        self._rapid_wrong = 0
+    
+    def __len__(self):
+        return len(self._first_half) + len(self._second_half)
+    
+    def push(self, response: StudentResponse):
+        """Add one response, evicting the oldest if the window is full."""
+        entry = (
+            response.timestamp,
+            response.response_time_seconds,
+            bool(response.is_correct),
+            getattr(response, 'hints_used', 0) > 0
+        )
+        
+        newest = self._second_half[-1] if self._second_half else None
+        if newest is None:
+            self._runs = 1
+        else:
+            self._gap_seconds += (entry[0] - newest[0]).total_seconds()
+            if entry[2] != newest[2]:
+                self._runs += 1
+        
+        self._second_half.append(entry)
+        self._second_correct += entry[2]
+        self._count(entry, 1)
+        self._rebalance()
+        
+        if self.window_size is not None and len(self) > self.window_size:
+            self._evict()
+    
+    def _evict(self):
+        oldest = self._first_half.popleft()
+        self._first_correct -= oldest[2]
+        self._count(oldest, -1)
+        
+        following = self._first_half[0] if self._first_half else self._second_half[0]
+        self._gap_seconds -= (following[0] - oldest[0]).total_seconds()
+        if following[2] != oldest[2]:
+            self._runs -= 1
+        self._rebalance()
+        
+        # Refresh the float accumulators from the window once per window of
+        # evictions (amortized O(1)) so removal rounding cannot build up
+        self._evictions += 1
+        if self._evictions >= self.window_size:
+            self._evictions = 0
+            self._refresh_accumulators()
+    
+    def _refresh_accumulators(self):
+        entries = list(self._first_half) + list(self._second_half)
+        times = [entry[1] for entry in entries if entry[1] and entry[1] > 0]
+        self._time_count = len(times)
+        self._time_mean = sum(times) / len(times) if times else 0.0
+        self._time_m2 = sum((value - self._time_mean) ** 2 for value in times)
+        self._gap_seconds = sum(
+            (later[0] - earlier[0]).total_seconds() for earlier, later in zip(entries, entries[1:])
+        )
+    
+    def _rebalance(self):
+        """Keep len(first half) == len(window) // 2 by moving the boundary forward."""
+        while len(self._first_half) < len(self) // 2:
+            entry = self._second_half.popleft()
+            self._second_correct -= entry[2]
+            self._first_half.append(entry)
+            self._first_correct += entry[2]
+    
+    def _count(self, entry, sign: int):
+        """Add (sign=1) or remove (sign=-1) an entry from the counters."""
+        _, response_time, is_correct, used_hints = entry
+        self._hint_count += sign * used_hints
+        
+        if response_time and response_time > 0:
+            if sign > 0:
+                self._time_count += 1
+                delta = response_time - self._time_mean
+                self._time_mean += delta / self._time_count
+                self._time_m2 += delta * (response_time - self._time_mean)
+            elif self._time_count == 1:
+                self._time_count, self._time_mean, self._time_m2 = 0, 0.0, 0.0
+            else:
+                self._time_count -= 1
+                delta = response_time - self._time_mean
+                self._time_mean -= delta / self._time_count
+                self._time_m2 -= delta * (response_time - self._time_mean)
+                # Removal cancels; treat residue at float precision as zero variance
+                if self._time_m2 < 1e-9 * self._time_count * self._time_mean ** 2:
+                    self._time_m2 = 0.0
+        
+        if response_time and response_time < self.RESPONSE_TIME_MIN:
+            self._rapid_count += sign
+            self._rapid_wrong += sign * (not is_correct)
+    
+    def snapshot(self) -> EngagementIndicators:
+        """Indicators for the current window."""
+        indicators = EngagementIndicators()
+        count = len(self)
+        if count < 2:
+            return indicators
+        
+        indicators.window_size = count
+        correct = self._first_correct + self._second_correct
+        accuracy = correct / count
+        avg_time = self._time_mean if self._time_count else None
+        
+        # Behavioral
+        if self._time_count >= 2 and self._time_mean > 0:
+            std_dev = math.sqrt(self._time_m2 / (self._time_count - 1))
+            indicators.response_time_deviation = min(1.0, std_dev / self._time_mean)
+        indicators.inactivity_duration = self._gap_seconds
+        indicators.hint_usage_count = self._hint_count
+        if self._rapid_count:
+            indicators.rapid_guessing_probability = self._rapid_wrong / self._rapid_count
+        
+        # Cognitive
+        if count >= 4:
+            mid = len(self._first_half)
+            trend = self._second_correct / (count - mid) - self._first_correct / mid
+            indicators.accuracy_trend = max(-1.0, min(1.0, trend))
+        if count >= 3:
+            indicators.consistency_score = self._consistency_score(accuracy, self._runs, count)
+        indicators.inferred_cognitive_load = self._cognitive_load(accuracy, avg_time, self._hint_count)
+        
+        # Affective
+        self._affective_from_stats(indicators, accuracy, avg_time)
+        
+        indicators.is_valid = True
+        return indicators
+
+
 class IndicatorLogger:
     """Logs engagement indicators for debugging/analysis."""
     
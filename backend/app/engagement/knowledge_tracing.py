@@ -0,0 +1,316 @@
+"""
+Bayesian Knowledge Tracing Module
+
+Maintains a persisted P(known) per student x topic, updated in O(1) each time
+a response is recorded, so mastery can be read with a point lookup instead of
+re-scanning the response table.
+
+Per-topic parameters (P(L0), P(T), P(S), P(G)) start from Config.BKT_DEFAULTS
+and can be re-estimated from history with a batch EM (Baum-Welch) fitter that
+runs forward-backward over all of a topic's student sequences at once in NumPy.
+"""
+
+from app import db
+from app.models.knowledge import KnowledgeState, BKTParameters
+from app.models.session import Session, StudentResponse
+from app.models.question import Question
+from config import Config
+from datetime import datetime
+from collections import defaultdict
+import numpy as np
+
+
+# Identifiability bounds commonly used for BKT: a model where guessing or
+# slipping exceeds these is degenerate (a "known" state that answers worse
+# than chance).
+MAX_GUESS = 0.3
+MAX_SLIP = 0.3
+EPSILON = 1e-4
+
+
+def bkt_posterior(p_known, is_correct, p_slip, p_guess):
+    """P(known | observation) for a single response"""
+    if is_correct:
+        numerator = p_known * (1 - p_slip)
+        denominator = numerator + (1 - p_known) * p_guess
+    else:
+        numerator = p_known * p_slip
+        denominator = numerator + (1 - p_known) * (1 - p_guess)
+    return numerator / denominator if denominator > 0 else p_known
+
+
+def bkt_step(p_known, is_correct, params):
+    """Posterior followed by the learning transition: P(known) for the next attempt"""
+    posterior = bkt_posterior(p_known, is_correct, params['p_slip'], params['p_guess'])
+    return posterior + (1 - posterior) * params['p_learn']
+
+
+class BayesianKnowledgeTracer:
+    """Incremental BKT updates and batch parameter fitting"""
+
+    def __init__(self):
+        self.defaults = Config.BKT_DEFAULTS
+
+    # ------------------------------------------------------------ parameters
+
+    def get_parameters(self, topic):
+        """Parameters for a topic (fitted if available, otherwise defaults)"""
+        row = BKTParameters.query.filter_by(topic=topic).first()
+        if row:
+            return {
+                'p_init': row.p_init,
+                'p_learn': row.p_learn,
+                'p_slip': row.p_slip,
+                'p_guess': row.p_guess
+            }
+        return {k: self.defaults[k] for k in ('p_init', 'p_learn', 'p_slip', 'p_guess')}
+
+    # ------------------------------------------------------- online updates
+
+    def update(self, student_id, topic, is_correct):
+        """
+        Apply one observed response to the student's state for the topic.
+        O(1): one indexed lookup plus an in-place update. The caller commits.
+        """
+        params = self.get_parameters(topic)
+        state = KnowledgeState.query.filter_by(student_id=student_id, topic=topic).first()
+        if state is None:
+            state = KnowledgeState(
+                student_id=student_id,
+                topic=topic,
+                p_known=params['p_init'],
+                attempts=0,
+                correct=0
+            )
+            db.session.add(state)
+
+        state.p_known = bkt_step(state.p_known, is_correct, params)
+        state.attempts = (state.attempts or 0) + 1
+        state.correct = (state.correct or 0) + (1 if is_correct else 0)
+        state.updated_at = datetime.utcnow()
+        return state
+
+    # ------------------------------------------------------------- lookups
+
+    def get_mastery(self, student_id, topic=None):
+        """
+        Point lookup of BKT mastery. Returns one topic's state dict, or
+        {topic: state} for all topics when topic is None.
+        """
+        threshold = self.defaults['mastery_threshold']
+
+        def describe(state):
+            data = state.to_dict()
+            data['mastered'] = state.p_known >= threshold
+            return data
+
+        if topic is not None:
+            state = KnowledgeState.query.filter_by(student_id=student_id, topic=topic).first()
+            if state is None:
+                return {
+                    'student_id': student_id,
+                    'topic': topic,
+                    'p_known': self.get_parameters(topic)['p_init'],
+                    'attempts': 0,
+                    'correct': 0,
+                    'mastered': False
+                }
+            return describe(state)
+
+        states = KnowledgeState.query.filter_by(student_id=student_id).all()
+        return {state.topic: describe(state) for state in states}
+
+    # --------------------------------------------------------- batch fitting
+
+    def load_sequences(self, topics=None):
+        """
+        Fetch every (student, topic) response sequence in one ordered query.
+        Returns {topic: {student_id: [0/1, ...]}}.
+        """
+        query = StudentResponse.query.join(
+            Question, StudentResponse.question_id == Question.id
+        ).join(
+            Session, StudentResponse.session_id == Session.id
+        ).with_entities(
+            Question.topic, Session.student_id, StudentResponse.is_correct
+        )
+        if topics:
+            query = query.filter(Question.topic.in_(topics))
+
+        sequences = defaultdict(lambda: defaultdict(list))
+        for topic, student_id, is_correct in query.order_by(StudentResponse.timestamp).all():
+            sequences[topic][student_id].append(1 if is_correct else 0)
+        return sequences
+
+    def fit_topic(self, sequences, max_iterations=50, tolerance=1e-5, initial=None):
+        """
+        Fit BKT parameters for one topic with EM over all student sequences.
+
+        sequences: list of 0/1 lists (one per student). Returns a dict with the
+        fitted parameters, log_likelihood, iterations and observations.
+        """
+        obs, mask = _pad_sequences(sequences)
+        params = dict(initial or {k: self.defaults[k] for k in ('p_init', 'p_learn', 'p_slip', 'p_guess')})
+
+        log_likelihood = -np.inf
+        iterations = 0
+        for iterations in range(1, max_iterations + 1):
+            gamma, xi_learn, new_log_likelihood = _forward_backward(obs, mask, params)
+
+            # M-step
+            valid = mask.astype(float)
+            known = gamma[:, :, 1] * valid
+            unknown = gamma[:, :, 0] * valid
+            transition_mask = valid[:, 1:]
+
+            params = {
+                'p_init': _clip(gamma[:, 0, 1].mean(), EPSILON, 1 - EPSILON),
+                'p_learn': _clip(
+                    xi_learn.sum() / max((gamma[:, :-1, 0] * transition_mask).sum(), EPSILON),
+                    EPSILON, 1 - EPSILON
+                ),
+                'p_guess': _clip((unknown * obs).sum() / max(unknown.sum(), EPSILON), EPSILON, MAX_GUESS),
+                'p_slip': _clip((known * (1 - obs)).sum() / max(known.sum(), EPSILON), EPSILON, MAX_SLIP),
+            }
+
+            if abs(new_log_likelihood - log_likelihood) < tolerance:
+                log_likelihood = new_log_likelihood
+                break
+            log_likelihood = new_log_likelihood
+
+        return {
+            **params,
+            'log_likelihood': float(log_likelihood),
+            'iterations': iterations,
+            'observations': int(mask.sum())
+        }
+
+    def fit(self, topics=None, min_observations=10, max_iterations=50, rebuild_states=True):
+        """
+        Re-estimate parameters for every topic with enough history, persist them,
+        and (optionally) recompute every student's P(known) with the new parameters.
+        """
+        sequences = self.load_sequences(topics)
+        results = {}
+
+        for topic, by_student in sequences.items():
+            student_ids = list(by_student)
+            student_sequences = [by_student[s] for s in student_ids]
+            observations = sum(len(seq) for seq in student_sequences)
+            if observations < min_observations:
+                results[topic] = {'status': 'skipped', 'observations': observations}
+                continue
+
+            fitted = self.fit_topic(student_sequences, max_iterations=max_iterations,
+                                    initial=self.get_parameters(topic))
+
+            row = BKTParameters.query.filter_by(topic=topic).first() or BKTParameters(topic=topic)
+            row.p_init = fitted['p_init']
+            row.p_learn = fitted['p_learn']
+            row.p_slip = fitted['p_slip']
+            row.p_guess = fitted['p_guess']
+            row.observations = fitted['observations']
+            row.log_likelihood = fitted['log_likelihood']
+            row.fitted_at = datetime.utcnow()
+            db.session.add(row)
+
+            if rebuild_states:
+                self._rebuild_states(topic, student_ids, student_sequences, fitted)
+
+            results[topic] = {'status': 'fitted', **fitted}
+
+        db.session.commit()
+        return results
+
+    def _rebuild_states(self, topic, student_ids, sequences, params):
+        """Replay each student's sequence through the fitted model (vectorized over students)"""
+        obs, mask = _pad_sequences(sequences)
+        p_known = np.full(len(sequences), params['p_init'])
+        for t in range(obs.shape[1]):
+            correct = obs[:, t] == 1
+            numerator = np.where(correct, p_known * (1 - params['p_slip']), p_known * params['p_slip'])
+            denominator = numerator + np.where(
+                correct, (1 - p_known) * params['p_guess'], (1 - p_known) * (1 - params['p_guess'])
+            )
+            posterior = numerator / denominator
+            stepped = posterior + (1 - posterior) * params['p_learn']
+            p_known = np.where(mask[:, t], stepped, p_known)
+
+        existing = {
+            state.student_id: state
+            for state in KnowledgeState.query.filter(
+                KnowledgeState.topic == topic,
+                KnowledgeState.student_id.in_(student_ids)
+            ).all()
+        }
+        now = datetime.utcnow()
+        for i, student_id in enumerate(student_ids):
+            state = existing.get(student_id) or KnowledgeState(student_id=student_id, topic=topic)
+            state.p_known = float(p_known[i])
+            state.attempts = int(mask[i].sum())
+            state.correct = int(obs[i][mask[i]].sum())
+            state.updated_at = now
+            db.session.add(state)
+
+
+def _clip(value, low, high):
+    return float(min(max(value, low), high))
+
+
+def _pad_sequences(sequences):
+    """Right-pad 0/1 sequences into an (S, T) int array plus a validity mask"""
+    length = max((len(seq) for seq in sequences), default=0)
+    obs = np.zeros((len(sequences), max(length, 1)), dtype=np.int8)
+    mask = np.zeros_like(obs, dtype=bool)
+    for i, seq in enumerate(sequences):
+        obs[i, :len(seq)] = seq
+        mask[i, :len(seq)] = True
+    return obs, mask
+
+
+def _forward_backward(obs, mask, params):
+    """
+    Scaled forward-backward for the 2-state BKT HMM (0 = unknown, 1 = known),
+    vectorized over students. Padded steps carry the state forward unchanged.
+
+    Returns (gamma (S, T, 2), expected unknown->known transitions (S, T-1), log-likelihood)
+    """
+    S, T = obs.shape
+    p_learn, p_slip, p_guess = params['p_learn'], params['p_slip'], params['p_guess']
+
+    # Emission probabilities; padded positions are uninformative
+    emit = np.empty((S, T, 2))
+    emit[:, :, 0] = np.where(obs == 1, p_guess, 1 - p_guess)
+    emit[:, :, 1] = np.where(obs == 1, 1 - p_slip, p_slip)
+    emit[~mask] = 1.0
+
+    transition = np.array([[1 - p_learn, p_learn], [0.0, 1.0]])
+    step_mask = mask[:, 1:, None]
+
+    alpha = np.empty((S, T, 2))
+    scale = np.empty((S, T))
+    alpha[:, 0] = np.array([1 - params['p_init'], params['p_init']]) * emit[:, 0]
+    scale[:, 0] = alpha[:, 0].sum(axis=1)
+    alpha[:, 0] /= scale[:, 0, None]
+    for t in range(1, T):
+        predicted = np.where(step_mask[:, t - 1], alpha[:, t - 1] @ transition, alpha[:, t - 1])
+        alpha[:, t] = predicted * emit[:, t]
+        scale[:, t] = alpha[:, t].sum(axis=1)
+        alpha[:, t] /= scale[:, t, None]
+
+    beta = np.ones((S, T, 2))
+    for t in range(T - 2, -1, -1):
+        weighted = emit[:, t + 1] * beta[:, t + 1]
+        propagated = np.where(step_mask[:, t], weighted @ transition.T, weighted)
+        beta[:, t] = propagated / scale[:, t + 1, None]
+
+    gamma = alpha * beta
+    gamma /= gamma.sum(axis=2, keepdims=True)
+
+    # Expected unknown -> known transitions between consecutive valid steps
+    xi_learn = (
+        alpha[:, :-1, 0] * p_learn * emit[:, 1:, 1] * beta[:, 1:, 1] / scale[:, 1:]
+    ) * mask[:, 1:]
+
+    log_likelihood = np.log(scale[mask]).sum()
+    return gamma, xi_learn, log_likelihood
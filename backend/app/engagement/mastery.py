@@ -55,25 +55,79 @@ class MasteryTracker:
                 'readiness_for_advancement': bool
             }
         """
-        # Get all responses for this student in this topic
+        outcomes = self._fetch_topic_outcomes(student_id, session_id, topic=topic)
+        return self._topic_mastery_from_outcomes(topic, outcomes.get(topic, []))
+    
+    def calculate_overall_mastery(self, student_id, session_id=None):
+        """
+        Calculate overall mastery across all topics.
+        All topics are computed in one pass over a single ordered query.
+        """
+        outcomes = self._fetch_topic_outcomes(student_id, session_id)
+        
+        if not outcomes:
+            return {
+                'overall_mastery': 0,
+                'overall_accuracy': 0.0,
+                'total_attempts': 0,
+                'topics': {},
+                'status': 'no_data'
+            }
+        
+        # Calculate mastery for each topic
+        topic_masteries = {
+            topic: self._topic_mastery_from_outcomes(topic, rows)
+            for topic, rows in outcomes.items()
+        }
+        topic_accuracies = [m['accuracy'] for m in topic_masteries.values()]
+        
+        # Overall metrics
+        overall_accuracy = sum(topic_accuracies) / len(topic_accuracies) if topic_accuracies else 0.0
+        overall_mastery = self._get_mastery_level(overall_accuracy)
+        
+        return {
+            'overall_mastery': overall_mastery,
+            'overall_mastery_name': self.MASTERY_LEVELS[overall_mastery]['name'],
+            'overall_accuracy': overall_accuracy,
+            'total_attempts': sum(m['total'] for m in topic_masteries.values()),
+            'total_correct': sum(m['correct'] for m in topic_masteries.values()),
+            'topics_studied': len(topic_masteries),
+            'topics': topic_masteries,
+            'status': 'calculated'
+        }
+    
+    def _fetch_topic_outcomes(self, student_id, session_id=None, topic=None):
+        """
+        Fetch (topic, is_correct, timestamp) rows for a student (or one session)
+        in a single query ordered by time, grouped by topic.
+        
+        Returns: {topic: [row, ...]} where each row exposes .is_correct and .timestamp
+        """
+        from app.models.session import Session
+        
+        query = StudentResponse.query.join(
+            Question, StudentResponse.question_id == Question.id
+        ).with_entities(
+            Question.topic, StudentResponse.is_correct, StudentResponse.timestamp
+        )
+        
         if session_id:
-            responses = StudentResponse.query.join(
-                Question, StudentResponse.question_id == Question.id
-            ).filter(
-                StudentResponse.session_id == session_id,
-                Question.topic == topic
-            ).order_by(StudentResponse.timestamp).all()
+            query = query.filter(StudentResponse.session_id == session_id)
         else:
-            responses = StudentResponse.query.join(
-                Question, StudentResponse.question_id == Question.id
-            ).join(
-                app.models.session.Session,
-                StudentResponse.session_id == app.models.session.Session.id
-            ).filter(
-                app.models.session.Session.student_id == student_id,
-                Question.topic == topic
-            ).order_by(StudentResponse.timestamp).all()
+            query = query.join(
+                Session, StudentResponse.session_id == Session.id
+            ).filter(Session.student_id == student_id)
+        
+        if topic is not None:
+            query = query.filter(Question.topic == topic)
         
+        grouped = defaultdict(list)
+        for row in query.order_by(StudentResponse.timestamp).all():
+            grouped[row.topic].append(row)
+        return grouped
+    
+    def _topic_mastery_from_outcomes(self, topic, responses):
+        """Compute topic mastery from time-ordered outcome rows"""
         if not responses:
             return {
                 'topic': topic,
@@ -121,61 +175,6 @@ class MasteryTracker:
             'recent_performance': self._get_recent_performance(responses, window=5)
         }
     
-    def calculate_overall_mastery(self, student_id, session_id=None):
-        """Calculate overall mastery across all topics"""
-        if session_id:
-            responses = StudentResponse.query.join(
-                Question, StudentResponse.question_id == Question.id
-            ).filter(
-                StudentResponse.session_id == session_id
-            ).all()
-        else:
-            # Get all responses for student
-            from app.models.session import Session
-            responses = StudentResponse.query.join(
-                Session, StudentResponse.session_id == Session.id
-            ).join(
-                Question, StudentResponse.question_id == Question.id
-            ).filter(
-                Session.student_id == student_id
-            ).all()
-        
-        if not responses:
-            return {
-                'overall_mastery': 0,
-                'overall_accuracy': 0.0,
-                'total_attempts': 0,
-                'topics': {},
-                'status': 'no_data'
-            }
-        
-        # Get unique topics
-        topics = set(r.question.topic for r in responses)
-        
-        # Calculate mastery for each topic
-        topic_masteries = {}
-        topic_accuracies = []
-        
-        for topic in topics:
-            mastery = self.calculate_topic_mastery(student_id, topic, session_id)
-            topic_masteries[topic] = mastery
-            topic_accuracies.append(mastery['accuracy'])
-        
-        # Overall metrics
-        overall_accuracy = sum(topic_accuracies) / len(topic_accuracies) if topic_accuracies else 0.0
-        overall_mastery = self._get_mastery_level(overall_accuracy)
-        
-        return {
-            'overall_mastery': overall_mastery,
-            'overall_mastery_name': self.MASTERY_LEVELS[overall_mastery]['name'],
-            'overall_accuracy': overall_accuracy,
-            'total_attempts': len(responses),
-            'total_correct': sum(1 for r in responses if r.is_correct),
-            'topics_studied': len(topics),
-            'topics': topic_masteries,
-            'status': 'calculated'
-        }
-    
     def get_knowledge_profile(self, student_id, session_id=None):
         """
         Get comprehensive knowledge profile of student
@@ -0,0 +1,205 @@
+"""
+Review Queue Builder
+
+Nightly batch job that precomputes every student's spaced repetition due
+queue into the review_queue table, so the due-for-review endpoint serves a
+short indexed read instead of building the queue on each request.
+
+- Learning records are streamed in next_review order (only rows already due)
+- Each student keeps a bounded heap of their highest-priority items:
+  most days overdue first, then lowest easiness factor (hardest to retain)
+- Students are partitioned into contiguous student_id ranges; partitions can
+  be built in a process pool, each worker with its own database connection.
+  Workers only read, the parent writes each partition, so SQLite stays
+  single-writer
+- Reviewing an item removes it from the precomputed queue (see
+  SpacedRepetitionScheduler._update_learning_record)
+
+Run from backend directory: python scripts/build_review_queues.py
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import heapq
+
+from app import db
+from app.models.learning_record import LearningRecord, ReviewQueueEntry
+from app.models.question import Question
+
+
+class ReviewQueueBuilder:
+    """Build and serve precomputed per-student review queues"""
+
+    def __init__(self, per_student_limit=100, stream_batch_size=1000):
+        self.per_student_limit = per_student_limit
+        self.stream_batch_size = stream_batch_size
+
+    # ---------------------------------------------------------- partitioning
+
+    def partition_students(self, num_partitions):
+        """
+        Split the student_id key space into contiguous [low, high) ranges with
+        roughly equal numbers of students. The first and last ranges are open
+        (None) so the partitions always cover every student.
+        """
+        student_ids = [
+            row[0] for row in db.session.query(LearningRecord.student_id)
+            .distinct().order_by(LearningRecord.student_id).all()
+        ]
+        num_partitions = max(1, min(num_partitions, len(student_ids)))
+        step = len(student_ids) / num_partitions
+        boundaries = [student_ids[int(i * step)] for i in range(1, num_partitions)]
+
+        bounds = [None] + boundaries + [None]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    # -------------------------------------------------------------- building
+
+    def build_partition(self, low=None, high=None, now=None):
+        """
+        Stream due learning records for students in [low, high) and return
+        {student_id: [entry dicts in queue order]}.
+        """
+        now = now or datetime.utcnow()
+        query = db.session.query(
+            LearningRecord.student_id,
+            LearningRecord.question_id,
+            LearningRecord.next_review,
+            LearningRecord.easiness_factor
+        ).filter(LearningRecord.next_review <= now)
+        if low is not None:
+            query = query.filter(LearningRecord.student_id >= low)
+        if high is not None:
+            query = query.filter(LearningRecord.student_id < high)
+
+        # Bounded min-heaps whose root is the lowest-priority item kept so far
+        heaps = {}
+        for student_id, question_id, next_review, easiness in query.order_by(
+            LearningRecord.next_review
+        ).yield_per(self.stream_batch_size):
+            item = ((now - next_review).days, -easiness, question_id)
+            heap = heaps.setdefault(student_id, [])
+            if len(heap) < self.per_student_limit:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        return {
+            student_id: [
+                {
+                    'question_id': question_id,
+                    'position': position,
+                    'days_overdue': days_overdue,
+                    'easiness_factor': -negative_easiness
+                }
+                for position, (days_overdue, negative_easiness, question_id)
+                in enumerate(sorted(heap, reverse=True))
+            ]
+            for student_id, heap in heaps.items()
+        }
+
+    def write_partition(self, low, high, queues, built_at):
+        """Replace the stored queues for every student in [low, high)"""
+        delete = ReviewQueueEntry.query
+        if low is not None:
+            delete = delete.filter(ReviewQueueEntry.student_id >= low)
+        if high is not None:
+            delete = delete.filter(ReviewQueueEntry.student_id < high)
+        delete.delete(synchronize_session=False)
+
+        rows = [
+            {'student_id': student_id, 'built_at': built_at, **entry}
+            for student_id, entries in queues.items()
+            for entry in entries
+        ]
+        if rows:
+            db.session.execute(db.insert(ReviewQueueEntry), rows)
+        db.session.commit()
+        return len(rows)
+
+    def build(self, now=None, num_partitions=1, max_workers=1, database_uri=None):
+        """
+        Rebuild every student's review queue.
+
+        With max_workers > 1 the partitions are built in a process pool
+        against database_uri, by default the URL the current app's engine
+        resolved (relative SQLite paths are resolved against the app's
+        instance folder, which a worker's own app would not share). It must
+        be a database the workers can open, not an in-memory SQLite database.
+        """
+        now = now or datetime.utcnow()
+        if max_workers > 1 and database_uri is None:
+            database_uri = db.engine.url.render_as_string(hide_password=False)
+        started = datetime.utcnow()
+        partitions = self.partition_students(num_partitions)
+        summary = {'partitions': len(partitions), 'students': 0, 'entries': 0}
+
+        if max_workers <= 1:
+            for low, high in partitions:
+                queues = self.build_partition(low, high, now)
+                self._record(summary, low, high, queues, now)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(
+                        _build_partition_worker, database_uri, low, high, now,
+                        self.per_student_limit, self.stream_batch_size
+                    ): (low, high)
+                    for low, high in partitions
+                }
+                for future in as_completed(futures):
+                    low, high = futures[future]
+                    self._record(summary, low, high, future.result(), now)
+
+        summary['built_at'] = now.isoformat()
+        summary['elapsed_seconds'] = round((datetime.utcnow() - started).total_seconds(), 3)
+        return summary
+
+    def _record(self, summary, low, high, queues, built_at):
+        summary['students'] += len(queues)
+        summary['entries'] += self.write_partition(low, high, queues, built_at)
+
+    # --------------------------------------------------------------- serving
+
+    def get_queue(self, student_id, limit=20):
+        """
+        Precomputed queue for a student with question rows joined, or None if
+        no queue is stored for the student.
+        """
+        rows = db.session.query(ReviewQueueEntry, Question).join(
+            Question, ReviewQueueEntry.question_id == Question.id
+        ).filter(
+            ReviewQueueEntry.student_id == student_id
+        ).order_by(ReviewQueueEntry.position).limit(limit).all()
+
+        if not rows:
+            return None
+
+        return [
+            {
+                'question_id': entry.question_id,
+                'days_overdue': entry.days_overdue,
+                'easiness': entry.easiness_factor,
+                'built_at': entry.built_at,
+                'question': question
+            }
+            for entry, question in rows
+        ]
+
+
+def _build_partition_worker(database_uri, low, high, now, per_student_limit, stream_batch_size):
+    """Process pool entry point: build one partition on a private app/database binding"""
+    from flask import Flask
+    from config import Config
+
+    app = Flask('review_queue_worker')
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    db.init_app(app)
+
+    with app.app_context():
+        builder = ReviewQueueBuilder(per_student_limit, stream_batch_size)
+        try:
+            return builder.build_partition(low, high, now)
+        finally:
+            db.session.remove()
@@ -12,7 +12,9 @@ from datetime import datetime, timedelta
 from app.models.student import Student
 from app.models.session import StudentResponse
 from app.models.question import Question
+from app.models.learning_record import LearningRecord, ReviewQueueEntry
 from app import db
+from sqlalchemy import func, case
 import math
 
 
@@ -163,7 +165,8 @@ class SpacedRepetitionScheduler:
             schedule['next_easiness_factor'],
             schedule['next_repetition'],
             next_review_date,
-            quality
+            quality,
+            interval_days=schedule['next_interval_days']
         )
         
         # Determine status
@@ -184,47 +187,51 @@ class SpacedRepetitionScheduler:
             'repetition_count': schedule['next_repetition']
         }
     
-    def get_due_for_review(self, student_id):
+    def get_due_for_review(self, student_id, limit=None, now=None):
         """
         Get questions due for review for a student
         
+        Range scan on the (student_id, next_review) index, with the question
+        rows fetched in the same query.
+        
         Args:
             student_id: Student ID
+            limit: Maximum number of items to return (most overdue first)
+            now: Reference time (defaults to utcnow)
         
         Returns:
             List of questions due for review, sorted by urgency
         """
-        due_questions = []
+        now = now or datetime.utcnow()
         
-        # Get all student responses
-        responses = StudentResponse.query.filter_by(student_id=student_id).all()
+        query = db.session.query(LearningRecord, Question).join(
+            Question, LearningRecord.question_id == Question.id
+        ).filter(
+            LearningRecord.student_id == student_id,
+            LearningRecord.next_review <= now
+        ).order_by(LearningRecord.next_review)  # Oldest due date = most overdue
         
-        # Check each question's review status
-        reviewed_questions = {}
-        for response in responses:
-            if response.question_id not in reviewed_questions:
-                reviewed_questions[response.question_id] = []
-            reviewed_questions[response.question_id].append(response)
-        
-        now = datetime.utcnow()
+        if limit is not None:
+            query = query.limit(limit)
         
-        for question_id, response_list in reviewed_questions.items():
-            # Get latest learning record
-            record = self._get_learning_record(student_id, question_id)
-            
-            if record['next_review_date'] and record['next_review_date'] <= now:
-                due_questions.append({
-                    'question_id': question_id,
-                    'days_overdue': (now - record['next_review_date']).days,
-                    'interval': record['interval'],
-                    'easiness': record['easiness_factor'],
-                    'question': Question.query.get(question_id)
-                })
-        
-        # Sort by urgency (most overdue first)
-        due_questions.sort(key=lambda x: x['days_overdue'], reverse=True)
-        
-        return due_questions
+        return [
+            {
+                'question_id': record.question_id,
+                'days_overdue': (now - record.next_review).days,
+                'interval': record.interval_days,
+                'easiness': record.easiness_factor,
+                'question': question
+            }
+            for record, question in query.all()
+        ]
+    
+    def count_due(self, student_id, now=None):
+        """Number of questions due for review (index-only range count)"""
+        now = now or datetime.utcnow()
+        return db.session.query(func.count(LearningRecord.id)).filter(
+            LearningRecord.student_id == student_id,
+            LearningRecord.next_review <= now
+        ).scalar() or 0
     
     def get_learning_statistics(self, student_id):
         """
@@ -236,71 +243,93 @@ class SpacedRepetitionScheduler:
         Returns:
             Statistics including questions due, upcoming, mastered
         """
-        responses = StudentResponse.query.filter_by(student_id=student_id).all()
-        reviewed_questions = set(r.question_id for r in responses)
+        now = datetime.utcnow()
         
-        due_count = 0
-        upcoming_count = 0
-        mastered_count = 0
-        struggling_count = 0
+        # Buckets are exclusive and checked in order: struggling, mastered, due, upcoming
+        bucket = case(
+            (LearningRecord.easiness_factor < self.easiness_factor_min + 0.1, 'struggling'),
+            (LearningRecord.repetitions >= 10, 'mastered'),  # Mastered after many successful repetitions
+            (LearningRecord.next_review <= now, 'due'),
+            else_='upcoming'
+        )
+        # Retention grows with repetition count, capped at 0.95
+        retention = case(
+            (LearningRecord.repetitions * 0.02 + 0.5 > 0.95, 0.95),
+            else_=LearningRecord.repetitions * 0.02 + 0.5
+        )
         
-        now = datetime.utcnow()
+        rows = db.session.query(
+            bucket, func.count(LearningRecord.id), func.sum(retention)
+        ).filter(
+            LearningRecord.student_id == student_id
+        ).group_by(bucket).all()
         
-        for q_id in reviewed_questions:
-            record = self._get_learning_record(student_id, q_id)
-            
-            if record['easiness_factor'] < self.easiness_factor_min + 0.1:
-                struggling_count += 1
-            elif record['repetitions'] >= 10:  # Mastered after many successful repetitions
-                mastered_count += 1
-            elif record['next_review_date'] and record['next_review_date'] <= now:
-                due_count += 1
-            else:
-                upcoming_count += 1
+        counts = {name: count for name, count, _ in rows}
+        total = sum(counts.values())
+        retention_total = sum(value or 0.0 for _, _, value in rows)
         
         return {
-            'total_questions_studied': len(reviewed_questions),
-            'due_for_review': due_count,
-            'upcoming_reviews': upcoming_count,
-            'mastered': mastered_count,
-            'struggling': struggling_count,
-            'estimated_retention': self._estimate_retention(student_id, reviewed_questions)
+            'total_questions_studied': total,
+            'due_for_review': counts.get('due', 0),
+            'upcoming_reviews': counts.get('upcoming', 0),
+            'mastered': counts.get('mastered', 0),
+            'struggling': counts.get('struggling', 0),
+            'estimated_retention': round(retention_total / total, 3) if total else 0.0
         }
     
-    def _estimate_retention(self, student_id, question_ids):
-        """Estimate retention rate based on easiness factors"""
-        if not question_ids:
-            return 0.0
-        
-        total_retention = 0.0
-        for q_id in question_ids:
-            record = self._get_learning_record(student_id, q_id)
-            # Retention inversely proportional to easiness (harder to remember = lower EF)
-            # and repetition count (more practice = better retention)
-            retention = min(0.95, 0.5 + (record['repetitions'] / 20) * 0.4)
-            total_retention += retention
-        
-        return round(total_retention / len(question_ids), 3)
-    
     def _get_learning_record(self, student_id, question_id):
-        """Get or create learning record for question"""
-        # This would be stored in database in production
-        # For now, initialize with default values
+        """Get learning record for question (defaults if never reviewed)"""
+        record = LearningRecord.query.filter_by(
+            student_id=student_id, question_id=question_id
+        ).first()
+        
+        if record is None:
+            return {
+                'student_id': student_id,
+                'question_id': question_id,
+                'repetitions': 0,
+                'easiness_factor': self.easiness_factor_default,
+                'next_review_date': None,
+                'last_review_date': None,
+                'interval': 0,
+                'last_quality': None
+            }
+        
         return {
             'student_id': student_id,
             'question_id': question_id,
-            'repetitions': 0,
-            'easiness_factor': self.easiness_factor_default,
-            'next_review_date': None,
-            'last_review_date': None,
-            'interval': 0,
-            'quality_history': []
+            'repetitions': record.repetitions,
+            'easiness_factor': record.easiness_factor,
+            'next_review_date': record.next_review,
+            'last_review_date': record.last_review,
+            'interval': record.interval_days,
+            'last_quality': record.last_quality
         }
     
-    def _update_learning_record(self, student_id, question_id, ef, reps, next_review, quality):
-        """Update learning record (would store in database)"""
-        # In production, this would update database record
-        pass
+    def _update_learning_record(self, student_id, question_id, ef, reps, next_review, quality,
+                                interval_days=None):
+        """Create or update the persisted learning record"""
+        record = LearningRecord.query.filter_by(
+            student_id=student_id, question_id=question_id
+        ).first()
+        if record is None:
+            record = LearningRecord(student_id=student_id, question_id=question_id)
+            db.session.add(record)
+        
+        now = datetime.utcnow()
+        record.easiness_factor = ef
+        record.repetitions = reps
+        record.next_review = next_review
+        record.last_review = now
+        record.last_quality = quality
+        record.interval_days = interval_days if interval_days is not None \
+            else max(0, (next_review - now).days)
+        
+        # Reviewed items leave the precomputed (nightly) review queue
+        ReviewQueueEntry.query.filter_by(
+            student_id=student_id, question_id=question_id
+        ).delete(synchronize_session=False)
+        db.session.commit()
     
     def get_review_schedule_for_topic(self, student_id, topic):
         """
@@ -313,9 +342,6 @@ class SpacedRepetitionScheduler:
         Returns:
             Schedule organized by review date
         """
-        # Get all questions in topic
-        topic_questions = Question.query.filter_by(topic=topic).all()
-        
         schedule = {
             'due_today': [],
             'due_this_week': [],
@@ -325,20 +351,24 @@ class SpacedRepetitionScheduler:
         
         now = datetime.utcnow()
         
-        for question in topic_questions:
-            record = self._get_learning_record(student_id, question.id)
-            
-            if not record['next_review_date']:
-                continue
-            
-            days_until_review = (record['next_review_date'] - now).days
+        # Only questions that have been scheduled; one joined query for the topic
+        rows = db.session.query(LearningRecord, Question).join(
+            Question, LearningRecord.question_id == Question.id
+        ).filter(
+            LearningRecord.student_id == student_id,
+            Question.topic == topic,
+            LearningRecord.next_review.isnot(None)
+        ).order_by(LearningRecord.next_review).all()
+        
+        for record, question in rows:
+            days_until_review = (record.next_review - now).days
             
             item = {
                 'question_id': question.id,
                 'question_text': question.question_text[:100],
                 'days_until_review': days_until_review,
-                'interval': record['interval'],
-                'easiness': record['easiness_factor']
+                'interval': record.interval_days,
+                'easiness': record.easiness_factor
             }
             
             if days_until_review <= 0:
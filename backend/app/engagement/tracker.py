@@ -3,6 +3,7 @@ from app.models.session import StudentResponse
 from app import db
 from datetime import datetime, timedelta
 from config import Config
+from app.adaptation.facial_signal_integration import FacialDataValidator, get_facial_modifier
 
 class EngagementIndicatorTracker:
     """
@@ -148,19 +149,16 @@ class EngagementIndicatorTracker:
         # Try to enhance with facial emotion data if available
         if facial_data:
             try:
-                from app.adaptation.facial_signal_integration import FacialDataValidator
+                facial = get_facial_modifier().compiled
+                codes = facial.encode(facial_data)
                 
-                is_valid, cleaned_facial_data, validation_reason = FacialDataValidator.validate(facial_data)
-                
-                if is_valid:
-                    affective_values = FacialDataValidator.get_affective_values_from_emotion(
-                        cleaned_facial_data['emotion_detected']
-                    )
+                if codes is not None:
+                    affective_values = facial.affective_values(codes[0])
                     
                     if affective_values:
                         # Blend facial emotion with behavioral inference
                         # Facial emotion gets 50% weight, behavior gets 50%
-                        facial_weight = Config.FACIAL_EMOTION_AFFECTIVE_BLEND if hasattr(Config, 'FACIAL_EMOTION_AFFECTIVE_BLEND') else 0.5
+                        facial_weight = getattr(Config, 'FACIAL_EMOTION_AFFECTIVE_BLEND', 0.5)
                         behavior_weight = 1.0 - facial_weight
                         
                         affective_data['confidence_level'] = (
@@ -179,16 +177,14 @@ class EngagementIndicatorTracker:
                         affective_data['affective_source'] = 'facial_emotion_blended_with_behavioral'
                         affective_data['facial_emotion_available'] = True
                         affective_data['facial_emotion_used'] = True
-                        affective_data['facial_emotion_detected'] = cleaned_facial_data['emotion_detected']
-                        affective_data['facial_emotion_confidence'] = cleaned_facial_data['emotion_confidence']
+                        affective_data['facial_emotion_detected'] = facial.emotions[codes[0]]
+                        affective_data['facial_emotion_confidence'] = codes[1]
                 else:
-                    # Facial data invalid but behavioral inference still works
+                    # Facial data invalid but behavioral inference still works;
+                    # the validator is only consulted to explain the rejection
                     affective_data['facial_emotion_available'] = True
-                    affective_data['facial_emotion_validation_error'] = validation_reason
+                    affective_data['facial_emotion_validation_error'] = FacialDataValidator.validate(facial_data)[2]
             
-            except ImportError:
-                # Facial integration module not available
-                affective_data['facial_integration_error'] = 'FacialSignalIntegration module not available'
             except Exception as e:
                 # Other errors - log but continue with behavioral inference
                 affective_data['facial_integration_error'] = str(e)
@@ -4,16 +4,26 @@
 import csv
 import json
 import os
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
+from app.logging.sinks import EngagementLogSinks
+
 
 class EngagementLogEntry:
     """
     Single log entry: per-question record of complete adaptive system state.
+    Slotted: the logger keeps one per question until export.
     """
     
+    __slots__ = (
+        'session_id', 'question_number', 'timestamp',
+        'question_id', 'question_difficulty', 'response_correctness', 'response_time_seconds',
+        'indicators', 'fused_engagement', 'adaptation_decision', 'resulting_difficulty'
+    )
+    
     def __init__(self, session_id: str, question_number: int = 0):
         self.session_id = session_id
         self.question_number = question_number
@@ -134,8 +144,18 @@ class EngagementLogEntry:
 class WindowLogEntry:
     """
     Summary log entry: per-window aggregate of engagement and performance.
+    Slotted, like EngagementLogEntry.
     """
     
+    __slots__ = (
+        'session_id', 'window_number', 'timestamp',
+        'window_size', 'correct_count', 'incorrect_count', 'accuracy', 'avg_response_time',
+        'avg_engagement_score', 'avg_behavioral_score', 'avg_cognitive_score', 'avg_affective_score',
+        'dominant_engagement_state', 'primary_driver_summary',
+        'difficulty_at_start', 'difficulty_at_end', 'total_difficulty_change',
+        'decisions_count', 'increase_count', 'decrease_count', 'maintain_count'
+    )
+    
     def __init__(self, session_id: str, window_number: int):
         self.session_id = session_id
         self.window_number = window_number
@@ -210,22 +230,56 @@ class EngagementLogger:
     """
     Comprehensive logging system for adaptive tutoring system.
     Records per-question and per-window logs in CSV and JSON formats.
+    
+    Two modes:
+    - default: entries are kept in memory and written per session by
+      export_to_csv / export_to_json / export_all
+    - streaming (sinks=EngagementLogSinks(...)): each entry is appended to
+      the shared rotating sinks as it is logged and only the last tail_size
+      entries stay in memory
+    Statistics are running totals, so they cover every logged entry in both modes.
     """
     
-    def __init__(self, session_id: str, output_dir: str = None):
+    DEFAULT_TAIL_SIZE = 100
+    
+    def __init__(self, session_id: str, output_dir: str = None,
+                 sinks: Optional[EngagementLogSinks] = None, tail_size: int = None):
         self.session_id = session_id
-        self.output_dir = output_dir or "/tmp/engagement_logs"
+        self.sinks = sinks
+        self.output_dir = output_dir or (sinks.output_dir if sinks else "/tmp/engagement_logs")
         
         # Create output directory
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
         
-        # Storage
-        self.question_logs: List[EngagementLogEntry] = []
-        self.window_logs: List[WindowLogEntry] = []
+        # Storage (a bounded tail when streaming)
+        if self.streaming:
+            tail_size = tail_size or self.DEFAULT_TAIL_SIZE
+            self.question_logs = deque(maxlen=tail_size)
+            self.window_logs = deque(maxlen=tail_size)
+        else:
+            self.question_logs: List[EngagementLogEntry] = []
+            self.window_logs: List[WindowLogEntry] = []
         
         # Current window tracking
         self.current_window_number = 0
-        self.current_window_questions: List[EngagementLogEntry] = []
+        self._window_actions = {'decisions': 0, 'increase': 0, 'decrease': 0, 'maintain': 0}
+        
+        # Running statistics
+        self.question_count = 0
+        self.window_count = 0
+        self._correct_count = 0
+        self._response_time_sum = 0
+        self._response_time_count = 0
+        self._engagement_sum = 0
+        self._engagement_count = 0
+        self._first_difficulty = None
+        self._last_difficulty = None
+        self._min_difficulty = None
+        self._max_difficulty = None
+    
+    @property
+    def streaming(self) -> bool:
+        return self.sinks is not None
     
     def log_question(self,
                      question_id: str,
@@ -240,7 +294,7 @@ class EngagementLogger:
         Log a single question's complete adaptive system state.
         """
         
-        entry = EngagementLogEntry(self.session_id, len(self.question_logs) + 1)
+        entry = EngagementLogEntry(self.session_id, self.question_count + 1)
         
         # Fill in all fields
         entry.question_id = question_id
@@ -254,10 +308,42 @@ class EngagementLogger:
         
         # Store
         self.question_logs.append(entry)
-        self.current_window_questions.append(entry)
+        self._count_question(entry)
+        if self.streaming:
+            self.sinks.questions.write(entry.to_dict())
         
         return entry
     
+    def _count_question(self, entry: EngagementLogEntry):
+        """Update running statistics and the current window's decision counts."""
+        self.question_count += 1
+        if entry.response_correctness:
+            self._correct_count += 1
+        if entry.response_time_seconds:
+            self._response_time_sum += entry.response_time_seconds
+            self._response_time_count += 1
+        if entry.fused_engagement:
+            self._engagement_sum += entry.fused_engagement.engagement_score
+            self._engagement_count += 1
+        
+        difficulty = entry.resulting_difficulty
+        if difficulty is not None:
+            if self._first_difficulty is None:
+                self._first_difficulty = self._min_difficulty = self._max_difficulty = difficulty
+            self._last_difficulty = difficulty
+            self._min_difficulty = min(self._min_difficulty, difficulty)
+            self._max_difficulty = max(self._max_difficulty, difficulty)
+        
+        self._window_actions['decisions'] += 1
+        if entry.adaptation_decision:
+            action = entry.adaptation_decision.primary_action.value
+            if 'increase' in action:
+                self._window_actions['increase'] += 1
+            elif 'decrease' in action:
+                self._window_actions['decrease'] += 1
+            elif 'maintain' in action:
+                self._window_actions['maintain'] += 1
+    
     def log_window_summary(self,
                           window_number: int,
                           correct_count: int,
@@ -294,19 +380,16 @@ class EngagementLogger:
         entry.total_difficulty_change = difficulty_at_end - difficulty_at_start
         
         # Count decisions
-        entry.decisions_count = len(self.current_window_questions)
-        for q_log in self.current_window_questions:
-            if q_log.adaptation_decision:
-                action = q_log.adaptation_decision.primary_action.value
-                if 'increase' in action:
-                    entry.increase_count += 1
-                elif 'decrease' in action:
-                    entry.decrease_count += 1
-                elif 'maintain' in action:
-                    entry.maintain_count += 1
+        entry.decisions_count = self._window_actions['decisions']
+        entry.increase_count = self._window_actions['increase']
+        entry.decrease_count = self._window_actions['decrease']
+        entry.maintain_count = self._window_actions['maintain']
         
         self.window_logs.append(entry)
-        self.current_window_questions = []
+        self.window_count += 1
+        if self.streaming:
+            self.sinks.windows.write(entry.to_dict())
+        self._window_actions = {'decisions': 0, 'increase': 0, 'decrease': 0, 'maintain': 0}
         self.current_window_number += 1
     
     def export_to_csv(self, include_questions: bool = True, include_windows: bool = True):
@@ -314,6 +397,11 @@ class EngagementLogger:
         Export logs to CSV files.
         """
         
+        if self.streaming:
+            # Entries were written as they were logged
+            self.sinks.flush()
+            return
+        
         if include_questions and self.question_logs:
             csv_path = os.path.join(
                 self.output_dir,
@@ -352,6 +440,11 @@ class EngagementLogger:
         Export logs to JSON files.
         """
         
+        if self.streaming:
+            # Entries were written as they were logged
+            self.sinks.flush()
+            return
+        
         if include_questions and self.question_logs:
             json_path = os.path.join(
                 self.output_dir,
@@ -398,37 +491,32 @@ class EngagementLogger:
         Get aggregate statistics for thesis evaluation.
         """
         
-        if not self.question_logs:
+        if not self.question_count:
             return {}
         
         # Question-level stats
-        total_questions = len(self.question_logs)
-        correct = sum(1 for q in self.question_logs if q.response_correctness)
-        accuracy = correct / total_questions if total_questions > 0 else 0
-        
-        response_times = [q.response_time_seconds for q in self.question_logs 
-                         if q.response_time_seconds]
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+        total_questions = self.question_count
+        accuracy = self._correct_count / total_questions
+        avg_response_time = (self._response_time_sum / self._response_time_count
+                             if self._response_time_count else 0)
         
         # Engagement stats
-        engagement_scores = [q.fused_engagement.engagement_score for q in self.question_logs 
-                            if q.fused_engagement]
-        avg_engagement = sum(engagement_scores) / len(engagement_scores) if engagement_scores else 0
+        avg_engagement = self._engagement_sum / self._engagement_count if self._engagement_count else 0
         
         # Difficulty stats
-        difficulties = [q.resulting_difficulty for q in self.question_logs 
-                       if q.resulting_difficulty is not None]
+        has_difficulty = self._first_difficulty is not None
         
         return {
             'total_questions': total_questions,
-            'total_windows': len(self.window_logs),
+            'total_windows': self.window_count,
             'accuracy': round(accuracy, 4),
             'avg_response_time': round(avg_response_time, 2),
             'avg_engagement_score': round(avg_engagement, 4),
-            'min_difficulty': round(min(difficulties), 3) if difficulties else None,
-            'max_difficulty': round(max(difficulties), 3) if difficulties else None,
-            'final_difficulty': round(difficulties[-1], 3) if difficulties else None,
-            'difficulty_delta': round(difficulties[-1] - difficulties[0], 3) if difficulties else None
+            'min_difficulty': round(self._min_difficulty, 3) if has_difficulty else None,
+            'max_difficulty': round(self._max_difficulty, 3) if has_difficulty else None,
+            'final_difficulty': round(self._last_difficulty, 3) if has_difficulty else None,
+            'difficulty_delta': (round(self._last_difficulty - self._first_difficulty, 3)
+                                 if has_difficulty else None)
         }
     
     def print_summary(self):
@@ -0,0 +1,167 @@
+# Streaming Log Sinks
+# Append-only, size-rotated JSONL/CSV files shared by many EngagementLogger sessions
+
+import atexit
+import csv
+import gzip
+import io
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+class RotatingLogSink:
+    """
+    Buffered append-only sink for one record kind (e.g. question logs).
+
+    Records from every session go to the same file, one JSON object per line
+    (jsonl) or one CSV row (csv, header per file). When a file has received
+    max_bytes (uncompressed) it is closed and a new one is started:
+        {kind}-{started}-{pid}-{token}-{seq:04d}.{jsonl|csv}[.gz]
+    The pid keeps files from concurrent worker processes apart and the random
+    per-sink token keeps sinks of one process apart; files are created
+    exclusively, so an existing file is never truncated. A sink inherited
+    through fork drops the parent's open file and starts its own.
+    """
+
+    FORMATS = ('jsonl', 'csv')
+
+    def __init__(self, output_dir: str, kind: str, fmt: str = 'jsonl',
+                 max_bytes: int = 64 * 1024 * 1024, compress: bool = False,
+                 buffer_size: int = 256 * 1024):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported log format '{fmt}' (expected one of {self.FORMATS})")
+
+        self.output_dir = output_dir
+        self.kind = kind
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.buffer_size = buffer_size
+
+        self.started = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        self.token = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self.records_written = 0
+        self.files_written = []
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._csv_writer = None
+        self._bytes_in_file = 0
+        self._pid = os.getpid()
+
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+
+    @property
+    def current_path(self) -> Optional[str]:
+        return self.files_written[-1] if self._file is not None else None
+
+    def write(self, record: Dict[str, Any]):
+        """Append one record, rotating first if the current file is full."""
+        self._check_fork()
+        with self._lock:
+            if self._file is None or self._bytes_in_file >= self.max_bytes:
+                self._rotate(record)
+
+            if self.fmt == 'jsonl':
+                line = json.dumps(record) + '\n'
+            else:
+                line = self._csv_line(record)
+            self._file.write(line)
+            self._bytes_in_file += len(line)
+            self.records_written += 1
+
+    def _csv_line(self, record):
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=self._csv_fields, extrasaction='ignore').writerow(record)
+        return buffer.getvalue()
+
+    def _rotate(self, record):
+        self._close_file()
+        self.sequence += 1
+
+        suffix = self.fmt + ('.gz' if self.compress else '')
+        path = os.path.join(
+            self.output_dir,
+            f"{self.kind}-{self.started}-{self._pid}-{self.token}-{self.sequence:04d}.{suffix}"
+        )
+        if self.compress:
+            self._file = io.TextIOWrapper(
+                io.BufferedWriter(gzip.open(path, 'xb'), buffer_size=self.buffer_size),
+                encoding='utf-8', newline=''
+            )
+        else:
+            self._file = open(path, 'x', buffering=self.buffer_size, encoding='utf-8', newline='')
+        self._bytes_in_file = 0
+        self.files_written.append(path)
+
+        if self.fmt == 'csv':
+            # Header per file, from the first record written to it
+            self._csv_fields = sorted(record.keys())
+            header = io.StringIO()
+            csv.writer(header).writerow(self._csv_fields)
+            self._file.write(header.getvalue())
+            self._bytes_in_file += len(header.getvalue())
+
+    def _check_fork(self):
+        """In a forked child, abandon the parent's file so the next write opens a new one."""
+        if self._pid == os.getpid():
+            return
+        # The parent may have held the lock while forking
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        if self._file is not None:
+            # Point the inherited descriptor at /dev/null so closing it cannot write
+            # the parent's buffered records (or a gzip trailer) into the parent's file
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            try:
+                os.dup2(devnull, self._file.fileno())
+            finally:
+                os.close(devnull)
+            self._close_file()
+        self.files_written = []
+        self.records_written = 0
+
+    def flush(self):
+        self._check_fork()
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        self._check_fork()
+        with self._lock:
+            self._close_file()
+
+
+class EngagementLogSinks:
+    """
+    Question and window sinks shared by every EngagementLogger in a process.
+    Pass one instance as EngagementLogger(..., sinks=sinks) to enable streaming.
+    Sinks are flushed and closed at interpreter exit.
+    """
+
+    def __init__(self, output_dir: str = None, fmt: str = 'jsonl',
+                 max_bytes: int = 64 * 1024 * 1024, compress: bool = False):
+        self.output_dir = output_dir or "/tmp/engagement_logs"
+        self.questions = RotatingLogSink(self.output_dir, 'questions', fmt, max_bytes, compress)
+        self.windows = RotatingLogSink(self.output_dir, 'windows', fmt, max_bytes, compress)
+        atexit.register(self.close)
+
+    def flush(self):
+        self.questions.flush()
+        self.windows.flush()
+
+    def close(self):
+        self.questions.close()
+        self.windows.close()
@@ -1,8 +1,10 @@
 from app.models.student import Student
 from app.models.question import Question, QuestionDifficulty
 from app.models.session import Session, StudentResponse
-from app.models.engagement import EngagementMetric
-from app.models.adaptation import AdaptationLog
+from app.models.engagement import EngagementMetric, AffectiveBucket
+from app.models.adaptation import AdaptationLog, JobWatermark
+from app.models.knowledge import KnowledgeState, BKTParameters
+from app.models.learning_record import LearningRecord, ReviewQueueEntry
 
 __all__ = [
     'Student',
@@ -11,5 +13,11 @@ __all__ = [
     'Session',
     'StudentResponse',
     'EngagementMetric',
-    'AdaptationLog'
+    'AffectiveBucket',
+    'AdaptationLog',
+    'JobWatermark',
+    'KnowledgeState',
+    'BKTParameters',
+    'LearningRecord',
+    'ReviewQueueEntry'
 ]
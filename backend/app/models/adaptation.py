@@ -9,7 +9,7 @@ class AdaptationLog(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     student_id = db.Column(db.String(36), db.ForeignKey('students.id'), nullable=False, index=True)
     session_id = db.Column(db.String(36), db.ForeignKey('sessions.id'), nullable=False, index=True)
-    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     
     # Trigger information
     trigger_metric = db.Column(db.String(120), nullable=False)  # Which metric triggered adaptation
@@ -42,3 +42,23 @@ class AdaptationLog(db.Model):
             'was_effective': self.was_effective,
             'effectiveness_notes': self.effectiveness_notes
         }
+
+
+class JobWatermark(db.Model):
+    """High-water mark of an incremental background job (last processed row)"""
+    __tablename__ = 'job_watermarks'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    last_timestamp = db.Column(db.DateTime, nullable=True)
+    last_id = db.Column(db.String(36), nullable=True)
+    processed_count = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp else None,
+            'last_id': self.last_id,
+            'processed_count': self.processed_count,
+            'updated_at': self.updated_at.isoformat()
+        }
@@ -58,3 +58,52 @@ class EngagementMetric(db.Model):
             'engagement_score': self.engagement_score,
             'engagement_level': self.engagement_level
         }
+
+
+class AffectiveBucket(db.Model):
+    """
+    Per-session, time-bucketed aggregate of affective observations
+    (facial expression, gaze or posture) with one row per bucket x kind x label
+    """
+    __tablename__ = 'affective_buckets'
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'bucket_start', 'kind', 'label', name='uq_affective_bucket'),
+        # Windowed summaries are range scans on (session_id, bucket_start)
+        db.Index('ix_affective_buckets_session_bucket', 'session_id', 'bucket_start'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Not foreign keys: clients may report for anonymous students
+    student_id = db.Column(db.String(36), nullable=True, index=True)
+    session_id = db.Column(db.String(36), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    
+    kind = db.Column(db.String(20), nullable=False)   # facial_expression, gaze_tracking, posture_analysis
+    label = db.Column(db.String(30), nullable=False)  # emotion, gaze pattern or posture type
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Sums of the inferred values (divide by count for means)
+    detection_confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+    frustration_sum = db.Column(db.Float, nullable=False, default=0.0)
+    interest_sum = db.Column(db.Float, nullable=False, default=0.0)
+    attention_sum = db.Column(db.Float, nullable=False, default=0.0)
+    engagement_sum = db.Column(db.Float, nullable=False, default=0.0)
+    duration_sum = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'student_id': self.student_id,
+            'bucket_start': self.bucket_start.isoformat(),
+            'kind': self.kind,
+            'label': self.label,
+            'count': self.count,
+            'detection_confidence_sum': self.detection_confidence_sum,
+            'confidence_sum': self.confidence_sum,
+            'frustration_sum': self.frustration_sum,
+            'interest_sum': self.interest_sum,
+            'attention_sum': self.attention_sum,
+            'engagement_sum': self.engagement_sum,
+            'duration_sum': self.duration_sum
+        }
@@ -0,0 +1,62 @@
+from app import db
+from datetime import datetime
+import uuid
+
+class KnowledgeState(db.Model):
+    """Bayesian Knowledge Tracing state for one student x topic pair"""
+    __tablename__ = 'knowledge_states'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'topic', name='uq_knowledge_state_student_topic'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    student_id = db.Column(db.String(36), db.ForeignKey('students.id'), nullable=False, index=True)
+    topic = db.Column(db.String(120), nullable=False)
+
+    # P(skill known) after the latest observed response
+    p_known = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Observation counts
+    attempts = db.Column(db.Integer, default=0)
+    correct = db.Column(db.Integer, default=0)
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'student_id': self.student_id,
+            'topic': self.topic,
+            'p_known': self.p_known,
+            'attempts': self.attempts,
+            'correct': self.correct,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class BKTParameters(db.Model):
+    """Fitted Bayesian Knowledge Tracing parameters for a topic"""
+    __tablename__ = 'bkt_parameters'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    topic = db.Column(db.String(120), unique=True, nullable=False, index=True)
+
+    p_init = db.Column(db.Float, nullable=False)   # P(L0): known before first attempt
+    p_learn = db.Column(db.Float, nullable=False)  # P(T): unknown -> known after an attempt
+    p_slip = db.Column(db.Float, nullable=False)   # P(S): wrong although known
+    p_guess = db.Column(db.Float, nullable=False)  # P(G): correct although unknown
+
+    # Fit metadata
+    observations = db.Column(db.Integer, default=0)
+    log_likelihood = db.Column(db.Float, nullable=True)
+    fitted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'topic': self.topic,
+            'p_init': self.p_init,
+            'p_learn': self.p_learn,
+            'p_slip': self.p_slip,
+            'p_guess': self.p_guess,
+            'observations': self.observations,
+            'log_likelihood': self.log_likelihood,
+            'fitted_at': self.fitted_at.isoformat() if self.fitted_at else None
+        }
@@ -0,0 +1,66 @@
+from app import db
+from datetime import datetime
+import uuid
+
+class LearningRecord(db.Model):
+    """SuperMemo-2 spaced repetition state for one student x question pair"""
+    __tablename__ = 'learning_records'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'question_id', name='uq_learning_record_student_question'),
+        # Due-queue lookups are range scans on (student_id, next_review)
+        db.Index('ix_learning_records_student_next_review', 'student_id', 'next_review'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    student_id = db.Column(db.String(36), db.ForeignKey('students.id'), nullable=False)
+    question_id = db.Column(db.String(36), db.ForeignKey('questions.id'), nullable=False)
+
+    # SM-2 state
+    easiness_factor = db.Column(db.Float, nullable=False, default=2.5)
+    repetitions = db.Column(db.Integer, nullable=False, default=0)
+    interval_days = db.Column(db.Integer, nullable=False, default=0)
+
+    # Scheduling
+    next_review = db.Column(db.DateTime, nullable=True)
+    last_review = db.Column(db.DateTime, nullable=True)
+    last_quality = db.Column(db.Integer, nullable=True)
+
+    def to_dict(self):
+        return {
+            'student_id': self.student_id,
+            'question_id': self.question_id,
+            'easiness_factor': self.easiness_factor,
+            'repetitions': self.repetitions,
+            'interval_days': self.interval_days,
+            'next_review': self.next_review.isoformat() if self.next_review else None,
+            'last_review': self.last_review.isoformat() if self.last_review else None,
+            'last_quality': self.last_quality
+        }
+
+class ReviewQueueEntry(db.Model):
+    """Precomputed review queue slot, rebuilt in bulk by the nightly review-queue job"""
+    __tablename__ = 'review_queue'
+    __table_args__ = (
+        db.Index('ix_review_queue_student_position', 'student_id', 'position'),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    student_id = db.Column(db.String(36), db.ForeignKey('students.id'), nullable=False)
+    question_id = db.Column(db.String(36), db.ForeignKey('questions.id'), nullable=False)
+
+    # 0 = review first (most overdue, then lowest easiness factor)
+    position = db.Column(db.Integer, nullable=False)
+    days_overdue = db.Column(db.Integer, nullable=False, default=0)
+    easiness_factor = db.Column(db.Float, nullable=False)
+
+    built_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'student_id': self.student_id,
+            'question_id': self.question_id,
+            'position': self.position,
+            'days_overdue': self.days_overdue,
+            'easiness_factor': self.easiness_factor,
+            'built_at': self.built_at.isoformat() if self.built_at else None
+        }
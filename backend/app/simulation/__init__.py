@@ -0,0 +1,4 @@
+# Simulation module initialization
+from app.simulation.headless import HeadlessEngine, Learner, ProfileLearner
+
+__all__ = ['HeadlessEngine', 'Learner', 'ProfileLearner']
@@ -0,0 +1,286 @@
+"""
+Headless Engine
+In-process facade over CBTSystem, EngagementIndicatorTracker and AdaptiveEngine
+for simulations and replays.
+
+Sessions run directly against the production services on an in-memory (or
+ephemeral file) SQLite store, with no HTTP server and no request handling.
+Flask-SQLAlchemy models need an application context, so the engine owns a bare
+Flask app with no blueprints registered purely to hold the database binding.
+
+Simulated learners plug in through the small `Learner` protocol:
+
+    engine = HeadlessEngine()
+    engine.seed_synthetic_questions('Simulation')
+    trace = engine.run_session(ProfileLearner('L-001', profile), 'Simulation', num_questions=10)
+"""
+
+import contextlib
+import os
+import random
+from typing import Dict, List, Protocol, runtime_checkable
+
+from flask import Flask
+
+from app import db
+from app.models.student import Student
+from app.models.question import Question
+from app.cbt.system import CBTSystem
+from app.cbt.question_cache import question_payload_cache
+
+
+# Keyword arguments a Learner may return that are forwarded to CBTSystem.submit_response
+SUBMIT_FIELDS = (
+    'initial_option', 'final_option', 'option_change_count', 'option_change_history',
+    'navigation_frequency', 'interaction_start_timestamp', 'submission_timestamp',
+    'submission_iso_timestamp', 'time_spent_per_question', 'inactivity_duration_ms',
+    'question_index', 'hesitation_flags', 'navigation_pattern', 'facial_metrics',
+    'hints_used_array'
+)
+
+
+@runtime_checkable
+class Learner(Protocol):
+    """
+    A simulated learner.
+
+    respond() receives the client question payload (as served to real students),
+    the correct option (so the simulator can decide correctness), and the
+    current session state. It returns at least 'student_answer' and
+    'response_time_seconds'; any SUBMIT_FIELDS keys are passed through to
+    CBTSystem.submit_response.
+    """
+    learner_id: str
+
+    def respond(self, question: Dict, correct_option: str, state: Dict) -> Dict:
+        ...
+
+
+class ProfileLearner:
+    """
+    Learner driven by a profile with accuracy/response-time/hint/option-change
+    parameters (e.g. LearnerProfile from data/standalone_simulator.py).
+    Accuracy falls off as question difficulty exceeds the learner's ability.
+    """
+
+    def __init__(self, learner_id, profile, rng=None):
+        self.learner_id = learner_id
+        self.profile = profile
+        self.rng = rng or random.Random()
+
+    def respond(self, question, correct_option, state):
+        profile = self.profile
+        rng = self.rng
+
+        response_time = max(2.0, rng.gauss(profile.response_time_mean, profile.response_time_std))
+
+        difficulty_gap = question['difficulty'] - profile.accuracy_mean
+        p_correct = profile.accuracy_mean - max(difficulty_gap, 0) * 0.5 + rng.gauss(0, profile.accuracy_std)
+        p_correct = max(0.05, min(0.98, p_correct))
+
+        if rng.random() < p_correct:
+            answer = correct_option
+        else:
+            answer = rng.choice([o for o in 'ABCD' if o != correct_option])
+
+        option_changes = rng.randint(1, 3) if rng.random() < profile.option_changes_probability else 0
+        hints = []
+        if question.get('hints_available') and rng.random() < profile.hint_usage_probability:
+            hints = [{'hint_index': 0, 'timestamp': state['question_number']}]
+
+        return {
+            'student_answer': answer,
+            'response_time_seconds': round(response_time, 2),
+            'time_spent_per_question': round(response_time, 2),
+            'option_change_count': option_changes,
+            'hints_used_array': hints,
+            'question_index': state['question_number'] - 1
+        }
+
+
+class _StaticDifficultyEngine:
+    """Stand-in for AdaptiveEngine in the non-adaptive condition"""
+
+    def adapt_difficulty(self, student_id, session_id, engagement_metric):
+        return {
+            'adapted': False,
+            'reason': 'Non-adaptive condition: difficulty held constant'
+        }
+
+
+class HeadlessEngine:
+    """
+    Runs complete CBT sessions in-process using the production services.
+    """
+
+    def __init__(self, database_uri='sqlite://', adaptive=True, quiet=True):
+        from config import TestingConfig
+
+        self.app = Flask('headless_engine')
+        self.app.config.from_object(TestingConfig)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+        db.init_app(self.app)
+
+        self._ctx = self.app.app_context()
+        self._ctx.push()
+        db.create_all()
+
+        self.cbt = CBTSystem()
+        self._adaptive_engine = self.cbt.adaptive_engine
+        self._static_engine = _StaticDifficultyEngine()
+        self.adaptive = adaptive
+        self.quiet = quiet
+
+        self._answer_key = {}
+        self._devnull = open(os.devnull, 'w') if quiet else None
+
+    # ---------------------------------------------------------------- setup
+
+    def load_questions(self, questions):
+        """
+        Add questions (dicts of Question columns or Question instances).
+        Returns the number of questions added.
+        """
+        rows = [q if isinstance(q, Question) else Question(**q) for q in questions]
+        db.session.add_all(rows)
+        db.session.commit()
+
+        question_payload_cache.warm(rows)
+        for row in rows:
+            self._answer_key[row.id] = row.correct_option
+        return len(rows)
+
+    def seed_synthetic_questions(self, subject='Simulation', per_difficulty=30,
+                                 difficulties=(0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8), seed=0):
+        """Create a synthetic question bank spread across difficulty levels"""
+        rng = random.Random(seed)
+        questions = []
+        for difficulty in difficulties:
+            for i in range(per_difficulty):
+                questions.append({
+                    'subject': subject,
+                    'topic': f'Level {difficulty:.1f}',
+                    'difficulty': difficulty,
+                    'question_text': f'Synthetic question {i + 1} at difficulty {difficulty:.1f}',
+                    'option_a': 'Option A',
+                    'option_b': 'Option B',
+                    'option_c': 'Option C',
+                    'option_d': 'Option D',
+                    'correct_option': rng.choice('ABCD'),
+                    'explanation': 'Synthetic item',
+                    'hints': ['Synthetic hint']
+                })
+        return self.load_questions(questions)
+
+    def create_student(self, learner_id, preferred_difficulty=0.5):
+        """Create (or reuse) the Student row backing a simulated learner"""
+        email = f'{learner_id}@simulation.local'
+        student = Student.query.filter_by(email=email).first()
+        if not student:
+            student = Student(email=email, name=learner_id, preferred_difficulty=preferred_difficulty)
+            db.session.add(student)
+            db.session.commit()
+        return student.id
+
+    # ------------------------------------------------------------- sessions
+
+    def run_session(self, learner, subject, num_questions=10, adaptive=None,
+                    preferred_difficulty=0.5):
+        """
+        Run one complete session for a learner.
+        Returns a trace dict with per-question interactions and the final summary.
+        """
+        adaptive = self.adaptive if adaptive is None else adaptive
+        self.cbt.adaptive_engine = self._adaptive_engine if adaptive else self._static_engine
+
+        with self._output():
+            student_id = self.create_student(learner.learner_id, preferred_difficulty)
+            session = self.cbt.start_session(student_id, subject, num_questions)
+            if isinstance(session, tuple):
+                return {'learner_id': learner.learner_id, 'error': session[0].get('error')}
+
+            session_id = session['session_id']
+            question = self.cbt.get_next_question(session_id)
+            interactions = []
+
+            while isinstance(question, dict) and 'question_id' in question:
+                question_number = len(interactions) + 1
+                difficulty_before = session['current_difficulty'] if not interactions \
+                    else interactions[-1]['difficulty_after']
+
+                reply = learner.respond(question, self._correct_option(question['question_id']), {
+                    'question_number': question_number,
+                    'current_difficulty': difficulty_before,
+                    'last_result': interactions[-1] if interactions else None
+                })
+                submit_kwargs = {k: v for k, v in reply.items() if k in SUBMIT_FIELDS}
+
+                result = self.cbt.submit_response(
+                    session_id, question['question_id'],
+                    reply['student_answer'], reply.get('response_time_seconds', 0),
+                    include_next_question=True,
+                    **submit_kwargs
+                )
+                if isinstance(result, tuple):
+                    break
+
+                interactions.append({
+                    'question_number': question_number,
+                    'question_id': question['question_id'],
+                    'question_difficulty': question['difficulty'],
+                    'response_time_seconds': reply.get('response_time_seconds', 0),
+                    'is_correct': result['is_correct'],
+                    'engagement_score': result['engagement_score'],
+                    'engagement_level': result['engagement_level'],
+                    'difficulty_before': difficulty_before,
+                    'difficulty_after': result['current_difficulty']
+                })
+                question = result.get('next_question')
+
+            summary = self.cbt.end_session(session_id)
+
+        return {
+            'learner_id': learner.learner_id,
+            'student_id': student_id,
+            'session_id': session_id,
+            'condition': 'adaptive' if adaptive else 'non-adaptive',
+            'interactions': interactions,
+            'final_score': summary['final_score'],
+            'correct_answers': summary['correct_answers'],
+            'final_difficulty': interactions[-1]['difficulty_after'] if interactions else session['current_difficulty']
+        }
+
+    def run_sessions(self, learners, subject, num_questions=10, adaptive=None) -> List[Dict]:
+        """Run one session per learner, in order"""
+        return [self.run_session(learner, subject, num_questions, adaptive) for learner in learners]
+
+    # -------------------------------------------------------------- helpers
+
+    def _correct_option(self, question_id):
+        correct = self._answer_key.get(question_id)
+        if correct is None:
+            correct = Question.query.get(question_id).correct_option
+            self._answer_key[question_id] = correct
+        return correct
+
+    def _output(self):
+        """Silence the services' debug prints when running quietly"""
+        if self._devnull is not None:
+            return contextlib.redirect_stdout(self._devnull)
+        return contextlib.nullcontext()
+
+    def close(self):
+        """Release the database session and application context"""
+        db.session.remove()
+        self._ctx.pop()
+        if self._devnull is not None:
+            self._devnull.close()
+            self._devnull = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
@@ -26,7 +26,30 @@ class Config:
         'max_difficulty': 0.9,
         'difficulty_step': 0.1,
         'max_retries': 3,
-        'hint_threshold': 0.5
+        'hint_threshold': 0.5,
+        'adapt_every_n_answers': 3     # Difficulty adapts on every Nth answer, from the last N
+    }
+    
+    # Adaptation effectiveness labeling (see app/adaptation/effectiveness.py)
+    EFFECTIVENESS_LABELING = {
+        'window_responses': 3,         # Responses compared before/after each adaptation
+        'settle_seconds': 300,         # Logs younger than this are left for the next run
+        'final_after_seconds': 86400,  # Labels of unfinished sessions are redone until this old
+        'min_improvement': 0.0,        # Accuracy + engagement change needed to count as effective
+        'batch_size': 500
+    }
+    
+    # Seconds a worker serves a cached question payload before re-reading the row,
+    # bounding staleness after edits made by other processes (app/cbt/question_cache.py)
+    QUESTION_CACHE_TTL_SECONDS = 60
+    
+    # Bayesian Knowledge Tracing defaults (used until a topic is fitted)
+    BKT_DEFAULTS = {
+        'p_init': 0.3,
+        'p_learn': 0.1,
+        'p_slip': 0.1,
+        'p_guess': 0.2,
+        'mastery_threshold': 0.95
     }
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Commit benchmark: adaptation recommendations via the four per-policy
+adapt_* calls vs the unified AdaptiveEngine.decide (one flush).
+Uses a throwaway SQLite database; the application database is not touched.
+Run from backend directory: python scripts/benchmark_adaptation_commits.py --sessions 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import create_app, db
+from app.adaptation.engine import AdaptiveEngine
+from app.models import EngagementMetric, Session, Student
+
+
+def seed(count, prefix):
+    """Sessions whose latest metric triggers difficulty, pacing and hint adaptations"""
+    contexts = []
+    for i in range(count):
+        student = Student(email=f'{prefix}-{i}@example.com', name=f'Bench {i}')
+        db.session.add(student)
+        db.session.flush()
+        session = Session(student_id=student.id, subject='Mathematics', current_difficulty=0.5)
+        db.session.add(session)
+        db.session.flush()
+        metric = EngagementMetric(
+            student_id=student.id, session_id=session.id, response_time_seconds=1.0,
+            accuracy=0.0, learning_progress=0.1, completion_rate=0.2, confidence_level=0.2,
+            frustration_level=0.8, interest_level=0.3, engagement_score=0.4, engagement_level='low'
+        )
+        db.session.add(metric)
+        contexts.append((student.id, session.id, metric))
+    db.session.commit()
+    return contexts
+
+
+def per_policy(engine, student_id, session_id, metric):
+    engine.adapt_difficulty(student_id, session_id, metric)
+    engine.adapt_pacing(student_id, session_id, metric)
+    engine.adapt_hint_frequency(student_id, session_id, metric)
+    engine.adapt_content_selection(student_id, session_id, metric)
+
+
+def unified(engine, student_id, session_id, metric):
+    engine.decide(student_id, db.session.get(Session, session_id), metric)
+
+
+def measure(label, run, contexts):
+    engine = AdaptiveEngine()
+    counts = {'commits': 0, 'statements': 0}
+
+    def on_commit(session):
+        counts['commits'] += 1
+
+    def on_statement(conn, cursor, statement, *args):
+        counts['statements'] += 1
+
+    event.listen(db.session, 'after_commit', on_commit)
+    event.listen(db.engine, 'before_cursor_execute', on_statement)
+    started = time.perf_counter()
+    try:
+        for context in contexts:
+            run(engine, *context)
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(db.session, 'after_commit', on_commit)
+        event.remove(db.engine, 'before_cursor_execute', on_statement)
+
+    n = len(contexts)
+    print(f"{label:<12} {counts['commits'] / n:>8.2f} {counts['statements'] / n:>11.2f} "
+          f"{elapsed / n * 1000:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Adaptation commit benchmark')
+    parser.add_argument('--sessions', type=int, default=200)
+    args = parser.parse_args()
+
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    try:
+        with app.app_context():
+            db.create_all()
+            print(f"{'path':<12} {'commits':>8} {'statements':>11} {'ms':>9}   (per recommendation)")
+            # Fresh sessions for each path so both see the same triggering metrics
+            measure('per-policy', per_policy, seed(args.sessions, 'per-policy'))
+            measure('unified', unified, seed(args.sessions, 'unified'))
+            db.session.remove()
+    finally:
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
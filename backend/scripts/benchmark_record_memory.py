@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: per-instance bytes of the engagement/logging record types,
+slotted (current) vs dict-backed (same __init__ without __slots__).
+Run from backend directory: python scripts/benchmark_record_memory.py --count 1000000
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.engagement.indicators import EngagementIndicators
+from app.engagement.fusion import FusedEngagementState, EngagementState
+from app.logging.engagement_logger import EngagementLogEntry, WindowLogEntry
+
+
+def dict_backed(cls):
+    """Equivalent class storing attributes in a per-instance __dict__"""
+    namespace = {'__init__': cls.__init__}
+    if hasattr(cls, '__dataclass_fields__'):
+        namespace['__init__'] = lambda self, **fields: self.__dict__.update(fields)
+    return type(f'{cls.__name__}Dict', (object,), namespace)
+
+
+FUSED_FIELDS = dict(
+    engagement_score=0.5, categorical_state=EngagementState.NEUTRAL, behavioral_score=0.5,
+    cognitive_score=0.5, affective_score=0.5, confidence=1.0,
+    primary_driver='No clear driver', secondary_driver=None, timestamp=datetime(2024, 1, 1)
+)
+
+RECORDS = [
+    ('EngagementIndicators', EngagementIndicators, lambda cls, i: cls()),
+    ('FusedEngagementState', FusedEngagementState, lambda cls, i: cls(**FUSED_FIELDS)),
+    ('EngagementLogEntry', EngagementLogEntry, lambda cls, i: cls('session', i)),
+    ('WindowLogEntry', WindowLogEntry, lambda cls, i: cls('session', i)),
+]
+
+
+def bytes_per_instance(cls, build, count):
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    records = [build(cls, i) for i in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    # Exclude the list holding the records
+    used -= sys.getsizeof(records)
+    del records
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-instance memory of record types')
+    parser.add_argument('--count', type=int, default=1_000_000, help='records per type')
+    args = parser.parse_args()
+
+    print(f"{'record':<24}{'dict-backed':>14}{'slotted':>12}{'saved':>10}   (bytes/instance, {args.count:,} records)")
+    for name, cls, build in RECORDS:
+        before = bytes_per_instance(dict_backed(cls), build, args.count)
+        after = bytes_per_instance(cls, build, args.count)
+        print(f"{name:<24}{before:>14.1f}{after:>12.1f}{1 - after / before:>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
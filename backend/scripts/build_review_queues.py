@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Nightly job: rebuild every student's precomputed spaced repetition review queue.
+Run from backend directory: python scripts/build_review_queues.py --workers 8
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from main import app
+from app.engagement.review_queue import ReviewQueueBuilder
+
+
+def build_review_queues(workers, partitions, limit):
+    with app.app_context():
+        builder = ReviewQueueBuilder(per_student_limit=limit)
+        summary = builder.build(
+            num_partitions=partitions or workers * 4,
+            max_workers=workers
+        )
+
+    print(f"✅ Built {summary['entries']} queue entries for {summary['students']} students "
+          f"in {summary['partitions']} partitions ({summary['elapsed_seconds']:.1f}s)")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild precomputed review queues')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--partitions', type=int, default=None, help='student id ranges (default: 4 x workers)')
+    parser.add_argument('--limit', type=int, default=100, help='queue length per student')
+    args = parser.parse_args()
+
+    build_review_queues(args.workers, args.partitions, args.limit)
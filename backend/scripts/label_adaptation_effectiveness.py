@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Background job: label new adaptation logs as effective/ineffective.
+Run from backend directory:
+    python scripts/label_adaptation_effectiveness.py               # one pass
+    python scripts/label_adaptation_effectiveness.py --interval 60 # keep running
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from main import app
+from app.adaptation.effectiveness import EffectivenessLabeler
+
+
+def label_adaptation_effectiveness(batch_size):
+    with app.app_context():
+        summary = EffectivenessLabeler(batch_size=batch_size).run()
+
+    print(f"✅ Labeled {summary['labeled']} adaptation logs in {summary['batches']} batches "
+          f"({summary['effective']} effective, {summary['ineffective']} ineffective, "
+          f"{summary['unknown']} unknown)")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Label adaptation log effectiveness')
+    parser.add_argument('--batch-size', type=int, default=None, help='logs per batch')
+    parser.add_argument('--interval', type=float, default=None, help='seconds between passes (default: run once)')
+    args = parser.parse_args()
+
+    while True:
+        label_adaptation_effectiveness(args.batch_size)
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
@@ -7,7 +7,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from datetime import datetime, timedelta
 from app.engagement.indicators import (
-    EngagementIndicatorExtractor, EngagementIndicators
+    EngagementIndicatorExtractor, EngagementIndicators, StreamingIndicatorExtractor
 )
 from app.engagement.fusion import EngagementFusionEngine
 from app.adaptation.policy import AdaptivePolicyEngine, PolicyLogger
@@ -107,7 +107,6 @@ def simulate_scenario(scenario_type, num_windows=3):
     current_difficulty = 0.50  # Start at medium difficulty
     
     # Components
-    extractor = EngagementIndicatorExtractor()
     fusion_engine = EngagementFusionEngine()
     policy_engine = AdaptivePolicyEngine()
     
@@ -135,11 +134,12 @@ def simulate_scenario(scenario_type, num_windows=3):
         # Per-question processing and logging (accumulate engagement data)
         window_engagement_scores = []
         window_primary_drivers = []
+        window_stream = StreamingIndicatorExtractor()
         
         for q_num, response in enumerate(responses, 1):
             # Extract indicators from window up to this point
-            responses_so_far = responses[:q_num]
-            indicators = extractor.extract_from_responses(responses_so_far)
+            window_stream.push(response)
+            indicators = window_stream.snapshot()
             
             # Fuse indicators
             fused_state = fusion_engine.fuse(indicators)
@@ -177,7 +177,7 @@ def simulate_scenario(scenario_type, num_windows=3):
             window_performance = window_performance * 0.95  # Penalize slightly
         
         # Get final fused engagement state for the window
-        final_indicators = extractor.extract_from_responses(responses)
+        final_indicators = window_stream.snapshot()
         final_fused_state = fusion_engine.fuse(final_indicators)
         
         # Make adaptation decision
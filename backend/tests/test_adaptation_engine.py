@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import event
+from app import db
+from app.adaptation.engine import AdaptiveEngine
+from app.models import AdaptationLog, EngagementMetric, Session, Student
+
+
+@pytest.fixture
+def struggling_session(app, sample_student):
+    """Session whose latest metric triggers difficulty, pacing and hint adaptations."""
+    session = Session(student_id=sample_student, subject='Mathematics', current_difficulty=0.5)
+    db.session.add(session)
+    db.session.flush()
+    db.session.add(EngagementMetric(
+        student_id=sample_student, session_id=session.id,
+        response_time_seconds=1.0, accuracy=0.0, learning_progress=0.1, completion_rate=0.2,
+        confidence_level=0.2, frustration_level=0.8, interest_level=0.3,
+        engagement_score=0.4, engagement_level='low', knowledge_gaps=['Algebra']
+    ))
+    db.session.commit()
+    return sample_student, session.id
+
+
+def count_commits():
+    commits = []
+    event.listen(db.session, 'after_commit', lambda session: commits.append(1))
+    return commits
+
+
+class TestUnifiedDecision:
+    """Test the one-pass adaptation decision."""
+
+    def test_single_commit_for_all_policies(self, struggling_session):
+        """Test every change and log is persisted in one commit."""
+        student_id, session_id = struggling_session
+        commits = count_commits()
+
+        decision = AdaptiveEngine().get_adaptation_recommendations(student_id, session_id)
+
+        assert len(commits) == 1
+        assert decision['adaptation_logs'] == 3
+        assert decision['difficulty']['new_difficulty'] == pytest.approx(0.4)
+        assert decision['pacing']['new_pacing'] == 'slow'
+        assert decision['hints']['provide_proactive_hints']
+        assert decision['content']['primary_strategy']['strategy'] == 'reinforce_gaps'
+
+        assert db.session.get(Session, session_id).current_difficulty == pytest.approx(0.4)
+        assert db.session.get(Student, student_id).preferred_pacing == 'slow'
+        assert sorted(log.adaptation_type for log in AdaptationLog.query.all()) == \
+            ['difficulty', 'hint_frequency', 'pacing']
+
+    def test_dry_run_has_no_side_effects(self, struggling_session):
+        """Test dry runs return the same decision without writing anything."""
+        student_id, session_id = struggling_session
+        engine = AdaptiveEngine()
+        commits = count_commits()
+
+        preview = engine.get_adaptation_recommendations(student_id, session_id, dry_run=True)
+        db.session.expire_all()
+        assert commits == []
+        assert AdaptationLog.query.count() == 0
+        assert db.session.get(Session, session_id).current_difficulty == 0.5
+
+        applied = engine.get_adaptation_recommendations(student_id, session_id)
+        assert preview['dry_run'] and not applied['dry_run']
+        for policy in ('difficulty', 'pacing', 'hints', 'content'):
+            assert preview[policy] == applied[policy]
+
+    def test_matches_individual_policies(self, struggling_session):
+        """Test the combined decision equals calling each adapt_* method in turn."""
+        student_id, session_id = struggling_session
+        engine = AdaptiveEngine()
+        combined = engine.get_adaptation_recommendations(student_id, session_id, dry_run=True)
+
+        metric = EngagementMetric.query.filter_by(session_id=session_id).one()
+        assert engine.adapt_difficulty(student_id, session_id, metric) == combined['difficulty']
+        assert engine.adapt_pacing(student_id, session_id, metric) == combined['pacing']
+        assert engine.adapt_hint_frequency(student_id, session_id, metric) == combined['hints']
+        assert engine.adapt_content_selection(student_id, session_id, metric) == combined['content']
+
+    def test_recommend_endpoint(self, client, struggling_session):
+        """Test the endpoint forwards dry_run and reports missing sessions."""
+        student_id, session_id = struggling_session
+        response = client.get(f'/api/adaptation/recommend/{student_id}/{session_id}?dry_run=true')
+        assert response.status_code == 200
+        assert response.get_json()['recommendations']['dry_run'] is True
+        assert AdaptationLog.query.count() == 0
+
+        assert client.get(f'/api/adaptation/recommend/{student_id}/missing').status_code == 404
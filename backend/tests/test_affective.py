@@ -0,0 +1,185 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import AffectiveBucket
+from app.engagement.affective import AffectiveIndicatorAnalyzer
+from app.engagement.affective_store import AffectiveStore
+
+
+EMOTIONS = list(AffectiveIndicatorAnalyzer.EMOTION_ENGAGEMENT_MAP)
+
+
+@pytest.fixture
+def analyzer(app):
+    """Analyzer with its own store (flushes only on threshold or read)."""
+    return AffectiveIndicatorAnalyzer(store=AffectiveStore(flush_threshold=100, flush_interval_seconds=3600))
+
+
+class TestAffectiveStore:
+    """Test batched, time-bucketed affective storage."""
+
+    def test_summary_matches_raw_observations(self, analyzer):
+        """Test windowed summary equals statistics over every recorded observation."""
+        rng = random.Random(3)
+        observed = [
+            analyzer.record_facial_expression('student', 's1', rng.choice(EMOTIONS), rng.random())
+            for _ in range(450)
+        ]
+        for _ in range(40):
+            analyzer.record_gaze_pattern('student', 's1', 'focused', 2.0)
+        analyzer.record_facial_expression('student', 's2', 'angry', 0.9)
+
+        summary = analyzer.get_affective_summary('student', 's1', minutes=5)
+        assert summary['observations'] == 490
+        assert summary['average_confidence'] == pytest.approx(
+            sum(m['inferred_confidence_level'] for m in observed) / len(observed), abs=1e-3
+        )
+        assert summary['average_frustration'] == pytest.approx(
+            sum(m['inferred_frustration_level'] for m in observed) / len(observed), abs=1e-3
+        )
+        counts = {}
+        for m in observed:
+            counts[m['emotion_label']] = counts.get(m['emotion_label'], 0) + 1
+        assert counts[summary['dominant_emotion']] == max(counts.values())
+
+        # One row per bucket x kind x label, far fewer than observations
+        assert AffectiveBucket.query.filter_by(session_id='s1').count() <= 2 * (len(EMOTIONS) + 1)
+
+    def test_flushes_merge_into_existing_buckets(self, app):
+        """Test repeated flushes of one bucket update the row instead of duplicating it."""
+        store = AffectiveStore(flush_threshold=10 ** 6, flush_interval_seconds=3600)
+        at = datetime(2026, 1, 1, 12, 0, 3)
+        observation = {'session_id': 's1', 'student_id': 'student', 'timestamp': at,
+                       'detection_type': 'facial_expression', 'emotion_label': 'Happy',
+                       'emotion_confidence': 0.8, 'inferred_confidence_level': 0.9,
+                       'inferred_frustration_level': 0.1, 'inferred_interest_level': 0.9}
+        for _ in range(3):
+            store.add(observation)
+            store.add(dict(observation, timestamp=at + timedelta(seconds=5)))
+            assert store.flush() == 1
+
+        bucket = AffectiveBucket.query.one()
+        assert bucket.bucket_start == datetime(2026, 1, 1, 12, 0, 0)
+        assert bucket.label == 'happy'
+        assert bucket.count == 6
+        assert bucket.confidence_sum == pytest.approx(5.4)
+
+    def test_writes_are_batched(self, analyzer):
+        """Test observations are committed once per flush_threshold, not per call."""
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            for _ in range(250):
+                analyzer.record_facial_expression('student', 's1', 'neutral', 0.7)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        # Two flushes of 100, each a single upsert
+        assert len(statements) == 2
+        assert analyzer.store.flush() == 1
+        assert AffectiveBucket.query.with_entities(db.func.sum(AffectiveBucket.count)).scalar() == 250
+
+    def test_concurrent_flushes_merge(self, app):
+        """Test two stores flushing the same bucket add up instead of colliding."""
+        first, second = (AffectiveStore(flush_threshold=10 ** 6, flush_interval_seconds=3600) for _ in range(2))
+        observation = {'session_id': 's1', 'timestamp': datetime(2026, 1, 1, 12, 0, 1),
+                       'detection_type': 'facial_expression', 'emotion_label': 'happy',
+                       'inferred_confidence_level': 0.9}
+        first.add(observation)
+        second.add(observation)
+        assert first.flush() == 1 and second.flush() == 1
+
+        bucket = AffectiveBucket.query.one()
+        assert bucket.count == 2
+        assert bucket.confidence_sum == pytest.approx(1.8)
+
+    def test_failed_flush_keeps_batch(self, analyzer, monkeypatch):
+        """Test a failing flush is rolled back and retried with the batch intact."""
+        store = analyzer.store
+        for _ in range(99):
+            analyzer.record_facial_expression('student', 's1', 'happy', 0.9)
+
+        def fail(dialect):
+            raise RuntimeError('database unavailable')
+        monkeypatch.setattr(store, '_upsert_statement', fail)
+        analyzer.record_facial_expression('student', 's1', 'happy', 0.9)  # due, flush fails quietly
+        with pytest.raises(RuntimeError):
+            store.flush()
+        assert AffectiveBucket.query.count() == 0
+
+        monkeypatch.undo()
+        assert store.flush() == 1
+        assert AffectiveBucket.query.one().count == 100
+
+    def test_fallback_without_upsert(self, app, monkeypatch):
+        """Test dialects without an upsert merge cells with UPDATE-then-INSERT."""
+        store = AffectiveStore(flush_threshold=10 ** 6, flush_interval_seconds=3600)
+        monkeypatch.setattr(store, '_upsert_statement', lambda dialect: None)
+        observation = {'session_id': 's1', 'timestamp': datetime(2026, 1, 1, 12, 0, 1),
+                       'detection_type': 'facial_expression', 'emotion_label': 'happy',
+                       'inferred_confidence_level': 0.9}
+        for _ in range(2):
+            store.add(observation)
+            store.add(dict(observation, emotion_label='sad'))
+            assert store.flush() == 2
+
+        assert {bucket.label: bucket.count for bucket in AffectiveBucket.query.all()} == {'happy': 2, 'sad': 2}
+
+    def test_pending_cells_are_capped(self, app, monkeypatch):
+        """Test a store that cannot flush stops growing at max_pending_cells."""
+        store = AffectiveStore(flush_threshold=1, flush_interval_seconds=3600, max_pending_cells=2)
+
+        def fail(dialect):
+            raise RuntimeError('database unavailable')
+        monkeypatch.setattr(store, '_upsert_statement', fail)
+        for label in ('happy', 'sad', 'angry', 'happy'):
+            store.add({'session_id': 's1', 'detection_type': 'facial_expression', 'emotion_label': label})
+
+        assert len(store._pending) == 2
+        assert store._pending_observations == 3
+        assert store.dropped_observations == 1
+
+    def test_reads_do_not_write(self, analyzer):
+        """Test summaries include pending observations without flushing or committing."""
+        commits = []
+        event.listen(db.session, 'after_commit', lambda session: commits.append(1))
+        for _ in range(5):
+            analyzer.record_facial_expression('student', 's1', 'confused', 0.9)
+
+        assert analyzer.get_affective_summary('student', 's1')['observations'] == 5
+        assert analyzer.detect_confusion('student', 's1')['signals']
+        assert commits == []
+        assert AffectiveBucket.query.count() == 0
+
+    def test_window_excludes_old_buckets(self, analyzer):
+        """Test summaries and detection only read buckets inside the window."""
+        old = datetime.utcnow() - timedelta(minutes=20)
+        for _ in range(10):
+            analyzer.store.add({'session_id': 's1', 'student_id': 'student', 'timestamp': old,
+                                'detection_type': 'facial_expression', 'emotion_label': 'confused',
+                                'inferred_confidence_level': 0.3, 'inferred_frustration_level': 0.6})
+        analyzer.record_facial_expression('student', 's1', 'happy', 0.9)
+
+        assert analyzer.get_affective_summary('student', 's1', minutes=5)['observations'] == 1
+        assert analyzer.get_affective_summary('student', 's1', minutes=30)['observations'] == 11
+        assert analyzer.detect_confusion('student', 's1')['signals'] == []
+
+    def test_detection_uses_recent_frames(self, analyzer):
+        """Test confusion/frustration fall back to stored frames without facial_data."""
+        for emotion in ['confused'] * 6 + ['neutral'] * 2:
+            analyzer.record_facial_expression('student', 's1', emotion, 0.8)
+
+        confusion = analyzer.detect_confusion('student', 's1', {}, {'response_time': 20})
+        assert confusion['confusion_score'] == pytest.approx(0.6)
+        assert confusion['confusion_detected']
+        assert analyzer.detect_frustration('student', 's1')['frustration_score'] == 0.0
+
+    def test_empty_summary_keeps_defaults(self, analyzer):
+        """Test a session without observations reports neutral defaults."""
+        summary = analyzer.get_affective_summary('student', 'missing')
+        assert summary['dominant_emotion'] == 'neutral'
+        assert summary['affective_engagement'] == 0.55
+        assert summary['observations'] == 0
@@ -0,0 +1,205 @@
+import json
+import time
+from types import SimpleNamespace
+import pytest
+from app import db
+from app.models import Question, Session
+from app.cbt.question_cache import question_payload_cache
+
+
+def _start_session(client, student_id, num_questions=2):
+    response = client.post('/api/cbt/session/start', json={
+        'student_id': student_id,
+        'subject': 'Mathematics',
+        'num_questions': num_questions
+    })
+    assert response.status_code == 201
+    return response.get_json()['session']['session_id']
+
+
+class TestInlineNextQuestion:
+    """Test returning the next question with the submit response."""
+
+    def test_submit_without_flag_has_no_next_question(self, client, sample_student, sample_questions):
+        """Test that the default submit payload is unchanged."""
+        session_id = _start_session(client, sample_student)
+        question = client.get(f'/api/cbt/question/next/{session_id}').get_json()['question']
+
+        response = client.post('/api/cbt/response/submit', json={
+            'session_id': session_id,
+            'question_id': question['question_id'],
+            'student_answer': 'A'
+        })
+
+        assert response.status_code == 201
+        assert 'next_question' not in response.get_json()
+
+    def test_submit_returns_unanswered_next_question(self, client, sample_student, sample_questions):
+        """Test that the inline next question is a different, unanswered question."""
+        session_id = _start_session(client, sample_student)
+        question = client.get(f'/api/cbt/question/next/{session_id}').get_json()['question']
+
+        response = client.post('/api/cbt/response/submit', json={
+            'session_id': session_id,
+            'question_id': question['question_id'],
+            'student_answer': 'A',
+            'include_next_question': True
+        })
+        data = response.get_json()
+
+        assert response.status_code == 201
+        assert data['next_question']['question_id'] != question['question_id']
+        assert 'correct_option' not in data['next_question']
+
+    def test_submit_reports_completion_inline(self, client, sample_student, sample_questions):
+        """Test that the last submit returns the completion payload inline."""
+        session_id = _start_session(client, sample_student, num_questions=1)
+        question = client.get(f'/api/cbt/question/next/{session_id}').get_json()['question']
+
+        data = client.post('/api/cbt/response/submit', json={
+            'session_id': session_id,
+            'question_id': question['question_id'],
+            'student_answer': 'B',
+            'include_next_question': True
+        }).get_json()
+
+        assert data['next_question']['status'] == 'completed'
+
+    def test_submit_keeps_next_question_error_status(self, client, sample_student, sample_questions, monkeypatch):
+        """Test an inline next-question error carries its status, unlike the completion payload."""
+        from app.cbt.routes import cbt_system
+        session_id = _start_session(client, sample_student)
+        question = client.get(f'/api/cbt/question/next/{session_id}').get_json()['question']
+        monkeypatch.setattr(cbt_system, '_select_next_question', lambda *args: (
+            {'error': 'Session is not active (status: abandoned)'}, 400
+        ))
+
+        data = client.post('/api/cbt/response/submit', json={
+            'session_id': session_id,
+            'question_id': question['question_id'],
+            'student_answer': 'B',
+            'include_next_question': True
+        }).get_json()
+
+        assert data['next_question'] == {'error': 'Session is not active (status: abandoned)', 'status': 400}
+
+
+class TestQuestionPrefetch:
+    """Test the prefetch endpoint."""
+
+    def test_prefetch_returns_distinct_candidates(self, client, sample_student, sample_questions):
+        """Test prefetching candidates for an active session."""
+        session_id = _start_session(client, sample_student, num_questions=5)
+
+        response = client.get(f'/api/cbt/question/prefetch/{session_id}?k=5')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        ids = [q['question_id'] for q in data['prefetch']['questions']]
+        assert len(ids) == len(set(ids))
+        # Only the medium Mathematics question is in range at difficulty 0.5
+        assert len(ids) == 1
+        assert data['prefetch']['questions'][0]['difficulty'] == 0.5
+
+    def test_prefetch_rejects_invalid_k(self, client, sample_student, sample_questions):
+        """Test that k is bounded."""
+        session_id = _start_session(client, sample_student)
+        response = client.get(f'/api/cbt/question/prefetch/{session_id}?k=0')
+        assert response.status_code == 400
+
+    def test_prefetch_unknown_session(self, client):
+        """Test prefetching for a missing session."""
+        response = client.get('/api/cbt/question/prefetch/missing')
+        assert response.status_code == 404
+
+
+class TestQuestionPayloadCache:
+    """Test the pre-encoded question payload cache."""
+
+    def test_client_payload_hides_answer(self, app, sample_questions):
+        """Test that cached bytes decode to the client payload, without the answer."""
+        with app.app_context():
+            question = Question.query.filter_by(subject='Science').first()
+            encoded = question_payload_cache.get_client_bytes(question.id)
+            assert json.loads(encoded) == question_payload_cache.get_client_payload(question.id)
+
+            client = question_payload_cache.get_client_payload(question.id)
+            assert 'correct_option' not in client
+            assert client['hints_available'] == 1
+
+    def test_edit_invalidates_entry(self, app, sample_questions):
+        """Test that updating question text invalidates the cached payload."""
+        with app.app_context():
+            question = Question.query.filter_by(subject='Science').first()
+            assert question_payload_cache.get_client_payload(question.id)['question_text'] == question.question_text
+
+            question.question_text = 'What is the SI unit of force (edited)?'
+            db.session.commit()
+
+            assert question_payload_cache.get_client_payload(question.id)['question_text'].endswith('(edited)?')
+
+    def test_entries_expire_after_ttl(self, app, sample_questions, monkeypatch):
+        """Test edits and deletes made outside this process are picked up once an entry expires."""
+        from app.cbt import question_cache
+        cache = question_cache.QuestionPayloadCache(ttl_seconds=60)
+        edited, deleted = Question.query.limit(2).all()
+        cache.warm([edited, deleted])
+
+        # Bulk statements bypass ORM events, like an edit from another worker
+        Question.query.filter_by(id=edited.id).update({'question_text': 'Edited elsewhere?'})
+        Question.query.filter_by(id=deleted.id).delete()
+        db.session.commit()
+        assert cache.get_client_payload(edited.id)['question_text'] != 'Edited elsewhere?'
+        assert cache.get_client_payload(deleted.id) is not None
+
+        later = time.monotonic() + 61
+        monkeypatch.setattr(question_cache, 'time', SimpleNamespace(monotonic=lambda: later))
+        assert cache.get_client_payload(edited.id)['question_text'] == 'Edited elsewhere?'
+        assert cache.get_client_payload(deleted.id) is None
+
+    def test_hint_served_from_cache(self, client, sample_student, sample_questions):
+        """Test hint retrieval and bounds."""
+        session_id = _start_session(client, sample_student)
+        question = client.get(f'/api/cbt/question/next/{session_id}').get_json()['question']
+
+        response = client.get(f"/api/cbt/hint/{session_id}/{question['question_id']}?hint_index=0")
+        assert response.status_code == 200
+        assert response.get_json()['hint_data']['total_hints'] == 1
+
+        response = client.get(f"/api/cbt/hint/{session_id}/{question['question_id']}?hint_index=1")
+        assert response.status_code == 400
+
+    def test_next_question_falls_back_on_cache_miss(self, client, sample_student, sample_questions, monkeypatch):
+        """Test the next question is serialized normally when the cache has no payload for it."""
+        session_id = _start_session(client, sample_student)
+        monkeypatch.setattr(question_payload_cache, 'get_client_bytes', lambda question_id: None)
+
+        response = client.get(f'/api/cbt/question/next/{session_id}')
+        assert response.status_code == 200
+        assert response.get_json()['success'] is True
+        assert response.get_json()['question']['question_id']
+
+    def test_next_question_skips_deleted_candidates(self, client, sample_student, sample_questions, monkeypatch):
+        """Test a candidate deleted before its payload loads is skipped, and 404 when none remain."""
+        from app.cbt.routes import cbt_system
+        session_id = _start_session(client, sample_student)
+        candidates = [q.id for q in Question.query.filter_by(subject='Mathematics')]
+        monkeypatch.setattr(cbt_system, '_get_candidate_question_ids', lambda *args: list(candidates))
+        original = question_payload_cache.get_client_payload
+        deleted = set()
+
+        def get_client_payload(question_id):
+            if not deleted:
+                deleted.add(question_id)  # The first pick disappears
+            return None if question_id in deleted else original(question_id)
+        monkeypatch.setattr(question_payload_cache, 'get_client_payload', get_client_payload)
+
+        response = client.get(f'/api/cbt/question/next/{session_id}')
+        assert response.status_code == 200
+        assert response.get_json()['question']['question_id'] not in deleted
+
+        monkeypatch.setattr(question_payload_cache, 'get_client_payload', lambda question_id: None)
+        response = client.get(f'/api/cbt/question/next/{session_id}')
+        assert response.status_code == 404
+        assert 'retry' in response.get_json()['error']
+
@@ -0,0 +1,85 @@
+import random
+import numpy as np
+import pytest
+from app.adaptation.difficulty_mapper import DifficultyMapper
+from app.adaptation.difficulty_policy import (
+    CompiledDifficultyPolicy, default_policy, get_difficulty_policy
+)
+
+
+def ladder(current, accuracy, engagement, low=0.1, high=0.9):
+    """The if/elif ladder AdaptiveEngine.adapt_difficulty used before the band table."""
+    if accuracy >= 0.99:
+        new, trigger = min(high, current + 0.10), 'perfect_accuracy'
+    elif accuracy >= 0.8:
+        new, trigger = min(high, current + 0.10), 'high_accuracy'
+    elif accuracy >= 0.67:
+        new, trigger = min(high, current + 0.01), 'mixed_good_accuracy'
+    elif accuracy > 0.33:
+        new, trigger = current, 'marginal_accuracy'
+    elif accuracy > 0.01:
+        new, trigger = max(low, current - 0.10), 'low_accuracy'
+    else:
+        new, trigger = max(low, current - 0.10), 'zero_accuracy'
+    if engagement < 0.3 and new == current:
+        new, trigger = max(low, current - 0.05), 'marginal_accuracy_low_engagement'
+    return new, trigger
+
+
+def cases(count=5000, seed=4):
+    """(current, accuracy, engagement) including every band boundary."""
+    rng = random.Random(seed)
+    edges = [0.0, 0.01, 0.33, 1 / 3, 0.67, 2 / 3, 0.8, 0.99, 1.0]
+    edges += [np.nextafter(e, 2.0) for e in edges] + [np.nextafter(e, -1.0) for e in edges]
+    result = []
+    for i in range(count):
+        accuracy = edges[i % len(edges)] if i < 4 * len(edges) else rng.random()
+        result.append((rng.choice([0.1, 0.5, 0.85, 0.9, rng.random()]), accuracy,
+                       rng.choice([0.0, 0.3, rng.random()])))
+    return result
+
+
+class TestCompiledDifficultyPolicy:
+    """Test the band table against the original ladder."""
+
+    def test_scalar_matches_ladder(self):
+        """Test bisect decisions equal the if/elif ladder exactly, boundaries included."""
+        policy = get_difficulty_policy()
+        config = default_policy()
+        for current, accuracy, engagement in cases():
+            expected = ladder(current, accuracy, engagement,
+                              config['min_difficulty'], config['max_difficulty'])
+            new, trigger, reason = policy.decide(current, accuracy, engagement)
+            assert (new, trigger) == expected
+            assert reason
+
+    def test_batch_matches_scalar(self):
+        """Test searchsorted column decisions equal scalar decisions."""
+        policy = get_difficulty_policy()
+        current, accuracy, engagement = map(np.array, zip(*cases()))
+        new, codes = policy.decide_many(current, accuracy, engagement)
+        triggers = policy.trigger_names(codes)
+        for i in range(len(current)):
+            scalar_new, scalar_trigger, _ = policy.decide(current[i], accuracy[i], engagement[i])
+            assert new[i] == scalar_new
+            assert triggers[i] == scalar_trigger
+
+    def test_custom_bands_are_sorted(self):
+        """Test bands declared in any order are checked highest bound first."""
+        policy = CompiledDifficultyPolicy(dict(
+            default_policy(), accuracy_bands=[(0.5, False, -0.2), (0.9, True, 0.3)], below_bands_step=0.0
+        ))
+        assert policy.decide(0.5, 0.95, 1.0)[0] == pytest.approx(0.8)
+        assert policy.decide(0.5, 0.6, 1.0)[0] == pytest.approx(0.3)
+        assert policy.decide(0.5, 0.5, 1.0)[:2] == (0.5, 'zero_accuracy')
+
+
+class TestDifficultyMapper:
+    """Test difficulty labels from sorted breakpoints."""
+
+    def test_labels(self):
+        """Test scalar and vectorized labels at and around the thresholds."""
+        values = [0.0, 0.349, 0.35, 0.5, 0.649, 0.65, 1.0]
+        expected = ['easy', 'easy', 'medium', 'medium', 'medium', 'hard', 'hard']
+        assert [DifficultyMapper.get_difficulty_label(v) for v in values] == expected
+        assert list(DifficultyMapper.get_difficulty_labels(np.array(values))) == expected
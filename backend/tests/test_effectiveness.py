@@ -0,0 +1,134 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import Session, StudentResponse, EngagementMetric, AdaptationLog, Question
+from app.adaptation.effectiveness import EffectivenessLabeler
+
+
+@pytest.fixture
+def adapted_session(app, sample_student, sample_questions):
+    """Session with an improving, a worsening and an unfinished adaptation."""
+    question_id = Question.query.first().id
+    start = datetime.utcnow() - timedelta(hours=2)
+    session = Session(student_id=sample_student, subject='Mathematics', session_start=start)
+    db.session.add(session)
+    db.session.flush()
+
+    outcomes = [False, False, False, True, True, True, True, False, False]
+    scores = [0.4, 0.4, 0.4, 0.6, 0.7, 0.8, 0.8, 0.5, 0.3]
+    for i, (correct, score) in enumerate(zip(outcomes, scores)):
+        at = start + timedelta(minutes=i)
+        db.session.add(StudentResponse(
+            session_id=session.id, question_id=question_id, student_answer='A',
+            is_correct=correct, response_time_seconds=10.0, timestamp=at
+        ))
+        db.session.add(EngagementMetric(
+            student_id=sample_student, session_id=session.id, timestamp=at, engagement_score=score
+        ))
+
+    for minute, adaptation_type in [(2, 'difficulty'), (5, 'pacing'), (8, 'hints')]:
+        db.session.add(AdaptationLog(
+            student_id=sample_student, session_id=session.id,
+            timestamp=start + timedelta(minutes=minute, seconds=30),
+            trigger_metric='accuracy', trigger_value=0.5, adaptation_type=adaptation_type
+        ))
+    db.session.commit()
+    return session.id
+
+
+class TestEffectivenessLabeler:
+    """Test incremental labeling of adaptation log effectiveness."""
+
+    def test_labels_from_before_and_after_windows(self, app, adapted_session):
+        """Test improving, worsening and unfinished adaptations are labeled accordingly."""
+        summary = EffectivenessLabeler(window_responses=3, batch_size=2).run()
+        assert summary['labeled'] == 3
+        assert summary['batches'] == 2
+
+        labels = {log.adaptation_type: log for log in AdaptationLog.query.all()}
+        assert labels['difficulty'].was_effective is True
+        assert 'Accuracy 0.00 -> 1.00' in labels['difficulty'].effectiveness_notes
+        assert 'engagement 0.40 -> 0.80' in labels['difficulty'].effectiveness_notes
+        assert labels['pacing'].was_effective is False
+        assert labels['hints'].was_effective is None
+        assert 'Insufficient data' in labels['hints'].effectiveness_notes
+
+    def test_watermark_processes_each_log_once(self, app, adapted_session, sample_student):
+        """Test reruns skip final labels and unsettled logs wait for a later run."""
+        session = db.session.get(Session, adapted_session)
+        session.session_end = datetime.utcnow()
+        db.session.commit()
+
+        labeler = EffectivenessLabeler(settle_seconds=300)
+        assert labeler.run()['labeled'] == 3
+        assert labeler.run()['labeled'] == 0
+
+        now = datetime.utcnow()
+        db.session.add(AdaptationLog(
+            student_id=sample_student, session_id=adapted_session, timestamp=now,
+            trigger_metric='accuracy', trigger_value=0.5, adaptation_type='difficulty'
+        ))
+        db.session.commit()
+        assert labeler.pending(now) == 0
+        assert labeler.run(now=now + timedelta(minutes=10))['labeled'] == 1
+        assert labeler.get_watermark().processed_count == 4
+
+    def test_incomplete_windows_are_requeued(self, app, adapted_session, sample_questions):
+        """Test a label with a short after window is redone once more responses arrive."""
+        labeler = EffectivenessLabeler(window_responses=3)
+        summary = labeler.run()
+        assert (summary['labeled'], summary['requeued']) == (3, 1)
+        assert labeler.get_watermark().processed_count == 2
+        assert labeler.pending() == 1
+        assert labeler.run()['labeled'] == 1
+
+        hints = AdaptationLog.query.filter_by(adaptation_type='hints').one()
+        assert hints.was_effective is None
+        question_id = Question.query.first().id
+        for minute in range(9, 12):
+            db.session.add(StudentResponse(
+                session_id=adapted_session, question_id=question_id, student_answer='A', is_correct=True,
+                response_time_seconds=10.0, timestamp=hints.timestamp + timedelta(seconds=minute)
+            ))
+        db.session.commit()
+
+        summary = labeler.run()
+        assert (summary['labeled'], summary['requeued']) == (1, 0)
+        assert hints.was_effective is True
+        assert labeler.pending() == 0
+        assert labeler.get_watermark().processed_count == 3
+
+    def test_relabels_invalidate_outcome_stats(self, app, adapted_session, sample_questions):
+        """Test cached outcome stats pick up a provisional label that is redone."""
+        from app.adaptation.outcome_stats import AdaptationOutcomeStats
+        labeler = EffectivenessLabeler(window_responses=3)
+        labeler.run()
+        stats = AdaptationOutcomeStats()
+        before = stats.action_type_row('hints')
+
+        hints = AdaptationLog.query.filter_by(adaptation_type='hints').one()
+        question_id = Question.query.first().id
+        # One answer after: a partial window, so the new label is still provisional
+        db.session.add(StudentResponse(
+            session_id=adapted_session, question_id=question_id, student_answer='A', is_correct=True,
+            response_time_seconds=10.0, timestamp=hints.timestamp + timedelta(seconds=1)
+        ))
+        db.session.commit()
+        assert labeler.run()['requeued'] == 1
+
+        assert hints.was_effective is True
+        assert stats.action_type_row('hints')['successes'] == before['successes'] + 1
+
+    def test_old_labels_become_final(self, app, adapted_session):
+        """Test logs older than final_after_seconds are final even with a short window."""
+        labeler = EffectivenessLabeler(window_responses=3, final_after_seconds=3600)
+        assert labeler.run()['requeued'] == 0
+        assert labeler.pending() == 0
+
+    def test_effectiveness_endpoint_counts_labels(self, client, adapted_session):
+        """Test the session effectiveness report reflects labeled logs."""
+        response = client.post('/api/adaptation/effectiveness/label', json={})
+        assert response.status_code == 200
+
+        analysis = client.get(f'/api/adaptation/effectiveness/{adapted_session}').get_json()['effectiveness_analysis']
+        assert (analysis['effective'], analysis['ineffective'], analysis['unknown']) == (1, 1, 1)
@@ -0,0 +1,103 @@
+import csv
+import glob
+import gzip
+import json
+import os
+import random
+import pytest
+from app.engagement.indicators import EngagementIndicators
+from app.engagement.fusion import EngagementFusionEngine
+from app.logging.engagement_logger import EngagementLogger
+from app.logging.sinks import EngagementLogSinks, RotatingLogSink
+
+
+def log_session(logger, rng, questions=12):
+    """Log questions with a window summary every 5 questions."""
+    fusion = EngagementFusionEngine()
+    difficulty = 0.5
+    for q in range(1, questions + 1):
+        indicators = EngagementIndicators()
+        indicators.is_valid = True
+        indicators.window_size = q
+        indicators.accuracy_trend = rng.uniform(-1, 1)
+        difficulty = min(0.9, max(0.1, difficulty + rng.choice([-0.1, 0.0, 0.1])))
+        logger.log_question(f'q{q}', difficulty, rng.random() < 0.6, rng.uniform(2, 30),
+                            indicators, fusion.fuse(indicators), None, difficulty)
+        if q % 5 == 0:
+            logger.log_window_summary(q // 5, 3, 2, 10.0, 0.5, 0.5, 0.5, 0.5, 'engaged', 'none', 0.5, difficulty)
+
+
+class TestStreamingEngagementLogger:
+    """Test streaming loggers sharing rotating sinks."""
+
+    def test_sessions_share_sinks_with_bounded_tail(self, tmp_path):
+        """Test entries stream to shared JSONL files and statistics match the in-memory logger."""
+        sinks = EngagementLogSinks(str(tmp_path), fmt='jsonl')
+        streaming = [EngagementLogger(f's{i}', sinks=sinks, tail_size=3) for i in range(3)]
+        for i, logger in enumerate(streaming):
+            log_session(logger, random.Random(i))
+        sinks.close()
+
+        lines = [json.loads(line) for path in sinks.questions.files_written for line in open(path)]
+        assert len(lines) == 36
+        assert {line['session_id'] for line in lines} == {'s0', 's1', 's2'}
+        assert sum(1 for path in sinks.windows.files_written for _ in open(path)) == 6
+        assert len(glob.glob(os.path.join(tmp_path, '*'))) == 2
+
+        in_memory = EngagementLogger('s0', output_dir=str(tmp_path / 'memory'))
+        log_session(in_memory, random.Random(0))
+        assert len(streaming[0].question_logs) == 3
+        assert streaming[0].get_statistics() == in_memory.get_statistics()
+
+    @pytest.mark.parametrize('fmt', ['jsonl', 'csv'])
+    def test_rotation_and_gzip(self, tmp_path, fmt):
+        """Test small max_bytes rotates into several gzip files that read back completely."""
+        sinks = EngagementLogSinks(str(tmp_path), fmt=fmt, max_bytes=4096, compress=True)
+        log_session(EngagementLogger('rotating', sinks=sinks), random.Random(5), questions=40)
+        sinks.close()
+
+        paths = sinks.questions.files_written
+        assert len(paths) > 1
+        assert all(path.endswith(f'.{fmt}.gz') for path in paths)
+
+        rows = []
+        for path in paths:
+            with gzip.open(path, 'rt', newline='') as f:
+                rows.extend(csv.DictReader(f) if fmt == 'csv' else (json.loads(line) for line in f))
+        assert [row['question_id'] for row in rows] == [f'q{q}' for q in range(1, 41)]
+
+    def test_sinks_in_one_process_do_not_collide(self, tmp_path):
+        """Test two sinks of the same kind started in the same second write separate files."""
+        first, second = (RotatingLogSink(str(tmp_path), 'questions') for _ in range(2))
+        first.write({'n': 1})
+        second.write({'n': 2})
+        first.close()
+        second.close()
+
+        assert first.files_written[0] != second.files_written[0]
+        assert [json.loads(line) for line in open(first.files_written[0])] == [{'n': 1}]
+        assert [json.loads(line) for line in open(second.files_written[0])] == [{'n': 2}]
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork')
+    @pytest.mark.parametrize('compress', [False, True])
+    def test_forked_child_opens_its_own_file(self, tmp_path, compress):
+        """Test a child writes to a new file and leaves the parent's buffered file intact."""
+        sink = RotatingLogSink(str(tmp_path), 'questions', compress=compress)
+        sink.write({'writer': 'parent'})  # still buffered when forking
+        pid = os.fork()
+        if pid == 0:
+            try:
+                sink.write({'writer': 'child'})
+                sink.close()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        sink.write({'writer': 'parent'})
+        sink.close()
+
+        opener = gzip.open if compress else open
+        writers = {}
+        for path in glob.glob(os.path.join(tmp_path, '*')):
+            with opener(path, 'rt') as f:
+                writers[path] = [json.loads(line)['writer'] for line in f]
+        assert sorted(writers.values()) == [['child'], ['parent', 'parent']]
@@ -0,0 +1,80 @@
+import math
+import random
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import Student, Question, Session, StudentResponse, EngagementMetric, AdaptationLog
+from app.analytics.evaluator import ResearchEvaluator
+from app.analytics.cohort_evaluator import CohortEvaluator
+
+
+@pytest.fixture
+def cohort(app, sample_questions):
+    """Students with random sessions, responses, metrics and adaptations."""
+    rng = random.Random(3)
+    question_ids = [q.id for q in Question.query.all()]
+    now = datetime.utcnow()
+    student_ids = []
+    for s in range(7):
+        student = Student(email=f'cohort{s}@example.com', name=f'Cohort {s}')
+        db.session.add(student)
+        db.session.flush()
+        student_ids.append(student.id)
+
+        for k in range(rng.randint(0, 3)):
+            start = now - timedelta(days=rng.choice([1, 5, 40]), hours=k)
+            session = Session(student_id=student.id, subject='Mathematics', session_start=start)
+            db.session.add(session)
+            db.session.flush()
+            for i in range(rng.randint(0, 6)):
+                db.session.add(StudentResponse(
+                    session_id=session.id, question_id=rng.choice(question_ids), student_answer='A',
+                    is_correct=rng.random() < 0.6, response_time_seconds=10.0,
+                    timestamp=start + timedelta(minutes=i)
+                ))
+                db.session.add(EngagementMetric(
+                    student_id=student.id, session_id=session.id, timestamp=start + timedelta(minutes=i),
+                    engagement_score=rng.random(), accuracy=rng.random()
+                ))
+                if rng.random() < 0.5:
+                    db.session.add(AdaptationLog(
+                        student_id=student.id, session_id=session.id, timestamp=start + timedelta(minutes=i),
+                        trigger_metric='engagement', trigger_value=0.4, adaptation_type='difficulty',
+                        was_effective=rng.choice([True, False, None])
+                    ))
+    db.session.commit()
+    return student_ids
+
+
+class TestCohortEvaluator:
+    """Test the grouped cohort evaluation against the per-student evaluators."""
+
+    def test_matches_per_student_evaluators(self, app, cohort):
+        """Test every per-student value equals the individual evaluator's result."""
+        evaluator = ResearchEvaluator()
+        frame = CohortEvaluator(chunk_size=3).student_metrics()
+
+        assert sorted(frame.index) == sorted(cohort)
+        for student_id in cohort:
+            row = frame.loc[student_id]
+            engagement = evaluator.evaluate_sustained_engagement(student_id)
+            performance = evaluator.evaluate_performance_improvement(student_id)
+            adaptation = evaluator.evaluate_adaptation_effectiveness(student_id)
+
+            assert row['engagement'] == pytest.approx(engagement.get('engagement', {}).get('average_score', 0))
+            if 'performance_analysis' in performance:
+                assert row['improvement_percent'] == pytest.approx(
+                    performance['performance_analysis']['learning_gain_percent'])
+            else:
+                assert math.isnan(row['improvement_percent'])
+            if 'effectiveness' in adaptation:
+                assert row['adaptation_effectiveness'] == pytest.approx(
+                    adaptation['effectiveness']['overall_effectiveness_rate'])
+            else:
+                assert math.isnan(row['adaptation_effectiveness'])
+
+    def test_system_impact_report(self, client, app, cohort):
+        """Test the aggregate endpoint reports over the whole cohort."""
+        data = client.get('/api/analytics/evaluate/system-impact').get_json()
+        assert data['evaluation']['total_students'] == len(cohort)
+        assert data['evaluation']['students_with_data'] == len(cohort)
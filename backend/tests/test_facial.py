@@ -0,0 +1,180 @@
+import random
+import struct
+import threading
+import numpy as np
+import pytest
+from statistics import mean, stdev
+from app.engagement.facial_expression_api import (
+    FacialExpressionIntegrator, EMOTIONS, EMOTION_CODES, FRAME_DTYPE, MAX_FRAME_PAYLOAD_BYTES, NO_FACE_CODE,
+    decode_frames
+)
+
+
+def random_frames(rng, count):
+    """Frame dicts as sent by the webcam client, with some missing faces."""
+    frames = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            frames.append(None)
+        else:
+            frames.append({
+                'emotion': rng.choice(list(EMOTIONS) + ['surprised', 'HAPPY']),
+                'confidence': rng.random(),
+                'x': rng.uniform(0, 640), 'y': rng.uniform(0, 480), 'width': 150, 'height': 150
+            })
+    return frames
+
+
+class TestFacialRecording:
+    """Test streaming facial frame aggregation."""
+
+    def test_summary_matches_full_frame_history(self):
+        """Test aggregates equal statistics over every processed frame while only a ring is kept."""
+        integrator = FacialExpressionIntegrator(ring_size=50)
+        integrator.record_session_start('s1', 'student')
+        frames = random_frames(random.Random(2), 1000)
+        for frame in frames:
+            integrator.add_frame('s1', frame)
+
+        recording = integrator.recording_sessions['s1']
+        assert recording.size == 50
+        processed = [integrator.process_facial_frame('s1', frame) for frame in frames if frame]
+        recent = recording.recent_frames()
+        assert list(recent['engagement_score']) == pytest.approx(
+            [p['engagement_score'] for p in processed[-50:]], abs=1e-6)
+
+        summary = integrator.record_session_end('s1')
+        engagement = [p['engagement_score'] for p in processed]
+        emotions = [p['emotion'] for p in processed]
+        assert summary['frames_recorded'] == len(processed)
+        assert summary['face_detection_rate'] == len(processed) / len(frames)
+        assert summary['avg_engagement'] == pytest.approx(mean(engagement))
+        assert summary['avg_frustration'] == pytest.approx(mean(p['frustration_level'] for p in processed))
+        assert summary['engagement_stability'] == pytest.approx(stdev(engagement))
+        assert emotions.count(summary['dominant_emotion']) == max(emotions.count(e) for e in set(emotions))
+        assert summary['emotion_breakdown'] == {e: round(emotions.count(e) / len(emotions), 2) for e in set(emotions)}
+        assert 's1' not in integrator.recording_sessions
+
+    def test_idle_sessions_expire(self):
+        """Test recordings idle past the TTL are dropped when a new session starts."""
+        integrator = FacialExpressionIntegrator(session_ttl_seconds=60)
+        integrator.record_session_start('old', 'student')
+        integrator.recording_sessions['old'].last_seen -= 120
+        integrator.record_session_start('new', 'student')
+
+        assert list(integrator.recording_sessions) == ['new']
+        assert integrator.add_frame('old', {'emotion': 'happy'}) is False
+
+    def test_concurrent_ingestion(self):
+        """Test threads feeding, restarting and expiring recordings lose no frames."""
+        integrator = FacialExpressionIntegrator(ring_size=32)
+        integrator.record_session_start('s', 'student')
+        frames = decode_frames(pack_frames(random_frames(random.Random(6), 40)))
+        detected = int(np.count_nonzero(frames['emotion'] != NO_FACE_CODE))
+
+        def feed():
+            for _ in range(50):
+                integrator.add_frames('s', frames)
+                integrator.record_session_start('s', 'student', restart=False)
+                integrator.record_session_start(f'other-{threading.get_ident()}', 'student')
+                integrator.expire_sessions()
+
+        threads = [threading.Thread(target=feed) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        summary = integrator.record_session_end('s')
+        assert summary['frames_recorded'] == 8 * 50 * detected
+        assert summary['face_detection_rate'] == pytest.approx(detected / frames.size)
+
+
+def pack_frames(frames):
+    """Pack frame dicts into the binary ingestion layout."""
+    return b''.join(
+        struct.pack('<dBfffff', 1.7e9 + i, NO_FACE_CODE, 0, 0, 0, 0, 0) if frame is None else
+        struct.pack('<dBfffff', 1.7e9 + i, EMOTION_CODES.get(frame['emotion'].lower(), 200),
+                    frame['confidence'], frame['x'], frame['y'], frame['width'], frame['height'])
+        for i, frame in enumerate(frames)
+    )
+
+
+class TestFacialFrameBatches:
+    """Test packed binary frame batches against per-frame ingestion."""
+
+    def test_batch_matches_per_frame_ingestion(self):
+        """Test decoding and add_frames give the same aggregates and ring as add_frame."""
+        frames = random_frames(random.Random(4), 700)
+        for frame in frames:
+            if frame:  # Per-frame path sees the float32 value the client packed
+                frame['confidence'] = float(np.float32(frame['confidence']))
+
+        single = FacialExpressionIntegrator(ring_size=64)
+        single.record_session_start('s', 'student')
+        for frame in frames:
+            single.add_frame('s', frame)
+
+        batched = FacialExpressionIntegrator(ring_size=64)
+        batched.record_session_start('s', 'student')
+        payload = pack_frames(frames)
+        for start in range(0, len(payload), 29 * 250):
+            batched.add_frames('s', decode_frames(payload[start:start + 29 * 250]))
+
+        expected = single.recording_sessions['s']
+        actual = batched.recording_sessions['s']
+        for field in ('engagement_score', 'frustration_level', 'emotion', 'bbox'):
+            assert np.allclose(actual.recent_frames()[field], expected.recent_frames()[field])
+
+        expected_summary = single.record_session_end('s')
+        actual_summary = batched.record_session_end('s')
+        for key in ('frames_recorded', 'face_detection_rate', 'dominant_emotion', 'emotion_breakdown'):
+            assert actual_summary[key] == expected_summary[key]
+        for key in ('avg_engagement', 'avg_frustration', 'engagement_stability'):
+            assert actual_summary[key] == pytest.approx(expected_summary[key])
+
+    def test_ingestion_endpoint(self, client, app, sample_student):
+        """Test the endpoint starts a recording for the session and rejects truncated payloads."""
+        from app import db
+        from app.models import Session
+        session = Session(student_id=sample_student, subject='Mathematics')
+        db.session.add(session)
+        db.session.commit()
+
+        payload = pack_frames([{'emotion': 'happy', 'confidence': 0.9, 'x': 1, 'y': 2, 'width': 3, 'height': 4},
+                               None])
+        url = f'/api/analytics/affective/facial-frames/{session.id}'
+        response = client.post(url, data=payload, content_type='application/octet-stream')
+        assert response.status_code == 200
+        assert response.get_json()['faces_detected'] == 1
+        assert response.get_json()['faces_missing'] == 1
+
+        assert client.post(url, data=payload[:-1], content_type='application/octet-stream').status_code == 400
+        assert client.post('/api/analytics/affective/facial-frames/missing', data=payload,
+                           content_type='application/octet-stream').status_code == 404
+
+    @pytest.mark.parametrize('timestamp, confidence', [
+        (float('nan'), 0.5), (float('inf'), 0.5), (1.7e9, float('nan')), (1.7e9, 1.5), (1.7e9, -0.1)
+    ])
+    def test_invalid_frames_are_rejected(self, timestamp, confidence):
+        """Test non-finite values and out-of-range confidences never reach the aggregates."""
+        good = struct.pack('<dBfffff', 1.7e9, EMOTION_CODES['happy'], 0.9, 0, 0, 0, 0)
+        bad = struct.pack('<dBfffff', timestamp, EMOTION_CODES['happy'], confidence, 0, 0, 0, 0)
+        with pytest.raises(ValueError):
+            decode_frames(good + bad)
+
+        # add_frames drops them when handed an undecoded array
+        integrator = FacialExpressionIntegrator()
+        integrator.record_session_start('s', 'student')
+        assert integrator.add_frames('s', np.frombuffer(good + bad, dtype=FRAME_DTYPE)) == (1, 0, 1)
+        summary = integrator.record_session_end('s')
+        assert summary['avg_engagement'] == pytest.approx(0.95 * np.float32(0.9))
+
+    def test_ingestion_endpoint_limits(self, client, app, sample_student):
+        """Test the endpoint answers 400 for invalid frames and 413 for oversized payloads."""
+        url = '/api/analytics/affective/facial-frames/any'
+        nan = struct.pack('<dBfffff', 1.7e9, EMOTION_CODES['happy'], float('nan'), 0, 0, 0, 0)
+        assert client.post(url, data=nan, content_type='application/octet-stream').status_code == 400
+
+        oversized = pack_frames([None] * (MAX_FRAME_PAYLOAD_BYTES // 29 + 1))
+        assert client.post(url, data=oversized, content_type='application/octet-stream').status_code == 413
@@ -0,0 +1,102 @@
+import math
+import random
+import numpy as np
+import pytest
+from app.adaptation.facial_signal_integration import (
+    AdaptationModifier, CompiledFacialConfig, FacialDataValidator, FacialSignalConfig,
+    FacialSignalProcessor, get_facial_modifier
+)
+
+
+class EnabledConfig(FacialSignalConfig):
+    ENABLED = True
+
+
+def random_facial_data(rng, count):
+    """Facial data dicts including unknown labels and low confidences."""
+    emotions = list(FacialSignalConfig.EMOTION_ENGAGEMENT_MAP) + ['surprised', 'HAPPY']
+    gazes = list(FacialSignalConfig.GAZE_PATTERN_ADJUSTMENTS) + ['sideways', '']
+    postures = list(FacialSignalConfig.POSTURE_ADJUSTMENTS) + ['standing', '']
+    return [{
+        'emotion_detected': rng.choice(emotions),
+        'emotion_confidence': rng.random(),
+        'gaze_pattern': rng.choice(gazes),
+        'posture_type': rng.choice(postures)
+    } for _ in range(count)]
+
+
+class TestCompiledFacialConfig:
+    """Test the lookup-table evaluation against the original processor."""
+
+    def test_signals_match_processor(self):
+        """Test scalar and batch signals equal extract_engagement_signal exactly."""
+        compiled = CompiledFacialConfig()
+        processor = FacialSignalProcessor()
+        frames = random_facial_data(random.Random(5), 3000)
+
+        batch = compiled.score_frames(frames)
+        for frame, batch_signal in zip(frames, batch):
+            expected, _ = processor.extract_engagement_signal(frame)
+            if expected is None:
+                assert compiled.signal(frame) is None
+                assert math.isnan(batch_signal)
+            else:
+                assert compiled.signal(frame) == expected
+                assert batch_signal == expected
+
+    def test_affective_values_match_validator(self):
+        """Test compiled affective values equal the validator's dict lookups."""
+        compiled = CompiledFacialConfig()
+        for emotion, code in compiled.emotion_codes.items():
+            assert compiled.affective_values(code) == \
+                FacialDataValidator.get_affective_values_from_emotion(emotion)
+        assert compiled.affective_values(0) is None
+
+    def test_blend_matches_modify_engagement_score(self):
+        """Test batch engagement blending equals modify_engagement_score per frame."""
+        modifier = AdaptationModifier(EnabledConfig)
+        rng = random.Random(9)
+        frames = random_facial_data(rng, 500)
+        base = [rng.random() for _ in frames]
+
+        blended = modifier.compiled.blend_engagement(base, modifier.compiled.score_frames(frames))
+        for score, frame, value in zip(base, frames, blended):
+            assert value == pytest.approx(modifier.modify_engagement_score(score, frame)[0], abs=1e-12)
+
+        # Disabled: scores pass through unchanged
+        disabled = CompiledFacialConfig()
+        assert np.array_equal(disabled.blend_engagement(base, np.full(len(base), 0.9)), base)
+
+
+class TestFacialFastPath:
+    """Test that disabled integration skips facial evaluation."""
+
+    def test_disabled_modifier_skips_validation(self, monkeypatch):
+        """Test adaptation metadata is the compiled constant without validating data."""
+        modifier = get_facial_modifier()
+        assert modifier is get_facial_modifier()
+        assert not modifier.is_enabled()
+
+        def fail(*args, **kwargs):
+            raise AssertionError('validator called on disabled path')
+        monkeypatch.setattr(FacialDataValidator, 'validate', staticmethod(fail))
+
+        metadata = modifier.get_integration_metadata({'emotion_detected': 'happy'})
+        assert metadata == {
+            'facial_integration_enabled': False,
+            'facial_signal_used': False,
+            'fallback_mode_active': True,
+            'reason': 'Facial integration not enabled'
+        }
+        metadata['reason'] = 'changed'
+        assert modifier.get_integration_metadata(None)['reason'] == 'Facial integration not enabled'
+
+    def test_enabled_metadata_reports_signal(self):
+        """Test enabled integration still explains the signal it used."""
+        modifier = AdaptationModifier(EnabledConfig)
+        metadata = modifier.get_integration_metadata({
+            'emotion_detected': 'Happy', 'emotion_confidence': 0.9, 'gaze_pattern': 'away'
+        })
+        assert metadata['facial_signal_used']
+        assert metadata['facial_engagement_signal'] == pytest.approx(0.88)
+        assert 'Gaze: away' in metadata['facial_signal_reason']
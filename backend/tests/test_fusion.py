@@ -0,0 +1,54 @@
+import random
+import pytest
+from app.engagement.indicators import EngagementIndicators
+from app.engagement.fusion import EngagementFusionEngine
+
+
+def random_indicators(rng):
+    """Indicator snapshots drawn around the fusion thresholds."""
+    indicators = EngagementIndicators()
+    pick = lambda *edges: rng.choice(list(edges) + [rng.random()])
+    indicators.response_time_deviation = pick(0.0, 0.8, 1.0)
+    indicators.inactivity_duration = rng.choice([0.0, 10.0, 30.0, 45.5, 60.0, 120.0, rng.uniform(0, 90)])
+    indicators.hint_usage_count = rng.randint(0, 7)
+    indicators.rapid_guessing_probability = pick(0.0, 0.5, 1.0)
+    indicators.accuracy_trend = rng.choice([-1.0, -0.3, 0.0, 0.5, 1.0, rng.uniform(-1, 1)])
+    indicators.consistency_score = pick(0.0, 0.3, 1.0)
+    indicators.inferred_cognitive_load = pick(0.0, 0.5, 0.8, 1.0)
+    indicators.frustration_probability = pick(0.0, 0.7, 1.0)
+    indicators.confusion_probability = pick(0.0, 0.7, 1.0)
+    indicators.boredom_probability = pick(0.0, 0.7, 1.0)
+    indicators.window_size = rng.randint(0, 12)
+    indicators.is_valid = rng.random() < 0.9
+    return indicators
+
+
+class TestFuseMany:
+    """Parity of the columnar fuse_many path with scalar fuse."""
+
+    def test_matches_scalar_fuse(self):
+        """Test every fused field equals the scalar result exactly."""
+        engine = EngagementFusionEngine()
+        rng = random.Random(7)
+        snapshots = [random_indicators(rng) for _ in range(5000)]
+
+        fused = engine.fuse_many(engine.to_columns(snapshots))
+        states = engine.states_from_columns(fused)
+
+        for indicators, state in zip(snapshots, states):
+            expected = engine.fuse(indicators)
+            for field in ('engagement_score', 'behavioral_score', 'cognitive_score', 'affective_score',
+                          'confidence', 'categorical_state', 'primary_driver', 'secondary_driver'):
+                assert getattr(state, field) == getattr(expected, field), field
+
+    def test_is_valid_defaults_to_true(self):
+        """Test columns without is_valid are fused as valid snapshots."""
+        engine = EngagementFusionEngine()
+        indicators = random_indicators(random.Random(1))
+        indicators.is_valid = True
+        columns = engine.to_columns([indicators])
+        del columns['is_valid']
+
+        fused = engine.fuse_many(columns)
+        assert fused['engagement_score'][0] == engine.fuse(indicators).engagement_score
+        assert fused['engagement_score'].shape == (1,)
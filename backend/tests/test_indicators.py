@@ -0,0 +1,79 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from app.engagement.fusion import INDICATOR_COLUMNS
+from app.engagement.indicators import EngagementIndicators, EngagementIndicatorExtractor, StreamingIndicatorExtractor
+
+
+def random_responses(rng, count):
+    """Response-like objects with occasional missing/zero/rapid response times."""
+    at = datetime(2024, 1, 1)
+    responses = []
+    for _ in range(count):
+        at += timedelta(seconds=rng.choice([0, 2, 7.5, 15, 45]))
+        responses.append(SimpleNamespace(
+            timestamp=at,
+            response_time_seconds=rng.choice([None, 0, 0.4, 0.9, rng.uniform(1, 40)]),
+            is_correct=rng.random() < rng.choice([0.2, 0.5, 0.9]),
+            hints_used=rng.choice([0, 0, 0, 1, 2])
+        ))
+    return responses
+
+
+class TestStreamingIndicators:
+    """Property tests of the streaming extractor against extract_from_responses."""
+
+    @pytest.mark.parametrize('window_size', [None, 1, 2, 5, 8])
+    def test_snapshot_matches_batch_extraction(self, window_size):
+        """Test every snapshot equals batch extraction over the same window."""
+        batch = EngagementIndicatorExtractor()
+        for seed in range(25):
+            rng = random.Random(seed)
+            responses = random_responses(rng, rng.randint(0, 30))
+            stream = StreamingIndicatorExtractor(window_size=window_size)
+
+            for i, response in enumerate(responses, 1):
+                stream.push(response)
+                window = responses[max(0, i - window_size):i] if window_size else responses[:i]
+                expected = batch.extract_from_responses(window)
+                actual = stream.snapshot()
+                for field in INDICATOR_COLUMNS:
+                    assert getattr(actual, field) == pytest.approx(getattr(expected, field), abs=1e-6), \
+                        (seed, i, field)
+
+    def test_reset_clears_window(self):
+        """Test reset returns the extractor to an empty, invalid state."""
+        stream = StreamingIndicatorExtractor(window_size=4)
+        for response in random_responses(random.Random(0), 6):
+            stream.push(response)
+        assert len(stream) == 4
+
+        stream.reset()
+        assert len(stream) == 0
+        assert stream.snapshot().is_valid is False
+
+    @pytest.mark.parametrize('window_size', [0, -3])
+    def test_rejects_empty_window(self, window_size):
+        """Test a window that could never hold a response is rejected up front."""
+        with pytest.raises(ValueError):
+            StreamingIndicatorExtractor(window_size=window_size)
+
+
+class TestRecordTypes:
+    """Test the per-question record types stay slotted."""
+
+    def test_records_have_no_instance_dict(self):
+        """Test indicator, fusion and log records carry no per-instance __dict__."""
+        from app.engagement.fusion import EngagementFusionEngine
+        from app.logging.engagement_logger import EngagementLogEntry, WindowLogEntry
+
+        indicators = EngagementIndicators()
+        records = [
+            indicators,
+            EngagementFusionEngine().fuse(indicators),
+            EngagementLogEntry('session', 1),
+            WindowLogEntry('session', 1)
+        ]
+        for record in records:
+            assert not hasattr(record, '__dict__'), type(record).__name__
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from app import db
+from app.models import KnowledgeState, BKTParameters
+from app.engagement.knowledge_tracing import BayesianKnowledgeTracer, bkt_step
+
+
+def _simulate_bkt(params, students=400, length=15, seed=7):
+    """Generate response sequences from a known BKT model."""
+    rng = np.random.default_rng(seed)
+    sequences = []
+    for _ in range(students):
+        known = rng.random() < params['p_init']
+        seq = []
+        for _ in range(length):
+            p_correct = 1 - params['p_slip'] if known else params['p_guess']
+            seq.append(int(rng.random() < p_correct))
+            if not known and rng.random() < params['p_learn']:
+                known = True
+        sequences.append(seq)
+    return sequences
+
+
+class TestBayesianKnowledgeTracing:
+    """Test the BKT store and EM fitter."""
+
+    def test_step_moves_toward_evidence(self):
+        """Test that correct answers raise and wrong answers lower P(known)."""
+        params = {'p_init': 0.3, 'p_learn': 0.1, 'p_slip': 0.1, 'p_guess': 0.2}
+        assert bkt_step(0.3, True, params) > 0.3
+        assert bkt_step(0.3, False, params) < bkt_step(0.3, True, params)
+
+    def test_submit_updates_state(self, client, app, sample_student, sample_questions):
+        """Test that recording an answer updates the student's topic state once."""
+        session_id = client.post('/api/cbt/session/start', json={
+            'student_id': sample_student, 'subject': 'Mathematics', 'num_questions': 2
+        }).get_json()['session']['session_id']
+        question = client.get(f'/api/cbt/question/next/{session_id}').get_json()['question']
+
+        for _ in range(2):  # Revisiting the same question must not count twice
+            client.post('/api/cbt/response/submit', json={
+                'session_id': session_id,
+                'question_id': question['question_id'],
+                'student_answer': 'A'
+            })
+
+        with app.app_context():
+            state = KnowledgeState.query.filter_by(student_id=sample_student, topic='Algebra').one()
+            assert state.attempts == 1
+
+        response = client.get(f'/api/analytics/mastery/bkt/{sample_student}?topic=Algebra')
+        assert response.status_code == 200
+        assert response.get_json()['data']['attempts'] == 1
+
+    def test_em_recovers_parameters(self, app):
+        """Test that the vectorized EM fitter recovers generating parameters."""
+        truth = {'p_init': 0.2, 'p_learn': 0.15, 'p_slip': 0.08, 'p_guess': 0.22}
+        with app.app_context():
+            fitted = BayesianKnowledgeTracer().fit_topic(_simulate_bkt(truth), max_iterations=200)
+
+        for name, value in truth.items():
+            assert fitted[name] == pytest.approx(value, abs=0.06), name
+
+    def test_fit_without_history(self, app):
+        """Test that fitting with no history is a no-op."""
+        with app.app_context():
+            assert BayesianKnowledgeTracer().fit() == {}
+            assert BKTParameters.query.count() == 0
@@ -0,0 +1,77 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import db
+from app.models import Question, Session, StudentResponse
+from app.engagement.mastery import MasteryTracker
+
+
+@pytest.fixture
+def answered_session(app, sample_student, sample_questions):
+    """Session with Algebra answered 1/2 correct, then Physics answered correctly."""
+    with app.app_context():
+        session = Session(student_id=sample_student, subject='Mathematics')
+        db.session.add(session)
+        db.session.commit()
+
+        algebra = Question.query.filter_by(topic='Algebra').order_by(Question.difficulty).all()
+        physics = Question.query.filter_by(topic='Physics').first()
+        start = datetime.utcnow()
+        outcomes = [(algebra[0], True), (algebra[1], False), (physics, True)]
+        for i, (question, is_correct) in enumerate(outcomes):
+            db.session.add(StudentResponse(
+                session_id=session.id,
+                question_id=question.id,
+                student_answer='A',
+                is_correct=is_correct,
+                response_time_seconds=10.0,
+                timestamp=start + timedelta(seconds=i)
+            ))
+        db.session.commit()
+        return session.id
+
+
+class TestMasteryTracker:
+    """Test grouped mastery computation."""
+
+    def test_topic_mastery_without_session(self, app, sample_student, answered_session):
+        """Test the student-wide topic query (joins through sessions)."""
+        with app.app_context():
+            mastery = MasteryTracker().calculate_topic_mastery(sample_student, 'Algebra')
+
+            assert mastery['total'] == 2
+            assert mastery['correct'] == 1
+            assert mastery['accuracy'] == 0.5
+
+    def test_overall_mastery_groups_topics(self, app, sample_student, answered_session):
+        """Test that every topic is computed from one ordered pass."""
+        with app.app_context():
+            overall = MasteryTracker().calculate_overall_mastery(sample_student)
+
+            assert overall['topics_studied'] == 2
+            assert overall['total_attempts'] == 3
+            assert overall['total_correct'] == 2
+            assert overall['topics']['Physics']['accuracy'] == 1.0
+            assert overall['topics']['Algebra']['learning_curve']['points'][-1]['y'] == 0.5
+
+    def test_knowledge_profile_uses_single_query(self, app, sample_student, answered_session):
+        """Test that the profile issues one SELECT regardless of topic count."""
+        with app.app_context():
+            statements = []
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', count)
+            try:
+                profile = MasteryTracker().get_knowledge_profile(sample_student)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count)
+
+            assert profile['total_attempts'] == 3
+            assert len(statements) == 1
+
+    def test_no_data(self, app, sample_student):
+        """Test a student without responses."""
+        with app.app_context():
+            assert MasteryTracker().calculate_overall_mastery(sample_student)['status'] == 'no_data'
@@ -0,0 +1,92 @@
+import random
+import numpy as np
+import pytest
+from app.adaptation.replay import PolicyReplayEngine, ReplayDataset, replay_difficulty, default_policy
+from app.simulation import HeadlessEngine
+
+
+class _ScriptedLearner:
+    """Answers correctly with a fixed probability."""
+
+    def __init__(self, learner_id, p_correct, seed):
+        self.learner_id = learner_id
+        self.p_correct = p_correct
+        self.rng = random.Random(seed)
+
+    def respond(self, question, correct_option, state):
+        answer = correct_option if self.rng.random() < self.p_correct else \
+            next(o for o in 'ABCD' if o != correct_option)
+        return {'student_answer': answer, 'response_time_seconds': 12.0}
+
+
+def _synthetic_dataset(sessions=200, length=12, seed=0):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, length + 1, size=sessions)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    events = int(offsets[-1])
+    return ReplayDataset(
+        [f's{i}' for i in range(sessions)], offsets,
+        rng.integers(0, 2, size=events), rng.random(events), rng.random(events),
+        np.full(sessions, 0.5)
+    )
+
+
+class TestPolicyReplay:
+    """Test offline replay of the difficulty policy."""
+
+    def test_replay_reproduces_live_engine(self):
+        """Test that replaying logged sessions with the default policy matches the live engine."""
+        with HeadlessEngine() as engine:
+            engine.seed_synthetic_questions(per_difficulty=12)
+            learners = [_ScriptedLearner(f'R-{i}', p, seed=i)
+                        for i, p in enumerate([0.95, 0.6, 0.3, 0.05, 0.75, 0.5])]
+            traces = engine.run_sessions(learners, 'Simulation', num_questions=12)
+
+            replay = PolicyReplayEngine.from_database()
+            report = replay.compare()
+
+        final = dict(zip(replay.dataset.session_ids, replay.baseline['final_difficulty']))
+        for trace in traces:
+            assert final[trace['session_id']] == pytest.approx(trace['final_difficulty'])
+        assert report['baseline_fidelity'] == 1.0
+        assert report['divergence']['sessions_diverged'] == 0.0
+
+    def test_decisions_match_scalar_policy(self):
+        """Test the vectorized decisions step by step against a scalar re-implementation."""
+        dataset = _synthetic_dataset()
+        policy = default_policy()
+        result = replay_difficulty(dataset, policy)
+
+        window = policy['adapt_every_n_answers']
+        for s in range(dataset.num_sessions):
+            start, stop = dataset.offsets[s], dataset.offsets[s + 1]
+            difficulty = 0.5
+            for end in range(start + window, stop + 1, window):
+                accuracy = dataset.correct[end - window:end].sum() / float(window)
+                new = difficulty
+                for bound, inclusive, step in policy['accuracy_bands']:
+                    if (accuracy >= bound) if inclusive else (accuracy > bound):
+                        break
+                else:
+                    step = policy['below_bands_step']
+                if step > 0:
+                    new = min(policy['max_difficulty'], difficulty + step)
+                elif step < 0:
+                    new = max(policy['min_difficulty'], difficulty + step)
+                if dataset.engagement[end - 1] < policy['low_engagement_threshold'] and new == difficulty:
+                    new = max(policy['min_difficulty'], difficulty - policy['low_engagement_step'])
+                difficulty = new
+            assert result['final_difficulty'][s] == pytest.approx(difficulty)
+
+    def test_alternative_policy_diverges(self):
+        """Test that changed thresholds are reported as divergence, in and out of a pool."""
+        engine = PolicyReplayEngine(_synthetic_dataset())
+        grid = {'adapt_every_n_answers': [3, 4], 'low_engagement_threshold': [0.3, 0.0]}
+
+        reports = engine.grid(grid, max_workers=1)
+        assert len(reports) == 4
+        assert reports[0]['divergence']['sessions_diverged'] == 0.0
+        assert reports[-1]['divergence']['sessions_diverged'] > 0.0
+
+        pooled = engine.grid(grid, max_workers=2)
+        assert [r['divergence'] for r in pooled] == [r['divergence'] for r in reports]
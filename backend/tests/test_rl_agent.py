@@ -0,0 +1,253 @@
+import itertools
+import json
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import db
+from app.models import Session, AdaptationLog, EngagementMetric
+from app.adaptation.rl_agent import RLAdaptiveAgent
+from app.adaptation.transitions import TransitionExtractor
+from app.adaptation.rl_policy_optimizer import RLPolicyOptimizer
+
+
+@pytest.fixture
+def logged_sessions(app, sample_student):
+    """Two sessions with interleaved adaptation logs and engagement metrics."""
+    start = datetime(2024, 1, 1, 9, 0, 0)
+    session_ids = []
+    for s in range(2):
+        session = Session(student_id=sample_student, subject='Mathematics')
+        db.session.add(session)
+        db.session.flush()
+        session_ids.append(session.id)
+        # Metrics at minutes 0, 2, 4, 6; logs at minutes 1, 3, 5 (and one before any metric)
+        for m in range(4):
+            db.session.add(EngagementMetric(
+                student_id=sample_student, session_id=session.id,
+                timestamp=start + timedelta(minutes=2 * m),
+                engagement_score=0.2 + 0.2 * m, accuracy=0.3 + 0.2 * m,
+                confidence_level=None if m == 1 else 0.5
+            ))
+        for minute in (-1, 1, 3, 5):
+            db.session.add(AdaptationLog(
+                student_id=sample_student, session_id=session.id,
+                timestamp=start + timedelta(minutes=minute),
+                trigger_metric='engagement', trigger_value=0.4,
+                adaptation_type='difficulty', old_value=0.5, new_value=0.6 if s == 0 else 0.4
+            ))
+    db.session.commit()
+    return session_ids
+
+
+class TestRLAdaptiveAgent:
+    """Test the array-backed Q-learning agent."""
+
+    def test_state_and_action_indexing_round_trip(self):
+        """Test that every action id maps back to itself and states are dense."""
+        agent = RLAdaptiveAgent()
+        ids = {agent.action_index(agent.index_to_action(i)) for i in range(agent.num_actions)}
+        assert ids == set(range(agent.num_actions))
+        assert agent.state_index(('high', 'good', 'hard')) == agent.num_states - 1
+
+    def test_unvisited_state_is_neutral(self):
+        """Test that the greedy policy falls back to the neutral action."""
+        agent = RLAdaptiveAgent()
+        assert agent.best_action(('low', 'poor', 'easy')) == RLAdaptiveAgent.NEUTRAL_ACTION
+
+    def test_batch_step_matches_single_updates(self):
+        """Test that a batch of distinct pairs equals sequential updates from the same Q-array."""
+        single = RLAdaptiveAgent(learning_rate=0.5, discount_factor=0.9)
+        batched = RLAdaptiveAgent(learning_rate=0.5, discount_factor=0.9)
+        state = ('medium', 'fair', 'medium')
+        actions = [(0.1, 'fast', 'minimal', 'advance'), (-0.1, 'slow', 'generous', 'reinforce_gaps')]
+        terminal = ('high', 'good', 'hard')
+
+        for action, reward in zip(actions, (1.0, -0.5)):
+            single.update_q_value(state, action, reward, terminal)
+        batched.train_batch(
+            [batched.state_index(state)] * 2,
+            [batched.action_index(a) for a in actions],
+            [1.0, -0.5],
+            [batched.state_index(terminal)] * 2
+        )
+
+        np.testing.assert_allclose(single.q_values, batched.q_values)
+        assert batched.best_action(state) == actions[0]
+
+    def test_replay_learns_best_action(self):
+        """Test that experience replay recovers the rewarding action from logged transitions."""
+        agent = RLAdaptiveAgent(learning_rate=0.2, discount_factor=0.0)
+        rng = np.random.default_rng(0)
+        state_id = agent.state_index(('low', 'poor', 'easy'))
+        good = agent.action_index((-0.2, 'slow', 'generous', 'reinforce_gaps'))
+        actions = rng.integers(0, agent.num_actions, size=5000)
+        rewards = np.where(actions == good, 1.0, rng.normal(0, 0.1, size=5000))
+
+        agent.experience_buffer.add_batch(np.full(5000, state_id), actions, rewards, np.full(5000, state_id))
+        agent.replay(batch_size=2048, steps=30, rng=rng)
+
+        assert agent.best_action(('low', 'poor', 'easy')) == (-0.2, 'slow', 'generous', 'reinforce_gaps')
+
+    def test_npz_and_legacy_json_persistence(self, tmp_path):
+        """Test .npz round trip and import of the old JSON Q-table format."""
+        agent = RLAdaptiveAgent(epsilon=0.2)
+        agent.update_q_value(('low', 'fair', 'easy'), (0.1, 'fast', 'normal', 'advance'), 0.8,
+                             ('medium', 'fair', 'easy'))
+        agent.save_model(tmp_path / 'policy.npz')
+
+        restored = RLAdaptiveAgent()
+        restored.load_model(tmp_path / 'policy.npz')
+        np.testing.assert_array_equal(restored.q_values, agent.q_values)
+        assert restored.epsilon == 0.2
+
+        legacy = tmp_path / 'policy.json'
+        legacy.write_text(json.dumps({
+            'q_table': {"('high', 'good', 'hard')": {"(0.2, 'fast', 'minimal', 'advance')": 0.7}},
+            'alpha': 0.1, 'gamma': 0.95, 'epsilon': 0.1
+        }))
+        imported = RLAdaptiveAgent()
+        imported.load_model(str(legacy))
+        assert imported.best_action(('high', 'good', 'hard')) == (0.2, 'fast', 'minimal', 'advance')
+
+    def test_state_ids_follow_level_counts(self, monkeypatch):
+        """Test state ids stay distinct and dense when a dimension gains a level."""
+        levels = dict(RLAdaptiveAgent.STATE_LEVELS, accuracy=('poor', 'fair', 'good', 'excellent'))
+        monkeypatch.setattr(RLAdaptiveAgent, 'STATE_LEVELS', levels)
+        agent = RLAdaptiveAgent()
+        assert agent.num_states == 36
+
+        ids = {agent.state_index(state) for state in itertools.product(*levels.values())}
+        assert ids == set(range(36))
+
+    def test_npz_suffix_is_normalized(self, tmp_path):
+        """Test a path without .npz saves and loads the same file."""
+        agent = RLAdaptiveAgent()
+        agent.update_q_value(('low', 'fair', 'easy'), (0.1, 'fast', 'normal', 'advance'), 0.8,
+                             ('medium', 'fair', 'easy'))
+        assert agent.save_model(tmp_path / 'policy') == str(tmp_path / 'policy.npz')
+
+        restored = RLAdaptiveAgent()
+        restored.load_model(tmp_path / 'policy')
+        np.testing.assert_array_equal(restored.q_values, agent.q_values)
+
+
+class TestTransitionExtractor:
+    """Test the as-of merge that feeds RL training."""
+
+    def _point_lookup_transitions(self, session_id):
+        """Reference: per-log 'latest metric at or before' queries."""
+        def as_of(timestamp):
+            return EngagementMetric.query.filter_by(session_id=session_id).filter(
+                EngagementMetric.timestamp <= timestamp
+            ).order_by(EngagementMetric.timestamp.desc()).first()
+
+        logs = AdaptationLog.query.filter_by(session_id=session_id).order_by(AdaptationLog.timestamp).all()
+        pairs = []
+        for log, next_log in zip(logs, logs[1:]):
+            before, after = as_of(log.timestamp), as_of(next_log.timestamp)
+            if before and after:
+                pairs.append((log.id, before.timestamp, after.timestamp))
+        return pairs
+
+    def test_merge_matches_point_lookups(self, app, logged_sessions):
+        """Test that the streaming merge aligns exactly like timestamp <= lookups."""
+        transitions = list(TransitionExtractor().iter_transitions())
+        expected = sorted(p for session_id in logged_sessions for p in self._point_lookup_transitions(session_id))
+
+        actual = sorted((t.log.id, t.before.timestamp, t.after.timestamp) for t in transitions)
+        assert actual == expected
+        assert len(actual) == 4  # The log before any metric only starts no transition
+
+    def test_session_learning_uses_constant_queries(self, app, logged_sessions):
+        """Test that learning from a session issues two scans instead of 2N lookups."""
+        agent = RLAdaptiveAgent()
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            result = agent.learn_from_experience(None, logged_sessions[0])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+        assert result['updates'] == 2
+        assert len(statements) == 2
+
+    def test_cohort_batches(self, app, logged_sessions, sample_student):
+        """Test cross-session training in batches scoped by student."""
+        agent = RLAdaptiveAgent()
+        batches = list(agent.transition_extractor.iter_batches(agent, student_ids=[sample_student], batch_size=3))
+        assert [len(b['states']) for b in batches] == [3, 1]
+
+        result = agent.learn_from_cohort(student_ids=[sample_student])
+        assert result['updates'] == 4
+        assert len(agent.experience_buffer) == 4
+
+
+class TestPolicyOutcomeAggregation:
+    """Test the grouped outcome aggregation behind policy validation."""
+
+    @pytest.fixture
+    def scored_sessions(self, app, sample_student):
+        """Sessions scoring 80, 40 and None with a mix of adaptation types."""
+        now = datetime.utcnow()
+        plan = [(80.0, ['difficulty', 'difficulty', 'pacing']), (40.0, ['difficulty']), (None, ['hints'])]
+        for i, (score, types) in enumerate(plan):
+            session = Session(student_id=sample_student, subject='Mathematics', score_percentage=score,
+                              session_end=now - timedelta(hours=i))
+            db.session.add(session)
+            db.session.flush()
+            for j, adaptation_type in enumerate(types):
+                db.session.add(AdaptationLog(
+                    student_id=sample_student, session_id=session.id,
+                    timestamp=now - timedelta(hours=i, minutes=j),
+                    trigger_metric='engagement', trigger_value=0.5, adaptation_type=adaptation_type
+                ))
+        db.session.commit()
+
+    def test_validate_policy(self, app, scored_sessions):
+        """Test per-type effectiveness over the most recent sessions."""
+        validation = RLPolicyOptimizer(RLAdaptiveAgent()).validate_policy(test_sessions_count=2)
+
+        assert validation['sessions_analyzed'] == 2
+        assert validation['avg_session_performance'] == 60.0
+        assert validation['action_effectiveness'] == {'difficulty': 2 / 3, 'pacing': 1.0}
+
+    def test_action_impact(self, app, scored_sessions):
+        """Test grouped impact statistics for one adaptation type."""
+        optimizer = RLPolicyOptimizer(RLAdaptiveAgent())
+        impact = optimizer.analyze_action_impact('difficulty')
+
+        assert impact['total_times_used'] == 3
+        assert impact['success_rate'] == pytest.approx(2 / 3)
+        assert impact['avg_impact_score'] == pytest.approx(0.8)
+        assert impact['impact_std'] == pytest.approx(0.0, abs=1e-9)
+        assert optimizer.analyze_action_impact('content')['impact'] == 'insufficient_data'
+
+    def test_cache_keyed_by_latest_log(self, app, scored_sessions, sample_student):
+        """Test that cached aggregates are reused until a new log arrives."""
+        optimizer = RLPolicyOptimizer(RLAdaptiveAgent())
+        assert optimizer.analyze_action_impact('hints')['total_times_used'] == 1
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            optimizer.analyze_action_impact('pacing')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        assert len(statements) == 1  # Only the latest-log check
+
+        session_id = AdaptationLog.query.filter_by(adaptation_type='hints').first().session_id
+        db.session.add(AdaptationLog(
+            student_id=sample_student, session_id=session_id, timestamp=datetime.utcnow() + timedelta(minutes=1),
+            trigger_metric='engagement', trigger_value=0.5, adaptation_type='hints'
+        ))
+        db.session.commit()
+        assert optimizer.analyze_action_impact('hints')['total_times_used'] == 2
@@ -0,0 +1,66 @@
+import random
+import pytest
+from types import SimpleNamespace
+from app.simulation import HeadlessEngine, Learner, ProfileLearner
+
+
+AVERAGE_PROFILE = SimpleNamespace(
+    response_time_mean=20.0,
+    response_time_std=5.0,
+    accuracy_mean=0.65,
+    accuracy_std=0.10,
+    hint_usage_probability=0.2,
+    option_changes_probability=0.2
+)
+
+
+class AlwaysCorrectLearner:
+    """Learner that always answers correctly."""
+
+    def __init__(self, learner_id):
+        self.learner_id = learner_id
+
+    def respond(self, question, correct_option, state):
+        return {'student_answer': correct_option, 'response_time_seconds': 10.0}
+
+
+@pytest.fixture
+def engine():
+    """Headless engine with a synthetic question bank."""
+    engine = HeadlessEngine()
+    engine.seed_synthetic_questions('Simulation', per_difficulty=10)
+    yield engine
+    engine.close()
+
+
+class TestHeadlessEngine:
+    """Test running sessions through the in-process engine."""
+
+    def test_learners_satisfy_protocol(self):
+        """Test that the bundled learners implement the Learner protocol."""
+        assert isinstance(ProfileLearner('L-1', AVERAGE_PROFILE), Learner)
+        assert isinstance(AlwaysCorrectLearner('L-2'), Learner)
+
+    def test_run_session_completes(self, engine):
+        """Test that a session runs to the requested length."""
+        learner = ProfileLearner('L-1', AVERAGE_PROFILE, random.Random(1))
+        trace = engine.run_session(learner, 'Simulation', num_questions=6)
+
+        assert len(trace['interactions']) == 6
+        assert len({i['question_id'] for i in trace['interactions']}) == 6
+        assert 0 <= trace['final_score'] <= 100
+
+    def test_adaptive_condition_raises_difficulty(self, engine):
+        """Test that a perfect learner is moved up by the real adaptive engine."""
+        trace = engine.run_session(AlwaysCorrectLearner('L-2'), 'Simulation', num_questions=6)
+
+        assert trace['final_score'] == 100
+        assert trace['final_difficulty'] > 0.5
+
+    def test_non_adaptive_condition_holds_difficulty(self, engine):
+        """Test that the non-adaptive condition keeps difficulty constant."""
+        trace = engine.run_session(AlwaysCorrectLearner('L-3'), 'Simulation',
+                                   num_questions=6, adaptive=False)
+
+        assert trace['condition'] == 'non-adaptive'
+        assert {i['difficulty_after'] for i in trace['interactions']} == {0.5}
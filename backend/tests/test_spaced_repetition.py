@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+from app import db
+from app.models import LearningRecord, ReviewQueueEntry, Question, Student
+from app.engagement.spaced_repetition import SpacedRepetitionScheduler
+from app.engagement.review_queue import ReviewQueueBuilder
+from app.simulation import HeadlessEngine
+
+
+def _add_record(student_id, question_id, days_from_now, ef=2.5, reps=1):
+    db.session.add(LearningRecord(
+        student_id=student_id,
+        question_id=question_id,
+        easiness_factor=ef,
+        repetitions=reps,
+        interval_days=1,
+        next_review=datetime.utcnow() + timedelta(days=days_from_now)
+    ))
+
+
+class TestSpacedRepetition:
+    """Test persisted SM-2 learning records and due queues."""
+
+    def test_schedule_persists_record(self, app, sample_student, sample_questions):
+        """Test that scheduling a review is remembered for the next review."""
+        scheduler = SpacedRepetitionScheduler()
+        question_id = Question.query.first().id
+
+        first = scheduler.schedule_question_review(sample_student, question_id, quality=5)
+        second = scheduler.schedule_question_review(sample_student, question_id, quality=5)
+
+        assert first['repetition_count'] == 1
+        assert second['repetition_count'] == 2
+        assert second['interval_days'] == 3
+        assert LearningRecord.query.filter_by(student_id=sample_student).count() == 1
+
+    def test_due_queue_is_ordered_and_limited(self, app, sample_student, sample_questions):
+        """Test that due items come back most overdue first with question rows joined."""
+        scheduler = SpacedRepetitionScheduler()
+        ids = [q.id for q in Question.query.order_by(Question.difficulty).all()]
+        _add_record(sample_student, ids[0], -1)
+        _add_record(sample_student, ids[1], -5)
+        _add_record(sample_student, ids[2], 3)
+        db.session.commit()
+
+        due = scheduler.get_due_for_review(sample_student, limit=1)
+        assert [d['question_id'] for d in due] == [ids[1]]
+        assert due[0]['question'].id == ids[1]
+        assert scheduler.count_due(sample_student) == 2
+
+    def test_statistics_buckets(self, app, sample_student, sample_questions):
+        """Test that statistics are aggregated from the learning records."""
+        scheduler = SpacedRepetitionScheduler()
+        ids = [q.id for q in Question.query.all()]
+        _add_record(sample_student, ids[0], -1)
+        _add_record(sample_student, ids[1], 2, reps=12)
+        _add_record(sample_student, ids[2], 2, ef=1.3)
+        db.session.commit()
+
+        stats = scheduler.get_learning_statistics(sample_student)
+        assert stats['total_questions_studied'] == 3
+        assert stats['due_for_review'] == 1
+        assert stats['mastered'] == 1
+        assert stats['struggling'] == 1
+        assert stats['estimated_retention'] == round((0.52 + 0.74 + 0.52) / 3, 3)
+
+    def test_due_endpoint(self, client, app, sample_student, sample_questions):
+        """Test the due-for-review endpoint reports the full count but a limited list."""
+        ids = [q.id for q in Question.query.all()]
+        for question_id in ids:
+            _add_record(sample_student, question_id, -2)
+        db.session.commit()
+
+        data = client.get(f'/api/analytics/sr/due-for-review/{sample_student}?limit=2').get_json()
+        assert data['due_count'] == 3
+        assert len(data['questions']) == 2
+
+        url = f'/api/analytics/sr/due-for-review/{sample_student}'
+        assert len(client.get(f'{url}?limit=100000').get_json()['questions']) == 3
+        for limit in ('abc', '0', '-5', ''):
+            assert client.get(f'{url}?limit={limit}').status_code == 400
+
+
+class TestReviewQueueBuilder:
+    """Test the precomputed nightly review queues."""
+
+    def _seed(self, app, students=3):
+        question_ids = [q.id for q in Question.query.all()]
+        student_ids = []
+        for i in range(students):
+            student = Student(email=f'queue{i}@example.com', name=f'Queue {i}')
+            db.session.add(student)
+            db.session.flush()
+            student_ids.append(student.id)
+            _add_record(student.id, question_ids[0], -1, ef=2.5)
+            _add_record(student.id, question_ids[1], -1, ef=1.4)
+            _add_record(student.id, question_ids[2], -4)
+        db.session.commit()
+        return student_ids, question_ids
+
+    def test_queue_priority(self, app, sample_questions):
+        """Test that queues order by days overdue, then lowest easiness factor."""
+        student_ids, question_ids = self._seed(app)
+        builder = ReviewQueueBuilder(per_student_limit=2)
+
+        summary = builder.build(num_partitions=2)
+        assert summary['students'] == 3
+        assert summary['entries'] == 6
+
+        queue = builder.get_queue(student_ids[0])
+        assert [q['question_id'] for q in queue] == [question_ids[2], question_ids[1]]
+
+    def test_process_pool_matches_in_process(self, tmp_path):
+        """Test that a pooled build over a file database stores the same queues."""
+        database_uri = f'sqlite:///{tmp_path / "queues.db"}'
+        with HeadlessEngine(database_uri=database_uri) as engine:
+            engine.seed_synthetic_questions(per_difficulty=2, difficulties=(0.3, 0.5))
+            question_ids = [q.id for q in Question.query.all()]
+            for i in range(5):
+                student_id = engine.create_student(f'Q-{i}')
+                for j, question_id in enumerate(question_ids):
+                    _add_record(student_id, question_id, -(i + j) % 4, ef=1.3 + 0.1 * j)
+            db.session.commit()
+
+            builder = ReviewQueueBuilder(per_student_limit=3)
+            now = datetime.utcnow()
+            order = (ReviewQueueEntry.student_id, ReviewQueueEntry.position)
+
+            builder.build(now=now, num_partitions=3)
+            expected = [(e.student_id, e.question_id) for e in ReviewQueueEntry.query.order_by(*order)]
+
+            # Workers open the database the app's engine resolved
+            summary = builder.build(now=now, num_partitions=3, max_workers=2)
+            actual = [(e.student_id, e.question_id) for e in ReviewQueueEntry.query.order_by(*order)]
+
+        assert summary['students'] == 5
+        assert actual == expected
+
+    def test_endpoint_serves_queue_and_drops_reviewed(self, client, app, sample_questions):
+        """Test the endpoint reads the stored queue and reviews remove entries."""
+        student_ids, question_ids = self._seed(app, students=1)
+        ReviewQueueBuilder().build()
+
+        data = client.get(f'/api/analytics/sr/due-for-review/{student_ids[0]}').get_json()
+        assert data['source'] == 'precomputed'
+        assert data['questions'][0]['question_id'] == question_ids[2]
+
+        SpacedRepetitionScheduler().schedule_question_review(student_ids[0], question_ids[2], quality=5)
+        data = client.get(f'/api/analytics/sr/due-for-review/{student_ids[0]}').get_json()
+        assert question_ids[2] not in [q['question_id'] for q in data['questions']]
@@ -0,0 +1,266 @@
+"""
+Parallel Sharded Learner Simulation
+====================================
+
+Runs the standalone learner simulation across a process pool for large
+Monte Carlo studies (e.g. 100k learners per condition).
+
+Key Design:
+- Learners are split into contiguous shards; each shard runs in a worker
+  process with its own seed derived deterministically from RANDOM_SEED; the
+  default shard count depends only on the number of learners, so results do
+  not depend on worker count or scheduling order
+- Each shard streams one JSON line per learner record (same record shape as
+  standalone_simulator.run_simulation) as soon as the learner finishes, so
+  memory stays bounded by a single learner
+- Shards are optionally gzip-compressed
+- A manifest.json listing shards, seeds and counts is written at the end;
+  process_simulation_data.extract_from_simulation accepts the manifest path
+
+Usage:
+    python3 data/parallel_simulation.py --learners 100000 --questions 10 --shards 64 --gzip
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from standalone_simulator import (
+    RANDOM_SEED,
+    LearnerArchetype,
+    LearnerSimulator,
+)
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulated", "shards")
+MANIFEST_FORMAT = "sharded-jsonl"
+
+CONDITIONS = (
+    # (condition, learner id prefix)
+    ("adaptive", "ADAPT"),
+    ("non-adaptive", "NONADAPT"),
+)
+
+# Default sharding (num_shards=None): one shard per LEARNERS_PER_SHARD learners,
+# at most MAX_DEFAULT_SHARDS
+LEARNERS_PER_SHARD = 250
+MAX_DEFAULT_SHARDS = 256
+
+# ============================================================================
+# SEEDING & PARTITIONING
+# ============================================================================
+
+def derive_shard_seeds(num_shards: int, base_seed: int = RANDOM_SEED) -> List[int]:
+    """Independent, reproducible per-shard seeds spawned from the base seed"""
+    children = np.random.SeedSequence(base_seed).spawn(num_shards)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def default_shard_count(num_learners: int) -> int:
+    """Shard count derived from the learner count alone (never from the worker count)"""
+    return max(1, min(MAX_DEFAULT_SHARDS, -(-num_learners // LEARNERS_PER_SHARD)))
+
+
+def partition_learners(num_learners: int, num_shards: int) -> List[range]:
+    """Contiguous learner index ranges, sizes differing by at most one"""
+    num_shards = max(1, min(num_shards, num_learners))
+    base, extra = divmod(num_learners, num_shards)
+    ranges = []
+    start = 0
+    for shard in range(num_shards):
+        size = base + (1 if shard < extra else 0)
+        ranges.append(range(start, start + size))
+        start += size
+    return ranges
+
+# ============================================================================
+# SHARD WORKER
+# ============================================================================
+
+def _open_shard(path: str, compress: bool):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    return open(path, "w", encoding="utf-8")
+
+
+def _learner_record(simulator: LearnerSimulator, profile, condition: str, interactions: List[Dict]) -> Dict:
+    """Same learner record shape as standalone_simulator.run_simulation"""
+    learner = simulator.learner
+    return {
+        "learner_id": simulator.learner_id,
+        "profile": profile.name,
+        "condition": condition,
+        "session_id": simulator.session_id,
+        "total_questions_attempted": len(interactions),
+        "total_questions_correct": learner.correct_count,
+        "final_accuracy": round(learner.correct_count / len(interactions), 3) if interactions else 0,
+        "final_engagement": round(learner.current_engagement, 2),
+        "final_difficulty": learner.current_difficulty,
+        "disengaged": learner.disengaged,
+        "interactions": interactions,
+    }
+
+
+def run_shard(shard: int, learner_range: range, seed: int, questions_per_learner: int,
+              output_dir: str, compress: bool) -> Dict:
+    """
+    Simulate every learner in the range under both conditions and stream the
+    records to the shard file. Returns the shard's manifest entry.
+    """
+    random.seed(seed)
+    profile_list = [p.value for p in LearnerArchetype]
+    filename = f"shard-{shard:05d}.jsonl" + (".gz" if compress else "")
+    path = os.path.join(output_dir, filename)
+
+    counts = {condition: {"learners": 0, "interactions": 0, "correct": 0} for condition, _ in CONDITIONS}
+    started = time.time()
+
+    # LearnerSimulator prints disengagement notices; keep worker output quiet
+    with _open_shard(path, compress) as out, contextlib.redirect_stdout(io.StringIO()) as sink:
+        for i in learner_range:
+            profile = profile_list[i % len(profile_list)]
+            for condition, prefix in CONDITIONS:
+                learner_id = f"{prefix}-{i+1:06d}"
+                simulator = LearnerSimulator(learner_id=learner_id, profile=profile, condition=condition)
+                simulator.session_id = f"sess-{learner_id}"  # deterministic across runs
+
+                interactions = simulator.run_session(num_questions=questions_per_learner)
+                record = _learner_record(simulator, profile, condition, interactions)
+                out.write(json.dumps(record, separators=(",", ":")))
+                out.write("\n")
+
+                stats = counts[condition]
+                stats["learners"] += 1
+                stats["interactions"] += len(interactions)
+                stats["correct"] += record["total_questions_correct"]
+
+            sink.seek(0)
+            sink.truncate()
+
+    return {
+        "shard": shard,
+        "file": filename,
+        "seed": seed,
+        "learner_start": learner_range.start,
+        "learner_stop": learner_range.stop,
+        "conditions": counts,
+        "elapsed_seconds": round(time.time() - started, 3),
+    }
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run_parallel_simulation(
+    num_learners: int = 1000,
+    questions_per_learner: int = 10,
+    num_shards: int = None,
+    max_workers: int = None,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    compress: bool = False,
+    base_seed: int = RANDOM_SEED,
+) -> Dict:
+    """
+    Run num_learners per condition across a process pool.
+    Shards (and therefore seeds) default to default_shard_count(num_learners),
+    so a run reproduces on any number of workers.
+    Returns the manifest (also written to <output_dir>/manifest.json).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    num_shards = num_shards or default_shard_count(num_learners)
+
+    ranges = partition_learners(num_learners, num_shards)
+    seeds = derive_shard_seeds(len(ranges), base_seed)
+
+    print(f"Simulating {num_learners} learners/condition x {questions_per_learner} questions "
+          f"in {len(ranges)} shards on {max_workers} workers")
+
+    started = time.time()
+    shards = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_shard, shard, learner_range, seed, questions_per_learner, output_dir, compress)
+            for shard, (learner_range, seed) in enumerate(zip(ranges, seeds))
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            shards.append(future.result())
+            if done % max(1, len(futures) // 10) == 0 or done == len(futures):
+                print(f"  ✓ {done}/{len(futures)} shards complete")
+
+    shards.sort(key=lambda entry: entry["shard"])
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "timestamp": datetime.now().isoformat(),
+        "random_seed": base_seed,
+        "num_learners_per_condition": num_learners,
+        "questions_per_learner": questions_per_learner,
+        "conditions": [condition for condition, _ in CONDITIONS],
+        "learner_profiles": [p.value.name for p in LearnerArchetype],
+        "compressed": compress,
+        "elapsed_seconds": round(time.time() - started, 3),
+        "total_interactions": sum(
+            stats["interactions"] for entry in shards for stats in entry["conditions"].values()
+        ),
+        "shards": shards,
+    }
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✓ {manifest['total_interactions']} interactions in {manifest['elapsed_seconds']:.1f}s "
+          f"→ {output_dir}")
+    return manifest
+
+# ============================================================================
+# READING SHARDS
+# ============================================================================
+
+def iter_learner_records(manifest_path: str) -> Iterator[Dict]:
+    """Stream learner records from every shard listed in a manifest, in shard order"""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    for entry in manifest["shards"]:
+        path = os.path.join(base_dir, entry["file"])
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded parallel learner simulation")
+    parser.add_argument("--learners", type=int, default=1000, help="learners per condition")
+    parser.add_argument("--questions", type=int, default=10, help="questions per learner")
+    parser.add_argument("--shards", type=int, default=None, help=f"number of shards (default: one per {LEARNERS_PER_SHARD} learners, "
+                             f"at most {MAX_DEFAULT_SHARDS})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress shard files")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED)
+    args = parser.parse_args()
+
+    run_parallel_simulation(
+        num_learners=args.learners,
+        questions_per_learner=args.questions,
+        num_shards=args.shards,
+        max_workers=args.workers,
+        output_dir=args.output_dir,
+        compress=args.gzip,
+        base_seed=args.seed,
+    )
@@ -24,74 +24,86 @@ from datetime import datetime
 # DATA EXTRACTION
 # ============================================================================
 
-def extract_from_simulation(json_file: str) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def _iter_learner_records(json_file: str):
     """
-    Extract structured data from simulation JSON.
-    Returns: (responses_df, engagement_df, adaptations_df)
+    Yield (condition_key, learner_record) from either a single simulation JSON
+    or a sharded-jsonl manifest written by parallel_simulation.py.
     """
     with open(json_file, 'r') as f:
         data = json.load(f)
     
+    if data.get('format') == 'sharded-jsonl':
+        from parallel_simulation import iter_learner_records
+        for learner_data in iter_learner_records(json_file):
+            yield learner_data['condition'].replace('-', '_'), learner_data
+        return
+    
+    # Process both conditions
+    for condition_key in ['adaptive', 'non_adaptive']:
+        for learner_data in data.get(condition_key, []):
+            yield condition_key, learner_data
+
+def extract_from_simulation(json_file: str) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Extract structured data from simulation JSON (or a sharded simulation manifest).
+    Returns: (responses_df, engagement_df, adaptations_df)
+    """
     responses = []
     engagement_metrics = []
     adaptations = []
     
-    # Process both conditions
-    for condition_key in ['adaptive', 'non_adaptive']:
-        learners = data.get(condition_key, [])
+    for condition_key, learner_data in _iter_learner_records(json_file):
+        learner_id = learner_data['learner_id']
+        profile = learner_data['profile']
+        interactions = learner_data['interactions']
+        # Use the condition from the data, not from learner_id
+        actual_condition = learner_data.get('condition', condition_key)
         
-        for learner_data in learners:
-            learner_id = learner_data['learner_id']
-            profile = learner_data['profile']
-            interactions = learner_data['interactions']
-            # Use the condition from the data, not from learner_id
-            actual_condition = learner_data.get('condition', condition_key)
+        for interaction in interactions:
+            request = interaction['request']
+            response = interaction['response']
+            
+            # Extract response data
+            response_record = {
+                'learner_id': learner_id,
+                'condition': actual_condition,
+                'profile': profile,
+                'response_time_seconds': request.get('response_time_seconds'),
+                'is_correct': response.get('is_correct', False),
+                'option_changes': request.get('option_changes', 0),
+                'hints_used': request.get('hints_used', 0),
+                'pauses_during_response': request.get('pauses_during_response', 0),
+                'timestamp': interaction['timestamp']
+            }
+            responses.append(response_record)
             
-            for interaction in interactions:
-                request = interaction['request']
-                response = interaction['response']
-                
-                # Extract response data
-                response_record = {
+            # Extract engagement metrics
+            if 'engagement_score' in response:
+                engagement_record = {
                     'learner_id': learner_id,
                     'condition': actual_condition,
-                    'profile': profile,
                     'response_time_seconds': request.get('response_time_seconds'),
-                    'is_correct': response.get('is_correct', False),
-                    'option_changes': request.get('option_changes', 0),
-                    'hints_used': request.get('hints_used', 0),
-                    'pauses_during_response': request.get('pauses_during_response', 0),
+                    'engagement_score': response.get('engagement_score'),
+                    'engagement_level': response.get('engagement_level', 'medium'),
+                    'accuracy_recent': response.get('accuracy_recent', 0.5),
                     'timestamp': interaction['timestamp']
                 }
-                responses.append(response_record)
-                
-                # Extract engagement metrics
-                if 'engagement_score' in response:
-                    engagement_record = {
-                        'learner_id': learner_id,
-                        'condition': actual_condition,
-                        'response_time_seconds': request.get('response_time_seconds'),
-                        'engagement_score': response.get('engagement_score'),
-                        'engagement_level': response.get('engagement_level', 'medium'),
-                        'accuracy_recent': response.get('accuracy_recent', 0.5),
-                        'timestamp': interaction['timestamp']
-                    }
-                    engagement_metrics.append(engagement_record)
-                
-                # Extract adaptation events (all responses have action_type)
-                if 'action_type' in response:
-                    adapt_record = {
-                        'learner_id': learner_id,
-                        'condition': actual_condition,
-                        'previous_difficulty': response.get('previous_difficulty'),
-                        'new_difficulty': response.get('new_difficulty'),
-                        'action_type': response.get('action_type', 'maintain'),
-                        'reason': response.get('reason', ''),
-                        'engagement_level': response.get('engagement_level'),
-                        'timestamp': interaction['timestamp']
-                    }
-                    adaptations.append(adapt_record)
-    
+                engagement_metrics.append(engagement_record)
+            
+            # Extract adaptation events (all responses have action_type)
+            if 'action_type' in response:
+                adapt_record = {
+                    'learner_id': learner_id,
+                    'condition': actual_condition,
+                    'previous_difficulty': response.get('previous_difficulty'),
+                    'new_difficulty': response.get('new_difficulty'),
+                    'action_type': response.get('action_type', 'maintain'),
+                    'reason': response.get('reason', ''),
+                    'engagement_level': response.get('engagement_level'),
+                    'timestamp': interaction['timestamp']
+                }
+                adaptations.append(adapt_record)
+
     return (
         pd.DataFrame(responses),
         pd.DataFrame(engagement_metrics),
@@ -265,6 +277,36 @@ def generate_table_47(adaptations_df: pd.DataFrame) -> pd.DataFrame:
     
     return table
 
+def build_tables(
+    responses_df: pd.DataFrame,
+    engagement_df: pd.DataFrame,
+    adaptations_df: pd.DataFrame
+) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame]:
+    """
+    Generate all Chapter 4 tables from the extracted dataframes.
+    Returns: (tables keyed by name, per-learner info)
+    """
+    # Get learner info
+    learners_info = responses_df.groupby('learner_id').agg({
+        'condition': 'first',
+        'profile': 'first',
+        'is_correct': ['sum', 'count']
+    }).reset_index()
+    learners_info.columns = ['learner_id', 'condition', 'profile', 'correct', 'total']
+    learners_info['accuracy'] = learners_info['correct'] / learners_info['total']
+    
+    table_43, _ = generate_table_43(responses_df)
+    
+    tables = {
+        'Table_4.1': generate_table_41(learners_info.to_dict('records')),
+        'Table_4.3': table_43,
+        'Table_4.5': generate_table_45(engagement_df),
+        'Table_4.6': generate_table_46(responses_df),
+        'Table_4.7': generate_table_47(adaptations_df)
+    }
+    
+    return tables, learners_info
+
 # ============================================================================
 # MAIN PROCESSING FUNCTION
 # ============================================================================
@@ -297,46 +339,12 @@ def process_simulation_data(
     
     # Generate tables
     print("\n2. Generating Chapter 4 tables...")
-    
-    # Get learner info
-    learners_info = responses_df.groupby('learner_id').agg({
-        'condition': 'first',
-        'profile': 'first',
-        'is_correct': ['sum', 'count']
-    }).reset_index()
-    learners_info.columns = ['learner_id', 'condition', 'profile', 'correct', 'total']
-    learners_info['accuracy'] = learners_info['correct'] / learners_info['total']
-    
-    # Table 4.1
-    table_41 = generate_table_41(learners_info.to_dict('records'))
-    print("   ✓ Table 4.1: Participant Characteristics")
-    
-    # Table 4.3
-    table_43, learner_acc = generate_table_43(responses_df)
-    print("   ✓ Table 4.3: Performance Scores")
-    
-    # Table 4.5
-    table_45 = generate_table_45(engagement_df)
-    print("   ✓ Table 4.5: Engagement Trajectory")
-    
-    # Table 4.6
-    table_46 = generate_table_46(responses_df)
-    print("   ✓ Table 4.6: Behavioral Metrics")
-    
-    # Table 4.7
-    table_47 = generate_table_47(adaptations_df)
-    print("   ✓ Table 4.7: Adaptation Distribution")
+    tables, learners_info = build_tables(responses_df, engagement_df, adaptations_df)
+    for name in tables:
+        print(f"   ✓ {name.replace('_', ' ')}")
     
     # Save tables
     print("\n3. Saving outputs...")
-    tables = {
-        'Table_4.1': table_41,
-        'Table_4.3': table_43,
-        'Table_4.5': table_45,
-        'Table_4.6': table_46,
-        'Table_4.7': table_47
-    }
-    
     for name, table in tables.items():
         output_file = f"{output_dir}/{name}.csv"
         table.to_csv(output_file, index=False)
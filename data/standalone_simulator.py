@@ -542,6 +542,107 @@ def run_simulation(num_learners: int = 10, questions_per_learner: int = 10) -> D
     
     return all_data
 
+# ============================================================================
+# HEADLESS ENGINE RUNNER
+# ============================================================================
+
+def run_headless_simulation(num_learners: int = 10, questions_per_learner: int = 10) -> Dict:
+    """
+    Run the same study design against the production CBTSystem/AdaptiveEngine
+    in-process (backend/app/simulation), instead of the AdaptiveAlgorithm
+    re-implementation above. Output has the same shape as run_simulation so
+    process_simulation_data can consume either; engagement is rescaled to
+    0-100 and difficulty to the 1-10 scale used by this simulator.
+    Learners whose session fails to start are left out and listed in
+    metadata["errors"].
+    """
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+    from app.simulation import HeadlessEngine, ProfileLearner
+
+    rng = random.Random(RANDOM_SEED)
+    profile_list = [p.value for p in LearnerArchetype]
+
+    all_data = {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(),
+            "num_learners_per_condition": num_learners,
+            "questions_per_learner": questions_per_learner,
+            "conditions": ["adaptive", "non_adaptive"],
+            "random_seed": RANDOM_SEED,
+            "learner_profiles": [p.name for p in profile_list],
+            "engine": "headless",
+            "errors": []
+        },
+        "adaptive": [],
+        "non_adaptive": []
+    }
+
+    with HeadlessEngine() as engine:
+        engine.seed_synthetic_questions('Simulation', seed=RANDOM_SEED)
+
+        for condition, key, prefix in (("adaptive", "adaptive", "ADAPT"),
+                                       ("non-adaptive", "non_adaptive", "NONADAPT")):
+            for i in range(num_learners):
+                profile = profile_list[i % len(profile_list)]
+                learner = ProfileLearner(f"{prefix}-{i+1:03d}", profile, random.Random(rng.random()))
+                trace = engine.run_session(learner, 'Simulation', questions_per_learner,
+                                           adaptive=(condition == "adaptive"))
+                if "error" in trace:
+                    # Session could not start; report it and leave the learner out
+                    print(f"  ! Learner {learner.learner_id} ({condition}) failed: {trace['error']}")
+                    all_data["metadata"]["errors"].append({
+                        "learner_id": learner.learner_id, "condition": condition, "error": trace["error"]
+                    })
+                    continue
+
+                timestamp = datetime.now()
+                interactions = []
+                correct = 0
+                for step in trace["interactions"]:
+                    correct += step["is_correct"]
+                    previous_difficulty = round(step["difficulty_before"] * 10)
+                    new_difficulty = round(step["difficulty_after"] * 10)
+                    action_type = ("increase" if new_difficulty > previous_difficulty
+                                   else "decrease" if new_difficulty < previous_difficulty
+                                   else "maintain")
+                    interactions.append({
+                        "timestamp": timestamp.isoformat(),
+                        "question_number": step["question_number"],
+                        "request": {
+                            "response_time_seconds": step["response_time_seconds"],
+                            "question_id": step["question_id"]
+                        },
+                        "response": {
+                            "is_correct": step["is_correct"],
+                            "engagement_score": round(step["engagement_score"] * 100, 2),
+                            "engagement_level": step["engagement_level"],
+                            "accuracy_recent": round(correct / step["question_number"], 3),
+                            "previous_difficulty": previous_difficulty,
+                            "new_difficulty": new_difficulty,
+                            "action_type": action_type,
+                            "reason": "AdaptiveEngine (headless)"
+                        }
+                    })
+                    timestamp += timedelta(seconds=step["response_time_seconds"])
+
+                all_data[key].append({
+                    "learner_id": learner.learner_id,
+                    "profile": profile.name,
+                    "condition": condition,
+                    "session_id": trace.get("session_id"),
+                    "total_questions_attempted": len(interactions),
+                    "total_questions_correct": correct,
+                    "final_accuracy": round(correct / len(interactions), 3) if interactions else 0,
+                    "final_engagement": interactions[-1]["response"]["engagement_score"] if interactions else 0,
+                    "final_difficulty": round(trace.get("final_difficulty", 0.5) * 10),
+                    "disengaged": False,
+                    "interactions": interactions
+                })
+
+    return all_data
+
 # ============================================================================
 # EXECUTION
 # ============================================================================
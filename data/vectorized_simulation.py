@@ -0,0 +1,330 @@
+"""
+Vectorized Monte Carlo Learner Simulator
+=========================================
+
+Batched counterpart of standalone_simulator.py: N learners are represented as
+NumPy arrays (ability, fatigue, engagement, difficulty, ...) and every learner
+advances one question per step with vectorized RNG draws. The learner model and
+the AdaptiveAlgorithm engagement/difficulty rules are the same as in
+standalone_simulator.py, expressed as array operations.
+
+Difficulty is kept on the backend's 0-1 scale so the adaptation bounds and step
+can be taken from (and swept over) ADAPTATION_CONFIG in backend/config.py. It
+is reported on the simulator's 1-10 scale (difficulty * 10) so the output feeds
+process_simulation_data.build_tables unchanged.
+
+Usage:
+    from vectorized_simulation import simulate, sweep_adaptation_config
+    responses_df, engagement_df, adaptations_df = simulate(num_learners=100000)
+    sweep = sweep_adaptation_config({'difficulty_step': [0.05, 0.1, 0.2]})
+"""
+
+import itertools
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from standalone_simulator import RANDOM_SEED, LearnerArchetype
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from config import Config  # noqa: E402
+
+ACTION_LABELS = np.array(["maintain", "increase", "decrease"])
+LEVEL_LABELS = np.array(["low", "medium", "high"])
+
+# ============================================================================
+# PROFILE ARRAYS
+# ============================================================================
+
+def _profile_arrays(num_learners: int) -> Dict[str, np.ndarray]:
+    """Per-learner profile parameters, assigned round-robin like run_simulation"""
+    profiles = [p.value for p in LearnerArchetype]
+    index = np.arange(num_learners) % len(profiles)
+
+    def column(attr, dtype=float):
+        return np.array([getattr(p, attr) for p in profiles], dtype=dtype)[index]
+
+    return {
+        "profile_index": index,
+        "profile_names": np.array([p.name for p in profiles]),
+        "rt_mean": column("response_time_mean"),
+        "rt_std": column("response_time_std"),
+        "acc_mean": column("accuracy_mean"),
+        "acc_std": column("accuracy_std"),
+        "hint_p": column("hint_usage_probability"),
+        "pauses": column("pauses_per_response"),
+        "option_p": column("option_changes_probability"),
+        "disengagement_trigger": column("disengagement_trigger", bool),
+        "stress_sensitivity": column("stress_sensitivity", bool),
+    }
+
+# ============================================================================
+# BATCHED SIMULATION
+# ============================================================================
+
+def simulate_arrays(
+    num_learners: int = 10,
+    questions_per_learner: int = 10,
+    adaptation_config: Dict = None,
+    seed: int = RANDOM_SEED,
+    fatigue_rate: float = 0.0,
+) -> Dict[str, np.ndarray]:
+    """
+    Simulate num_learners per condition (adaptive first, then non-adaptive).
+
+    Returns per-step arrays of shape (questions_per_learner, 2 * num_learners)
+    plus per-learner metadata. `active[q, i]` is False once learner i stopped
+    early (disengaged after question 5, as in LearnerSimulator.run_session).
+
+    fatigue_rate scales down the chance of a correct answer by
+    (1 - fatigue) with fatigue growing by fatigue_rate per question; the
+    default 0.0 reproduces the standalone learner model.
+    """
+    config = dict(Config.ADAPTATION_CONFIG)
+    config.update(adaptation_config or {})
+    min_d, max_d, step = config["min_difficulty"], config["max_difficulty"], config["difficulty_step"]
+
+    rng = np.random.default_rng(seed)
+    n = 2 * num_learners
+    Q = questions_per_learner
+
+    profile = {k: (v if k == "profile_names" else np.concatenate([v, v])) for k, v in _profile_arrays(num_learners).items()}
+    adaptive = np.arange(n) < num_learners
+
+    # Learner state
+    engagement = np.full(n, 75.0)
+    difficulty = np.full(n, 0.5)
+    fatigue = np.zeros(n)
+    correct_count = np.zeros(n)
+    disengaged = np.zeros(n, dtype=bool)
+    active = np.ones(n, dtype=bool)
+
+    steps = {
+        "active": np.zeros((Q, n), dtype=bool),
+        "response_time": np.zeros((Q, n)),
+        "is_correct": np.zeros((Q, n), dtype=bool),
+        "option_changes": np.zeros((Q, n), dtype=np.int64),
+        "hints_used": np.zeros((Q, n), dtype=np.int64),
+        "pauses": np.zeros((Q, n), dtype=np.int64),
+        "engagement": np.zeros((Q, n)),
+        "accuracy_recent": np.zeros((Q, n)),
+        "previous_difficulty": np.zeros((Q, n)),
+        "new_difficulty": np.zeros((Q, n)),
+        "action": np.zeros((Q, n), dtype=np.int64),
+        "disengaged": np.zeros((Q, n), dtype=bool),
+    }
+
+    for q in range(Q):
+        steps["active"][q] = active
+
+        # --- Learner response (LearnerSimulator.generate_response) ---
+        response_time = np.maximum(2.0, rng.normal(profile["rt_mean"], profile["rt_std"]))
+        difficulty_factor = 1 - ((difficulty * 10 - 5) * 0.08)
+        ability = np.clip(profile["acc_mean"] * difficulty_factor + rng.normal(0, profile["acc_std"]), 0, 1)
+        is_correct = rng.random(n) < ability * (1 - fatigue)
+        option_changes = np.where(rng.random(n) < profile["option_p"], rng.integers(1, 4, n), 0)
+        hints_used = np.where(rng.random(n) < profile["hint_p"], rng.integers(1, 3, n), 0)
+        pauses = np.maximum(0, np.trunc(rng.normal(profile["pauses"], 0.5))).astype(np.int64)
+
+        # --- Engagement (AdaptiveAlgorithm.calculate_engagement) ---
+        correct_count += is_correct & active
+        accuracy_recent = correct_count / (q + 1)
+
+        delta = np.where(is_correct, rng.uniform(5, 15, n), -rng.uniform(8, 20, n))
+        delta -= np.where(response_time < 5, 5, 0)
+        delta -= np.where(response_time > 60, 10, 0)
+        delta += np.select([accuracy_recent > 0.80, accuracy_recent < 0.40], [10, -15], 0)
+        delta -= np.where(profile["stress_sensitivity"] & (np.rint(difficulty * 10) > 7), 10, 0)
+        new_engagement = np.clip(engagement + delta, 0, 100)
+
+        disengaged_now = disengaged | ((new_engagement < 20) & profile["disengagement_trigger"])
+
+        # --- Difficulty (AdaptiveAlgorithm.determine_difficulty_action) ---
+        conditions = [
+            (accuracy_recent > 0.85) & (new_engagement > 70),
+            (accuracy_recent < 0.40) & (new_engagement < 50),
+            (new_engagement < 30) & profile["disengagement_trigger"],
+            (new_engagement > 85) & (accuracy_recent > 0.70),
+        ]
+        change = np.select(conditions, [step, -step, -2 * step, step], 0.0)
+        change = np.where(adaptive, change, 0.0)
+        new_difficulty = np.clip(np.round(difficulty + change, 6), min_d, max_d)
+        action = np.select([change > 0, change < 0], [1, 2], 0)
+
+        # --- Record step and advance only active learners ---
+        steps["response_time"][q] = response_time
+        steps["is_correct"][q] = is_correct
+        steps["option_changes"][q] = option_changes
+        steps["hints_used"][q] = hints_used
+        steps["pauses"][q] = pauses
+        steps["engagement"][q] = new_engagement
+        steps["accuracy_recent"][q] = accuracy_recent
+        steps["previous_difficulty"][q] = difficulty
+        steps["new_difficulty"][q] = new_difficulty
+        steps["action"][q] = action
+        steps["disengaged"][q] = disengaged_now
+
+        engagement = np.where(active, new_engagement, engagement)
+        difficulty = np.where(active, new_difficulty, difficulty)
+        disengaged = np.where(active, disengaged_now, disengaged)
+        fatigue = np.minimum(1.0, fatigue + fatigue_rate * active)
+
+        if q + 1 > 5:
+            active &= ~disengaged
+
+    steps["adaptive"] = adaptive
+    steps["profile_index"] = profile["profile_index"]
+    steps["profile_names"] = profile["profile_names"]
+    return steps
+
+
+def to_dataframes(steps: Dict[str, np.ndarray]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Flatten the step arrays into the (responses_df, engagement_df, adaptations_df)
+    layout produced by process_simulation_data.extract_from_simulation.
+    """
+    Q, n = steps["active"].shape
+    num_learners = n // 2
+
+    # Flatten learner-major (all questions of learner 0, then learner 1, ...)
+    mask = steps["active"].T.ravel()
+
+    def flat(key):
+        return steps[key].T.ravel()[mask]
+
+    learner_index = np.repeat(np.arange(n), Q)[mask]
+    question_number = np.tile(np.arange(1, Q + 1), n)[mask]
+
+    adaptive = steps["adaptive"][learner_index]
+    local_index = np.where(adaptive, learner_index, learner_index - num_learners) + 1
+    width = max(3, len(str(num_learners)))
+    learner_id = np.char.add(
+        np.where(adaptive, "ADAPT-", "NONADAPT-"),
+        np.char.zfill(local_index.astype(str), width),
+    )
+    condition = np.where(adaptive, "adaptive", "non-adaptive")
+    profile = steps["profile_names"][steps["profile_index"][learner_index]]
+
+    response_time = np.round(flat("response_time"), 2)
+    # Synthetic timestamps: 3.5s average gap between interactions, as in run_session
+    base = np.datetime64(datetime.now().replace(microsecond=0))
+    timestamp = (base + (question_number * 3500).astype("timedelta64[ms]")).astype(str)
+
+    engagement = np.round(flat("engagement"), 2)
+    level = LEVEL_LABELS[np.select([engagement < 40, engagement < 70], [0, 1], 2)]
+
+    responses_df = pd.DataFrame({
+        "learner_id": learner_id,
+        "condition": condition,
+        "profile": profile,
+        "response_time_seconds": response_time,
+        "is_correct": flat("is_correct"),
+        "option_changes": flat("option_changes"),
+        "hints_used": flat("hints_used"),
+        "pauses_during_response": flat("pauses"),
+        "timestamp": timestamp,
+    })
+
+    engagement_df = pd.DataFrame({
+        "learner_id": learner_id,
+        "condition": condition,
+        "response_time_seconds": response_time,
+        "engagement_score": engagement,
+        "engagement_level": level,
+        "accuracy_recent": np.round(flat("accuracy_recent"), 3),
+        "timestamp": timestamp,
+    })
+
+    previous = np.rint(flat("previous_difficulty") * 10).astype(np.int64)
+    new = np.rint(flat("new_difficulty") * 10).astype(np.int64)
+    adaptations_df = pd.DataFrame({
+        "learner_id": learner_id,
+        "condition": condition,
+        "previous_difficulty": previous,
+        "new_difficulty": new,
+        "action_type": ACTION_LABELS[flat("action")],
+        "reason": "vectorized simulation",
+        "engagement_level": level,
+        "timestamp": timestamp,
+    })
+
+    return responses_df, engagement_df, adaptations_df
+
+
+def simulate(num_learners: int = 10, questions_per_learner: int = 10,
+             adaptation_config: Dict = None, seed: int = RANDOM_SEED,
+             fatigue_rate: float = 0.0) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Run the batched simulation and return the extract_from_simulation dataframes"""
+    steps = simulate_arrays(num_learners, questions_per_learner, adaptation_config, seed, fatigue_rate)
+    return to_dataframes(steps)
+
+# ============================================================================
+# PARAMETER SWEEPS
+# ============================================================================
+
+def summarize_steps(steps: Dict[str, np.ndarray]) -> Dict:
+    """Per-condition summary metrics straight from the step arrays"""
+    active = steps["active"]
+    answered = active.sum(axis=0)
+    correct = (steps["is_correct"] & active).sum(axis=0)
+    last = np.maximum(answered - 1, 0)
+    cols = np.arange(active.shape[1])
+    final_engagement = steps["engagement"][last, cols]
+    final_difficulty = steps["new_difficulty"][last, cols]
+    ended_disengaged = steps["disengaged"][last, cols]
+    actions = np.where(active, steps["action"], -1)
+
+    summary = {}
+    for name, selector in (("adaptive", steps["adaptive"]), ("non_adaptive", ~steps["adaptive"])):
+        total_actions = max(1, int((actions[:, selector] >= 0).sum()))
+        summary.update({
+            f"{name}_accuracy": float(correct[selector].sum() / max(1, answered[selector].sum())),
+            f"{name}_final_engagement": float(final_engagement[selector].mean()),
+            f"{name}_final_difficulty": float(final_difficulty[selector].mean()),
+            f"{name}_disengaged_rate": float(ended_disengaged[selector].mean()),
+            f"{name}_questions_answered": float(answered[selector].mean()),
+            f"{name}_increase_pct": float((actions[:, selector] == 1).sum() / total_actions * 100),
+            f"{name}_decrease_pct": float((actions[:, selector] == 2).sum() / total_actions * 100),
+        })
+    return summary
+
+
+def sweep_adaptation_config(grid: Dict[str, List], num_learners: int = 10000,
+                            questions_per_learner: int = 10, seed: int = RANDOM_SEED,
+                            fatigue_rate: float = 0.0) -> pd.DataFrame:
+    """
+    Evaluate every combination of ADAPTATION_CONFIG overrides in `grid`
+    (e.g. {'difficulty_step': [0.05, 0.1], 'max_difficulty': [0.8, 0.9]}).
+    All configurations share the same seed (common random numbers).
+    """
+    keys = list(grid)
+    rows = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        overrides = dict(zip(keys, values))
+        steps = simulate_arrays(num_learners, questions_per_learner, overrides, seed, fatigue_rate)
+        rows.append({**overrides, **summarize_steps(steps)})
+    return pd.DataFrame(rows)
+
+# ============================================================================
+# EXECUTION
+# ============================================================================
+
+if __name__ == "__main__":
+    import time
+    from process_simulation_data import build_tables
+
+    started = time.time()
+    responses_df, engagement_df, adaptations_df = simulate(num_learners=100000)
+    print(f"Simulated {len(responses_df)} interactions in {time.time() - started:.1f}s")
+
+    tables, _ = build_tables(responses_df, engagement_df, adaptations_df)
+    for name, table in tables.items():
+        print(f"\n{name}")
+        print(table.to_string(index=False))
+
+    print("\nSweep over difficulty_step:")
+    print(sweep_adaptation_config({"difficulty_step": [0.05, 0.1, 0.2]}, num_learners=20000).to_string(index=False))